@@ -13,7 +13,6 @@ Classes for the main Sgtk API.
 
 """
 import os
-import glob
 
 from tank_vendor import yaml
 
@@ -23,7 +22,10 @@ from .util import shotgun
 from .errors import TankError
 from .folder.folder_io import folder_preflight_checks
 from .path_cache import PathCache
-from .template import read_templates
+from .template import load_templates
+from . import templatekey
+from . import template_search
+from .template_matcher import TemplateMatcher
 from .platform import constants as platform_constants
 from . import pipelineconfig
 
@@ -50,10 +52,22 @@ class Tank(object):
             self.__pipeline_config = pipelineconfig.from_path(project_path)
             
         try:
-            self.templates = read_templates(self.__pipeline_config)
+            (self.templates, self.__templates_state) = load_templates(self.__pipeline_config)
         except TankError, e:
             raise TankError("Could not read templates configuration: %s" % e)
 
+        # matcher for template_from_path, built on first use
+        self._template_matcher = None
+        self._template_matcher_templates = None
+
+        # hash of the template definitions used by settings validation, computed on first use
+        self._template_fingerprint = None
+        self._template_fingerprint_templates = None
+
+        # cache of path cache lookups made by context_from_path
+        self._folder_entity_cache = context.FolderEntityCache(self.__pipeline_config, 
+                                                              platform_constants.CONTEXT_FROM_PATH_CACHE_SIZE)
+
         # execute a tank_init hook for developers to use.
         self.execute_hook(platform_constants.TANK_INIT_HOOK_NAME)
 
@@ -75,13 +89,36 @@ class Tank(object):
         """
         return self.__pipeline_config
 
-    def reload_templates(self):
+    def _get_template_matcher(self):
+        """
+        Internal Use Only - Returns a TemplateMatcher for the templates of this
+        instance. The matcher is updated whenever a new templates dictionary is
+        assigned, as done by reload_templates(). Changes made to the dictionary
+        in place are not picked up.
+        """
+        if self._template_matcher is None:
+            self._template_matcher_templates = self.templates
+            self._template_matcher = TemplateMatcher(self.templates)
+        elif self._template_matcher_templates is not self.templates:
+            self._template_matcher_templates = self.templates
+            self._template_matcher.update(self.templates)
+        return self._template_matcher
+
+    def reload_templates(self, incremental=False):
         """
         Reloads the template definitions. If reload fails, the previous 
         template definitions will be preserved.
+
+        :param incremental: Only create the keys and templates whose definitions have
+                            changed since the templates were last loaded, together
+                            with the templates using changed keys. Templates which 
+                            haven't changed are kept as they are.
         """
+        previous_state = None
+        if incremental:
+            previous_state = self.__templates_state
         try:
-            self.templates = read_templates(self.__pipeline_config)
+            (self.templates, self.__templates_state) = load_templates(self.__pipeline_config, previous_state)
         except TankError, e:
             raise TankError("Templates could not be reloaded: %s" % e)
 
@@ -168,21 +205,8 @@ class Tank(object):
         :returns: Template matching this path
         :rtype: Template instance or None
         """
-        matched = []
-        for key, template in self.templates.items():
-            if template.validate(path):
-                matched.append(template)
-
-        if len(matched) == 0:
-            return None
-        elif len(matched) == 1:
-            return matched[0]
-        else:
-            # ambiguity!
-            msg = "%d templates are matching the path '%s'.\n" % (len(matched), path)
-            msg += "The overlapping templates are:\n"
-            msg += "\n".join([str(x) for x in matched])
-            raise TankError(msg)
+        (template, _) = self._get_template_matcher().match(path)
+        return template
 
     def paths_from_template(self, template, fields, skip_keys=None, skip_missing_optional_keys=False):
         """
@@ -215,6 +239,15 @@ class Tank(object):
         :returns: Matching file paths
         :rtype: List of strings.
         """
+        return self._paths_from_template(template, fields, skip_keys, skip_missing_optional_keys)
+
+    def _paths_from_template(self, template, fields, skip_keys=None, skip_missing_optional_keys=False, validate=True):
+        """
+        Finds paths that match a template using field values passed. See paths_from_template().
+        
+        :param validate: If False, the paths found are not validated against the template
+                         and may include paths which aren't valid for the template.
+        """
         skip_keys = skip_keys or []
         if isinstance(skip_keys, basestring):
             skip_keys = [skip_keys]
@@ -263,8 +296,12 @@ class Tank(object):
                 continue
             globs_searched.add(glob_str)
             
-            # Find all files which are valid for this key set
-            found_files.update([found_file for found_file in glob.iglob(glob_str) if template.validate(found_file)])
+            # Find all files which are valid for this key set. The search
+            # finds the same files as a glob of the search string.
+            search_results = template_search.find_paths(template, current_local_fields, current_skip_keys)
+            if validate:
+                search_results = [found_file for found_file in search_results if template.validate(found_file)]
+            found_files.update(search_results)
                     
         return list(found_files) 
 
@@ -289,6 +326,49 @@ class Tank(object):
         :returns: A list of paths whose abstract keys use their abstract(default) value unless
                   a value is specified for them in the fields parameter.
         """
+        return self._abstract_paths_from_template(template, fields).keys()
+
+    def frame_ranges_from_template(self, template, fields):
+        """
+        Returns the abstract paths for a template, as abstract_paths_from_template()
+        does, together with the range of frames found on disk for each path.
+
+        Example:
+
+            >>> tk.frame_ranges_from_template(template, {"Shot": "AAA"})
+            {"/mnt/proj/AAA/render/beauty.%04d.exr": (1001, 1100, [1050, 1051])}
+
+        :param template: Template with which to search.
+        :param fields: Mapping of keys to values with which to assemble the abstract path.
+
+        :returns: Dictionary keyed by abstract path, with tuples (first frame, last frame,
+                  list of missing frames) as values. The value is None for paths 
+                  without frame numbers.
+        """
+        frame_ranges = {}
+        for (abstract_path, frames) in self._abstract_paths_from_template(template, fields, True).items():
+            if not frames:
+                frame_ranges[abstract_path] = None
+                continue
+            first = min(frames)
+            last = max(frames)
+            missing = [x for x in xrange(first, last + 1) if x not in frames]
+            frame_ranges[abstract_path] = (first, last, missing)
+        return frame_ranges
+
+    def _abstract_paths_from_template(self, template, fields, with_frames=False):
+        """
+        Finds the abstract paths for a template. See abstract_paths_from_template().
+
+        Paths found on disk which only differ by the values of their abstract keys,
+        like the frames of an image sequence, are grouped together and only one path
+        of each group is parsed with the template.
+
+        :param with_frames: Collect the frame numbers of the paths found. This requires
+                            a search down to the leaf level of the template.
+        :returns: Dictionary keyed by abstract path, with the set of frame numbers
+                  found for each path as values.
+        """
         search_template = template
 
         # the logic is as follows:
@@ -301,11 +381,11 @@ class Tank(object):
         # and abstract templates.
 
         # can we avoid the leaf level?
-        leaf_keys = set(template.keys.keys()) - set(template.parent.keys.keys())
+        leaf_keys = template._get_level_key_names()
 
         abstract_key_names = [k.name for k in template.keys.values() if k.is_abstract]
 
-        skip_leaf_level = True
+        skip_leaf_level = not with_frames
         for k in leaf_keys:
             if k not in abstract_key_names:
                 # a non-abstract key
@@ -314,20 +394,39 @@ class Tank(object):
                     skip_leaf_level = False
                     break
 
-        if skip_leaf_level:
+        if skip_leaf_level and template.parent is not None:
             search_template = template.parent
 
-        # now carry out a regular search based on the template
-        found_files = self.paths_from_template(search_template, fields)
+        # now carry out a regular search based on the template. The paths found
+        # are validated below, one path per group of paths which only differ
+        # by the values of their abstract keys.
+        found_files = self._paths_from_template(search_template, fields, validate=False)
 
         st_abstract_key_names = [k.name for k in search_template.keys.values() if k.is_abstract]
+        sequence_key_names = [k.name for k in search_template.keys.values() 
+                              if isinstance(k, templatekey.SequenceKey)]
 
         # now collapse down the search matches for any abstract fields,
         # and add the leaf level if necessary
-        abstract_paths = set()
-        for found_file in found_files:
+        abstract_paths = {}
+        for group in template_search.group_by_abstract_keys(search_template, found_files):
 
-            cur_fields = search_template.get_fields(found_file)
+            # all the paths in the group resolve to the same abstract path
+            (found_file, values) = group[0]
+            try:
+                cur_fields = search_template.get_fields(found_file)
+            except TankError:
+                # not a valid path for the template
+                continue
+
+            # collect the frame numbers 
+            frames = set()
+            for seq_key_name in sequence_key_names[:1]:
+                if values is None:
+                    frame_values = [cur_fields.get(seq_key_name)]
+                else:
+                    frame_values = [x[1].get(seq_key_name) for x in group]
+                frames.update([int(x) for x in frame_values if x is not None and str(x).isdigit()])
 
             # pass 1 - go through the fields for this file and
             # zero out the abstract fields - this way, apply
@@ -351,9 +450,9 @@ class Tank(object):
 
             # now we have all the fields we need to compose the full template
             abstract_path = template.apply_fields(cur_fields)
-            abstract_paths.add(abstract_path)
+            abstract_paths.setdefault(abstract_path, set()).update(frames)
 
-        return list(abstract_paths)
+        return abstract_paths
 
 
     def paths_from_entity(self, entity_type, entity_id):
@@ -425,6 +524,19 @@ class Tank(object):
         """
         return context.from_entity(self, entity_type, entity_id)
 
+    def contexts_from_entities(self, entity_type, entity_ids):
+        """
+        Derive contexts for several shotgun entities of the same type.
+        This is much faster than calling context_from_entity() for each
+        entity when there are many entities.
+
+        :param entity_type: The entity type to produce contexts for.
+        :param entity_ids: List of entity ids to produce contexts for.
+
+        :returns: Dictionary of context objects keyed by entity id.
+        """
+        return context.from_entities(self, entity_type, entity_ids)
+
     def create_filesystem_structure(self, entity_type, entity_id, engine=None):
         """
         Create folders and associated data on disk to reflect branches in the project tree
@@ -23,7 +23,11 @@ from .util import login
 from .util import shotgun_entity
 from .util import shotgun
 from .errors import TankError
+from .util.lru_cache import LRUCache
+from .util.entity_ref import get_entity_ref
+from . import path_cache
 from .path_cache import PathCache
+from .platform import constants
 from .template import TemplatePath
 
 
@@ -42,21 +46,28 @@ class Context(object):
 
     Contexts are always created via the factory methods. Avoid instantiating it by hand.
 
+    The entity links of a context are immutable EntityRef dictionaries, shared
+    by all the contexts pointing at the same entities.
+
     """
 
+    __slots__ = ("__tk", "__project", "__entity", "__step", "__task", "__user", 
+                 "__additional_entities", "_entity_fields_cache", "__weakref__")
+
     def __init__(self, tk, project=None, entity=None, step=None, task=None, user=None, additional_entities=[]):
         """
         Do not create instances of this class directly.
         Instead, use the factory methods.
         """
         self.__tk = tk
-        self.__project = project
-        self.__entity = entity
-        self.__step = step
-        self.__task = task
-        self.__user = user
-        self.__additional_entities = additional_entities
-        self._entity_fields_cache = {}
+        self.__project = get_entity_ref(project)
+        self.__entity = get_entity_ref(entity)
+        self.__step = get_entity_ref(step)
+        self.__task = get_entity_ref(task)
+        self.__user = get_entity_ref(user)
+        self.__additional_entities = [get_entity_ref(x) for x in additional_entities]
+        # created when first needed
+        self._entity_fields_cache = None
 
     def __repr__(self):
         # multi line repr
@@ -139,13 +150,13 @@ class Context(object):
         # construct copy with current api instance:
         ctx_copy = Context(self.__tk)
         
-        # deepcopy all other members:
-        ctx_copy.__project = copy.deepcopy(self.__project, memo)
-        ctx_copy.__entity = copy.deepcopy(self.__entity, memo)
-        ctx_copy.__step = copy.deepcopy(self.__step, memo)
-        ctx_copy.__task = copy.deepcopy(self.__task, memo)
-        ctx_copy.__user = copy.deepcopy(self.__user, memo)        
-        ctx_copy.__additional_entities = copy.deepcopy(self.__additional_entities, memo)
+        # the entity links are immutable and can be shared:
+        ctx_copy.__project = self.__project
+        ctx_copy.__entity = self.__entity
+        ctx_copy.__step = self.__step
+        ctx_copy.__task = self.__task
+        ctx_copy.__user = self.__user
+        ctx_copy.__additional_entities = list(self.__additional_entities)
         
         # except:
         # ctx_copy._entity_fields_cache
@@ -220,9 +231,9 @@ class Context(object):
         if self.__user is None:
             user = login.get_current_user(self.__tk)
             if user is not None:
-                self.__user = {"type": user.get("type"), 
-                               "id": user.get("id"), 
-                               "name": user.get("name")}
+                self.__user = get_entity_ref({"type": user.get("type"), 
+                                              "id": user.get("id"), 
+                                              "name": user.get("name")})
         return self.__user
 
     @property
@@ -419,7 +430,7 @@ class Context(object):
         :returns: Context object
         """
         ctx_copy = copy.deepcopy(self)
-        ctx_copy.__user = user
+        ctx_copy.__user = get_entity_ref(user)
         return ctx_copy       
 
     ################################################################################################
@@ -448,6 +459,8 @@ class Context(object):
                 
                 # check the context cache 
                 cache_key = (entity["type"], entity["id"], key.shotgun_field_name)
+                if self._entity_fields_cache is None:
+                    self._entity_fields_cache = {}
                 if cache_key in self._entity_fields_cache:
                     # already have the value cached - no need to fetch from shotgun
                     fields[key.name] = self._entity_fields_cache[cache_key]
@@ -559,7 +572,7 @@ class Context(object):
         #  <Sgtk TemplatePath sequences/{Sequence}/{Shot}/{Step}/publish>, 
         #  <Sgtk TemplatePath sequences/{Sequence}/{Shot}/{Step}/publish/maya>, 
         #  <Sgtk TemplatePath maya_shot_publish: sequences/{Sequence}/{Shot}/{Step}/publish/maya/{name}.v{version}.ma>]
-        templates = _get_template_ancestors(template)
+        templates = template.ancestors
 
         # get a path cache handle
         path_cache = PathCache(self.__tk.pipeline_configuration)
@@ -568,7 +581,7 @@ class Context(object):
             # for each template, get all paths we have stored in the database
             # and get the filename - this will be our field value
             for cur_template in templates:
-                for key in cur_template.keys.values():
+                for key in cur_template._keys[0].values():
                     # If we don't already have a value, look for it
                     if fields.get(key.name) is None:
                         entity = entities.get(key.name)
@@ -670,6 +683,109 @@ def from_entity(tk, entity_type, entity_id):
 
     return Context(**context)
 
+def from_entities(tk, entity_type, entity_ids):
+    """
+    Constructs contexts for several shotgun entities of the same type.
+    This gives the same results as calling from_entity() for each entity
+    but uses a fixed number of Shotgun and path cache queries, regardless
+    of the number of entities.
+
+    :param tk:           Sgtk API handle
+    :param entity_type:  The shotgun entity type to produce contexts for.
+    :param entity_ids:   List of shotgun entity ids to produce contexts for.
+
+    :returns: dictionary of context objects keyed by entity id
+    """
+    if entity_type is None:
+        raise TankError("Cannot create a context from an entity type 'None'!")
+    
+    if None in entity_ids:
+        raise TankError("Cannot create a context from an entity id set to 'None'!")
+
+    # remove duplicates but keep the order
+    unique_ids = []
+    for entity_id in entity_ids:
+        if entity_id not in unique_ids:
+            unique_ids.append(entity_id)
+    if len(unique_ids) == 0:
+        return {}
+
+    if entity_type == "Task":
+        # For tasks get data from shotgun query
+        contexts_data = _tasks_from_sg(tk, unique_ids)
+
+    elif entity_type in ["PublishedFile", "TankPublishedFile"]:
+        
+        sg_entities = tk.shotgun.find(entity_type, 
+                                      [["id", "in"] + unique_ids], 
+                                      ["project", "entity", "task"])
+        sg_entities_by_id = dict((x["id"], x) for x in sg_entities)
+        
+        missing_ids = [x for x in unique_ids if x not in sg_entities_by_id]
+        if missing_ids:
+            raise TankError("Entities %s with ids %s not found in Shotgun!" 
+                            % (entity_type, ", ".join([str(x) for x in missing_ids])))
+
+        # base the context on the task, entity or project that each 
+        # published file is linked with, in that order of preference.
+        links = {}
+        for entity_id in unique_ids:
+            sg_entity = sg_entities_by_id[entity_id]
+            for field in ["task", "entity", "project"]:
+                if sg_entity.get(field):
+                    links[entity_id] = (sg_entity[field]["type"], sg_entity[field]["id"])
+                    break
+        
+        linked_ids_by_type = {}
+        for (linked_type, linked_id) in links.values():
+            linked_ids_by_type.setdefault(linked_type, []).append(linked_id)
+        linked_contexts = {}
+        for (linked_type, linked_ids) in linked_ids_by_type.iteritems():
+            for (linked_id, ctx) in from_entities(tk, linked_type, linked_ids).iteritems():
+                linked_contexts[(linked_type, linked_id)] = ctx
+
+        contexts = {}
+        for entity_id in unique_ids:
+            if entity_id in links:
+                contexts[entity_id] = linked_contexts[links[entity_id]]
+            else:
+                # not linked to anything
+                contexts[entity_id] = Context(tk)
+        return contexts
+    
+    else:
+        # Get data from path cache
+        contexts_data = _context_data_from_cache_many(tk, entity_type, unique_ids)
+                    
+        # make sure these were actually found in the cache
+        # fall back on a shotgun lookup if not found
+        missing_ids = [x for x in unique_ids if contexts_data[x]["project"] is None]
+        if missing_ids:
+            contexts_data.update(_entities_from_sg(tk, entity_type, missing_ids))
+
+    contexts = {}
+    for entity_id in unique_ids:
+        # prep our return data structure
+        context = {
+            "tk": tk,
+            "project": None,
+            "entity": None,
+            "step": None,
+            "user": None,
+            "task": None,
+            "additional_entities": []
+        }
+        context.update(contexts_data[entity_id])
+        
+        if entity_type == "Project":
+            # no need to set entity to point at project in this case
+            # that only produces double entries.
+            context["entity"] = None
+        
+        contexts[entity_id] = Context(**context)
+
+    return contexts
+
 def from_path(tk, path, previous_context=None):
     """
     Constructs a context from a path to a folder or a file.
@@ -688,126 +804,276 @@ def from_path(tk, path, previous_context=None):
     :returns: a context object
     """
 
-    # prep our return data structure
-    context = {
-        "tk": tk,
-        "project": None,
-        "entity": None,
-        "step": None,
-        "user": None,
-        "task": None,
-        "additional_entities": []
-    }
+    resolver = PathContextResolver(tk)
+    try:
+        return resolver.context_from_path(path, previous_context)
+    finally:
+        resolver.close()
 
-    # ask hook for extra entity types we should recognize and insert into the additional_entities list.
-    additional_types = tk.execute_hook("context_additional_entities").get("entity_types_in_path", [])
 
-    # get a cache handle
-    path_cache = PathCache(tk.pipeline_configuration)
+class FolderEntityCache(object):
+    """
+    Remembers the entities associated with folders, as found in the path
+    cache. An instance is held by each Sgtk API instance so that repeated context_from_path calls for paths
+    sharing parent folders don't have to query the path cache again.
+    
+    All cached data is discarded as soon as the path cache changes, 
+    either on disk or through this process.
+    """
+    
+    def __init__(self, pipeline_configuration, max_size):
+        """
+        :param pipeline_configuration: pipeline config object
+        :param max_size: maximum number of lookups to remember
+        """
+        self._db_path = pipeline_configuration.get_path_cache_location()
+        self._folders = LRUCache(max_size)
+        self._state = None
+    
+    def _get_state(self):
+        try:
+            stat = os.stat(self._db_path)
+            db_state = (stat.st_mtime, stat.st_size)
+        except OSError:
+            db_state = None
+        return (db_state, path_cache.get_write_generation())
+    
+    def validate(self):
+        """
+        Clears the cache if the path cache has changed since the last call.
+        """
+        state = self._get_state()
+        if state != self._state:
+            self._folders.clear()
+            self._state = state
+    
+    def get(self, key):
+        """
+        Returns a cached lookup result, or None if not cached
+        """
+        return self._folders.get(key)
+    
+    def set(self, key, value):
+        """
+        Remembers a lookup result
+        """
+        self._folders.set(key, value)
 
-    # gather all roots as lower case
-    project_roots = [x.lower() for x in tk.pipeline_configuration.get_data_roots().values()]
 
-    # first gather entities
-    entities = []
-    secondary_entities = []
-    curr_path = path
-    while True:
-        curr_entity = path_cache.get_entity(curr_path)
-        if curr_entity:
-            # Don't worry about entity types we've already got in the context. In the future
-            # we should look for entity ids that conflict in order to flag a degenerate schema.
-            entities.append(curr_entity)
+class PathContextResolver(object):
+    """
+    Constructs contexts from paths. The entities found in the path cache 
+    for each folder, including the lack of any, are remembered in the 
+    folder entity cache of the Sgtk API instance. Paths which share parent
+    folders therefore only look each folder up once, and the entities of 
+    all the files in a folder are fetched with a single query. 
+    
+    The path cache is only opened when a lookup isn't found in the cache.
+    The context_additional_entities hook is executed once per resolver.
+    """
+
+    def __init__(self, tk):
+        """
+        :param tk: Sgtk API handle
+        """
+        self._tk = tk
+        self._path_cache = None
+        self._additional_types = None
+        
+        self._cache = getattr(tk, "_folder_entity_cache", None)
+        if self._cache is None:
+            # not an API instance, use a private cache
+            self._cache = FolderEntityCache(tk.pipeline_configuration, 
+                                            constants.CONTEXT_FROM_PATH_CACHE_SIZE)
         
-        # add secondary entities
-        secondary_entities.extend( path_cache.get_secondary_entities(curr_path) )
+        # gather all roots as lower case
+        self._project_roots = [x.lower() for x in tk.pipeline_configuration.get_data_roots().values()]
 
-        if curr_path.lower() in project_roots:
-            #TODO this could fail with windows path variations
-            # we have reached a root!
-            break
+    def close(self):
+        """
+        Closes the path cache connection, if it was opened
+        """
+        if self._path_cache is not None:
+            self._path_cache.close()
+            self._path_cache = None
 
-        # and continue with parent path
-        parent_path = os.path.abspath(os.path.join(curr_path, ".."))
+    def _get_additional_types(self):
+        """
+        Returns the entity types which should be added to the additional 
+        entities of a context, as returned by the context_additional_entities hook.
+        """
+        if self._additional_types is None:
+            hook_data = self._tk.execute_hook("context_additional_entities")
+            self._additional_types = hook_data.get("entity_types_in_path", [])
+        return self._additional_types
 
-        if curr_path == parent_path:
-            # We're at the disk root, probably a degenerate path
-            break
-        else:
-            curr_path = parent_path
-
-    path_cache.close()
-
-    # now populate the context
-    # go from the root down, so that in the case there are a path with
-    # multiple entities (like PROJECT/SEQUENCE/SHOT), the last entry
-    # is the most relevant one, and will be assigned as the entity
-    for curr_entity in entities[::-1]:
-        # handle the special context fields first
-        if curr_entity["type"] == "Project":
-            context["project"] = curr_entity
-        elif curr_entity["type"] == "Step":
-            context["step"] = curr_entity
-        elif curr_entity["type"] == "Task":
-            context["task"] = curr_entity
-        elif curr_entity["type"] == "HumanUser":
-            context["user"] = curr_entity
-        elif curr_entity["type"] in additional_types:
-            context["additional_entities"].append(curr_entity)
-        else:
-            context["entity"] = curr_entity
-
-    # now that the context has been populated as much as possible using the
-    # primary entities, fill in any blanks based on the secondary entities.
-    for curr_entity in secondary_entities[::-1]:
-        # handle the special context fields first
-        if curr_entity["type"] == "Project":
-            if context["project"] is None:
-                context["project"] = curr_entity
+    def _get_path_cache(self):
+        if self._path_cache is None:
+            self._path_cache = PathCache(self._tk.pipeline_configuration)
+        return self._path_cache
+
+    def _folder_entities(self, path, is_root):
+        """
+        Returns the primary entity, or None, and the list of secondary 
+        entities associated with a single path.
+        """
+        (parent_path, name) = os.path.split(path)
+        if is_root or not name or parent_path == path:
+            # roots aren't children of a folder in the path cache
+            path_cache = self._get_path_cache()
+            return (path_cache.get_entity(path), path_cache.get_secondary_entities(path))
         
-        elif curr_entity["type"] == "Step":
-            if context["step"] is None:
-                context["step"] = curr_entity
+        # look up all the children of the parent folder in one go. 
+        # siblings of the path are likely to be asked about next.
+        key = ("children", parent_path)
+        children = self._cache.get(key)
+        if children is None:
+            children = self._get_path_cache().get_child_entities(parent_path)
+            self._cache.set(key, children)
+        return children.get(name, (None, []))
+
+    def _entities_from_path(self, path):
+        """
+        Returns the primary and secondary entities associated with a path
+        and its parent folders, up to the project root. 
         
-        elif curr_entity["type"] == "Task":
-            if context["task"] is None:
-                context["task"] = curr_entity
+        :returns: tuple (entities, secondary_entities), each with the 
+                  entities for the deepest folder first
+        """
+        # walk upwards until we reach a root or a folder we already know about
+        folders = []
+        parent_entities = ([], [])
+        curr_path = path
+        while True:
+            cached = self._cache.get(("path", curr_path))
+            if cached is not None:
+                parent_entities = cached
+                break
+            
+            is_root = curr_path.lower() in self._project_roots
+            (curr_entity, curr_secondary) = self._folder_entities(curr_path, is_root)
+            folders.append((curr_path, curr_entity, curr_secondary))
+
+            if is_root:
+                #TODO this could fail with windows path variations
+                # we have reached a root!
+                break
+
+            # and continue with parent path
+            parent_path = os.path.abspath(os.path.join(curr_path, ".."))
+
+            if curr_path == parent_path:
+                # We're at the disk root, probably a degenerate path
+                break
+            else:
+                curr_path = parent_path
         
-        elif curr_entity["type"] == "HumanUser":
-            if context["user"] is None:
-                context["user"] = curr_entity
+        # now assemble the lists going back down, remembering each folder
+        (entities, secondary_entities) = parent_entities
+        for (folder, folder_entity, folder_secondary_entities) in reversed(folders):
+            # Don't worry about entity types we've already got in the context. In the future
+            # we should look for entity ids that conflict in order to flag a degenerate schema.
+            if folder_entity:
+                entities = [folder_entity] + entities
+            secondary_entities = folder_secondary_entities + secondary_entities
+            # the cached lists are shared, so they must never be modified
+            self._cache.set(("path", folder), (entities, secondary_entities))
         
-        elif curr_entity["type"] in additional_types:
-            # is this entity in the list already
-            if curr_entity not in context["additional_entities"]:            
-                context["additional_entities"].append(curr_entity)
+        return (entities, secondary_entities)
+
+    def context_from_path(self, path, previous_context=None):
+        """
+        Constructs a context from a path. See from_path() for details.
+        """
+        # prep our return data structure
+        context = {
+            "tk": self._tk,
+            "project": None,
+            "entity": None,
+            "step": None,
+            "user": None,
+            "task": None,
+            "additional_entities": []
+        }
+        # make sure we don't use stale data
+        self._cache.validate()
         
-        else:
-            if context["entity"] is None:
+        # ask hook for extra entity types we should recognize and insert into the additional_entities list.
+        additional_types = self._get_additional_types()
+
+        # first gather entities
+        (entities, secondary_entities) = self._entities_from_path(path)
+
+        # now populate the context
+        # go from the root down, so that in the case there are a path with
+        # multiple entities (like PROJECT/SEQUENCE/SHOT), the last entry
+        # is the most relevant one, and will be assigned as the entity
+        for curr_entity in entities[::-1]:
+            # handle the special context fields first
+            if curr_entity["type"] == "Project":
+                context["project"] = curr_entity
+            elif curr_entity["type"] == "Step":
+                context["step"] = curr_entity
+            elif curr_entity["type"] == "Task":
+                context["task"] = curr_entity
+            elif curr_entity["type"] == "HumanUser":
+                context["user"] = curr_entity
+            elif curr_entity["type"] in additional_types:
+                context["additional_entities"].append(curr_entity)
+            else:
                 context["entity"] = curr_entity
 
-    # see if we can populate it based on the previous context
-    if previous_context and \
-       context.get("entity") == previous_context.entity and \
-       context.get("additional_entities") == previous_context.additional_entities:
-
-        # cool, everything is matching down to the step/task level.
-        # if context is missing a step and a task, we try to auto populate it.
-        # (note: weird edge that a context can have a task but no step)
-        if context.get("task") is None and context.get("step") is None:
-            context["step"] = previous_context.step
-
-        # now try to assign previous task but only if the step matches!
-        if context.get("task") is None and context.get("step") == previous_context.step:
-            context["task"] = previous_context.task
-
-    # ensure that we don't have a Project as the entity. Projects should only 
-    # appear on the projects level, despite being entities.
-    if context["project"] and context["entity"] and context["entity"]["type"] == "Project":
-        # remove double entry!
-        context["entity"] = None
+        # now that the context has been populated as much as possible using the
+        # primary entities, fill in any blanks based on the secondary entities.
+        for curr_entity in secondary_entities[::-1]:
+            # handle the special context fields first
+            if curr_entity["type"] == "Project":
+                if context["project"] is None:
+                    context["project"] = curr_entity
+        
+            elif curr_entity["type"] == "Step":
+                if context["step"] is None:
+                    context["step"] = curr_entity
+        
+            elif curr_entity["type"] == "Task":
+                if context["task"] is None:
+                    context["task"] = curr_entity
+        
+            elif curr_entity["type"] == "HumanUser":
+                if context["user"] is None:
+                    context["user"] = curr_entity
+        
+            elif curr_entity["type"] in additional_types:
+                # is this entity in the list already
+                if curr_entity not in context["additional_entities"]:            
+                    context["additional_entities"].append(curr_entity)
+        
+            else:
+                if context["entity"] is None:
+                    context["entity"] = curr_entity
 
-    return Context(**context)
+        # see if we can populate it based on the previous context
+        if previous_context and \
+           context.get("entity") == previous_context.entity and \
+           context.get("additional_entities") == previous_context.additional_entities:
+
+            # cool, everything is matching down to the step/task level.
+            # if context is missing a step and a task, we try to auto populate it.
+            # (note: weird edge that a context can have a task but no step)
+            if context.get("task") is None and context.get("step") is None:
+                context["step"] = previous_context.step
+
+            # now try to assign previous task but only if the step matches!
+            if context.get("task") is None and context.get("step") == previous_context.step:
+                context["task"] = previous_context.task
+
+        # ensure that we don't have a Project as the entity. Projects should only 
+        # appear on the projects level, despite being entities.
+        if context["project"] and context["entity"] and context["entity"]["type"] == "Project":
+            # remove double entry!
+            context["entity"] = None
+
+        return Context(**context)
 
 ################################################################################################
 # serialization
@@ -888,8 +1154,9 @@ def context_yaml_constructor(loader, node):
     # lazy load this to avoid cyclic dependencies
     from .api import Tank
     
-    # get the dict from yaml
-    context_constructor_dict = loader.construct_mapping(node)
+    # get the dict from yaml. The entity dictionaries need to be filled 
+    # in before the context takes a copy of them.
+    context_constructor_dict = loader.construct_mapping(node, deep=True)
     
     # first get the pc path out of the dict
     pipeline_config_path = context_constructor_dict["_pc_path"] 
@@ -922,14 +1189,10 @@ def _task_from_sg(tk, task_id):
     :param tk:           a Sgtk API instance
     :param task_id:      The shotgun task id to produce a context for.
     """
-    context = {}
-
     # Look up task's step and entity. This information should be static in practice, so we could
     # likely cache it in the future.
 
     standard_fields = ["content", "entity", "step", "project"]
-    # theses keys map directly to linked entities, users will be handled separately
-    context_keys = ["project", "entity", "step", "task"]
 
     # ask hook for extra Task entity fields we should query and insert into the additional_entities list.
     additional_fields = tk.execute_hook("context_additional_entities").get("entity_fields_on_task", [])
@@ -938,7 +1201,49 @@ def _task_from_sg(tk, task_id):
     if not task:
         raise TankError("Unable to locate Task with id %s in Shotgun" % task_id)
 
+    return _context_data_from_sg_task(task, task_id, additional_fields)
+
+
+def _tasks_from_sg(tk, task_ids):
+    """
+    Constructs context data for several tasks using a single Shotgun query.
+    See _task_from_sg() for details.
+
+    :param tk:           a Sgtk API instance
+    :param task_ids:     List of shotgun task ids
+    :returns: dictionary of context data keyed by task id
+    """
+    standard_fields = ["content", "entity", "step", "project"]
+
+    # ask hook for extra Task entity fields we should query and insert into the additional_entities list.
+    additional_fields = tk.execute_hook("context_additional_entities").get("entity_fields_on_task", [])
+
+    tasks = tk.shotgun.find("Task", [["id", "in"] + list(task_ids)], standard_fields + additional_fields)
+    tasks_by_id = dict((task["id"], task) for task in tasks)
+
+    missing_ids = [x for x in task_ids if x not in tasks_by_id]
+    if missing_ids:
+        raise TankError("Unable to locate Tasks with ids %s in Shotgun" % ", ".join([str(x) for x in missing_ids]))
+
+    return dict((task_id, _context_data_from_sg_task(tasks_by_id[task_id], task_id, additional_fields))
+                for task_id in task_ids)
+
+
+def _context_data_from_sg_task(task, task_id, additional_fields):
+    """
+    Returns context data given the shotgun data for a task
+
+    :param task:              Shotgun dictionary for the task
+    :param task_id:           The shotgun task id
+    :param additional_fields: Task fields to insert into the additional_entities list
+    """
+    context = {}
+
+    # theses keys map directly to linked entities, users will be handled separately
+    context_keys = ["project", "entity", "step", "task"]
+
     # add task so it can be processed with other shotgun entities
+    task = dict(task)
     task["task"] = {"type": "Task", "id": task_id, "name": task["content"]}
 
     for key in context_keys + additional_fields:
@@ -976,20 +1281,53 @@ def _entity_from_sg(tk, entity_type, entity_id):
     :param task_id:      The shotgun task id to produce a context for.
     """
 
+    data = tk.shotgun.find_one(entity_type, [["id", "is", entity_id]], ["project", _get_name_field(entity_type)])
+
+    if not data:
+        raise TankError("Unable to locate %s with id %s in Shotgun" % (entity_type, entity_id))
+
+    return _context_data_from_sg_entity(entity_type, entity_id, data)
+
+
+def _entities_from_sg(tk, entity_type, entity_ids):
+    """
+    Constructs context data for several entities of the same type using 
+    a single Shotgun query. See _entity_from_sg() for details.
+
+    :param tk:           a Sgtk API instance
+    :param entity_type:  The shotgun entity type
+    :param entity_ids:   List of shotgun entity ids
+    :returns: dictionary of context data keyed by entity id
+    """
+    entities = tk.shotgun.find(entity_type, [["id", "in"] + list(entity_ids)], ["project", _get_name_field(entity_type)])
+    entities_by_id = dict((data["id"], data) for data in entities)
+
+    missing_ids = [x for x in entity_ids if x not in entities_by_id]
+    if missing_ids:
+        raise TankError("Unable to locate %s with ids %s in Shotgun" % (entity_type, ", ".join([str(x) for x in missing_ids])))
+
+    return dict((entity_id, _context_data_from_sg_entity(entity_type, entity_id, entities_by_id[entity_id]))
+                for entity_id in entity_ids)
+
+
+def _get_name_field(entity_type):
+    """
+    Returns the name field for an entity type
+    """
     # deal with funny naming for certain entities 
     if entity_type == "HumanUser":
-        name_field = "login"
-        
+        return "login"
     elif entity_type == "Project":
-        name_field = "name"
-    
+        return "name"
     else:
-        name_field = "code"
+        return "code"
 
-    data = tk.shotgun.find_one(entity_type, [["id", "is", entity_id]], ["project", name_field])
 
-    if not data:
-        raise TankError("Unable to locate %s with id %s in Shotgun" % (entity_type, entity_id))
+def _context_data_from_sg_entity(entity_type, entity_id, data):
+    """
+    Returns context data given the shotgun data for an entity
+    """
+    name_field = _get_name_field(entity_type)
 
     # create context
     context = {}
@@ -1011,63 +1349,98 @@ def _context_data_from_cache(tk, entity_type, entity_id):
     :param entity_type: a Shotgun entity type
     :param entity_id: a Shotgun entity id
     """
-    context = {}
+    return _context_data_from_cache_many(tk, entity_type, [entity_id])[entity_id]
+
 
-    # Set entity info for input entity
-    context["entity"] = {"type": entity_type, "id": entity_id}
+def _context_data_from_cache_many(tk, entity_type, entity_ids):
+    """Gets context data for several entities of the same type from the path cache.
+    The paths of all the entities, and the entities of all their parent folders,
+    are looked up with a handful of queries rather than one per folder.
 
+    :param tk: a Sgtk API instance
+    :param entity_type: a Shotgun entity type
+    :param entity_ids: list of Shotgun entity ids
+    :returns: dictionary of context data keyed by entity id
+    """
     # Map entity types to context fields
     types_fields = {"Project": "project",
                     "Step": "step",
                     "Task": "task"}
 
-    # Use the path cache to look up all paths linked to the entity and use that to extract
+    # Use the path cache to look up all paths linked to the entities and use that to extract
     # extra entities we should include in the context
     path_cache = PathCache(tk.pipeline_configuration)
+    try:
+        # Grab all project roots
+        project_roots = tk.pipeline_configuration.get_data_roots().values()
 
-    # Grab all project roots
-    project_roots = tk.pipeline_configuration.get_data_roots().values()
+        # Special case for project as we have the primary data path, which 
+        # always points at a project.
+        project = path_cache.get_entity(tk.pipeline_configuration.get_primary_data_root())
 
-    # Special case for project as we have the primary data path, which 
-    # always points at a project.
-    context["project"] = path_cache.get_entity(tk.pipeline_configuration.get_primary_data_root())
-
-    paths = path_cache.get_paths(entity_type, entity_id)
-
-    for path in paths:
-        # now recurse upwards and look for entity types we haven't found yet
-        curr_path = path
-        curr_entity = path_cache.get_entity(curr_path)
-        
-        if curr_entity is None:
-            # this is some sort of anomaly! the path returned by get_paths
-            # does not resolve in get_entity. This can happen if the storage
-            # mappings are not consistent or if there is not a 1 to 1 relationship
-            #
-            # This can also happen if there are extra slashes at the end of the path
-            # in the local storage defs and in the pipeline_configuration.yml file.
-            raise TankError("The path '%s' associated with %s id %s does not " 
-                            "resolve correctly. This may be an indication of an issue "
-                            "with the local storage setup. Please contact " 
-                            "sgtksupport@shotgunsoftware.com" % (curr_path, entity_type, entity_id))
-
-        # grab the name for the context entity
-        if curr_entity["type"] == entity_type and curr_entity["id"] == entity_id:
-            context["entity"]["name"] = curr_entity["name"]
+        paths_by_id = path_cache.get_paths_for_entities(entity_type, entity_ids)
 
+        # work out the parent folders of each path, up to the project root.
         # note - paths returned by get_paths are always prefixed with a
         # project root so there is no risk we end up with an infinite loop here..
-        while curr_path not in project_roots:
-            curr_path = os.path.abspath(os.path.join(curr_path, ".."))
-            curr_entity = path_cache.get_entity(curr_path)
-            if curr_entity:
-                cur_type = curr_entity["type"]
-                if cur_type in types_fields:
-                    field_name = types_fields[cur_type]
-                    context[field_name] = curr_entity
-
-    path_cache.close()
-    return context
+        folders_by_path = {}
+        for paths in paths_by_id.values():
+            for path in paths:
+                folders = [path]
+                curr_path = path
+                while curr_path not in project_roots:
+                    curr_path = os.path.abspath(os.path.join(curr_path, ".."))
+                    folders.append(curr_path)
+                folders_by_path[path] = folders
+
+        all_folders = set()
+        for folders in folders_by_path.values():
+            all_folders.update(folders)
+        folder_entities = path_cache.get_entities(all_folders)
+    finally:
+        path_cache.close()
+
+    contexts = {}
+    for entity_id in entity_ids:
+        context = {}
+
+        # Set entity info for input entity
+        context["entity"] = {"type": entity_type, "id": entity_id}
+        # each context gets its own copies of the entity dictionaries
+        context["project"] = dict(project) if project else None
+
+        for path in paths_by_id.get(entity_id, []):
+            folders = folders_by_path[path]
+            curr_entity = folder_entities[path]
+            
+            if curr_entity is None:
+                # this is some sort of anomaly! the path returned by get_paths
+                # does not resolve in get_entity. This can happen if the storage
+                # mappings are not consistent or if there is not a 1 to 1 relationship
+                #
+                # This can also happen if there are extra slashes at the end of the path
+                # in the local storage defs and in the pipeline_configuration.yml file.
+                raise TankError("The path '%s' associated with %s id %s does not " 
+                                "resolve correctly. This may be an indication of an issue "
+                                "with the local storage setup. Please contact " 
+                                "sgtksupport@shotgunsoftware.com" % (path, entity_type, entity_id))
+
+            # grab the name for the context entity
+            if curr_entity["type"] == entity_type and curr_entity["id"] == entity_id:
+                context["entity"]["name"] = curr_entity["name"]
+
+            # now go upwards and look for entity types we haven't found yet
+            for folder in folders[1:]:
+                curr_entity = folder_entities[folder]
+                if curr_entity:
+                    cur_type = curr_entity["type"]
+                    if cur_type in types_fields:
+                        field_name = types_fields[cur_type]
+                        context[field_name] = dict(curr_entity)
+
+        contexts[entity_id] = context
+
+    return contexts
 
 
 def _values_from_path_cache(entity, cur_template, path_cache, fields):
@@ -1118,17 +1491,3 @@ def _values_from_path_cache(entity, cur_template, path_cache, fields):
         del(temp_fields[remove_key])
 
     return temp_fields
-
-
-def _get_template_ancestors(template):
-    """Return templates branch of the template tree, ordered from first template
-    below the project root down to and including the input template.
-    """
-    # TODO this would probably be better as the Template's responsibility
-    templates = [template]
-    cur_template = template
-    while cur_template.parent is not None and len(cur_template.parent.keys) > 0:
-        next_template = cur_template.parent
-        templates.insert(0, next_template)
-        cur_template = next_template
-    return templates
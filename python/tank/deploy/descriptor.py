@@ -297,6 +297,23 @@ class AppDescriptor(object):
             frameworks = []
         return frameworks
 
+    def get_commands(self):
+        """
+        Returns the commands that this item declares in its manifest,
+        or None if the manifest doesn't declare any commands. This is 
+        used by engines to register commands for apps without 
+        initializing them. Returns a list of dicts, for example:
+        
+        [{'name': 'Publish...', 'properties': {'type': 'context_menu'}}]
+        
+        Each item contains a name and an optional properties key.
+        """
+        md = self._get_metadata()
+        commands = md.get("commands")
+        if commands is None:
+            return None
+        return [{"name": x["name"], "properties": x.get("properties") or {}} for x in commands]
+
     def get_deprecation_status(self):
         """
         Returns (is_deprecated (bool), message (str)) to indicate if this item is deprecated.
@@ -15,7 +15,7 @@ Methods for handling of the tank command
 
 
 from .tank_commands.action_base import Action 
-from .tank_commands import apps, folders, misc, move_pc, move_studio, pc_overview, migrate_entities
+from .tank_commands import apps, folders, misc, move_pc, move_studio, pc_overview, migrate_entities, publish_queue, shotgun_stats, shotgun_cache, resolver_service, resolve, template_overlaps
 
 from ..platform import constants
 from ..platform.engine import start_engine, get_environment_from_context
@@ -38,7 +38,13 @@ BUILT_IN_ACTIONS = [misc.SetupProjectAction,
                     move_pc.MovePCAction,
                     pc_overview.PCBreakdownAction,
                     move_studio.MoveStudioInstallAction,
-                    migrate_entities.MigratePublishedFileEntitiesAction
+                    migrate_entities.MigratePublishedFileEntitiesAction,
+                    publish_queue.PublishQueueAction,
+                    shotgun_stats.ShotgunStatsAction,
+                    shotgun_cache.CacheShotgunActionsAction,
+                    resolver_service.ResolverServiceAction,
+                    resolve.ResolveAction,
+                    template_overlaps.TemplateOverlapsAction
                     ]
 
 
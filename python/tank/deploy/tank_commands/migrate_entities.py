@@ -20,6 +20,7 @@ import shutil
 from itertools import chain
 
 from tank_vendor import yaml
+from tank_vendor.shotgun_api3 import BatchChunkError
 from .action_base import Action
 from .apps import AppUpdatesAction
 from ...errors import TankError
@@ -46,6 +47,9 @@ class EntityMigrator(object):
     
     SHOTGUN_BATCH_SIZE = 50
     
+    # number of independent update batches to send to Shotgun in parallel:
+    SHOTGUN_BATCH_CONCURRENCY = 4
+    
     def __init__(self, log, sg, src_type, dst_type, sg_project):
         """
         Construction
@@ -801,11 +805,8 @@ class EntityMigrator(object):
                 data = {self._tracking_field : {"id":dst_entity_id, "type":self._dst_type}}
                 requests.append({"request_type":"update", "entity_type":self._src_type, "entity_id":src_entity_id, "data":data})
 
-            try:
-                self._sg.batch(requests=requests)
-            except Exception, e:
-                self._migration_errors.append("Failed to update migration tracking field for %d %s entities in Shotgun - %s"
-                                              % (len(requests), self._src_type, e))
+            self.__batch_updates(requests, "Failed to update migration tracking field for %d %s entities in Shotgun"
+                                 % (len(requests), self._src_type))
         
         # finally, migrate any thumbnails using the share_thumbnail api:
         if entities_with_thumbnails:
@@ -827,6 +828,24 @@ class EntityMigrator(object):
                 
         return src_map
 
+    def __batch_updates(self, requests, error_msg):
+        """
+        Send a list of independent update requests to Shotgun in chunks
+        of SHOTGUN_BATCH_SIZE, several chunks at a time.  Failed chunks
+        are recorded as migration errors without affecting the other
+        chunks.
+        """
+        try:
+            self._sg.batch(requests=requests, 
+                           chunk_size=EntityMigrator.SHOTGUN_BATCH_SIZE, 
+                           max_concurrency=EntityMigrator.SHOTGUN_BATCH_CONCURRENCY)
+        except BatchChunkError, e:
+            for (_, start, end, error) in e.failed_chunks:
+                self._migration_errors.append("%s - requests %d to %d failed: %s" 
+                                              % (error_msg, start, end - 1, error))
+        except Exception, e:
+            self._migration_errors.append("%s - %s" % (error_msg, e))
+
     def __migrate_internal_links(self, src_map):
         """
         Migrate any linked entities within the source entity type to
@@ -882,11 +901,8 @@ class EntityMigrator(object):
                 
         # if we have any requests then process them:
         if requests:
-            try:
-                self._sg.batch(requests=requests)
-            except Exception, e:
-                self._migration_errors.append("Failed to update inter-entity links for %d %s entities in Shotgun - %s"
-                                              % (len(requests), self._dst_type, e))
+            self.__batch_updates(requests, "Failed to update inter-entity links for %d %s entities in Shotgun"
+                                 % (len(requests), self._dst_type))
                 
 
              
@@ -985,11 +1001,8 @@ class EntityMigrator(object):
                         
         # now if we have any requests then process them:
         if requests:
-            try:
-                self._sg.batch(requests=requests)
-            except Exception, e:
-                self._migration_errors.append("Failed to update external entity links for %d %s entities in Shotgun - %s"
-                                              % (len(requests), self._dst_type, e))            
+            self.__batch_updates(requests, "Failed to update external entity links for %d %s entities in Shotgun"
+                                 % (len(requests), self._dst_type))
                 
 
 class PublishedFileTypeEntityMigrator(EntityMigrator):
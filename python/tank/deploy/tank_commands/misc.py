@@ -18,6 +18,7 @@ from ...errors import TankError
 from .. import setup_project
 from .. import validate_config
 from .. import core_api_admin
+from ...platform import validation
 
 from .action_base import Action
 
@@ -120,7 +121,8 @@ class ClearCacheAction(Action):
         Action.__init__(self, 
                         "clear_cache", 
                         Action.PC_LOCAL, 
-                        ("Clears the Shotgun Menu Cache associated with this Configuration. "
+                        ("Clears the Shotgun Menu Cache and the cached settings validation results "
+                         "associated with this Configuration. "
                          "This is sometimes useful after complex configuration changes if new "
                          "or modified Toolkit menu items are not appearing inside Shotgun."), 
                         "Admin")
@@ -142,6 +144,9 @@ class ClearCacheAction(Action):
         
         log.info("The Shotgun menu cache has been cleared.")
         
+        validation.clear_validation_cache(self.tk)
+        log.info("The settings validation cache has been cleared.")
+        
 
 class InteractiveShellAction(Action):
     
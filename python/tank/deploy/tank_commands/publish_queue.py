@@ -0,0 +1,90 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Methods for handling of the tank command
+
+"""
+
+import time
+
+from ...errors import TankError
+from ...util import shotgun
+from .action_base import Action
+
+
+class PublishQueueAction(Action):
+
+    def __init__(self):
+        Action.__init__(self,
+                        "publish_queue",
+                        Action.PC_LOCAL,
+                        ("Lists publishes which are waiting in the local publish queue to be "
+                         "registered in Shotgun. Run 'tank publish_queue flush' to push all "
+                         "queued publishes to Shotgun, including ones that have previously failed."),
+                        "Admin")
+
+    def run(self, log, args):
+        if len(args) == 0:
+            self._list(log)
+        elif len(args) == 1 and args[0] == "flush":
+            self._flush(log)
+        else:
+            raise TankError("Syntax: publish_queue [flush]")
+
+    def _list(self, log):
+        """
+        Prints the contents of the queue
+        """
+        queue = shotgun.get_publish_queue(self.tk)
+        try:
+            entries = queue.get_entries()
+        finally:
+            queue.close()
+
+        log.info("Publish queue: %s" % queue.location)
+        log.info("")
+        if len(entries) == 0:
+            log.info("The publish queue is empty.")
+            return
+
+        for entry in entries:
+            data = entry.payload["data"]
+            queued_at = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry.created))
+            log.info("- %s v%s (%s)" % (data.get("name"), data.get("version_number"), data.get("path_cache")))
+            log.info("  Queued at %s, %s attempts." % (queued_at, entry.attempts))
+            if entry.sg_id is not None:
+                log.info("  Registered as %s %s, thumbnails or dependencies pending." % (entry.entity_type, entry.sg_id))
+            if entry.last_error:
+                log.warning("  Last error: %s" % entry.last_error)
+        log.info("")
+        log.info("%s publishes are waiting to be registered in Shotgun." % len(entries))
+
+    def _flush(self, log):
+        """
+        Pushes everything in the queue to Shotgun
+        """
+        queue = shotgun.get_publish_queue(self.tk)
+        try:
+            num_before = queue.count()
+            # give previously failed entries another chance
+            queue.reset_attempts()
+        finally:
+            queue.close()
+
+        log.info("Pushing %s queued publishes to Shotgun, stand by..." % num_before)
+        num_left = shotgun.flush_publish_queue(self.tk)
+
+        log.info("")
+        log.info("%s publishes were registered in Shotgun." % (num_before - num_left))
+        if num_left > 0:
+            log.warning("%s publishes could not be registered. Run 'tank publish_queue' "
+                        "for details." % num_left)
+        log.info("")
@@ -0,0 +1,165 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Methods for handling of the tank command
+
+"""
+
+import os
+import sys
+import itertools
+
+try:
+    import json
+except ImportError:
+    # python 2.5 - use the simplejson fallback of the shotgun API
+    from tank_vendor.shotgun_api3.sg_25 import json
+
+try:
+    import multiprocessing
+except ImportError:
+    # python 2.5 - resolve all paths in the current process
+    multiprocessing = None
+
+from ...errors import TankError
+from ...template_matcher import TemplateMatcher
+from ... import context
+from .action_base import Action
+
+# number of paths handed to a worker process at a time
+WORKER_CHUNK_SIZE = 256
+
+
+# matcher used by the worker processes
+g_worker_matcher = None
+
+def _init_worker(pc_path):
+    """
+    Sets up the template matcher in a worker process
+    """
+    global g_worker_matcher
+    # lazy load this to avoid cyclic dependencies
+    from ...api import tank_from_path
+    g_worker_matcher = TemplateMatcher(tank_from_path(pc_path).templates)
+
+
+def _match_path(path):
+    """
+    Matches a path in a worker process. Returns a tuple
+    (path, template name, fields, error message)
+    """
+    return _match_path_with(g_worker_matcher, path)
+
+
+def _match_path_with(matcher, path):
+    try:
+        (template, fields) = matcher.match(path)
+    except TankError, e:
+        return (path, None, None, str(e))
+    if template is None:
+        return (path, None, None, None)
+    return (path, template.name, fields, None)
+
+
+class ResolveAction(Action):
+
+    def __init__(self):
+        Action.__init__(self,
+                        "resolve",
+                        Action.PC_LOCAL,
+                        ("Resolves a stream of paths, read one per line from stdin or found by "
+                         "walking the given directories, and writes one line of JSON per path "
+                         "with the matching template, its fields and the context entity, step "
+                         "and task. Syntax: resolve [--processes=N] [--no-context] [directory ...]"),
+                        "Developer")
+
+    def _get_paths(self, directories):
+        """
+        Returns an iterator over the paths to resolve
+        """
+        if not directories:
+            return (line.rstrip("\r\n") for line in sys.stdin if line.strip())
+        return itertools.chain(*[self._walk(d) for d in directories])
+
+    def _walk(self, directory):
+        directory = os.path.abspath(directory)
+        yield directory
+        for (dir_path, dir_names, file_names) in os.walk(directory):
+            dir_names.sort()
+            for name in dir_names + sorted(file_names):
+                yield os.path.join(dir_path, name)
+
+    def run(self, log, args):
+        num_processes = 1
+        if multiprocessing:
+            num_processes = multiprocessing.cpu_count()
+        with_context = True
+        directories = []
+        for arg in args:
+            if arg.startswith("--processes="):
+                try:
+                    num_processes = max(1, int(arg[len("--processes="):]))
+                except ValueError:
+                    raise TankError("Invalid number of processes '%s'!" % arg)
+            elif arg == "--no-context":
+                with_context = False
+            elif arg.startswith("--"):
+                raise TankError("Syntax: resolve [--processes=N] [--no-context] [directory ...]")
+            else:
+                if not os.path.isdir(arg):
+                    raise TankError("The directory '%s' does not exist!" % arg)
+                directories.append(arg)
+
+        self.resolve(self._get_paths(directories), sys.stdout, num_processes, with_context)
+
+    def resolve(self, paths, output, num_processes=1, with_context=True):
+        """
+        Resolves paths and writes one line of JSON per path to the output
+
+        :param paths: Iterable with paths to resolve
+        :param output: File-like object to write the results to
+        :param num_processes: Number of processes to use for the template matching.
+                              Paths are matched in the current process if the
+                              multiprocessing module is not available.
+        :param with_context: Include the context of each path in the output
+        """
+        pool = None
+        if num_processes > 1 and multiprocessing:
+            pool = multiprocessing.Pool(num_processes,
+                                        _init_worker,
+                                        (self.tk.pipeline_configuration.get_path(),))
+            results = pool.imap(_match_path, paths, WORKER_CHUNK_SIZE)
+        else:
+            matcher = self.tk._get_template_matcher()
+            results = (_match_path_with(matcher, path) for path in paths)
+
+        ctx_resolver = None
+        if with_context:
+            ctx_resolver = context.PathContextResolver(self.tk)
+
+        try:
+            for (path, template_name, fields, error) in results:
+                data = {"path": path, "template": template_name, "fields": fields}
+                if error:
+                    data["error"] = error
+                if ctx_resolver:
+                    ctx = ctx_resolver.context_from_path(path)
+                    data["context"] = {"project": ctx.project,
+                                       "entity": ctx.entity,
+                                       "step": ctx.step,
+                                       "task": ctx.task}
+                output.write(json.dumps(data, default=str) + "\n")
+        finally:
+            if ctx_resolver:
+                ctx_resolver.close()
+            if pool:
+                pool.terminate()
+                pool.join()
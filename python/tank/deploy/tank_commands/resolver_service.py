@@ -0,0 +1,46 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Methods for handling of the tank command
+
+"""
+
+from ...errors import TankError
+from ...util import resolver
+from .action_base import Action
+
+
+class ResolverServiceAction(Action):
+
+    def __init__(self):
+        Action.__init__(self,
+                        "resolver_service",
+                        Action.GLOBAL,
+                        ("Runs a resolver service which answers path resolution requests "
+                         "(template_from_path, get_fields, apply_fields, context_from_path, "
+                         "paths_from_entity) over a local socket, keeping the Toolkit API warm "
+                         "for short lived processes such as render farm tasks. Syntax: "
+                         "resolver_service [socket_path]"),
+                        "Developer")
+
+    def run(self, log, args):
+        if len(args) > 1:
+            raise TankError("Syntax: resolver_service [socket_path]")
+
+        socket_path = args[0] if args else None
+        server = resolver.ResolverServer(socket_path)
+        log.info("Resolver service listening on %s. Press ctrl-c to stop." % server.socket_path)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            log.info("Stopping the resolver service.")
+        finally:
+            server.server_close()
@@ -0,0 +1,266 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Generation of the Shotgun action menu cache files.
+
+The Shotgun web UI reads the actions available for an entity type from a
+cache file in the pipeline configuration's cache folder, on the form
+shotgun_mac_project.txt. Producing a cache file requires the shotgun engine
+to be started for the shotgun_<entity type> environment.
+
+"""
+
+import os
+import sys
+
+try:
+    import multiprocessing
+except ImportError:
+    # python 2.5 - process the environments in the current process
+    multiprocessing = None
+
+from ...errors import TankError
+from ...platform import engine
+from .action_base import Action
+
+# shotgun environments are named shotgun_<entity type>
+SHOTGUN_ENV_PREFIX = "shotgun_"
+
+# maximum number of environments to process in parallel
+MAX_PROCESSES = 8
+
+
+def get_cache_file_name(entity_type):
+    """
+    Returns the name of the menu cache file for an entity type
+    on the current operating system.
+    """
+    platform_name = {"linux2": "linux", "darwin": "mac", "win32": "windows"}[sys.platform]
+    return "shotgun_%s_%s.txt" % (platform_name, entity_type.lower())
+
+
+def get_cache_data(engine_obj, entity_type):
+    """
+    Returns the contents of the menu cache file for an entity type,
+    given a running shotgun engine.
+    """
+    # get list of actions
+    engine_commands = dict(engine_obj.commands)
+
+    # insert special system commands
+    if entity_type.lower() == "project":
+        engine_commands["__core_info"] = { "properties": {"title": "Check for Core Upgrades...",
+                                                          "deny_permissions": ["Artist"] } }
+
+        engine_commands["__upgrade_check"] = { "properties": {"title": "Check for App Upgrades...",
+                                                              "deny_permissions": ["Artist"] } }
+
+    # extract actions into cache file
+    res = []
+    for (cmd_name, cmd_params) in engine_commands.items():
+
+        # some apps provide a special deny_platforms entry
+        if "deny_platforms" in cmd_params["properties"]:
+            # setting can be Linux, Windows or Mac
+            curr_os = {"linux2": "Linux", "darwin": "Mac", "win32": "Windows"}[sys.platform]
+            if curr_os in cmd_params["properties"]["deny_platforms"]:
+                # deny this platform! :)
+                continue
+
+        if "title" in cmd_params["properties"]:
+            title = cmd_params["properties"]["title"]
+        else:
+            title = cmd_name
+
+        if "supports_multiple_selection" in cmd_params["properties"]:
+            supports_multiple_sel = cmd_params["properties"]["supports_multiple_selection"]
+        else:
+            supports_multiple_sel = False
+
+        if "deny_permissions" in cmd_params["properties"]:
+            deny = ",".join(cmd_params["properties"]["deny_permissions"])
+        else:
+            deny = ""
+
+        entry = [ cmd_name, title, deny, str(supports_multiple_sel) ]
+
+        res.append("$".join(entry))
+
+    return "\n".join(res)
+
+
+def write_cache_file(cache_path, data):
+    """
+    Writes a menu cache file to disk, unless the file already
+    has the given contents.
+
+    :returns: True if the file was written, False if it was up to date
+    """
+    try:
+        # if file does not exist, make sure it is created with open permissions
+        cache_file_created = False
+        if not os.path.exists(cache_path):
+            cache_file_created = True
+        else:
+            f = open(cache_path, "rb")
+            try:
+                existing_data = f.read()
+            finally:
+                f.close()
+            if existing_data == data:
+                return False
+
+        # Write to cache file
+        # Note that we are using binary form here to ensure that the line
+        # endings are written out consistently on all different OSes
+        # otherwise with wt mode, \n on windows will be turned into \n\r
+        # which is not interpreted correctly by the jacascript code.
+        f = open(cache_path, "wb")
+        f.write(data)
+        f.close()
+
+        # make sure cache file has proper permissions
+        if cache_file_created:
+            old_umask = os.umask(0)
+            try:
+                os.chmod(cache_path, 0666)
+            finally:
+                os.umask(old_umask)
+
+    except Exception, e:
+        raise TankError("Could not write to cache file %s: %s" % (cache_path, e))
+
+    return True
+
+
+def get_shotgun_environments(tk):
+    """
+    Returns the shotgun environments of a configuration, grouped by
+    environment file. Environment names which resolve to the same file,
+    for example through symlinks, are served by a single engine startup.
+
+    :returns: list of lists of entity types, in lower case
+    """
+    groups = {}
+    for env_name in sorted(tk.pipeline_configuration.get_environments()):
+        if not env_name.startswith(SHOTGUN_ENV_PREFIX):
+            continue
+        env_file = os.path.join(tk.pipeline_configuration.get_config_location(), "env", "%s.yml" % env_name)
+        key = os.path.realpath(env_file)
+        groups.setdefault(key, []).append(env_name[len(SHOTGUN_ENV_PREFIX):])
+    return [groups[key] for key in sorted(groups.keys())]
+
+
+def cache_environment(tk, entity_types):
+    """
+    Starts the shotgun engine once and writes the menu cache files
+    for all the given entity types, which must share an environment.
+
+    :returns: tuple (written, unchanged) with lists of cache file names
+    """
+    cache_folder = tk.pipeline_configuration.get_cache_location()
+    written = []
+    unchanged = []
+
+    engine_obj = engine.start_shotgun_engine(tk, entity_types[0])
+    try:
+        for entity_type in entity_types:
+            cache_file_name = get_cache_file_name(entity_type)
+            data = get_cache_data(engine_obj, entity_type)
+            if write_cache_file(os.path.join(cache_folder, cache_file_name), data):
+                written.append(cache_file_name)
+            else:
+                unchanged.append(cache_file_name)
+    finally:
+        engine_obj.destroy()
+
+    return (written, unchanged)
+
+
+def _cache_environment_process(pc_root_and_entity_types):
+    """
+    Entry point for the worker processes. Returns a tuple
+    (entity types, written files, unchanged files, error message)
+    """
+    (pc_root, entity_types) = pc_root_and_entity_types
+    from ...api import tank_from_path
+    try:
+        tk = tank_from_path(pc_root)
+        (written, unchanged) = cache_environment(tk, entity_types)
+    except Exception, e:
+        return (entity_types, [], [], str(e))
+    return (entity_types, written, unchanged, None)
+
+
+class CacheShotgunActionsAction(Action):
+
+    def __init__(self):
+        Action.__init__(self,
+                        "cache_shotgun_actions",
+                        Action.PC_LOCAL,
+                        ("Generates the Shotgun Menu Cache for all entity types in one go, "
+                         "starting the shotgun engine once per environment. Cache files whose "
+                         "contents haven't changed are left untouched. Environments are "
+                         "processed in parallel, use --processes=N to control how many at a time."),
+                        "Admin")
+
+    def run(self, log, args):
+        num_processes = None
+        for arg in args:
+            if arg.startswith("--processes="):
+                try:
+                    num_processes = int(arg[len("--processes="):])
+                except ValueError:
+                    raise TankError("Invalid number of processes '%s'!" % arg)
+            else:
+                raise TankError("Syntax: cache_shotgun_actions [--processes=N]")
+
+        env_groups = get_shotgun_environments(self.tk)
+        if len(env_groups) == 0:
+            log.info("No shotgun environments found in this configuration.")
+            return
+
+        if multiprocessing is None:
+            num_processes = 1
+        elif num_processes is None:
+            num_processes = min(len(env_groups), multiprocessing.cpu_count(), MAX_PROCESSES)
+        num_processes = max(1, min(num_processes, len(env_groups)))
+
+        log.info("Generating menu cache files for %d shotgun environments "
+                 "using %d processes..." % (len(env_groups), num_processes))
+
+        pc_root = self.tk.pipeline_configuration.get_path()
+        work = [(pc_root, entity_types) for entity_types in env_groups]
+        if num_processes == 1:
+            results = [_cache_environment_process(x) for x in work]
+        else:
+            pool = multiprocessing.Pool(num_processes)
+            try:
+                results = pool.map(_cache_environment_process, work)
+            finally:
+                pool.close()
+                pool.join()
+
+        num_written = 0
+        num_unchanged = 0
+        num_errors = 0
+        for (entity_types, written, unchanged, error) in results:
+            if error:
+                num_errors += 1
+                log.error("Could not generate the menu cache for %s: %s" % (", ".join(entity_types), error))
+                continue
+            for cache_file_name in written:
+                log.debug("Updated cache file %s" % cache_file_name)
+            num_written += len(written)
+            num_unchanged += len(unchanged)
+
+        log.info("Menu cache generated: %d files updated, %d files unchanged, "
+                 "%d environments failed." % (num_written, num_unchanged, num_errors))
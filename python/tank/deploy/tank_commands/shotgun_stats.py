@@ -0,0 +1,107 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Methods for handling of the tank command
+
+"""
+
+import time
+
+from ...errors import TankError
+from ...util import shotgun_stats
+from ...platform import engine
+from .action_base import Action
+
+
+class ShotgunStatsAction(Action):
+
+    # operation name -> (argument syntax, number of arguments)
+    OPERATIONS = {"context_from_entity": ("entity_type entity_id", 2),
+                  "context_from_path": ("path", 1),
+                  "create_filesystem_structure": ("entity_type entity_id", 2),
+                  "preview_filesystem_structure": ("entity_type entity_id", 2),
+                  "start_engine": ("engine_name entity_type entity_id", 3)}
+
+    def __init__(self):
+        Action.__init__(self,
+                        "shotgun_stats",
+                        Action.PC_LOCAL,
+                        ("Runs a Toolkit operation and reports all the Shotgun calls it made, "
+                         "including number of calls, round trips, retries, data transferred and "
+                         "timings. Run 'tank shotgun_stats' for a list of operations."),
+                        "Admin")
+
+    def _syntax(self):
+        lines = ["Syntax: shotgun_stats operation [arguments]", "", "Operations:"]
+        for name in sorted(self.OPERATIONS.keys()):
+            lines.append("- %s %s" % (name, self.OPERATIONS[name][0]))
+        return "\n".join(lines)
+
+    def run(self, log, args):
+        if len(args) == 0 or args[0] not in self.OPERATIONS:
+            raise TankError(self._syntax())
+
+        operation = args[0]
+        op_args = args[1:]
+        if len(op_args) != self.OPERATIONS[operation][1]:
+            raise TankError("Syntax: shotgun_stats %s %s" % (operation, self.OPERATIONS[operation][0]))
+
+        log.info("Running %s %s..." % (operation, " ".join(op_args)))
+
+        measurement = shotgun_stats.ShotgunMeasurement(self.tk.shotgun)
+        start = time.time()
+        stats = measurement.start()
+        try:
+            result = self._run_operation(operation, op_args)
+        finally:
+            measurement.stop()
+        duration = time.time() - start
+
+        log.info("Result: %s" % result)
+        log.info("")
+        for line in stats.format_report().split("\n"):
+            log.info(line)
+        log.info("")
+        log.info("Operation took %.1f ms, of which %.1f ms were spent in %d Shotgun calls." % (duration * 1000,
+                                                                                            stats.get().total_time * 1000,
+                                                                                            stats.calls))
+
+    def _get_entity_id(self, value):
+        try:
+            return int(value)
+        except ValueError:
+            raise TankError("Entity id '%s' is not a number!" % value)
+
+    def _run_operation(self, operation, args):
+        """
+        Executes an operation and returns a summary of its result
+        """
+        if operation == "context_from_entity":
+            return self.tk.context_from_entity(args[0], self._get_entity_id(args[1]))
+
+        elif operation == "context_from_path":
+            return self.tk.context_from_path(args[0])
+
+        elif operation == "create_filesystem_structure":
+            num_folders = self.tk.create_filesystem_structure(args[0], self._get_entity_id(args[1]))
+            return "%d folders processed" % num_folders
+
+        elif operation == "preview_filesystem_structure":
+            folders = self.tk.preview_filesystem_structure(args[0], self._get_entity_id(args[1]))
+            return "%d folders processed" % len(folders)
+
+        elif operation == "start_engine":
+            ctx = self.tk.context_from_entity(args[1], self._get_entity_id(args[2]))
+            engine_obj = engine.start_engine(args[0], self.tk, ctx)
+            try:
+                return "Started %s with %d apps" % (engine_obj.name, len(engine_obj.apps))
+            finally:
+                engine_obj.destroy()
@@ -0,0 +1,55 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Methods for handling of the tank command
+
+"""
+
+import time
+
+from ...errors import TankError
+from ... import template_overlap
+from .action_base import Action
+
+
+class TemplateOverlapsAction(Action):
+
+    def __init__(self):
+        Action.__init__(self,
+                        "template_overlaps",
+                        Action.PC_LOCAL,
+                        ("Checks the path templates of the current Configuration for templates "
+                         "which can match the same path. Paths matching more than one template "
+                         "make template_from_path fail."),
+                        "Configuration")
+
+    def run(self, log, args):
+        if len(args) != 0:
+            raise TankError("This command takes no arguments!")
+
+        log.info("Checking %d templates for overlaps..." % len(self.tk.templates))
+        start = time.time()
+        overlaps = template_overlap.find_overlapping_templates(self.tk.templates)
+        log.debug("Check took %.1f ms." % ((time.time() - start) * 1000))
+
+        log.info("")
+        if not overlaps:
+            log.info("No overlapping templates found.")
+            return
+
+        log.warning("Found %d pairs of templates which can match the same path:" % len(overlaps))
+        for (name_a, name_b) in overlaps:
+            log.info("")
+            log.info("%s: %s" % (name_a, self.tk.templates[name_a].definition))
+            log.info("%s: %s" % (name_b, self.tk.templates[name_b].definition))
+        log.info("")
+        log.info("Use choices, integer keys or more static text in the definitions to "
+                 "tell these templates apart.")
@@ -16,22 +16,170 @@ Methods for loading and managing plugins, e.g. Apps, Engines, Hooks etc.
 import os
 import sys
 import imp
+import uuid
+import types
+import marshal
+import thread
+import hashlib
+import threading
 import traceback
 
 from .errors import TankError
 
+# environment variable pointing at a local folder where compiled plugin
+# code is cached between sessions. Useful when plugins are loaded from
+# slow network storage.
+BYTECODE_CACHE_ENV_VAR = "TANK_BYTECODE_CACHE"
+
+# compiled plugin code, keyed by path. Each entry is a tuple
+# (mtime, size, code object, names of classes defined in the file)
+_CODE_CACHE = {}
+_CODE_CACHE_LOCK = threading.Lock()
+
+
+def clear_plugin_cache():
+    """
+    Clears the in-memory cache of compiled plugin code
+    """
+    _CODE_CACHE_LOCK.acquire()
+    try:
+        _CODE_CACHE.clear()
+    finally:
+        _CODE_CACHE_LOCK.release()
+
+
+def _get_defined_class_names(code):
+    """
+    Returns the names of the classes defined at the top level of a
+    module, given its code object. Class bodies are compiled to code
+    objects which are stored as constants of the module code.
+    """
+    names = []
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType) and const.co_name not in names:
+            # includes functions, these are filtered out
+            # when the module has been executed.
+            names.append(const.co_name)
+    return names
+
+
+def _get_disk_cache_path(plugin_file):
+    """
+    Returns the path to the on-disk bytecode cache file for a plugin,
+    or None if the on-disk cache is not enabled.
+    """
+    cache_dir = os.environ.get(BYTECODE_CACHE_ENV_VAR)
+    if not cache_dir:
+        return None
+    path_hash = hashlib.sha1(os.path.abspath(plugin_file)).hexdigest()
+    return os.path.join(cache_dir, "%s.pyc" % path_hash)
+
+
+def _read_disk_cache(cache_path, plugin_file, mtime, size):
+    """
+    Returns the code object from an on-disk cache file, or None
+    if the file doesn't exist or is out of date.
+    """
+    try:
+        fh = open(cache_path, "rb")
+        try:
+            if fh.read(4) != imp.get_magic():
+                return None
+            (cached_file, cached_mtime, cached_size, code) = marshal.load(fh)
+        finally:
+            fh.close()
+    except Exception:
+        # missing or corrupt
+        return None
+    if cached_file != plugin_file or cached_mtime != mtime or cached_size != size:
+        return None
+    return code
+
+
+def _write_disk_cache(cache_path, plugin_file, mtime, size, code):
+    """
+    Writes a code object to the on-disk cache. Failures are ignored,
+    the code is simply recompiled next time.
+    """
+    tmp_path = None
+    try:
+        tmp_path = "%s.%d.%d.tmp" % (cache_path, os.getpid(), thread.get_ident())
+        cache_dir = os.path.dirname(cache_path)
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        fh = open(tmp_path, "wb")
+        try:
+            fh.write(imp.get_magic())
+            marshal.dump((plugin_file, mtime, size, code), fh)
+        finally:
+            fh.close()
+        if sys.platform == "win32" and os.path.exists(cache_path):
+            os.remove(cache_path)
+        os.rename(tmp_path, cache_path)
+    except Exception:
+        if tmp_path and os.path.exists(tmp_path):
+            try:
+                os.remove(tmp_path)
+            except Exception:
+                pass
+
+
+def _get_plugin_code(plugin_file):
+    """
+    Returns the compiled code for a plugin file together with the names
+    of the classes it defines. Code is cached in memory and, if enabled,
+    on disk, and is recompiled when the file's modification time or size
+    changes. No global locks are held while reading or compiling.
+    """
+    stat = os.stat(plugin_file)
+    (mtime, size) = (stat.st_mtime, stat.st_size)
+
+    _CODE_CACHE_LOCK.acquire()
+    try:
+        entry = _CODE_CACHE.get(plugin_file)
+    finally:
+        _CODE_CACHE_LOCK.release()
+    if entry and entry[0] == mtime and entry[1] == size:
+        return (entry[2], entry[3])
+
+    code = None
+    cache_path = _get_disk_cache_path(plugin_file)
+    if cache_path:
+        code = _read_disk_cache(cache_path, plugin_file, mtime, size)
+
+    if code is None:
+        fh = open(plugin_file, "rU")
+        try:
+            source = fh.read()
+        finally:
+            fh.close()
+        code = compile(source + "\n", plugin_file, "exec")
+        if cache_path:
+            _write_disk_cache(cache_path, plugin_file, mtime, size, code)
+
+    class_names = _get_defined_class_names(code)
+    _CODE_CACHE_LOCK.acquire()
+    try:
+        _CODE_CACHE[plugin_file] = (mtime, size, code, class_names)
+    finally:
+        _CODE_CACHE_LOCK.release()
+    return (code, class_names)
+
+
 def load_plugin(plugin_file, valid_base_class):
     """
     Load a plugin into memory and extract its single interface class. 
     """
     # construct a uuid and use this as the module name to ensure
     # that each import is unique
-    import uuid
     module_uid = uuid.uuid4().hex 
     module = None
     try:
-        imp.acquire_lock()
-        module = imp.load_source(module_uid, plugin_file)
+        (code, class_names) = _get_plugin_code(plugin_file)
+        module = imp.new_module(module_uid)
+        module.__file__ = plugin_file
+        sys.modules[module_uid] = module
+        exec code in module.__dict__
     except Exception:
         # dump out the callstack for this one -- to help people get good messages when there is a plugin error        
         (exc_type, exc_value, exc_traceback) = sys.exc_info()
@@ -41,23 +189,28 @@ def load_plugin(plugin_file, valid_base_class):
         message += "Traceback (most recent call last):\n"
         message += "\n".join( traceback.format_tb(exc_traceback))
         raise TankError(message)
-    finally:
-        imp.release_lock()
     
     # cool, now validate the module
     found_classes = list()
     introspection_error_reported = None
     try:
-        for var in dir(module):
-            value = getattr(module, var)
+        # first look at the classes defined in the file itself
+        for var in class_names:
+            value = module.__dict__.get(var)
             if isinstance(value, type) and issubclass(value, valid_base_class) and value != valid_base_class:
                 found_classes.append(value)
+        if not found_classes:
+            # the class may have been imported from elsewhere
+            for var in dir(module):
+                value = getattr(module, var)
+                if isinstance(value, type) and issubclass(value, valid_base_class) and value != valid_base_class:
+                    found_classes.append(value)
     except Exception, e:
         introspection_error_reported = str(e)
 
     if introspection_error_reported:
             raise TankError("Introspection error while trying to load and introspect file %s. "
-                            "Error Reported: %s" % (plugin_file, e))
+                            "Error Reported: %s" % (plugin_file, introspection_error_reported))
 
     elif len(found_classes) < 1:
         # missing class!
@@ -19,6 +19,25 @@ import os
 
 from .errors import TankError 
 
+# maximum number of values passed in a single IN (...) query. 
+# sqlite has a default limit of 999 parameters per statement.
+MAX_QUERY_PARAMETERS = 500
+
+# incremented every time this process writes to a path cache
+g_write_generation = 0
+
+def get_write_generation():
+    """
+    Returns a number which changes every time this process 
+    writes to a path cache.
+    """
+    return g_write_generation
+
+def _bump_write_generation():
+    global g_write_generation
+    g_write_generation += 1
+
+
 class PathCache(object):
     """
     A global cache which holds the mapping between a shotgun entity and a location on disk.
@@ -180,6 +199,7 @@ class PathCache(object):
         query = "DELETE FROM path_cache where root=? and path like '%s%%'" % db_path
         c.execute(query, (root_name,) )
         self._connection.commit()
+        _bump_write_generation()
         c.close()
         
 
@@ -252,6 +272,7 @@ class PathCache(object):
                                                                 db_path,
                                                                 primary))
         self._connection.commit()
+        _bump_write_generation()
         c.close()
 
     def get_paths(self, entity_type, entity_id, primary_only=True):
@@ -285,6 +306,78 @@ class PathCache(object):
         c.close()
         return paths
 
+    def get_paths_for_entities(self, entity_type, entity_ids, primary_only=True):
+        """
+        Returns the paths for a list of shotgun entities of the same type,
+        using a single query per batch of ids.
+
+        :param entity_type: a Shotgun entity type
+        :param entity_ids: list of Shotgun entity ids
+        :returns: dictionary keyed by entity id with lists of paths on disk.
+                  Entities without any paths are not included.
+        """
+        paths = {}
+        entity_ids = list(entity_ids)
+        c = self._connection.cursor()
+        for idx in range(0, len(entity_ids), MAX_QUERY_PARAMETERS):
+            chunk = entity_ids[idx:idx + MAX_QUERY_PARAMETERS]
+            sql = ("SELECT entity_id, root, path FROM path_cache WHERE entity_type = ? AND entity_id IN (%s)" 
+                   % ",".join(["?"] * len(chunk)))
+            if primary_only:
+                sql += " AND primary_entity = 1"
+            for (entity_id, root_name, relative_path) in c.execute(sql, [entity_type] + chunk):
+                root_path = self._roots.get(root_name)
+                if not root_path:
+                    # The root name doesn't match a recognized name, so skip this entry
+                    continue
+                paths.setdefault(entity_id, []).append(self._dbpath_to_path(root_path, relative_path))
+        c.close()
+        return paths
+
+    def get_entities(self, paths):
+        """
+        Returns the primary entities for a list of paths, using a single 
+        query per root and batch of paths. See get_entity() for details.
+
+        :param paths: list of paths on disk
+        :returns: dictionary keyed by path with Shotgun entity dicts, 
+                  e.g. {"type": "Shot", "name": "xxx", "id": 123}, or None if 
+                  the path isn't associated with an entity.
+        """
+        entities = {}
+        # group the paths by root
+        db_paths_by_root = {}
+        for path in paths:
+            entities[path] = None
+            try:
+                root_path, relative_path = self._separate_root(path)
+            except TankError:
+                # fail gracefully if path is not a valid path
+                # eg. doesn't belong to the project
+                continue
+            db_path = self._path_to_dbpath(relative_path)
+            db_paths_by_root.setdefault(root_path, {}).setdefault(db_path, []).append(path)
+            
+        c = self._connection.cursor()
+        for (root_path, db_paths) in db_paths_by_root.iteritems():
+            db_path_list = db_paths.keys()
+            for idx in range(0, len(db_path_list), MAX_QUERY_PARAMETERS):
+                chunk = db_path_list[idx:idx + MAX_QUERY_PARAMETERS]
+                sql = ("SELECT path, entity_type, entity_id, entity_name FROM path_cache "
+                       "WHERE root = ? AND primary_entity = 1 AND path IN (%s)" % ",".join(["?"] * len(chunk)))
+                found = set()
+                for (db_path, entity_type, entity_id, entity_name) in c.execute(sql, [root_path] + chunk):
+                    if db_path in found:
+                        # never supposed to happen!
+                        c.close()
+                        raise TankError("More than one entry in path database for %s!" % db_paths[db_path][0])
+                    found.add(db_path)
+                    for path in db_paths[db_path]:
+                        # convert to string, not unicode!
+                        entities[path] = {"type": str(entity_type), "id": entity_id, "name": str(entity_name)}
+        c.close()
+        return entities
+
     def get_entity(self, path):
         """
         Returns an entity given a path.
@@ -323,6 +416,55 @@ class PathCache(object):
         else:
             return None
 
+    def get_child_entities(self, path):
+        """
+        Returns the entities associated with all the direct children of 
+        a folder, using a single query.
+        
+        :param path: a folder on disk
+        :returns: dictionary keyed by child folder name, with tuples 
+                  (primary entity, list of secondary entities). The primary 
+                  entity is None if the child only has secondary entities. 
+                  Children which aren't associated with any entities 
+                  are not included.
+        """
+        try:
+            root_path, relative_path = self._separate_root(path)
+        except TankError:
+            # fail gracefully if path is not a valid path
+            # eg. doesn't belong to the project
+            return {}
+        
+        db_path = self._path_to_dbpath(relative_path).rstrip("/")
+        prefix = db_path + "/"
+        # all the paths starting with the prefix sort between the prefix 
+        # and the prefix with its trailing slash bumped to the next character
+        upper_bound = db_path + chr(ord("/") + 1)
+        
+        c = self._connection.cursor()
+        res = c.execute("SELECT path, entity_type, entity_id, entity_name, primary_entity FROM path_cache "
+                        "WHERE root = ? AND path > ? AND path < ? AND substr(path, ?) NOT LIKE '%/%'", 
+                        (root_path, prefix, upper_bound, len(prefix) + 1))
+        data = list(res)
+        c.close()
+        
+        children = {}
+        for (child_db_path, entity_type, entity_id, entity_name, primary) in data:
+            name = child_db_path[len(prefix):]
+            # convert to string, not unicode!
+            entity = {"type": str(entity_type), "id": entity_id, "name": str(entity_name) }
+            (primary_entity, secondary_entities) = children.get(name, (None, []))
+            if primary:
+                if primary_entity is not None:
+                    # never supposed to happen!
+                    raise TankError("More than one entry in path database for %s!" % os.path.join(path, name))
+                primary_entity = entity
+            else:
+                secondary_entities = secondary_entities + [entity]
+            children[name] = (primary_entity, secondary_entities)
+        
+        return children
+
     def get_secondary_entities(self, path):
         """
         Returns all the secondary entities for a path.
@@ -437,6 +437,13 @@ class PipelineConfiguration(object):
         """
         return os.path.join(self._pc_root, "cache")
 
+    def get_publish_queue_location(self):
+        """
+        Returns the path to the sqlite file holding publishes which
+        have not yet been registered in Shotgun.
+        """
+        return os.path.join(self.get_cache_location(), constants.PUBLISH_QUEUE_DB_FILENAME)
+
 
     ########################################################################################
     # configuration
@@ -97,7 +97,7 @@ def restart():
 
     try:
         # first, reload the template defs
-        engine.tank.reload_templates()
+        engine.tank.reload_templates(incremental=True)
         engine.log_debug("Template definitions were reloaded.")
     except TankError, e:
         engine.log_error(e)
@@ -144,6 +144,84 @@ class Application(TankBundle):
         self.engine.log_exception(msg)
 
 
+class LazyApplication(object):
+    """
+    Internal class - not part of Tank's public interface.
+    
+    Stands in for an app which has not yet been initialized when the engine
+    runs in lazy app init mode. Basic information about the app is taken from 
+    its descriptor. Accessing anything else initializes the real app and 
+    forwards to it.
+    """
+    
+    def __init__(self, engine, descriptor, instance_name, load_callback):
+        """
+        :param engine: The engine the app belongs to
+        :param descriptor: Descriptor for the app
+        :param instance_name: The instance name of the app in the environment
+        :param load_callback: Callable which initializes the app and returns
+                              the Application instance.
+        """
+        self.__engine = engine
+        self.__descriptor = descriptor
+        self.__instance_name = instance_name
+        self.__load_callback = load_callback
+
+    def __repr__(self):
+        return "<Sgtk Lazy App 0x%08x: %s, engine: %s>" % (id(self), self.name, self.engine)
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return getattr(self._load(), name)
+
+    def _load(self):
+        """
+        Initializes the real app, if this hasn't already been done, and returns it.
+        """
+        return self.__load_callback()
+
+    @property
+    def descriptor(self):
+        return self.__descriptor
+
+    @property
+    def engine(self):
+        return self.__engine
+
+    @property
+    def instance_name(self):
+        return self.__instance_name
+
+    @property
+    def name(self):
+        return self.__descriptor.get_system_name()
+
+    @property
+    def display_name(self):
+        return self.__descriptor.get_display_name()
+
+    @property
+    def description(self):
+        return self.__descriptor.get_description()
+
+    @property
+    def version(self):
+        return self.__descriptor.get_version()
+
+    @property
+    def icon_256(self):
+        return self.__descriptor.get_icon_256()
+
+    @property
+    def documentation_url(self):
+        return self.__descriptor.get_doc_url()
+
+    @property
+    def support_url(self):
+        return self.__descriptor.get_support_url()
+
+
 def get_application(engine, app_folder, descriptor, settings, instance_name):
     """
     Internal helper method. 
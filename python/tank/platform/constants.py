@@ -111,6 +111,27 @@ ENVIRONMENT_LOCATION_KEY = "location"
 # the file to look for that defines and bootstraps an app
 APP_FILE = "app.py"
 
+# engine setting which turns on lazy app initialization. Apps are then only
+# initialized when one of their commands is executed.
+ENGINE_LAZY_APP_INIT_SETTING = "lazy_app_init"
+
+# folder in the pipeline configuration cache which holds the results of
+# settings validations
+SETTINGS_VALIDATION_CACHE_FOLDER = "settings_validation"
+
+# if this environment variable is set, app, engine and framework settings
+# are always fully validated rather than using cached validation results.
+FORCE_FULL_VALIDATION_ENV_VAR = "TANK_FORCE_FULL_VALIDATION"
+
+# if this environment variable is set, engine startup is profiled and a summary
+# written to the engine log. If set to a path ending with .json, a timeline in
+# the Chrome trace event format is also written to that path.
+PROFILE_STARTUP_ENV_VAR = "TANK_PROFILE_STARTUP"
+
+# file in the engine's cache location which holds the commands registered
+# by each app, used to register commands for apps in lazy mode.
+LAZY_APP_COMMANDS_MANIFEST_FILE = "app_commands.yml"
+
 # the storage name that is treated to be the primary storage for tank
 PRIMARY_STORAGE_NAME = "primary"
 
@@ -175,6 +196,29 @@ SHELL_ENGINE = "tk-shell"
 # the name of the file that holds the path cache
 CACHE_DB_FILENAME = "path_cache.db"
 
+# the maximum number of folders for which the path cache lookups made by 
+# context_from_path are remembered, per Sgtk API instance
+CONTEXT_FROM_PATH_CACHE_SIZE = 10000
+
+# the name of the file that holds publishes waiting to be registered in shotgun
+PUBLISH_QUEUE_DB_FILENAME = "publish_queue.db"
+
+# the name of the folder where thumbnails for queued publishes are kept
+PUBLISH_QUEUE_THUMBNAIL_FOLDER = "publish_queue_thumbnails"
+
+# number of seconds between background flushes of the publish queue
+PUBLISH_QUEUE_FLUSH_INTERVAL = 10
+
+# maximum number of queued publishes sent to shotgun in a single batch
+PUBLISH_QUEUE_BATCH_SIZE = 50
+
+# number of seconds after which a queued publish claimed by a flusher which 
+# never released it (e.g. because the process died) can be picked up again
+PUBLISH_QUEUE_CLAIM_TIMEOUT = 600
+
+# number of failed attempts after which the background flusher gives up on a queued publish
+PUBLISH_QUEUE_MAX_ATTEMPTS = 10
+
 # the name of the file that holds the templates.yml config
 CONTENT_TEMPLATES_FILE = "templates.yml"
 
@@ -18,6 +18,8 @@ import sys
 import traceback
 import weakref
         
+from tank_vendor import yaml
+
 from .. import loader
 from .. import hook
 from ..errors import TankError, TankEngineInitError
@@ -28,6 +30,7 @@ from . import constants
 from . import validation
 from . import qt
 from . import black_list
+from . import profiler
 from .bundle import TankBundle
 from .framework import setup_frameworks
 
@@ -58,67 +61,108 @@ class Engine(TankBundle):
         
         self.__commands_that_need_prefixing = []
         
-        # get the engine settings
-        settings = self.__env.get_engine_settings(self.__engine_instance_name)
+        # commands registered by apps in previous sessions, used in lazy mode
+        self.__app_commands_manifest = {}
         
-        # get the descriptor representing the engine        
-        descriptor = self.__env.get_engine_descriptor(self.__engine_instance_name)        
+        # framework instances shared by all apps in this engine, 
+        # keyed by (instance name, version)
+        self.__shared_frameworks = {}
         
-        # init base class
-        TankBundle.__init__(self, tk, context, settings, descriptor)
-
-        # check that the context contains all the info that the app needs
-        validation.validate_context(descriptor, context)
+        # time the startup if profiling has been turned on
+        profiler.start("Engine startup: %s" % engine_instance_name, tk)
+        try:
         
-        # make sure the current operating system platform is supported
-        validation.validate_platform(descriptor)
-
-        # Get the settings for the engine and then validate them
-        engine_schema = descriptor.get_configuration_schema()
-        validation.validate_settings(self.__engine_instance_name, tk, context, engine_schema, settings)
+            # get the engine settings
+            settings = self.__env.get_engine_settings(self.__engine_instance_name)
         
-        # set up any frameworks defined
-        setup_frameworks(self, self, self.__env, descriptor)
+            # get the descriptor representing the engine        
+            descriptor = self.__env.get_engine_descriptor(self.__engine_instance_name)        
         
-        # run the engine init
-        self.log_debug("Engine init: Instantiating %s" % self)
-        self.log_debug("Engine init: Current Context: %s" % context)
+            # init base class
+            TankBundle.__init__(self, tk, context, settings, descriptor)
 
-        # now if a folder named python is defined in the engine, add it to the pythonpath
-        my_path = os.path.dirname(sys.modules[self.__module__].__file__)
-        python_path = os.path.join(my_path, constants.BUNDLE_PYTHON_FOLDER)
-        if os.path.exists(python_path):            
-            # only append to python path if __init__.py does not exist
-            # if __init__ exists, we should use the special tank import instead
-            init_path = os.path.join(python_path, "__init__.py")
-            if not os.path.exists(init_path):
-                self.log_debug("Appending to PYTHONPATH: %s" % python_path)
-                sys.path.append(python_path)
-
-
-        # initial init pass on engine
-        self.init_engine()
+            # check that the context contains all the info that the app needs
+            validation.validate_context(descriptor, context)
+        
+            # make sure the current operating system platform is supported
+            validation.validate_platform(descriptor)
 
-        # try to pull in QT classes and assign to tank.platform.qt.XYZ
-        base_def = self._define_qt_base()
-        qt.QtCore = base_def.get("qt_core")
-        qt.QtGui = base_def.get("qt_gui")
-        qt.TankDialogBase = base_def.get("dialog_base")
+            # Get the settings for the engine and then validate them
+            engine_schema = descriptor.get_configuration_schema()
+            profiler.begin_phase("validate_settings")
+            try:
+                validation.validate_settings(self.__engine_instance_name, tk, context, engine_schema, settings)
+            finally:
+                profiler.end_phase()
         
-        # create invoker to allow execution of functions on the
-        # main thread:
-        self._invoker = self.__create_main_thread_invoker()
+            # set up any frameworks defined
+            profiler.begin_phase("setup_frameworks")
+            try:
+                setup_frameworks(self, self, self.__env, descriptor)
+            finally:
+                profiler.end_phase()
+        
+            # run the engine init
+            self.log_debug("Engine init: Instantiating %s" % self)
+            self.log_debug("Engine init: Current Context: %s" % context)
+
+            # now if a folder named python is defined in the engine, add it to the pythonpath
+            my_path = os.path.dirname(sys.modules[self.__module__].__file__)
+            python_path = os.path.join(my_path, constants.BUNDLE_PYTHON_FOLDER)
+            if os.path.exists(python_path):            
+                # only append to python path if __init__.py does not exist
+                # if __init__ exists, we should use the special tank import instead
+                init_path = os.path.join(python_path, "__init__.py")
+                if not os.path.exists(init_path):
+                    self.log_debug("Appending to PYTHONPATH: %s" % python_path)
+                    sys.path.append(python_path)
+
+
+            # initial init pass on engine
+            profiler.begin_phase("init_engine")
+            try:
+                self.init_engine()
+            finally:
+                profiler.end_phase()
+
+            # try to pull in QT classes and assign to tank.platform.qt.XYZ
+            base_def = self._define_qt_base()
+            qt.QtCore = base_def.get("qt_core")
+            qt.QtGui = base_def.get("qt_gui")
+            qt.TankDialogBase = base_def.get("dialog_base")
+        
+            # create invoker to allow execution of functions on the
+            # main thread:
+            self._invoker = self.__create_main_thread_invoker()
+        
+            # now load all apps and their settings
+            profiler.begin_phase("load_apps")
+            try:
+                self.__load_apps()
+            finally:
+                profiler.end_phase()
         
-        # now load all apps and their settings
-        self.__load_apps()
+            # now run the post app init
+            profiler.begin_phase("post_app_init")
+            try:
+                self.post_app_init()
+            finally:
+                profiler.end_phase()
         
-        # now run the post app init
-        self.post_app_init()
+            # emit an engine started event
+            profiler.begin_phase("engine_init_hook")
+            try:
+                tk.execute_hook(constants.TANK_ENGINE_INIT_HOOK_NAME, engine=self)
+            finally:
+                profiler.end_phase()
         
-        # emit an engine started event
-        tk.execute_hook(constants.TANK_ENGINE_INIT_HOOK_NAME, engine=self)
+            self.log_debug("Init complete: %s" % self)
         
-        self.log_debug("Init complete: %s" % self)
+            profiler.finish(self)
+        finally:
+            # make sure that a failed startup doesn't leave the profiler
+            # recording the shotgun calls of the rest of the session
+            profiler.stop()
         
     def __repr__(self):
         return "<Sgtk Engine 0x%08x: %s, env: %s>" % (id(self),  
@@ -239,6 +283,15 @@ class Engine(TankBundle):
         """
         pass
     
+    def _get_shared_frameworks(self):
+        """
+        Internal method - not part of Tank's public interface.
+        
+        Returns the dictionary of framework instances shared by all 
+        apps and frameworks in this engine, keyed by (instance name, version)
+        """
+        return self.__shared_frameworks
+    
     def destroy(self):
         """
         Destroy all apps, then call destroy_engine so subclasses can add their own tear down code.
@@ -721,105 +774,365 @@ class Engine(TankBundle):
     def __load_apps(self):
         """
         Populate the __applications dictionary, skip over apps that fail to initialize.
+
+        If the engine setting lazy_app_init is true, apps which declare their
+        commands, either in their manifest or in the command manifest cached
+        from a previous session, are not initialized. Instead, stub commands are
+        registered which initialize the app the first time they are executed.
+        Apps may register different commands depending on the context, so the
+        cached commands are only used for contexts of the same shape (entity
+        type, step, task etc.) as the one they were recorded for.
         """
+        lazy = self.get_setting(constants.ENGINE_LAZY_APP_INIT_SETTING, False)
+        if lazy:
+            self.__app_commands_manifest = self.__read_app_commands_manifest()
+            manifest_changed = False
+
         for app_instance_name in self.__env.get_apps(self.__engine_instance_name):
-            
+
             # get a handle to the app bundle
             descriptor = self.__env.get_app_descriptor(self.__engine_instance_name, app_instance_name)
             if not descriptor.exists_local():
                 self.log_error("Cannot start app! %s does not exist on disk." % descriptor)
                 continue
-            
-            # Load settings for app - skip over the ones that don't validate
+
+            if lazy:
+                commands = self.__get_declared_app_commands(app_instance_name, descriptor)
+                if commands is not None:
+                    self.__register_lazy_app(app_instance_name, descriptor, commands)
+                    continue
+
+            app = None
+            profiler.begin_phase(app_instance_name, "app")
             try:
-                # get the app settings data and validate it.
-                app_schema = descriptor.get_configuration_schema()
-                app_settings = self.__env.get_app_settings(self.__engine_instance_name, app_instance_name)
+                app = self.__load_app(app_instance_name, descriptor)
+            finally:
+                profiler.end_phase(failed=app is None)
 
-                # check that the context contains all the info that the app needs
-                if self.__engine_instance_name != constants.SHOTGUN_ENGINE_NAME: 
-                    # special case! The shotgun engine is special and does not have a 
-                    # context until you actually run a command, so disable the valiation
-                    validation.validate_context(descriptor, self.context)
-                
-                # make sure the current operating system platform is supported
-                validation.validate_platform(descriptor)
-                                
-                # for multi engine apps, make sure our engine is supported
-                supported_engines = descriptor.get_supported_engines()
-                if supported_engines and self.name not in supported_engines:
-                    raise TankError("The app could not be loaded since it only supports "
-                                    "the following engines: %s. Your current engine has been "
-                                    "identified as '%s'" % (supported_engines, self.name))
-                
-                # now validate the configuration                
-                validation.validate_settings(app_instance_name, self.tank, self.context, app_schema, app_settings)
-                
-                    
-            except TankError, e:
-                # validation error - probably some issue with the settings!
-                # report this as an error message.
-                self.log_error("App configuration Error for %s. It will not be loaded: %s" % (app_instance_name, e))
-                continue
+            if lazy and app:
+                # remember the commands for next time
+                self.__update_app_commands_manifest(app)
+                manifest_changed = True
+
+        if lazy and manifest_changed:
+            self.__write_app_commands_manifest()
+
+    def __load_app(self, app_instance_name, descriptor):
+        """
+        Validates, loads and initializes an app and adds it to the
+        __applications dictionary.
+
+        :returns: The app object or None if the app failed to load
+        """
+        loaded_app = None
+
+        # Load settings for app - skip over the ones that don't validate
+        try:
+            # get the app settings data and validate it.
+            app_schema = descriptor.get_configuration_schema()
+            app_settings = self.__env.get_app_settings(self.__engine_instance_name, app_instance_name)
+
+            # check that the context contains all the info that the app needs
+            if self.__engine_instance_name != constants.SHOTGUN_ENGINE_NAME: 
+                # special case! The shotgun engine is special and does not have a 
+                # context until you actually run a command, so disable the valiation
+                validation.validate_context(descriptor, self.context)
             
-            except Exception:
-                # code execution error in the validation. Report this as an error 
-                # with the engire call stack!
-                self.log_exception("A general exception was caught while trying to " 
-                                   "validate the configuration for app %s. "
-                                   "The app will not be loaded." % app_instance_name)
-                continue
+            # make sure the current operating system platform is supported
+            validation.validate_platform(descriptor)
+                            
+            # for multi engine apps, make sure our engine is supported
+            supported_engines = descriptor.get_supported_engines()
+            if supported_engines and self.name not in supported_engines:
+                raise TankError("The app could not be loaded since it only supports "
+                                "the following engines: %s. Your current engine has been "
+                                "identified as '%s'" % (supported_engines, self.name))
             
-                                    
-            # load the app
+            # now validate the configuration                
+            profiler.begin_phase("validate_settings")
             try:
-                # now get the app location and resolve it into a version object
-                app_dir = descriptor.get_path()
+                validation.validate_settings(app_instance_name, self.tank, self.context, app_schema, app_settings)
+            finally:
+                profiler.end_phase()
+            
+                
+        except TankError, e:
+            # validation error - probably some issue with the settings!
+            # report this as an error message.
+            self.log_error("App configuration Error for %s. It will not be loaded: %s" % (app_instance_name, e))
+            return None
+        
+        except Exception:
+            # code execution error in the validation. Report this as an error 
+            # with the engire call stack!
+            self.log_exception("A general exception was caught while trying to " 
+                               "validate the configuration for app %s. "
+                               "The app will not be loaded." % app_instance_name)
+            return None
+        
+                                
+        # load the app
+        try:
+            # now get the app location and resolve it into a version object
+            app_dir = descriptor.get_path()
 
-                # create the object, run the constructor
+            # create the object, run the constructor
+            profiler.begin_phase("load_plugin")
+            try:
                 app = application.get_application(self, app_dir, descriptor, app_settings, app_instance_name)
-                
-                # load any frameworks required
+            finally:
+                profiler.end_phase()
+            
+            # load any frameworks required
+            profiler.begin_phase("setup_frameworks")
+            try:
                 setup_frameworks(self, app, self.__env, descriptor)
-                
-                # track the init of the app
-                self.__currently_initializing_app = app
+            finally:
+                profiler.end_phase()
+            
+            # track the init of the app
+            self.__currently_initializing_app = app
+            try:
+                profiler.begin_phase("init_app")
                 try:
                     app.init_app()
                 finally:
-                    self.__currently_initializing_app = None
+                    profiler.end_phase()
+            finally:
+                self.__currently_initializing_app = None
+        
+        except TankError, e:
+            self.log_error("App %s failed to initialize. It will not be loaded: %s" % (app_dir, e))
             
-            except TankError, e:
-                self.log_error("App %s failed to initialize. It will not be loaded: %s" % (app_dir, e))
-                
-            except Exception:
-                self.log_exception("App %s failed to initialize. It will not be loaded." % app_dir)
-            else:
-                # note! Apps are keyed by their instance name, meaning that we 
-                # could theoretically have multiple instances of the same app.
-                self.__applications[app_instance_name] = app
-                
-            # lastly check if there are any compatibility warnings
-            messages = black_list.compare_against_black_list(descriptor)
-            if len(messages) > 0:
-                self.log_warning("Compatibility warnings were issued for %s:" % descriptor)
-                for msg in messages:
-                    self.log_warning("")
-                    self.log_warning(msg)
-                
+        except Exception:
+            self.log_exception("App %s failed to initialize. It will not be loaded." % app_dir)
+        else:
+            # note! Apps are keyed by their instance name, meaning that we 
+            # could theoretically have multiple instances of the same app.
+            self.__applications[app_instance_name] = app
+            loaded_app = app
             
+        # lastly check if there are any compatibility warnings
+        messages = black_list.compare_against_black_list(descriptor)
+        if len(messages) > 0:
+            self.log_warning("Compatibility warnings were issued for %s:" % descriptor)
+            for msg in messages:
+                self.log_warning("")
+                self.log_warning(msg)
+
+        return loaded_app
+
+    def __register_lazy_app(self, app_instance_name, descriptor, commands):
+        """
+        Registers stub commands for an app without initializing it.
+        The app is loaded the first time one of the commands is run.
+        """
+        try:
+            # only run the cheap checks here, the settings are validated
+            # when the app is loaded.
+            if self.__engine_instance_name != constants.SHOTGUN_ENGINE_NAME:
+                validation.validate_context(descriptor, self.context)
+            validation.validate_platform(descriptor)
+            supported_engines = descriptor.get_supported_engines()
+            if supported_engines and self.name not in supported_engines:
+                raise TankError("The app could not be loaded since it only supports "
+                                "the following engines: %s. Your current engine has been "
+                                "identified as '%s'" % (supported_engines, self.name))
+        except TankError, e:
+            self.log_error("App configuration Error for %s. It will not be loaded: %s" % (app_instance_name, e))
+            return
+
+        lazy_app = application.LazyApplication(self, descriptor, app_instance_name,
+                                               lambda: self.__load_lazy_app(lazy_app))
+        self.__applications[app_instance_name] = lazy_app
+
+        self.log_debug("Registering commands for %s, the app will be initialized when "
+                       "first used." % app_instance_name)
+        self.__currently_initializing_app = lazy_app
+        try:
+            for command in commands:
+                self.register_command(command["name"],
+                                      self.__make_lazy_command(lazy_app, command["name"]),
+                                      dict(command["properties"]))
+        finally:
+            self.__currently_initializing_app = None
+
+    def __make_lazy_command(self, lazy_app, command_name):
+        """
+        Returns a stub callback for a command of a lazily initialized app
+        """
+        def callback(*args, **kwargs):
+            app = lazy_app._load()
+            # find the command that the app registered when it was initialized
+            for name in [command_name, "%s:%s" % (app.instance_name, command_name)]:
+                command = self.__commands.get(name)
+                if command and command["properties"].get("app") is app:
+                    return command["callback"](*args, **kwargs)
+            raise TankError("The app %s did not register the command '%s'. The commands "
+                            "declared for the app are out of date." % (app.instance_name, command_name))
+        return callback
+
+    def __load_lazy_app(self, lazy_app):
+        """
+        Initializes an app which was set up in lazy mode, replacing its
+        stub commands with the ones that the app registers.
+
+        :returns: The app object
+        """
+        app = self.__applications.get(lazy_app.instance_name)
+        if app is not None and not isinstance(app, application.LazyApplication):
+            # already loaded
+            return app
+
+        self.log_debug("Initializing lazy app %s" % lazy_app.instance_name)
+
+        # remove the stub commands
+        for (name, command) in self.__commands.items():
+            if command["properties"].get("app") is lazy_app:
+                del self.__commands[name]
+
+        app = self.__load_app(lazy_app.instance_name, lazy_app.descriptor)
+        if app is None:
+            if self.__applications.get(lazy_app.instance_name) is lazy_app:
+                del self.__applications[lazy_app.instance_name]
+            raise TankError("The app %s failed to initialize. Please see the "
+                            "log for details." % lazy_app.instance_name)
+
+        # keep the command manifest up to date
+        self.__update_app_commands_manifest(app)
+        self.__write_app_commands_manifest()
+
+        return app
+
+    def __get_app_commands_manifest_key(self, app_instance_name):
+        """
+        Returns the key for an app in the app commands manifest. The key
+        includes the shape of the context, e.g. Shot+step+task, since apps
+        may register different commands in different contexts.
+        """
+        ctx = self.context
+        if ctx.entity:
+            shape = [ctx.entity["type"]]
+        elif ctx.project:
+            shape = ["Project"]
+        else:
+            shape = ["empty"]
+        if ctx.step:
+            shape.append("step")
+        if ctx.task:
+            shape.append("task")
+        shape.extend(sorted([x["type"] for x in ctx.additional_entities]))
+        return "%s/%s/%s" % (self.__env.name, app_instance_name, "+".join(shape))
+
+    def __get_declared_app_commands(self, app_instance_name, descriptor):
+        """
+        Returns the commands declared for an app, either in its manifest
+        or in the app commands manifest from an earlier session, or None
+        if the commands are not known.
+        """
+        commands = descriptor.get_commands()
+        if commands is not None:
+            return commands
+
+        key = self.__get_app_commands_manifest_key(app_instance_name)
+        entry = self.__app_commands_manifest.get(key)
+        if entry and entry.get("version") == descriptor.get_version() and entry.get("path") == descriptor.get_path():
+            return entry["commands"]
+
+        return None
+
+    def __update_app_commands_manifest(self, app):
+        """
+        Records the commands registered by an app in the app commands manifest
+        """
+        commands = []
+        for (name, command) in self.__commands.iteritems():
+            properties = command["properties"]
+            if properties.get("app") is not app:
+                continue
+            if properties.get("prefix"):
+                name = name[len(properties["prefix"]) + 1:]
+            # only keep simple values that can be stored on disk
+            properties = dict((k, v) for (k, v) in properties.iteritems()
+                              if k not in ["app", "prefix"] and _is_simple_value(v))
+            commands.append({"name": name, "properties": properties})
+
+        key = self.__get_app_commands_manifest_key(app.instance_name)
+        self.__app_commands_manifest[key] = {"version": app.descriptor.get_version(),
+                                             "path": app.descriptor.get_path(),
+                                             "commands": commands}
+
+    def __get_app_commands_manifest_path(self):
+        """
+        Returns the path to the app commands manifest for this engine
+        """
+        return os.path.join(self.cache_location, constants.LAZY_APP_COMMANDS_MANIFEST_FILE)
+
+    def __read_app_commands_manifest(self):
+        """
+        Reads the app commands manifest from disk
+        """
+        manifest_path = self.__get_app_commands_manifest_path()
+        if not os.path.exists(manifest_path):
+            return {}
+        try:
+            fh = open(manifest_path, "rt")
+            try:
+                data = yaml.load(fh)
+            finally:
+                fh.close()
+        except Exception, e:
+            self.log_debug("Could not read app commands manifest %s: %s" % (manifest_path, e))
+            return {}
+        return data or {}
+
+    def __write_app_commands_manifest(self):
+        """
+        Writes the app commands manifest to disk. Failures are not fatal,
+        they only mean that more apps are initialized at the next startup.
+        """
+        manifest_path = self.__get_app_commands_manifest_path()
+        tmp_path = "%s.%d.tmp" % (manifest_path, os.getpid())
+        try:
+            fh = open(tmp_path, "wt")
+            try:
+                yaml.safe_dump(self.__app_commands_manifest, fh, default_flow_style=False)
+            finally:
+                fh.close()
+            if sys.platform == "win32" and os.path.exists(manifest_path):
+                os.remove(manifest_path)
+            os.rename(tmp_path, manifest_path)
+        except Exception, e:
+            self.log_debug("Could not write app commands manifest %s: %s" % (manifest_path, e))
 
     def __destroy_apps(self):
         """
         Call the destroy_app method on all loaded apps
         """
-        
+
         for app in self.__applications.values():
+            if isinstance(app, application.LazyApplication):
+                # never initialized
+                continue
             app._destroy_frameworks()
             self.log_debug("Destroying %s" % app)
             app.destroy_app()
 
 
+def _is_simple_value(value):
+    """
+    Returns True if the value only contains basic types which
+    can be stored in a yaml file.
+    """
+    if value is None or isinstance(value, (bool, int, long, float, basestring)):
+        return True
+    if isinstance(value, (list, tuple)):
+        return all(_is_simple_value(x) for x in value)
+    if isinstance(value, dict):
+        return all(isinstance(k, basestring) and _is_simple_value(v) for (k, v) in value.iteritems())
+    return False
+
+
 ##########################################################################################
 # Engine management
 
@@ -22,6 +22,7 @@ from . import constants
 from ..errors import TankError
 from .bundle import TankBundle
 from . import validation
+from . import profiler
 
 # global variable that holds a stack of references to
 # a current bundle object - this variable is populated
@@ -51,16 +52,37 @@ class Framework(TankBundle):
         TankBundle.__init__(self, engine.tank, engine.context, settings, descriptor)
         
         self.__engine = engine
+        
+        # number of apps, frameworks and engines using this instance
+        self.__ref_count = 0
 
         self.log_debug("Framework init: Instantiating %s" % self)
                 
     def __repr__(self):        
         return "<Sgtk Framework 0x%08x: %s, engine: %s>" % (id(self), self.name, self.engine)
 
+    def _add_ref(self):
+        """
+        Called when an app, framework or engine starts using this framework
+        """
+        self.__ref_count += 1
+
     def _destroy_framework(self):
         """
-        Called by the parent classes when it is time to destroy this framework
+        Called by the parent classes when it is time to destroy this framework.
+        
+        Framework instances are shared by all items in an engine which use 
+        them, so the framework is only torn down once the last of these 
+        has released it.
         """
+        self.__ref_count -= 1
+        if self.__ref_count > 0:
+            self.log_debug("Releasing %s, still used by %d items" % (self, self.__ref_count))
+            return
+        
+        # remove self from the engine's shared instances
+        _release_shared_framework(self.engine, self)
+        
         # destroy all our frameworks
         for fw in self.frameworks.values():
             fw._destroy_framework() 
@@ -147,6 +169,9 @@ def setup_frameworks(engine_obj, parent_obj, env, parent_descriptor):
     """
     Checks if any frameworks are needed for the current item
     and in that case loads them - recursively
+    
+    Framework instances are shared across all the items in an engine, 
+    so each framework is only loaded and initialized once per engine.
     """
     
     # look into the environment, get descriptors for all frameworks that our item needs:
@@ -155,14 +180,52 @@ def setup_frameworks(engine_obj, parent_obj, env, parent_descriptor):
     # looks like all of the frameworks are valid! Load them one by one
     for fw_inst_name in framework_instance_names:
         
-        engine_obj.log_debug("%s - loading framework %s" % (parent_obj, fw_inst_name))
-        
-        fw_obj = load_framework(engine_obj, env, fw_inst_name)
+        fw_obj = _get_shared_framework(engine_obj, parent_obj, env, fw_inst_name)
         
         # note! frameworks are keyed by their code name, not their instance name
         parent_obj.frameworks[fw_obj.name] = fw_obj
         
-        
+
+def _get_shared_framework(engine_obj, parent_obj, env, fw_instance_name):
+    """
+    Returns the framework instance for an engine, loading it if it 
+    hasn't already been loaded by another item in the engine. 
+    Instances are keyed by instance name and version.
+    
+    The returned framework has had its reference count incremented and
+    should be released by calling its _destroy_framework() method.
+    """
+    descriptor = env.get_framework_descriptor(fw_instance_name)
+    key = (fw_instance_name, descriptor.get_version())
+    
+    shared_frameworks = engine_obj._get_shared_frameworks()
+    fw_obj = shared_frameworks.get(key)
+    
+    if fw_obj is None:
+        engine_obj.log_debug("%s - loading framework %s" % (parent_obj, fw_instance_name))
+        profiler.begin_phase(fw_instance_name, "framework")
+        try:
+            fw_obj = load_framework(engine_obj, env, fw_instance_name)
+        finally:
+            profiler.end_phase(failed=fw_obj is None)
+        shared_frameworks[key] = fw_obj
+    else:
+        engine_obj.log_debug("%s - reusing framework %s" % (parent_obj, fw_obj))
+    
+    fw_obj._add_ref()
+    return fw_obj
+
+
+def _release_shared_framework(engine_obj, fw_obj):
+    """
+    Removes a framework that is being destroyed from the shared
+    instances held by an engine.
+    """
+    shared_frameworks = engine_obj._get_shared_frameworks()
+    for (key, value) in shared_frameworks.items():
+        if value is fw_obj:
+            del shared_frameworks[key]
+
 
 
 def load_framework(engine_obj, env, fw_instance_name):
@@ -189,11 +252,15 @@ def load_framework(engine_obj, env, fw_instance_name):
         fw_schema = descriptor.get_configuration_schema()
                 
         fw_settings = env.get_framework_settings(fw_instance_name)
-        validation.validate_settings(fw_instance_name, 
-                                     engine_obj.tank, 
-                                     engine_obj.context, 
-                                     fw_schema, 
-                                     fw_settings)
+        profiler.begin_phase("validate_settings")
+        try:
+            validation.validate_settings(fw_instance_name, 
+                                         engine_obj.tank, 
+                                         engine_obj.context, 
+                                         fw_schema, 
+                                         fw_settings)
+        finally:
+            profiler.end_phase()
                             
     except TankError, e:
         # validation error - probably some issue with the settings!
@@ -207,13 +274,25 @@ def load_framework(engine_obj, env, fw_instance_name):
     # load the framework
     try:
         # initialize fw class
-        fw = _create_framework_instance(engine_obj, descriptor, fw_settings)
+        profiler.begin_phase("load_plugin")
+        try:
+            fw = _create_framework_instance(engine_obj, descriptor, fw_settings)
+        finally:
+            profiler.end_phase()
         
         # load any frameworks required by the framework :)
-        setup_frameworks(engine_obj, fw, env, descriptor)
+        profiler.begin_phase("setup_frameworks")
+        try:
+            setup_frameworks(engine_obj, fw, env, descriptor)
+        finally:
+            profiler.end_phase()
         
         # and run the init
-        fw.init_framework()
+        profiler.begin_phase("init_framework")
+        try:
+            fw.init_framework()
+        finally:
+            profiler.end_phase()
         
     except Exception, e:
         raise TankError("Framework %s failed to initialize: %s" % (descriptor, e))
@@ -0,0 +1,267 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Profiling of engine startup.
+
+Engine startup is broken down into phases (settings validation, framework
+loading, engine init, app loading etc.) which are timed when the
+TANK_PROFILE_STARTUP environment variable is set. For each phase, the wall
+time and the number of Shotgun calls made are recorded.
+
+When the engine has started, a summary is written to the engine log. If the
+environment variable is set to a file path ending with .json, the timeline is
+also written to that file in the Chrome trace event format, which can be
+loaded into chrome://tracing.
+
+Phases are timed with explicit calls, and must always be ended:
+
+    profiler.begin_phase("init_engine")
+    try:
+        ...
+    finally:
+        profiler.end_phase()
+
+"""
+
+import os
+import time
+import threading
+
+try:
+    import json
+except ImportError:
+    # python 2.5 - use the simplejson fallback of the shotgun API
+    from tank_vendor.shotgun_api3.sg_25 import json
+
+from . import constants
+from ..util import shotgun_stats
+
+
+class StartupProfiler(object):
+    """
+    Records a timeline of nested phases, together with the
+    Shotgun calls made during each phase.
+    """
+
+    def __init__(self, name, sg=None):
+        """
+        :param name: Name of the profiled operation
+        :param sg: Optional Shotgun API handle to record calls for
+        """
+        self.name = name
+        self.events = []
+        self._local = threading.local()
+        self._pid = os.getpid()
+        self._start_time = time.time()
+        self._end_time = None
+
+        self._measurement = None
+        self._sg_stats = None
+        if sg is not None:
+            self._measurement = shotgun_stats.ShotgunMeasurement(sg)
+            self._sg_stats = self._measurement.start()
+
+    def _get_stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = []
+            self._local.stack = stack
+        return stack
+
+    def _get_sg_totals(self):
+        if self._sg_stats is None:
+            return (0, 0.0)
+        stats = self._sg_stats.get()
+        return (stats.calls, stats.total_time)
+
+    def begin_phase(self, name, category="phase", **args):
+        """
+        Starts timing a phase. Phases can be nested, and each call
+        must be matched by a call to end_phase().
+
+        :param name: Name of the phase, e.g. 'init_app'
+        :param category: Type of phase, e.g. 'app' or 'framework'
+        :param args: Additional data to store with the phase
+        """
+        stack = self._get_stack()
+        stack.append((name, category, args, time.time(), self._get_sg_totals()))
+
+    def end_phase(self, failed=False):
+        """
+        Ends the phase most recently started in this thread.
+
+        :param failed: True if the phase did not complete successfully
+        """
+        end = time.time()
+        stack = self._get_stack()
+        if not stack:
+            return
+        (sg_calls, sg_time) = self._get_sg_totals()
+        (name, category, args, start, (start_sg_calls, start_sg_time)) = stack.pop()
+        args = dict(args)
+        args["sg_calls"] = sg_calls - start_sg_calls
+        args["sg_time_ms"] = round((sg_time - start_sg_time) * 1000, 3)
+        if failed:
+            args["failed"] = True
+        self.events.append({"name": name,
+                            "category": category,
+                            "start": start,
+                            "duration": end - start,
+                            "depth": len(stack),
+                            "thread": threading.currentThread().getName(),
+                            "args": args})
+
+    def stop(self):
+        """
+        Stops recording Shotgun calls
+        """
+        self._end_time = time.time()
+        if self._measurement is not None:
+            self._measurement.stop()
+            self._measurement = None
+
+    @property
+    def duration(self):
+        """
+        Total duration of the profiled operation in seconds
+        """
+        return (self._end_time or time.time()) - self._start_time
+
+    def to_chrome_trace(self):
+        """
+        Returns the timeline as a dictionary in the Chrome trace event format
+        """
+        thread_ids = {}
+        trace_events = []
+        for event in sorted(self.events, key=lambda x: x["start"]):
+            tid = thread_ids.setdefault(event["thread"], len(thread_ids) + 1)
+            trace_events.append({"name": event["name"],
+                                 "cat": event["category"],
+                                 "ph": "X",
+                                 "ts": int((event["start"] - self._start_time) * 1000000),
+                                 "dur": int(event["duration"] * 1000000),
+                                 "pid": self._pid,
+                                 "tid": tid,
+                                 "args": event["args"]})
+        for (thread_name, tid) in thread_ids.iteritems():
+            trace_events.append({"name": "thread_name", "ph": "M", "pid": self._pid,
+                                 "tid": tid, "args": {"name": thread_name}})
+        return {"traceEvents": trace_events,
+                "displayTimeUnit": "ms",
+                "otherData": {"name": self.name}}
+
+    def write_chrome_trace(self, path):
+        """
+        Writes the timeline to a file in the Chrome trace event format
+        """
+        fh = open(path, "wt")
+        try:
+            json.dump(self.to_chrome_trace(), fh)
+        finally:
+            fh.close()
+
+    def format_summary(self):
+        """
+        Returns a plain text summary of the timeline, with nested
+        phases indented below their parents.
+        """
+        lines = ["%s: %.1f ms" % (self.name, self.duration * 1000)]
+        lines.append("%-60s %10s %9s" % ("Phase", "Time (ms)", "SG calls"))
+        for event in sorted(self.events, key=lambda x: (x["start"], x["depth"])):
+            name = "  " * event["depth"] + event["name"]
+            if event["category"] not in ("phase",):
+                name += " (%s)" % event["category"]
+            if event["args"].get("failed"):
+                name += " [failed]"
+            lines.append("%-60s %10.1f %9d" % (name, event["duration"] * 1000, event["args"]["sg_calls"]))
+        return "\n".join(lines)
+
+
+g_current_profiler = None
+
+def start(name, tk):
+    """
+    Starts profiling if this is enabled via the TANK_PROFILE_STARTUP
+    environment variable.
+
+    :param name: Name of the profiled operation
+    :param tk: Sgtk API instance, used to record Shotgun calls
+    :returns: StartupProfiler instance or None if profiling is disabled
+    """
+    global g_current_profiler
+    if not os.environ.get(constants.PROFILE_STARTUP_ENV_VAR):
+        g_current_profiler = None
+        return None
+    g_current_profiler = StartupProfiler(name, tk.shotgun)
+    return g_current_profiler
+
+
+def begin_phase(name, category="phase", **args):
+    """
+    Starts timing a phase of the current profiling session. Does nothing 
+    if profiling isn't enabled. Must be matched by a call to end_phase(),
+    normally in a finally clause.
+
+    :param name: Name of the phase, e.g. 'init_app'
+    :param category: Type of phase, e.g. 'app' or 'framework'
+    :param args: Additional data to store with the phase
+    """
+    if g_current_profiler is not None:
+        g_current_profiler.begin_phase(name, category, **args)
+
+
+def end_phase(failed=False):
+    """
+    Ends the phase of the current profiling session most recently started
+    in this thread. Does nothing if profiling isn't enabled.
+
+    :param failed: True if the phase did not complete successfully
+    """
+    if g_current_profiler is not None:
+        g_current_profiler.end_phase(failed)
+
+
+def stop():
+    """
+    Ends the current profiling session, if any, without reporting the results.
+    Used to clean up when the profiled operation fails.
+    """
+    global g_current_profiler
+    profiler = g_current_profiler
+    if profiler is not None:
+        g_current_profiler = None
+        profiler.stop()
+
+
+def finish(bundle):
+    """
+    Ends the current profiling session, if any, and writes the results
+    to the log of the given bundle and, if requested, to a trace file.
+
+    :param bundle: Engine or app whose logger should be used
+    """
+    global g_current_profiler
+    profiler = g_current_profiler
+    if profiler is None:
+        return
+    g_current_profiler = None
+    profiler.stop()
+
+    for line in profiler.format_summary().split("\n"):
+        bundle.log_info(line)
+
+    path = os.environ.get(constants.PROFILE_STARTUP_ENV_VAR)
+    if path.lower().endswith(".json"):
+        try:
+            profiler.write_chrome_trace(path)
+            bundle.log_info("Startup timeline written to %s" % path)
+        except (IOError, OSError), e:
+            bundle.log_warning("Could not write startup timeline to %s: %s" % (path, e))
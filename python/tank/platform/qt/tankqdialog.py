@@ -591,7 +591,7 @@ class TankQDialog(TankDialogBase):
         """
         try:
             # first, reload the template defs
-            self._bundle.tank.reload_templates()
+            self._bundle.tank.reload_templates(incremental=True)
         except TankError, e:
             self._bundle.log_error(e)
 
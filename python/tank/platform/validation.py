@@ -14,11 +14,15 @@ App configuration and schema validation.
 """
 import os
 import sys
+import hashlib
 
 from . import constants
 from ..errors import TankError
 from ..template import TemplateString
 
+# settings validations which have passed in this session, keyed by cache key
+g_validated_settings = set()
+
 def validate_schema(app_or_engine_display_name, schema):
     """
     Validates the schema definition (info.yml) of an app or engine.
@@ -36,10 +40,179 @@ def validate_settings(app_or_engine_display_name, tank_api, context, schema, set
     
     Will raise a TankError if validation fails, will return None
     if validation succeeds.
+    
+    Successful validations are cached on disk, keyed by the settings, the 
+    schema, the template definitions, the "shape" of the context and the 
+    existence of the hook files and config resources the settings refer to,
+    so that subsequent validations of the same configuration return straight 
+    away. Setting the TANK_FORCE_FULL_VALIDATION environment variable disables 
+    the cache.
     """
+    cache_key = None
+    if not os.environ.get(constants.FORCE_FULL_VALIDATION_ENV_VAR):
+        cache_key = _get_validation_cache_key(app_or_engine_display_name, tank_api, context, schema, settings)
+        if _is_validation_cached(tank_api, cache_key):
+            return
+    
     v = _SettingsValidator(app_or_engine_display_name, tank_api, schema, context)
     v.validate(settings)
     
+    if cache_key:
+        _add_to_validation_cache(tank_api, cache_key)
+
+
+def clear_validation_cache(tank_api):
+    """
+    Removes all cached settings validation results for a pipeline configuration.
+    """
+    g_validated_settings.clear()
+    cache_folder = _get_validation_cache_folder(tank_api)
+    if os.path.exists(cache_folder):
+        for name in os.listdir(cache_folder):
+            try:
+                os.remove(os.path.join(cache_folder, name))
+            except OSError:
+                pass
+
+    
+def _get_validation_cache_folder(tank_api):
+    """
+    Returns the folder holding the settings validation cache 
+    """
+    return os.path.join(tank_api.pipeline_configuration.get_cache_location(), 
+                        constants.SETTINGS_VALIDATION_CACHE_FOLDER)
+
+
+def _is_validation_cached(tank_api, cache_key):
+    """
+    Returns true if settings with the given cache key have previously 
+    been successfully validated.
+    """
+    if cache_key in g_validated_settings:
+        return True
+    if os.path.exists(os.path.join(_get_validation_cache_folder(tank_api), cache_key)):
+        g_validated_settings.add(cache_key)
+        return True
+    return False
+    
+
+def _add_to_validation_cache(tank_api, cache_key):
+    """
+    Records that settings with the given cache key have validated successfully.
+    The cache is stored as an empty file per cache key, which makes it safe 
+    for concurrent use by several processes.
+    """
+    g_validated_settings.add(cache_key)
+    cache_folder = _get_validation_cache_folder(tank_api)
+    try:
+        if not os.path.exists(cache_folder):
+            old_umask = os.umask(0)
+            try:
+                os.makedirs(cache_folder, 0777)
+            finally:
+                os.umask(old_umask)
+        open(os.path.join(cache_folder, cache_key), "w").close()
+    except (IOError, OSError):
+        # the cache is an optimization - if it can't be written to 
+        # the settings are simply validated again next time.
+        pass
+
+
+def _get_validation_cache_key(app_or_engine_display_name, tank_api, context, schema, settings):
+    """
+    Returns a hash which uniquely identifies the outcome of a settings validation
+    """
+    pc = tank_api.pipeline_configuration
+    
+    # validation checks that hook files and config resources exist
+    resources = []
+    for settings_key in sorted(schema.keys()):
+        if isinstance(settings, dict) and settings_key in settings:
+            _get_validated_resources(pc, schema[settings_key], settings[settings_key], resources)
+    resources_exist = [(x, os.path.exists(x)) for x in resources]
+    
+    if context is None:
+        context_shape = None
+    else:
+        context_shape = (context.project is not None, 
+                         context.entity and context.entity.get("type"),
+                         context.step is not None,
+                         context.task is not None,
+                         context.user is not None,
+                         sorted([x.get("type") for x in context.additional_entities]))
+    
+    data = (app_or_engine_display_name,
+            pc.get_path(),
+            schema,
+            settings,
+            _get_template_fingerprint(tank_api),
+            context_shape,
+            resources_exist)
+    
+    return hashlib.sha1(_canonical_repr(data)).hexdigest()
+
+
+def _get_validated_resources(pc, schema, value, resources):
+    """
+    Adds the paths of the hook files and config resources which are checked
+    for existence when a setting value is validated to the resources list. 
+    Mirrors the traversal made by _SettingsValidator.
+    """
+    data_type = schema.get("type")
+    
+    if type(value) == str and value.startswith("hook:"):
+        return
+    
+    if data_type == "list" and isinstance(value, list):
+        for v in value:
+            _get_validated_resources(pc, schema.get("values", {}), v, resources)
+    
+    elif data_type == "dict" and isinstance(value, dict):
+        for (key, value_schema) in sorted(schema.get("items", {}).items()):
+            if key in value:
+                _get_validated_resources(pc, value_schema, value[key], resources)
+    
+    elif data_type == "hook" and isinstance(value, basestring):
+        if value != constants.TANK_BUNDLE_DEFAULT_HOOK_SETTING:
+            resources.append(os.path.join(pc.get_hooks_location(), "%s.py" % value))
+    
+    elif data_type == "config_path" and isinstance(value, basestring):
+        resources.append(os.path.join(pc.get_config_location(), value.replace("/", os.path.sep)))
+
+
+def _get_template_fingerprint(tank_api):
+    """
+    Returns a hash of the template definitions of an API instance. The hash
+    is computed again whenever the templates have changed, and only the most
+    recent one is kept.
+    """
+    templates = tank_api.templates
+    if tank_api._template_fingerprint is not None and tank_api._template_fingerprint_templates == templates:
+        return tank_api._template_fingerprint
+    
+    definitions = []
+    for name in sorted(templates.keys()):
+        template = templates[name]
+        keys = [(k.name, k.__class__.__name__, k.default) for k in template.keys.values()]
+        definitions.append((name, template.__class__.__name__, repr(template._repr_def), sorted(keys)))
+    
+    tank_api._template_fingerprint_templates = templates.copy()
+    tank_api._template_fingerprint = hashlib.sha1(_canonical_repr(definitions)).hexdigest()
+    return tank_api._template_fingerprint
+
+
+def _canonical_repr(value):
+    """
+    Returns a string representation of a value where dictionaries are
+    sorted, so that equal values always have the same representation.
+    """
+    if isinstance(value, dict):
+        items = sorted((_canonical_repr(k), _canonical_repr(v)) for (k, v) in value.iteritems())
+        return "{%s}" % ", ".join("%s: %s" % x for x in items)
+    if isinstance(value, (list, tuple)):
+        return "[%s]" % ", ".join(_canonical_repr(x) for x in value)
+    return repr(value)
+    
     
 def validate_context(descriptor, context):
     """
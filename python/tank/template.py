@@ -105,6 +105,12 @@ class Template(object):
         self._prefix = ''
         self._static_tokens = []
 
+        # template tree information, worked out on first access
+        self._parent = None
+        self._parent_resolved = False
+        self._ancestors = None
+        self._level_key_names = None
+
     def __repr__(self):
         class_name = self.__class__.__name__
         if self.name:
@@ -215,21 +221,9 @@ class Template(object):
         """
         ignore_types = ignore_types or []
 
-        # find largest key mapping without missing values
-        keys = None
         # index of matching keys will be used to find cleaned_definition
-        index = -1
-        for index, cur_keys in enumerate(self._keys):
-            missing_keys = self._missing_keys(fields, cur_keys, skip_defaults=True)
-            if not missing_keys:
-                keys = cur_keys
-                break
-
-        
-        if keys is None:
-            raise TankError("Tried to resolve a path from the template %s and a set "
-                            "of input fields '%s' but the following required fields were missing "
-                            "from the input: %s" % (self, fields, missing_keys))
+        index = self._definition_index(fields)
+        keys = self._keys[index]
 
         # Process all field values through template keys 
         processed_fields = {}
@@ -238,8 +232,134 @@ class Template(object):
             ignore_type =  key_name in ignore_types
             processed_fields[key_name] = key.str_from_value(value, ignore_type=ignore_type)
 
+        return self._format_path(index, processed_fields)
+
+    def _format_path(self, index, processed_fields):
+        """
+        Substitutes string values into a definition variation.
+
+        :param index: Index of the definition variation
+        :param processed_fields: Mapping of key names to string values
+        """
         return self._cleaned_definitions[index] % processed_fields
 
+    def apply_fields_many(self, fields_list):
+        """
+        Creates paths for many sets of fields. This returns the same paths as
+        calling apply_fields() for each set of fields, but the definition variation
+        to use and the string value of each field value are only worked out once.
+
+        :param fields_list: List of mappings of keys to fields.
+        :type fields_list: List of dictionaries
+
+        :returns: Paths for each set of fields, in the same order.
+        :rtype: List of strings
+        """
+        # definition variation index by names of the keys with values
+        indices = {}
+        # string values by key name and value
+        str_values = {}
+        paths = []
+        for fields in fields_list:
+            present = frozenset([name for (name, value) in fields.items() if value is not None])
+            index = indices.get(present)
+            if index is None:
+                index = self._definition_index(fields)
+                indices[present] = index
+
+            processed_fields = {}
+            for (key_name, key) in self._keys[index].items():
+                value = fields.get(key_name)
+                # values of different types which compare equal may have
+                # different string forms, e.g. 1 and 1.0
+                cache_key = (key_name, value.__class__, value)
+                try:
+                    str_value = str_values.get(cache_key)
+                except TypeError:
+                    # not hashable
+                    str_value = key.str_from_value(value)
+                else:
+                    if str_value is None:
+                        str_value = key.str_from_value(value)
+                        str_values[cache_key] = str_value
+                processed_fields[key_name] = str_value
+
+            paths.append(self._format_path(index, processed_fields))
+        return paths
+
+    def apply_fields_for_values(self, fields, key_name, values):
+        """
+        Creates paths for a set of fields and many values of one of the keys, 
+        for example all the frames of a sequence:
+
+            >>> template.apply_fields_for_values(fields, "SEQ", range(1001, 1101))
+
+        This returns the same paths as calling apply_fields() for each value,
+        but the fields which don't change are only processed once.
+
+        :param fields: Mapping of keys to fields.
+        :type fields: Dictionary
+        :param key_name: Name of the key to set the values for.
+        :type key_name: String
+        :param values: Values for the key.
+        :type values: List
+
+        :returns: Paths for each value, in the same order.
+        :rtype: List of strings
+        """
+        values = list(values)
+        if not values:
+            return []
+        if [x for x in values if x is None]:
+            # the definition variation may change between values
+            fields_list = []
+            for value in values:
+                cur_fields = dict(fields)
+                cur_fields[key_name] = value
+                fields_list.append(cur_fields)
+            return self.apply_fields_many(fields_list)
+
+        fields = dict(fields)
+        fields[key_name] = values[0]
+        index = self._definition_index(fields)
+        keys = self._keys[index]
+
+        processed_fields = {}
+        for (cur_key_name, key) in keys.items():
+            if cur_key_name != key_name:
+                processed_fields[cur_key_name] = key.str_from_value(fields.get(cur_key_name))
+
+        key = keys.get(key_name)
+        if key is None:
+            # the key isn't used by the definition
+            return [self._format_path(index, processed_fields)] * len(values)
+
+        paths = []
+        for value in values:
+            processed_fields[key_name] = key.str_from_value(value)
+            paths.append(self._format_path(index, processed_fields))
+        return paths
+
+    def _definition_index(self, fields):
+        """
+        Determines which definition variation is used to create a path from a 
+        set of fields, which is the largest one without missing values.
+
+        :param fields: Mapping of keys to fields.
+        :type fields: Dictionary
+
+        :returns: Index of the definition variation
+        :rtype: Integer
+        """
+        for index, cur_keys in enumerate(self._keys):
+            missing_keys = self._missing_keys(fields, cur_keys, skip_defaults=True)
+            if not missing_keys:
+                return index
+
+        raise TankError("Tried to resolve a path from the template %s and a set "
+                        "of input fields '%s' but the following required fields were missing "
+                        "from the input: %s" % (self, fields, missing_keys))
+
     def _definition_variations(self, definition):
         """
         Determines all possible definition based on combinations of optional sectionals.
@@ -319,6 +439,38 @@ class Template(object):
         """
         raise NotImplementedError
 
+    @property
+    def ancestors(self):
+        """
+        Returns the branch of the template tree ending with this template, ordered 
+        from the first template below the project root down to and including this
+        template. Parent templates without any keys are not included.
+
+        :returns: List of Template instances
+        """
+        if self._ancestors is None:
+            parent = self.parent
+            if parent is None or not parent._keys[0]:
+                self._ancestors = [self]
+            else:
+                self._ancestors = parent.ancestors + [self]
+        return list(self._ancestors)
+
+    def _get_level_key_names(self):
+        """
+        Returns the names of the keys which this template has but its parent 
+        doesn't have, e.g. name and version for sequences/{Sequence}/{name}.v{version}.nk
+
+        :returns: frozenset of key names
+        """
+        if self._level_key_names is None:
+            key_names = set(self._keys[0])
+            parent = self.parent
+            if parent is not None:
+                key_names -= set(parent._keys[0])
+            self._level_key_names = frozenset(key_names)
+        return self._level_key_names
+
 
     def validate(self, path, fields=None, skip_keys=None):
         """
@@ -407,6 +559,17 @@ class TemplatePath(Template):
         for definition in self._definitions:
             self._static_tokens.append(self._calc_static_tokens(definition))
 
+        # definitions ready for string substitution which include the root path.
+        # these can't be used for definitions starting with a key, since a value
+        # starting with a separator would replace the root path when joined.
+        self._rooted_definitions = []
+        for cleaned_definition in self._cleaned_definitions:
+            if cleaned_definition.startswith("%("):
+                self._rooted_definitions.append(None)
+            else:
+                root_path = self.root_path.replace("%", "%%")
+                self._rooted_definitions.append(os.path.join(root_path, cleaned_definition))
+
     @property
     def root_path(self):
         return self._prefix
@@ -415,17 +578,23 @@ class TemplatePath(Template):
     def parent(self):
         """
         Creates Template instance for parent directory of current Template. 
+        The parent template is created on first access and reused after that.
         
         :returns: Parent's template
         :rtype: Template instance
         """
-        parent_definition = os.path.dirname(self.definition)
-        if parent_definition:
-            return TemplatePath(parent_definition, self.keys, self.root_path, None)
-        return None
-
-    def _apply_fields(self, fields, ignore_types=None):
-        relative_path = super(TemplatePath, self)._apply_fields(fields, ignore_types)
+        if not self._parent_resolved:
+            parent_definition = os.path.dirname(self.definition)
+            if parent_definition:
+                self._parent = TemplatePath(parent_definition, self.keys, self.root_path, None)
+            self._parent_resolved = True
+        return self._parent
+
+    def _format_path(self, index, processed_fields):
+        rooted_definition = self._rooted_definitions[index]
+        if rooted_definition is not None:
+            return rooted_definition % processed_fields
+        relative_path = super(TemplatePath, self)._format_path(index, processed_fields)
         return os.path.join(self.root_path, relative_path)
 
 
@@ -678,8 +847,25 @@ def read_templates(pipeline_configuration):
 
     :returns: Dictionary of form {template name: template object}
     """
-    
-    data = pipeline_configuration.get_templates_config()            
+    (templates, _) = load_templates(pipeline_configuration)
+    return templates
+
+
+def load_templates(pipeline_configuration, previous_state=None):
+    """
+    Creates templates and keys based on contents of templates file. When the 
+    state of an earlier load is passed in, only the keys and templates whose 
+    configuration has changed since then are created again, along with the 
+    templates using changed keys or roots. All others are reused as is.
+
+    :param pipeline_configuration: pipeline config object
+    :param previous_state: (Optional) State returned by an earlier call.
+
+    :returns: Tuple (templates, state), where templates is a dictionary of form
+              {template name: template object} and state is to be passed to
+              the next call.
+    """
+    data = pipeline_configuration.get_templates_config()
     
     # get dictionaries from the templates config file:
     def get_data_section(section_name):
@@ -689,20 +875,81 @@ def read_templates(pipeline_configuration):
         if d is None:
             d = {}
         return d            
-            
-    keys = templatekey.make_keys(get_data_section("keys"))
-    template_paths = make_template_paths(get_data_section("paths"), keys, pipeline_configuration.get_data_roots() )
-    template_strings = make_template_strings(get_data_section("strings"), keys, template_paths)
+
+    state = _TemplatesState()
+    state.keys_data = get_data_section("keys")
+    state.paths_data = _process_templates_data(get_data_section("paths"), "path")
+    state.strings_data = _process_templates_data(get_data_section("strings"), "path")
+    state.roots = pipeline_configuration.get_data_roots()
+
+    previous = previous_state or _TemplatesState()
+
+    # keys
+    changed_key_names = set(previous.keys_data) - set(state.keys_data)
+    for key_name, key_data in state.keys_data.items():
+        if key_name in previous.keys and previous.keys_data.get(key_name) == key_data:
+            state.keys[key_name] = previous.keys[key_name]
+        else:
+            state.keys.update(templatekey.make_keys({key_name: key_data}))
+            changed_key_names.add(key_name)
+
+    changed_root_names = set()
+    for root_name in set(previous.roots) | set(state.roots):
+        if previous.roots.get(root_name) != state.roots.get(root_name):
+            changed_root_names.add(root_name)
+
+    # paths
+    for template_name, template_data in state.paths_data.items():
+        template_path = previous.template_paths.get(template_name)
+        if (template_path is None 
+            or previous.paths_data.get(template_name) != template_data
+            or template_data["root_name"] in changed_root_names
+            or changed_key_names.intersection(_get_key_names(template_data["definition"]))):
+            template_path = _make_template_path(template_name, template_data, state.keys, state.roots)
+        state.template_paths[template_name] = template_path
+
+    # strings
+    for template_name, template_data in state.strings_data.items():
+        template_string = previous.template_strings.get(template_name)
+        validator_name = template_data.get("validate_with")
+        if (template_string is None
+            or previous.strings_data.get(template_name) != template_data
+            or changed_key_names.intersection(_get_key_names(template_data["definition"]))
+            or state.template_paths.get(validator_name) is not previous.template_paths.get(validator_name)):
+            template_string = _make_template_string(template_name, template_data, state.keys, state.template_paths)
+        state.template_strings[template_name] = template_string
 
     # Detect duplicate names across paths and strings
-    dup_names =  set(template_paths).intersection(set(template_strings))
+    dup_names =  set(state.template_paths).intersection(set(state.template_strings))
     if dup_names:
         raise TankError("Detected paths and strings with the same name: %s" % str(list(dup_names)))
 
     # Put path and strings together
-    templates = template_paths
-    templates.update(template_strings)
-    return templates
+    templates = state.template_paths.copy()
+    templates.update(state.template_strings)
+    return (templates, state)
+
+
+class _TemplatesState(object):
+    """
+    The data and objects of a load_templates() call, used by 
+    the next call to find out what has changed.
+    """
+    def __init__(self):
+        self.keys_data = {}
+        self.paths_data = {}
+        self.strings_data = {}
+        self.roots = {}
+        self.keys = {}
+        self.template_paths = {}
+        self.template_strings = {}
+
+
+def _get_key_names(definition):
+    """
+    Returns the names of the keys used by a template definition
+    """
+    return re.findall(r"(?<={)%s(?=})" % Template._key_name_regex, definition)
 
 
 def make_template_paths(data, keys, roots):
@@ -722,22 +969,27 @@ def make_template_paths(data, keys, roots):
     templates_data = _process_templates_data(data, "path")
 
     for template_name, template_data in templates_data.items():
-        definition = template_data["definition"]
-        root_name = template_data["root_name"]
-        # to avoid confusion between strings and paths, validate to check
-        # that each item contains at least a "/" (#19098)
-        if "/" not in definition:
-            raise TankError("The template %s (%s) does not seem to be a valid path. A valid "
-                            "path needs to contain at least one '/' character. Perhaps this "
-                            "template should be in the strings section "
-                            "instead?" % (template_name, definition))
-
-        root_path = roots[root_name]
-        template_path = TemplatePath(definition, keys, root_path, template_name)
-        template_paths[template_name] = template_path
+        template_paths[template_name] = _make_template_path(template_name, template_data, keys, roots)
 
     return template_paths
 
+def _make_template_path(template_name, template_data, keys, roots):
+    """
+    Creates a TemplatePath from its processed data.
+    """
+    definition = template_data["definition"]
+    root_name = template_data["root_name"]
+    # to avoid confusion between strings and paths, validate to check
+    # that each item contains at least a "/" (#19098)
+    if "/" not in definition:
+        raise TankError("The template %s (%s) does not seem to be a valid path. A valid "
+                        "path needs to contain at least one '/' character. Perhaps this "
+                        "template should be in the strings section "
+                        "instead?" % (template_name, definition))
+
+    root_path = roots[root_name]
+    return TemplatePath(definition, keys, root_path, template_name)
+
 def make_template_strings(data, keys, template_paths):
     """
     Factory function which creates TemplateStrings.
@@ -755,23 +1007,27 @@ def make_template_strings(data, keys, template_paths):
     templates_data = _process_templates_data(data, "path")
 
     for template_name, template_data in templates_data.items():
-        definition = template_data["definition"]
-
-        validator_name = template_data.get("validate_with")
-        validator = template_paths.get(validator_name)
-        if validator_name and not validator:
-            msg = "Template %s validate_with is set to undefined template %s."
-            raise TankError(msg %(template_name, validator_name))
-
-        template_string = TemplateString(definition,
-                                         keys,
-                                         template_name,
-                                         validate_with=validator)
-
-        template_strings[template_name] = template_string
+        template_strings[template_name] = _make_template_string(template_name, template_data, keys, template_paths)
 
     return template_strings
 
+def _make_template_string(template_name, template_data, keys, template_paths):
+    """
+    Creates a TemplateString from its processed data.
+    """
+    definition = template_data["definition"]
+
+    validator_name = template_data.get("validate_with")
+    validator = template_paths.get(validator_name)
+    if validator_name and not validator:
+        msg = "Template %s validate_with is set to undefined template %s."
+        raise TankError(msg %(template_name, validator_name))
+
+    return TemplateString(definition,
+                          keys,
+                          template_name,
+                          validate_with=validator)
+
 def _conform_template_data(template_data, template_name):
     """
     Takes data for single template and conforms it expected data structure.
@@ -0,0 +1,175 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Matching of paths against a whole set of templates.
+
+A template can only match a path if the path contains all the static tokens
+of the template, the parts of the definition in between keys. If each key is
+followed by a static token, the path also has to end with the last token. The
+matcher indexes the templates by their last static token, so that a path only
+has to be looked up once per distinct token length rather than tested against
+every template. The few templates left are checked for their other static
+tokens and then parsed as usual, so the matcher finds exactly the same
+templates and fields as calling get_fields() on each template.
+
+"""
+
+import os
+
+from .errors import TankError
+from .template import TemplatePath
+
+
+class TemplateMatcher(object):
+    """
+    Matches paths against a set of templates.
+    """
+
+    def __init__(self, templates):
+        """
+        :param templates: Dictionary of templates keyed by name, as found in tk.templates
+        """
+        # templates which the index can't help with, always tested
+        self._other_templates = []
+        # templates keyed by the last static token of their definition,
+        # as a list of (template, static tokens) tuples
+        self._templates_by_suffix = {}
+        # order in which the templates were given, matches are
+        # reported in this order
+        self._order = {}
+        self._next_index = 0
+        self._suffix_lengths = []
+
+        for template in templates.values():
+            if template not in self._order:
+                self._add(template)
+        self._update_suffix_lengths()
+
+    def update(self, templates):
+        """
+        Updates the matcher for a new set of templates. Only the templates which
+        have been added or removed since the matcher was built are indexed or 
+        dropped, templates which are in both sets are left as they are.
+
+        :param templates: Dictionary of templates keyed by name, as found in tk.templates
+        """
+        new_templates = set(templates.values())
+        for template in set(self._order) - new_templates:
+            self._remove(template)
+        for template in templates.values():
+            if template not in self._order:
+                self._add(template)
+        self._update_suffix_lengths()
+
+    def _get_suffixes(self, template):
+        """
+        Returns the index entries for each variation of a template's definition,
+        as a list of (suffix, static tokens) tuples
+        """
+        entries = []
+        for (ordered_keys, static_tokens) in zip(template._ordered_keys, template._static_tokens):
+            suffix = ""
+            if len(static_tokens) > len(ordered_keys):
+                # each key is followed by a static token, so the last
+                # token has to be at the end of the path
+                suffix = static_tokens[-1]
+            entries.append((suffix, static_tokens))
+        return entries
+
+    def _add(self, template):
+        self._order[template] = self._next_index
+        self._next_index += 1
+        if not isinstance(template, TemplatePath):
+            # template strings are prefixed before they are parsed
+            self._other_templates.append(template)
+            return
+        for (suffix, static_tokens) in self._get_suffixes(template):
+            self._templates_by_suffix.setdefault(suffix, []).append((template, static_tokens))
+
+    def _remove(self, template):
+        del self._order[template]
+        if not isinstance(template, TemplatePath):
+            self._other_templates.remove(template)
+            return
+        for (suffix, _) in self._get_suffixes(template):
+            entries = [x for x in self._templates_by_suffix.get(suffix, []) if x[0] is not template]
+            if entries:
+                self._templates_by_suffix[suffix] = entries
+            elif suffix in self._templates_by_suffix:
+                del self._templates_by_suffix[suffix]
+
+    def _update_suffix_lengths(self):
+        # suffix lengths to look up for each path, longest first
+        self._suffix_lengths = sorted(set([len(x) for x in self._templates_by_suffix if x]), reverse=True)
+
+    def candidates(self, path):
+        """
+        Returns the templates which could match a path. These still need to be
+        checked by parsing the path.
+
+        :param path: Path to find templates for
+        :returns: List of templates, in the order they were given
+        """
+        path_lower = os.path.normpath(path).lower()
+
+        entries = list(self._templates_by_suffix.get("", []))
+        for length in self._suffix_lengths:
+            entries.extend(self._templates_by_suffix.get(path_lower[-length:], []))
+
+        candidates = set(self._other_templates)
+        for (template, static_tokens) in entries:
+            if template in candidates:
+                continue
+            for token in static_tokens:
+                if token not in path_lower:
+                    break
+            else:
+                candidates.add(template)
+
+        return sorted(candidates, key=self._order.get)
+
+    def match_all(self, path):
+        """
+        Returns all the templates matching a path.
+
+        :param path: Path to match
+        :returns: List of (template, fields) tuples
+        """
+        matched = []
+        for template in self.candidates(path):
+            try:
+                fields = template.get_fields(path)
+            except TankError:
+                continue
+            matched.append((template, fields))
+        return matched
+
+    def match(self, path):
+        """
+        Returns the template matching a path together with the fields
+        extracted from the path, or (None, None) if no template matches.
+        Raises a TankError if more than one template matches.
+
+        :param path: Path to match
+        :returns: Tuple (template, fields)
+        """
+        matched = self.match_all(path)
+
+        if len(matched) == 0:
+            return (None, None)
+        elif len(matched) == 1:
+            return matched[0]
+        else:
+            # ambiguity!
+            msg = "%d templates are matching the path '%s'.\n" % (len(matched), path)
+            msg += "The overlapping templates are:\n"
+            msg += "\n".join([str(x) for (x, _) in matched])
+            raise TankError(msg)
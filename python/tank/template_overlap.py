@@ -0,0 +1,258 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Offline detection of path templates which can match the same path.
+
+Each variation of a template definition, root path included, is split into
+path segments. A segment is turned into a list of atoms: literal characters
+and character classes for the keys, which take the key constraints into
+account (choices, integers, frame specs, alphanumeric filters and lengths).
+Two segments overlap if a string exists which both of them match, which is
+worked out by walking the two atom lists side by side.
+
+The segments of all the templates are stored in a tree, so that the templates
+sharing the beginning of their paths are compared once for those segments,
+and branches which can't overlap (e.g. sequences vs assets) are never
+descended into.
+
+The analysis errs on the side of reporting overlaps. Exclusions and keys used
+more than once in a definition are not taken into account, and key values
+are assumed not to contain path separators.
+"""
+
+from .template import TemplatePath, split_path
+from .templatekey import StringKey, IntegerKey, SequenceKey
+
+# character classes
+_ANY = "any"
+_DIGIT = "digit"
+_ALPHANUMERIC = "alphanumeric"
+
+# maximum number of alternatives a segment is expanded to for
+# keys with choices, before the choices are ignored
+MAX_SEGMENT_ALTERNATIVES = 64
+
+
+def find_overlapping_templates(templates):
+    """
+    Finds the pairs of path templates which can match the same path.
+
+    :param templates: Dictionary of templates keyed by name, as found in tk.templates
+    :returns: Sorted list of (template name, template name) tuples
+    """
+    tree = _SegmentTree()
+    for (name, template) in templates.items():
+        if isinstance(template, TemplatePath):
+            for (definition, keys) in zip(template._definitions, template._keys):
+                tree.add(name, _get_segments(template.root_path, definition, keys))
+
+    pairs = set()
+    tree.find_overlaps(pairs)
+    return sorted(pairs)
+
+
+def _get_segments(root_path, definition, keys):
+    """
+    Splits a template definition into segments. Each segment is a tuple of
+    alternatives, and each alternative is a tuple of atoms.
+    """
+    root_segments = [x for x in split_path(root_path.lower()) if x]
+    segments = [((tuple([("literal", c) for c in x]),)) for x in root_segments]
+    for segment in split_path(definition):
+        if segment:
+            segments.append(_get_segment_alternatives(segment, keys))
+    return segments
+
+
+def _get_segment_alternatives(segment, keys):
+    """
+    Turns a segment of a definition, e.g. {name}.v{version}.ma, into alternatives of atoms.
+    """
+    alternatives = [()]
+    index = 0
+    while index < len(segment):
+        if segment[index] == "{" and "}" in segment[index:]:
+            end_index = segment.index("}", index)
+            key = keys[segment[index + 1:end_index]]
+            key_alternatives = _get_key_alternatives(key)
+            if len(alternatives) * len(key_alternatives) > MAX_SEGMENT_ALTERNATIVES:
+                key_alternatives = _get_key_alternatives(key, use_choices=False)
+            alternatives = [x + y for x in alternatives for y in key_alternatives]
+            index = end_index + 1
+        else:
+            atom = ("literal", segment[index].lower())
+            alternatives = [x + (atom,) for x in alternatives]
+            index += 1
+    return tuple(alternatives)
+
+
+def _get_key_alternatives(key, use_choices=True):
+    """
+    Returns the alternatives of atoms the values of a key can match.
+    """
+    if isinstance(key, IntegerKey):
+        # choices are not used for integers since the values in a path can
+        # be padded differently than the choices
+        alternatives = [_class_atoms(_DIGIT, key.length, 1)]
+        if isinstance(key, SequenceKey):
+            for frame_spec in key._frame_specs:
+                alternatives.append(tuple([("literal", c) for c in frame_spec.lower()]))
+        return alternatives
+
+    if use_choices and key.choices:
+        return [tuple([("literal", c) for c in str(x).lower()]) for x in key.choices]
+
+    char_class = _ANY
+    if isinstance(key, StringKey) and key.filter_by == "alphanumeric":
+        char_class = _ALPHANUMERIC
+    return [_class_atoms(char_class, key.length, 0)]
+
+
+def _class_atoms(char_class, length, min_length):
+    """
+    Returns the atoms for a value of characters of a class. Atoms with
+    repeat set to True match any number of characters.
+    """
+    if length is not None:
+        return tuple([("class", char_class, False)] * length)
+    return tuple([("class", char_class, False)] * min_length + [("class", char_class, True)])
+
+
+def _chars_intersect(atom_a, atom_b):
+    """
+    Checks if a character exists which is matched by both atoms.
+    """
+    if atom_a[0] == "literal" and atom_b[0] == "literal":
+        return atom_a[1] == atom_b[1]
+    if atom_a[0] == "literal":
+        return _class_matches(atom_b[1], atom_a[1])
+    if atom_b[0] == "literal":
+        return _class_matches(atom_a[1], atom_b[1])
+    # the classes are nested, so there is always a common character
+    return True
+
+
+def _class_matches(char_class, char):
+    if char_class == _DIGIT:
+        return char.isdigit()
+    if char_class == _ALPHANUMERIC:
+        return char.isalnum()
+    return char not in ("/", "\\")
+
+
+def _atoms_intersect(atoms_a, atoms_b):
+    """
+    Checks if a string exists which is matched by both lists of atoms,
+    by walking the states of both lists at the same time.
+    """
+    len_a = len(atoms_a)
+    len_b = len(atoms_b)
+    visited = set()
+    states = [(0, 0)]
+    while states:
+        state = states.pop()
+        if state in visited:
+            continue
+        visited.add(state)
+        (index_a, index_b) = state
+        if index_a == len_a and index_b == len_b:
+            return True
+
+        # repeated atoms can match no characters at all
+        if index_a < len_a and atoms_a[index_a][0] == "class" and atoms_a[index_a][2]:
+            states.append((index_a + 1, index_b))
+        if index_b < len_b and atoms_b[index_b][0] == "class" and atoms_b[index_b][2]:
+            states.append((index_a, index_b + 1))
+
+        # or both atoms match the next character
+        if index_a < len_a and index_b < len_b:
+            atom_a = atoms_a[index_a]
+            atom_b = atoms_b[index_b]
+            if _chars_intersect(atom_a, atom_b):
+                next_a = index_a
+                if not (atom_a[0] == "class" and atom_a[2]):
+                    next_a += 1
+                next_b = index_b
+                if not (atom_b[0] == "class" and atom_b[2]):
+                    next_b += 1
+                states.append((next_a, next_b))
+    return False
+
+
+class _SegmentTree(object):
+    """
+    Tree of template segments. Each node has a child per distinct segment,
+    and the names of the templates ending at the node.
+    """
+
+    def __init__(self):
+        self.children = {}
+        self.template_names = set()
+
+    def add(self, name, segments):
+        node = self
+        for segment in segments:
+            if segment not in node.children:
+                node.children[segment] = _SegmentTree()
+            node = node.children[segment]
+        node.template_names.add(name)
+
+    def find_overlaps(self, pairs):
+        """
+        Adds the pairs of names of overlapping templates to a set
+        """
+        _find_overlaps(self, self, pairs, {})
+
+
+def _segments_intersect(segment_a, segment_b, intersections):
+    """
+    Checks if two segments can match the same string. Results
+    are cached in the intersections dictionary.
+    """
+    if segment_a == segment_b:
+        return True
+    key = (segment_a, segment_b)
+    if key not in intersections:
+        result = False
+        for atoms_a in segment_a:
+            for atoms_b in segment_b:
+                if _atoms_intersect(atoms_a, atoms_b):
+                    result = True
+                    break
+            if result:
+                break
+        intersections[key] = result
+        intersections[(segment_b, segment_a)] = result
+    return intersections[key]
+
+
+def _find_overlaps(node_a, node_b, pairs, intersections):
+    """
+    Finds the overlapping templates in two branches of the segment tree.
+    """
+    for name_a in node_a.template_names:
+        for name_b in node_b.template_names:
+            if name_a != name_b:
+                pairs.add(tuple(sorted([name_a, name_b])))
+
+    items_a = node_a.children.items()
+    if node_a is node_b:
+        # compare each pair of children once
+        for (index, (segment_a, child_a)) in enumerate(items_a):
+            _find_overlaps(child_a, child_a, pairs, intersections)
+            for (segment_b, child_b) in items_a[index + 1:]:
+                if _segments_intersect(segment_a, segment_b, intersections):
+                    _find_overlaps(child_a, child_b, pairs, intersections)
+    else:
+        for (segment_a, child_a) in items_a:
+            for (segment_b, child_b) in node_b.children.items():
+                if _segments_intersect(segment_a, segment_b, intersections):
+                    _find_overlaps(child_a, child_b, pairs, intersections)
@@ -0,0 +1,508 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Template driven searches of the file system.
+
+A template search finds the same paths as a glob of the template with
+wildcards for the keys without values, but walks the file system one
+directory level at a time. Each directory is listed once, and before
+descending, the entries of each level are checked against the keys of
+the template at that level (types, choices, lengths etc.) so that folders
+which can never match the template aren't searched.
+
+Directory listings can be spread over a thread pool, which helps on network
+file systems. Set the TANK_PATH_SEARCH_THREADS environment variable to the
+number of threads to use.
+
+Directory listings can also be cached for the lifetime of the process, which
+is useful for tools that search the same work areas over and over. A cached
+listing is used as long as the modification time of the directory hasn't
+changed, so repeated searches cost one stat per directory. The cache is
+enabled with enable_listing_cache() or by setting the TANK_PATH_SEARCH_CACHE
+environment variable to the maximum number of directory entries to cache.
+
+The paths found can be grouped by the values of the abstract keys of the
+template, so that for example all the frames of an image sequence are 
+handled together rather than parsing every frame with the template.
+
+"""
+
+import os
+import re
+import sys
+import time
+import glob
+import fnmatch
+import threading
+
+from . import templatekey
+from .util.lru_cache import LRUCache
+
+# number of threads used to list directories
+NUM_THREADS_ENV_VAR = "TANK_PATH_SEARCH_THREADS"
+
+# maximum number of directory entries in the listing cache
+LISTING_CACHE_ENV_VAR = "TANK_PATH_SEARCH_CACHE"
+
+# default maximum number of directory entries in the listing cache
+DEFAULT_LISTING_CACHE_SIZE = 1000000
+
+# listings of directories modified less than this many seconds before 
+# they were listed aren't cached, since the directory could change again
+# without its modification time changing on file systems with a coarse 
+# time resolution.
+LISTING_CACHE_MIN_AGE = 2
+
+# regular expression splitting a definition into static tokens and key names
+_key_split_regex = re.compile(r"{([a-zA-Z_ 0-9]+)}")
+
+
+def _get_num_threads():
+    try:
+        return int(os.environ.get(NUM_THREADS_ENV_VAR) or 0)
+    except ValueError:
+        return 0
+
+
+def _key_regex(key):
+    """
+    Returns a regular expression matching all the string values the
+    given key could possibly accept. This is a superset of the values
+    accepted by the key.
+    """
+    if key.choices:
+        # choices are compared case insensitively
+        choices = sorted([str(x) for x in key.choices], key=len, reverse=True)
+        return "(?:%s)" % "|".join([re.escape(x) for x in choices])
+
+    if isinstance(key, templatekey.SequenceKey):
+        # can be a frame number or a frame spec
+        return ".*"
+
+    if isinstance(key, templatekey.IntegerKey):
+        if key.length is not None:
+            return "\\d{%d}" % key.length
+        return "\\d+"
+
+    if key.length is not None:
+        return ".{%d}" % key.length
+    return ".*"
+
+
+class _Level(object):
+    """
+    A directory level of a template search
+    """
+
+    def __init__(self, pattern, tokens, keys, prune):
+        """
+        :param pattern: glob pattern for the level
+        :param tokens: the level's definition split into static
+                       tokens and key names, alternating
+        :param keys: Mapping of key names to keys
+        :param prune: Check the entries against the keys of the level
+        """
+        self.pattern = pattern
+        self.is_magic = glob.has_magic(pattern)
+
+        self._regex = None
+        self._key = None
+        key_names = tokens[1::2]
+        if prune and self.is_magic and key_names:
+            regex = ""
+            for (index, token) in enumerate(tokens):
+                if index % 2:
+                    regex += "(%s)" % _key_regex(keys[token])
+                else:
+                    regex += re.escape(token)
+            # static tokens are matched case insensitively in get_fields
+            self._regex = re.compile("^%s$" % regex, re.IGNORECASE | re.DOTALL | re.UNICODE)
+            if len(key_names) == 1:
+                # the value of the key is the entry without the static tokens
+                # around it, so it can be validated on its own
+                self._key = keys[key_names[0]]
+                self._prefix_length = len(tokens[0])
+                self._suffix_length = len(tokens[2])
+
+    def match(self, names):
+        """
+        Returns the names from a directory listing which match the level
+        """
+        if self.pattern[0] != ".":
+            # same as glob, skip hidden files
+            names = [x for x in names if x[0] != "."]
+        names = fnmatch.filter(names, self.pattern)
+
+        if self._regex is None:
+            return names
+
+        matches = []
+        for name in names:
+            if not self._regex.match(name):
+                continue
+            if self._key:
+                value = name[self._prefix_length:len(name) - self._suffix_length]
+                if not self._key.validate(value):
+                    continue
+            matches.append(name)
+        return matches
+
+
+def _get_levels(template, fields, ignore_types):
+    """
+    Returns the directory levels to search for a template and the
+    directory where the search starts, or None if the template can't
+    be searched level by level.
+    """
+    # process the fields in the same way as when the template is applied
+    index = template._definition_index(fields)
+    keys = template._keys[index]
+    values = {}
+    for (key_name, key) in keys.items():
+        values[key_name] = key.str_from_value(fields.get(key_name), ignore_type=(key_name in ignore_types))
+
+    for value in values.values():
+        if not value or os.sep in value or (os.altsep and os.altsep in value):
+            # the value doesn't make up a part of a directory name
+            return None
+
+    # definitions split by directory. A level can only be pruned
+    # if all variations of the definition are the same up to that level,
+    # since a path can be valid for any of the variations
+    all_components = [x.split(os.sep) for x in template._definitions]
+    components = all_components[index]
+
+    levels = []
+    can_prune = True
+    for (level_index, component) in enumerate(components):
+        for other_components in all_components:
+            if other_components[:level_index + 1] != components[:level_index + 1]:
+                can_prune = False
+        tokens = _key_split_regex.split(component)
+        pattern = ""
+        for (token_index, token) in enumerate(tokens):
+            if token_index % 2:
+                pattern += values[token]
+            else:
+                pattern += token
+        levels.append(_Level(pattern, tokens, keys, can_prune))
+
+    if glob.has_magic(template.root_path):
+        return None
+
+    return (template.root_path, levels)
+
+
+def _list_dir(path):
+    try:
+        return os.listdir(path)
+    except os.error:
+        return None
+
+
+class ListingCache(object):
+    """
+    Cache of directory listings, validated by the modification 
+    time of the directories.
+    """
+
+    def __init__(self, max_entries):
+        """
+        :param max_entries: Maximum total number of directory entries to cache
+        """
+        self._listings = LRUCache(max_entries, size_func=lambda x: len(x[1]) + 1)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        """
+        Number of directories in the cache
+        """
+        return len(self._listings)
+
+    @property
+    def size(self):
+        """
+        Number of directory entries in the cache
+        """
+        return self._listings.size
+
+    def _count(self, hit):
+        self._lock.acquire()
+        try:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        finally:
+            self._lock.release()
+
+    def clear(self):
+        """
+        Removes all listings from the cache
+        """
+        self._listings.clear()
+
+    def list_dir(self, path):
+        """
+        Returns the names in a directory, or None if it can't be listed
+        """
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return None
+
+        cached = self._listings.get(path)
+        if cached is not None and cached[0] == mtime:
+            self._count(True)
+            return cached[1]
+
+        self._count(False)
+        names = _list_dir(path)
+        if names is not None and time.time() - mtime >= LISTING_CACHE_MIN_AGE:
+            self._listings.set(path, (mtime, names))
+        return names
+
+
+g_listing_cache = None
+
+def enable_listing_cache(max_entries=None):
+    """
+    Enables the caching of directory listings for template searches
+    in this process. If the cache is already enabled, the existing
+    cache is returned.
+
+    :param max_entries: Maximum total number of directory entries to cache
+    :returns: ListingCache instance
+    """
+    global g_listing_cache
+    if g_listing_cache is None:
+        g_listing_cache = ListingCache(max_entries or DEFAULT_LISTING_CACHE_SIZE)
+    return g_listing_cache
+
+
+def disable_listing_cache():
+    """
+    Disables the caching of directory listings and discards the cache.
+    """
+    global g_listing_cache
+    g_listing_cache = None
+
+
+def get_listing_cache():
+    """
+    Returns the listing cache, or None if caching isn't enabled
+    """
+    if g_listing_cache is None and os.environ.get(LISTING_CACHE_ENV_VAR):
+        try:
+            max_entries = int(os.environ[LISTING_CACHE_ENV_VAR])
+        except ValueError:
+            max_entries = None
+        return enable_listing_cache(max_entries)
+    return g_listing_cache
+
+
+def find_paths(template, fields, ignore_types=None, num_threads=None):
+    """
+    Finds the paths matching a template and a set of fields. Returns
+    the same paths as a glob of the path produced by the template, where
+    the fields can contain glob wildcards for the keys in ignore_types.
+
+    Note that the paths found aren't necessarily valid for the template.
+
+    :param template: TemplatePath to search for
+    :param fields: Mapping of key names to values
+    :param ignore_types: Keys whose values are glob patterns rather
+                         than values of the key's type
+    :param num_threads: Number of threads used to list directories. Defaults
+                        to the value of the TANK_PATH_SEARCH_THREADS environment
+                        variable.
+    :returns: List of paths
+    """
+    ignore_types = ignore_types or []
+
+    levels = _get_levels(template, fields, ignore_types)
+    if levels is None:
+        return glob.glob(template._apply_fields(fields, ignore_types=ignore_types))
+    (root_path, levels) = levels
+
+    # the leading levels without wildcards are used as is
+    base_path = root_path
+    while levels and not levels[0].is_magic:
+        base_path = os.path.join(base_path, levels[0].pattern)
+        levels = levels[1:]
+
+    if not levels:
+        # no wildcards at all
+        if os.path.lexists(base_path):
+            return [base_path]
+        return []
+
+    if num_threads is None:
+        num_threads = _get_num_threads()
+    pool = None
+
+    list_dir = _list_dir
+    listing_cache = get_listing_cache()
+    if listing_cache is not None:
+        list_dir = listing_cache.list_dir
+
+    try:
+        paths = [base_path]
+        for level in levels:
+            if not paths:
+                break
+
+            if isinstance(level.pattern, unicode):
+                # same as glob, list directories by unicode path
+                # to get unicode names back
+                encoding = sys.getfilesystemencoding() or sys.getdefaultencoding()
+                paths = [x if isinstance(x, unicode) else unicode(x, encoding) for x in paths]
+
+            if not level.is_magic:
+                paths = [os.path.join(x, level.pattern) for x in paths]
+                paths = [x for x in paths if os.path.lexists(x)]
+                continue
+
+            if pool is None and num_threads > 1 and len(paths) > 1:
+                try:
+                    from multiprocessing.pool import ThreadPool
+                except ImportError:
+                    # python 2.5 - list the directories serially
+                    num_threads = 1
+                else:
+                    pool = ThreadPool(num_threads)
+
+            if pool is not None and len(paths) > 1:
+                listings = pool.map(list_dir, paths)
+            else:
+                listings = [list_dir(x) for x in paths]
+
+            next_paths = []
+            for (path, names) in zip(paths, listings):
+                if names:
+                    next_paths.extend([os.path.join(path, x) for x in level.match(names)])
+            paths = next_paths
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    return paths
+
+
+class AbstractKeyMatcher(object):
+    """
+    Matches paths against a template, capturing the values of the abstract
+    keys of the template (typically frame numbers and eyes), using one
+    compiled regular expression per variation of the template definition.
+    """
+
+    def __init__(self, template):
+        """
+        :param template: TemplatePath to match paths against
+        """
+        self._patterns = []
+        non_sep = "[^%s]" % re.escape(os.sep + (os.altsep or ""))
+
+        for (definition, keys) in zip(template._definitions, template._keys):
+            regex = re.escape(os.path.join(template.root_path, ""))
+            # group number of the first occurrence of each abstract key
+            first_groups = {}
+            # group numbers of all the occurrences of abstract keys
+            abstract_groups = []
+            num_groups = 0
+            tokens = _key_split_regex.split(definition)
+            for (index, token) in enumerate(tokens):
+                if index % 2 == 0:
+                    regex += re.escape(token)
+                    continue
+                key = keys[token]
+                if not key.is_abstract:
+                    regex += "%s*?" % non_sep
+                    continue
+                num_groups += 1
+                abstract_groups.append(num_groups)
+                if token in first_groups:
+                    regex += "(\\%d)" % first_groups[token]
+                else:
+                    first_groups[token] = num_groups
+                    if isinstance(key, templatekey.SequenceKey):
+                        # group frame numbers only, frame specs are
+                        # handled like any other value
+                        regex += "([0-9]+)"
+                    else:
+                        regex += "(%s)" % _key_regex(key)
+
+            first_groups = [(group, keys[name]) for (name, group) in first_groups.items()]
+            self._patterns.append((re.compile("^%s$" % regex, re.IGNORECASE | re.DOTALL),
+                                   first_groups,
+                                   abstract_groups))
+
+    def match(self, path):
+        """
+        Matches a path against the template.
+
+        :returns: Tuple (group key, values) where the group key is the same for 
+                  all paths which only differ by the values of their abstract
+                  keys, and values is a dictionary with the value of each
+                  abstract key. Returns None if the path doesn't match or the
+                  values of the abstract keys aren't valid for the keys.
+        """
+        for (index, (regex, first_groups, abstract_groups)) in enumerate(self._patterns):
+            match = regex.match(path)
+            if not match:
+                continue
+
+            values = {}
+            for (group, key) in first_groups:
+                value = match.group(group)
+                if not key.validate(value):
+                    return None
+                values[key.name] = value
+
+            # cut the values of the abstract keys out of the path
+            group_key = [index]
+            last_end = 0
+            for group in abstract_groups:
+                (start, end) = match.span(group)
+                group_key.append(path[last_end:start])
+                last_end = end
+            group_key.append(path[last_end:])
+            return (tuple(group_key), values)
+
+        return None
+
+
+def group_by_abstract_keys(template, paths):
+    """
+    Groups paths which only differ by the values of the abstract keys of
+    a template, typically the frames of an image sequence. 
+
+    :param template: TemplatePath the paths were found for
+    :param paths: List of paths
+    :returns: List of groups, each a list of tuples (path, values) where 
+              values is a dictionary with the string value of each abstract
+              key in the path. Paths which couldn't be matched are returned 
+              in groups of their own with values set to None.
+    """
+    matcher = AbstractKeyMatcher(template)
+    groups = {}
+    ungrouped = []
+    for path in paths:
+        result = matcher.match(path)
+        if result is None:
+            ungrouped.append([(path, None)])
+        else:
+            (group_key, values) = result
+            groups.setdefault(group_key, []).append((path, values))
+    return groups.values() + ungrouped
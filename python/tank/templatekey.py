@@ -20,6 +20,8 @@ FRAMESPEC_FORMAT_INDICATOR = "FORMAT:"
 
 VALID_FORMAT_STRINGS = ["%d", "#", "@", "$F"]
 
+FULL_FORMAT_STRINGS = ["%s %s" % (FRAMESPEC_FORMAT_INDICATOR, x) for x in VALID_FORMAT_STRINGS]
+
 class TemplateKey(object):
     """Base class for template keys. Should not be used directly."""
     def __init__(self,
@@ -49,7 +51,14 @@ class TemplateKey(object):
         self.shotgun_field_name = shotgun_field_name
         self.is_abstract = abstract
         self.length = length
-        self._last_error = ""
+        self._last_error_info = ("", ())
+
+        # normalized values for case insensitive comparisons in validate
+        self._exclusions_lower = frozenset([str(x).lower() for x in self.exclusions])
+        self._choices_lower = frozenset([str(x).lower() for x in self.choices])
+        # when there is nothing to check the string form of a value against,
+        # validate doesn't need to build it
+        self._check_str_value = bool(self.exclusions or self.choices or self.length is not None)
 
         # Validation
         if self.shotgun_field_name and not self.shotgun_entity_type:
@@ -109,26 +118,39 @@ class TemplateKey(object):
 
         :returns: Bool
         """
-        
+        if not self._check_str_value:
+            return True
+
         str_value = value if isinstance(value, basestring) else str(value)
 
         # We are not case sensitive
-        if str_value.lower() in [str(x).lower() for x in self.exclusions]:
-            self._last_error = "%s Illegal value: %s is forbidden for this key." % (self, value)
+        if self._exclusions_lower and str_value.lower() in self._exclusions_lower:
+            self._last_error_info = ("%s Illegal value: %s is forbidden for this key.", (self, value))
             return False
 
         if not((value is None) or (self.choices == [])):
-            if str_value.lower() not in [str(x).lower() for x in self.choices]:
-                self._last_error = "%s Illegal value: '%s' not in choices: %s" % (self, value, str(self.choices))
+            if str_value.lower() not in self._choices_lower:
+                self._last_error_info = ("%s Illegal value: '%s' not in choices: %s", (self, value, self.choices))
                 return False
         
         if self.length is not None and len(str_value) != self.length:
-            self._last_error = ("%s Illegal value: '%s' does not have a length of "
-                                "%d characters." % (self, value, self.length))
+            self._last_error_info = ("%s Illegal value: '%s' does not have a length of "
+                                     "%d characters.", (self, value, self.length))
             return False
                         
         return True
 
+    def _get_last_error(self):
+        # error messages are only built when asked for, validate is
+        # called far more often than it fails.
+        (message, args) = self._last_error_info
+        return message % args
+
+    def _set_last_error(self, message):
+        self._last_error_info = ("%s", (message,))
+
+    _last_error = property(_get_last_error, _set_last_error)
+
     def _as_string(self, value):
         raise NotImplementedError
 
@@ -195,7 +217,7 @@ class StringKey(TemplateKey):
                 u_value = value.decode("utf-8")
                 
             if self._filter_regex_u.search(u_value):
-                self._last_error = "%s Illegal value '%s' does not fit filter" % (self, value)
+                self._last_error_info = ("%s Illegal value '%s' does not fit filter", (self, value))
                 return False
         
         return super(StringKey, self).validate(value)
@@ -245,22 +267,24 @@ class IntegerKey(TemplateKey):
             raise TankError(msg % (name, str(format_spec)))
 
         self.format_spec = format_spec
+        if format_spec:
+            # insert format spec into string
+            self._format_string = "%%%sd" % format_spec
+        else:
+            self._format_string = "%d"
 
     def validate(self, value):
 
         if value is not None:
             if not (isinstance(value, int) or value.isdigit()):
-                self._last_error = "%s Illegal value %s, expected an Integer" % (self, value)
+                self._last_error_info = ("%s Illegal value %s, expected an Integer", (self, value))
                 return False
             else:
                 return super(IntegerKey, self).validate(value)
         return True
 
     def _as_string(self, value):
-        if self.format_spec:
-            # insert format spec into string
-            return ("%%%sd" % self.format_spec) % value
-        return "%d" % value
+        return self._format_string % value
 
     def _as_value(self, str_value):
         return int(str_value)
@@ -300,12 +324,8 @@ class SequenceKey(IntegerKey):
 
     def validate(self, value):
 
-        # use a std error message
-        full_format_strings = ["%s %s" % (FRAMESPEC_FORMAT_INDICATOR, x) for x in VALID_FORMAT_STRINGS]
-        error_msg = "%s Illegal value '%s', expected an Integer, a frame spec or format spec.\n" % (self, value)
-        error_msg += "Valid frame specs: %s\n" % str(self._frame_specs)
-        error_msg += "Valid format strings: %s\n" % full_format_strings
-        
+        if isinstance(value, int):
+            return super(SequenceKey, self).validate(value)
 
         if isinstance(value, basestring) and value.startswith(FRAMESPEC_FORMAT_INDICATOR):
             # FORMAT: YXZ string - check that XYZ is in VALID_FORMAT_STRINGS
@@ -313,21 +333,28 @@ class SequenceKey(IntegerKey):
             if pattern in VALID_FORMAT_STRINGS:
                 return True
             else:
-                self._last_error = error_msg
+                self._set_sequence_error(value)
                 return False
                 
-        elif not(isinstance(value, int) or value.isdigit()):
+        elif not value.isdigit():
             # not a digit - so it must be a frame spec! (like %05d)
             # make sure that it has the right length and formatting.
             if value in self._frame_specs:
                 return True
             else:
-                self._last_error = error_msg
+                self._set_sequence_error(value)
                 return False
                 
         else:
             return super(SequenceKey, self).validate(value)
 
+    def _set_sequence_error(self, value):
+        # use a std error message
+        self._last_error_info = ("%s Illegal value '%s', expected an Integer, a frame spec or format spec.\n"
+                                 "Valid frame specs: %s\n"
+                                 "Valid format strings: %s\n",
+                                 (self, value, self._frame_specs, FULL_FORMAT_STRINGS))
+
     def _as_string(self, value):
         
         if isinstance(value, basestring) and value.startswith(FRAMESPEC_FORMAT_INDICATOR):
@@ -10,5 +10,6 @@
 
 
 from .shotgun import register_publish, find_publish, create_event_log_entry, get_entity_type_display_name, get_published_file_entity_type
+from .shotgun import get_publish_queue, flush_publish_queue
 from .path import append_path_to_env_var, prepend_path_to_env_var
 from .login import get_shotgun_user, get_current_user
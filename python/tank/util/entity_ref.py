@@ -0,0 +1,104 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Immutable, shared Shotgun entity links.
+
+Contexts hold std shotgun link dictionaries for their project, entity, step etc.
+Tools which keep many contexts around would otherwise keep one copy of each of
+these dictionaries per context. Entity references with the same contents are
+interned, so that all the contexts pointing at the same entity share one object.
+
+EntityRef is a dictionary, so it can be used anywhere a link dictionary can,
+e.g. in Shotgun queries, but it can't be modified. It is hashable and can be
+used as a dictionary key. Copies, pickles and yaml dumps are plain dictionaries,
+which keeps serialized contexts readable by other versions of the core API.
+"""
+
+import copy
+import threading
+import weakref
+
+from tank_vendor import yaml
+
+
+class EntityRef(dict):
+    """
+    Immutable dictionary representing a link to a Shotgun entity.
+    Use get_entity_ref() to get instances.
+    """
+    __slots__ = ("__weakref__",)
+
+    def __hash__(self):
+        # entity links with the same contents have the same type and id
+        return hash((self.get("type"), self.get("id")))
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("Entity references can't be modified, create a copy with dict() instead.")
+
+    __setitem__ = _immutable
+    __delitem__ = _immutable
+    clear = _immutable
+    pop = _immutable
+    popitem = _immutable
+    setdefault = _immutable
+    update = _immutable
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(dict(self), memo)
+
+    def __reduce__(self):
+        # pickle as a plain dictionary
+        return (dict, (dict(self),))
+
+    def __repr__(self):
+        return dict.__repr__(self)
+
+
+g_entity_refs = weakref.WeakValueDictionary()
+g_entity_refs_lock = threading.Lock()
+
+def get_entity_ref(entity):
+    """
+    Returns the shared entity reference for an entity link dictionary.
+
+    :param entity: Entity link dictionary, e.g. {"type": "Shot", "id": 12, "name": "aa_001"}
+                   or None.
+    :returns: EntityRef with the same contents, or None if entity is None
+    """
+    if entity is None or isinstance(entity, EntityRef):
+        return entity
+
+    try:
+        key = tuple(sorted(entity.items()))
+        hash(key)
+    except TypeError:
+        # values which can't be hashed, e.g. links to other entities
+        return EntityRef(entity)
+
+    g_entity_refs_lock.acquire()
+    try:
+        entity_ref = g_entity_refs.get(key)
+        if entity_ref is None:
+            entity_ref = EntityRef(entity)
+            g_entity_refs[key] = entity_ref
+        return entity_ref
+    finally:
+        g_entity_refs_lock.release()
+
+
+def _represent_entity_ref(dumper, entity_ref):
+    return dumper.represent_dict(dict(entity_ref))
+
+yaml.add_representer(EntityRef, _represent_entity_ref)
+yaml.add_representer(EntityRef, _represent_entity_ref, Dumper=yaml.SafeDumper)
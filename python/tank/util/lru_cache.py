@@ -0,0 +1,131 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+# 
+# CONFIDENTIAL AND PROPRIETARY
+# 
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit 
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your 
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights 
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+A simple thread safe least recently used cache.
+
+"""
+
+import threading
+
+# indices into the linked list entries
+_PREV, _NEXT, _KEY, _VALUE, _SIZE = 0, 1, 2, 3, 4
+
+
+class LRUCache(object):
+    """
+    Dictionary-like cache holding at most max_size items. When full,
+    the least recently used item is discarded. If a function returning the
+    size of an item is given, max_size is the maximum total size of the 
+    items instead.
+    
+    The items are kept in a circular doubly linked list in order of use,
+    so that all operations run in constant time.
+    """
+
+    def __init__(self, max_size, size_func=None):
+        """
+        :param max_size: Maximum number of items, or total size of the items, to keep
+        :param size_func: Optional function returning the size of a value
+        """
+        self._max_size = max_size
+        self._size_func = size_func
+        self._size = 0
+        self._lock = threading.Lock()
+        self._data = {}
+        # sentinel entry, its next entry is the least recently used one
+        self._root = []
+        self._root[:] = [self._root, self._root, None, None, 0]
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    @property
+    def size(self):
+        """
+        Total size of the items in the cache
+        """
+        return self._size
+
+    def _unlink(self, entry):
+        entry[_PREV][_NEXT] = entry[_NEXT]
+        entry[_NEXT][_PREV] = entry[_PREV]
+
+    def _append(self, entry):
+        last = self._root[_PREV]
+        entry[_PREV] = last
+        entry[_NEXT] = self._root
+        last[_NEXT] = entry
+        self._root[_PREV] = entry
+
+    def get(self, key, default=None):
+        """
+        Returns the value for a key, or default if the key is not in the cache
+        """
+        self._lock.acquire()
+        try:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            # move to the most recently used end
+            self._unlink(entry)
+            self._append(entry)
+            self.hits += 1
+            return entry[_VALUE]
+        finally:
+            self._lock.release()
+
+    def set(self, key, value):
+        """
+        Adds or updates an item, discarding the least recently used
+        item if the cache is full.
+        """
+        if self._size_func:
+            size = self._size_func(value)
+        else:
+            size = 1
+        self._lock.acquire()
+        try:
+            entry = self._data.pop(key, None)
+            if entry is not None:
+                self._unlink(entry)
+                self._size -= entry[_SIZE]
+            if size > self._max_size:
+                # would never fit
+                return
+            entry = [None, None, key, value, size]
+            self._data[key] = entry
+            self._size += size
+            self._append(entry)
+            while self._size > self._max_size:
+                oldest = self._root[_NEXT]
+                self._unlink(oldest)
+                del self._data[oldest[_KEY]]
+                self._size -= oldest[_SIZE]
+        finally:
+            self._lock.release()
+
+    def clear(self):
+        """
+        Removes all items
+        """
+        self._lock.acquire()
+        try:
+            self._data.clear()
+            self._root[:] = [self._root, self._root, None, None, 0]
+            self._size = 0
+        finally:
+            self._lock.release()
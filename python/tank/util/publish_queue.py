@@ -0,0 +1,451 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Local, durable queue of publishes waiting to be registered in Shotgun.
+
+Publishes registered with register_publish(queue=True) are written to a
+sqlite database and pushed to Shotgun later on, either by a background
+flusher thread or by the tank publish_queue command.
+
+"""
+
+import os
+import time
+import uuid
+import pickle
+import sqlite3
+import threading
+
+from ..errors import TankError
+
+
+class PublishQueueEntry(object):
+    """
+    A single publish waiting in the queue.
+    """
+
+    def __init__(self, queue_id, idempotency_key, entity_type, payload, sg_id, attempts, last_error, created):
+        """
+        Constructor
+
+        :param queue_id: The id of the entry in the queue database
+        :param idempotency_key: String which uniquely identifies the publish.
+        :param entity_type: The publish entity type (TankPublishedFile or PublishedFile)
+        :param payload: Dictionary with all the data needed to register the publish
+        :param sg_id: The shotgun id of the publish record, None if not yet created
+        :param attempts: The number of times we have tried to push this entry to Shotgun
+        :param last_error: The error message from the last failed attempt, None if no error
+        :param created: Time stamp (seconds since epoch) when the entry was queued.
+        """
+        self.queue_id = queue_id
+        self.idempotency_key = idempotency_key
+        self.entity_type = entity_type
+        self.payload = payload
+        self.sg_id = sg_id
+        self.attempts = attempts
+        self.last_error = last_error
+        self.created = created
+
+    def __repr__(self):
+        return "<PublishQueueEntry %s %s attempts:%s>" % (self.queue_id, self.idempotency_key, self.attempts)
+
+
+class PublishQueue(object):
+    """
+    A sqlite backed queue holding publishes which have not yet been
+    registered in Shotgun.
+
+    An entry stays in the queue until both the publish record, its thumbnails
+    and its dependencies have been created in Shotgun. Once the publish record
+    has been created, its shotgun id is stored with the entry so that retries
+    never create the same publish twice.
+
+    Several flushers (e.g. the background thread and the tank command) may
+    process the same queue at the same time. Each of them claims the entries
+    it is about to push, and entries claimed by another flusher are skipped
+    until that claim is released or has expired.
+    """
+
+    def __init__(self, db_path):
+        """
+        Constructor
+
+        :param db_path: Path to the sqlite database file.
+        """
+        self._db_path = db_path
+        self._connection = None
+        self._init_db(db_path)
+
+    def _init_db(self, db_path):
+        """
+        Sets up the database
+        """
+        cache_folder = os.path.dirname(db_path)
+        if not os.path.exists(cache_folder):
+            old_umask = os.umask(0)
+            try:
+                os.makedirs(cache_folder, 0777)
+            finally:
+                os.umask(old_umask)
+
+        db_file_created = False
+        if not os.path.exists(db_path):
+            db_file_created = True
+
+        self._connection = sqlite3.connect(db_path)
+        self._connection.text_factory = str
+
+        c = self._connection.cursor()
+        c.executescript("""
+            CREATE TABLE IF NOT EXISTS publish_queue (id integer primary key autoincrement, idempotency_key text, entity_type text, payload blob, sg_id integer, attempts integer, last_error text, created real, claim text, claimed_at real);
+
+            CREATE UNIQUE INDEX IF NOT EXISTS publish_queue_key ON publish_queue(idempotency_key);
+        """)
+        self._connection.commit()
+        c.close()
+
+        if db_file_created:
+            old_umask = os.umask(0)
+            try:
+                os.chmod(db_path, 0666)
+            finally:
+                os.umask(old_umask)
+
+    @property
+    def location(self):
+        """
+        The path to the queue database on disk
+        """
+        return self._db_path
+
+    def close(self):
+        """
+        Close the database connection.
+        """
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def enqueue(self, idempotency_key, entity_type, payload, claim_timeout=None):
+        """
+        Adds a publish to the queue. 
+        
+        If a publish with the same idempotency key is already queued with the
+        same data, the existing entry is kept and its id returned. If the data
+        differs, the existing entry is updated with the new data, as long as its
+        publish record has not yet been created and no flusher is pushing it to
+        Shotgun. Otherwise a TankError is raised.
+
+        :param idempotency_key: String which uniquely identifies the publish.
+        :param entity_type: The publish entity type
+        :param payload: Dictionary with the publish data. Must be picklable.
+        :param claim_timeout: Number of seconds after which a claim made by a
+                              flusher is considered abandoned.
+        :returns: The queue id for the entry
+        """
+        blob = sqlite3.Binary(pickle.dumps(payload, 2))
+        
+        c = self._connection.cursor()
+        try:
+            res = c.execute("SELECT id, entity_type, payload FROM publish_queue WHERE idempotency_key = ?", 
+                            (idempotency_key,))
+            data = list(res)
+            if len(data) > 0:
+                (queue_id, existing_entity_type, existing_blob) = data[0]
+                if existing_entity_type == entity_type and pickle.loads(str(existing_blob)) == payload:
+                    return queue_id
+                
+                # replace the data, unless the publish is already being created
+                query = ("UPDATE publish_queue SET entity_type = ?, payload = ?, attempts = 0, last_error = NULL "
+                         "WHERE id = ? AND sg_id IS NULL AND (claim IS NULL")
+                params = [entity_type, blob, queue_id]
+                if claim_timeout is not None:
+                    query += " OR claimed_at < ?"
+                    params.append(time.time() - claim_timeout)
+                query += ")"
+                c.execute(query, params)
+                updated = c.rowcount
+                self._connection.commit()
+                if updated == 0:
+                    raise TankError("A different publish with the same name, version and path "
+                                    "is already being registered in Shotgun from the publish queue.")
+                return queue_id
+
+            c.execute("INSERT INTO publish_queue (idempotency_key, entity_type, payload, sg_id, attempts, last_error, created) "
+                      "VALUES(?, ?, ?, NULL, 0, NULL, ?)", (idempotency_key, entity_type, blob, time.time()))
+            queue_id = c.lastrowid
+            self._connection.commit()
+        finally:
+            c.close()
+
+        return queue_id
+
+    def get_entries(self, max_attempts=None, limit=None):
+        """
+        Returns entries in the queue, oldest first.
+
+        :param max_attempts: If specified, only entries that have been attempted
+                             fewer times than this are returned.
+        :param limit: Maximum number of entries to return.
+        :returns: list of PublishQueueEntry objects
+        """
+        query = "SELECT id, idempotency_key, entity_type, payload, sg_id, attempts, last_error, created FROM publish_queue"
+        params = []
+        if max_attempts is not None:
+            query += " WHERE attempts < ?"
+            params.append(max_attempts)
+        query += " ORDER BY id"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        c = self._connection.cursor()
+        try:
+            rows = list(c.execute(query, params))
+        finally:
+            c.close()
+
+        return self._make_entries(rows)
+
+    def _make_entries(self, rows):
+        """
+        Creates PublishQueueEntry objects from database rows
+        """
+        entries = []
+        for row in rows:
+            payload = pickle.loads(str(row[3]))
+            entries.append(PublishQueueEntry(row[0], row[1], row[2], payload, row[4], row[5], row[6], row[7]))
+        return entries
+
+    def count(self):
+        """
+        Returns the number of entries in the queue
+        """
+        c = self._connection.cursor()
+        try:
+            res = list(c.execute("SELECT COUNT(*) FROM publish_queue"))
+        finally:
+            c.close()
+        return res[0][0]
+
+    def claim_entries(self, max_attempts=None, claim_timeout=None):
+        """
+        Claims the entries in the queue which are not being processed by
+        another flusher, oldest first, and increments their attempt counters.
+        Entries are claimed and read in a single transaction, so an entry can
+        only be claimed by one flusher at a time. Claimed entries must be
+        handed back with release() once processed.
+
+        The attempt counter is incremented before any data is sent to
+        Shotgun, so that the number of attempts is correct even if the
+        process dies mid-flight.
+
+        :param max_attempts: If specified, only entries that have been attempted
+                             fewer times than this are claimed.
+        :param claim_timeout: Number of seconds after which a claim made by another
+                              flusher is considered abandoned, e.g. because the
+                              process died. If None, claims never expire.
+        :returns: (claim, entries) tuple, where claim is the string identifying
+                  the claim and entries a list of PublishQueueEntry objects.
+        """
+        claim = "%s:%s" % (os.getpid(), uuid.uuid4().hex)
+        now = time.time()
+        
+        condition = "(claim IS NULL"
+        params = [claim, now]
+        if claim_timeout is not None:
+            condition += " OR claimed_at < ?"
+            params.append(now - claim_timeout)
+        condition += ")"
+        if max_attempts is not None:
+            condition += " AND attempts < ?"
+            params.append(max_attempts)
+        
+        c = self._connection.cursor()
+        try:
+            # the update takes the database write lock, and the select below runs 
+            # in the same transaction, so other flushers can't claim these rows. 
+            c.execute("UPDATE publish_queue SET attempts = attempts + 1, claim = ?, claimed_at = ? "
+                      "WHERE %s" % condition, params)
+            rows = list(c.execute("SELECT id, idempotency_key, entity_type, payload, sg_id, attempts, last_error, created "
+                                  "FROM publish_queue WHERE claim = ? ORDER BY id", (claim,)))
+            self._connection.commit()
+        finally:
+            c.close()
+
+        return (claim, self._make_entries(rows))
+
+    def release(self, claim):
+        """
+        Releases the entries claimed with claim_entries() which are still in the queue, 
+        so that they can be picked up by the next flush.
+
+        :param claim: Claim string returned by claim_entries()
+        """
+        c = self._connection.cursor()
+        try:
+            c.execute("UPDATE publish_queue SET claim = NULL, claimed_at = NULL WHERE claim = ?", (claim,))
+            self._connection.commit()
+        finally:
+            c.close()
+
+    def set_created(self, queue_id, sg_id):
+        """
+        Records the shotgun id of the publish record created for an entry.
+
+        :param queue_id: The queue id of the entry
+        :param sg_id: The shotgun id of the newly created publish
+        """
+        c = self._connection.cursor()
+        try:
+            c.execute("UPDATE publish_queue SET sg_id = ? WHERE id = ?", (sg_id, queue_id))
+            self._connection.commit()
+        finally:
+            c.close()
+
+    def set_failed(self, queue_id, error):
+        """
+        Stores the error message from a failed attempt.
+
+        :param queue_id: The queue id of the entry
+        :param error: Error message string
+        """
+        c = self._connection.cursor()
+        try:
+            c.execute("UPDATE publish_queue SET last_error = ? WHERE id = ?", (str(error), queue_id))
+            self._connection.commit()
+        finally:
+            c.close()
+
+    def reset_attempts(self):
+        """
+        Resets the attempt counters for all entries so that entries that
+        have previously exceeded the maximum number of retries are picked
+        up again by the flusher.
+        """
+        c = self._connection.cursor()
+        try:
+            c.execute("UPDATE publish_queue SET attempts = 0 WHERE sg_id IS NULL AND attempts > 0")
+            self._connection.commit()
+        finally:
+            c.close()
+
+    def remove(self, queue_id):
+        """
+        Removes an entry from the queue.
+
+        :param queue_id: The queue id of the entry
+        """
+        c = self._connection.cursor()
+        try:
+            c.execute("DELETE FROM publish_queue WHERE id = ?", (queue_id,))
+            self._connection.commit()
+        finally:
+            c.close()
+
+
+class PublishQueueFlusher(threading.Thread):
+    """
+    Background thread which periodically flushes a publish queue.
+
+    The flush operation itself is passed in as a callable so that this
+    class does not need to know anything about how publishes are
+    created in Shotgun. The callable is expected to return the number
+    of entries remaining in the queue.
+    """
+
+    def __init__(self, flush_callback, interval):
+        """
+        Constructor
+
+        :param flush_callback: Callable taking no arguments which flushes the queue
+                               and returns the number of entries left.
+        :param interval: Number of seconds to wait between flushes.
+        """
+        threading.Thread.__init__(self, name="PublishQueueFlusher")
+        self.setDaemon(True)
+        self._flush_callback = flush_callback
+        self._interval = interval
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self.last_error = None
+
+    def set_flush_callback(self, flush_callback):
+        """
+        Replaces the callable used to flush the queue. Takes effect from
+        the next flush onwards.
+
+        :param flush_callback: Callable taking no arguments which flushes the queue
+                               and returns the number of entries left.
+        """
+        self._flush_callback = flush_callback
+
+    def wake(self):
+        """
+        Requests the flusher to process the queue straight away rather than
+        waiting for the next interval.
+        """
+        self._wake_event.set()
+
+    def stop(self):
+        """
+        Asks the thread to exit after the current flush has completed.
+        """
+        self._stop_event.set()
+        self._wake_event.set()
+
+    def run(self):
+        """
+        Thread main loop
+        """
+        while not self._stop_event.isSet():
+            self._wake_event.wait(self._interval)
+            self._wake_event.clear()
+            if self._stop_event.isSet():
+                break
+            flush_callback = self._flush_callback
+            try:
+                flush_callback()
+                self.last_error = None
+            except Exception, e:
+                # shotgun is most likely down - keep the data in the
+                # queue and try again next time round.
+                self.last_error = e
+
+
+g_flushers = {}
+g_flushers_lock = threading.Lock()
+
+def get_flusher(db_path, flush_callback, interval):
+    """
+    Returns a running flusher thread for the queue at the given location,
+    starting one if necessary. There is at most one flusher per queue
+    database in each process, which from now on uses the given callable
+    to flush the queue.
+
+    :param db_path: Path to the queue database
+    :param flush_callback: Callable which flushes the queue
+    :param interval: Number of seconds between flushes, used when a new
+                     flusher is started
+    :returns: PublishQueueFlusher instance
+    """
+    g_flushers_lock.acquire()
+    try:
+        flusher = g_flushers.get(db_path)
+        if flusher is None or not flusher.isAlive():
+            flusher = PublishQueueFlusher(flush_callback, interval)
+            flusher.start()
+            g_flushers[db_path] = flusher
+        else:
+            flusher.set_flush_callback(flush_callback)
+    finally:
+        g_flushers_lock.release()
+    return flusher
@@ -0,0 +1,417 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Long running path resolver service and its client.
+
+Short lived processes, for example render farm tasks, spend most of their
+Toolkit time constructing a Sgtk API instance (config discovery, template
+parsing) and opening the path cache. The resolver server keeps warm API
+instances and path cache connections per project, and answers path
+resolution requests over a Unix domain socket:
+
+    server = ResolverServer("/tmp/tank_resolver.sock")
+    server.serve_forever()
+
+    client = ResolverClient("/tmp/tank_resolver.sock")
+    client.template_from_path("/mnt/projects/foo/sequences/aa/aa_001/comp")
+
+Messages are single lines of compact JSON. A request is a list [op, args]
+and the response is a list [status, result], where status is 1 for success
+and 0 for failure, in which case the result is the error message.
+
+"""
+
+import os
+import time
+import socket
+import tempfile
+import threading
+import SocketServer
+
+from ..errors import TankError
+
+try:
+    import json
+except ImportError:
+    # python 2.5 - use the simplejson fallback of the shotgun API
+    from tank_vendor.shotgun_api3.sg_25 import json
+
+# how often, in seconds, the server checks if a project's templates have changed
+TEMPLATES_CHECK_INTERVAL = 5
+
+
+def get_default_socket_path():
+    """
+    Returns the default location of the resolver socket for the current user
+    """
+    return os.path.join(tempfile.gettempdir(), "tank_resolver_%d.sock" % os.getuid())
+
+
+def _encode(data):
+    """
+    Encodes a message for the wire
+    """
+    return json.dumps(data, separators=(",", ":")) + "\n"
+
+
+def _context_to_dict(ctx):
+    """
+    Returns the entities of a context as a dictionary
+    """
+    return {"project": ctx.project,
+            "entity": ctx.entity,
+            "step": ctx.step,
+            "task": ctx.task,
+            "user": ctx.user,
+            "additional_entities": ctx.additional_entities}
+
+
+class _Project(object):
+    """
+    Warm state for one pipeline configuration
+    """
+
+    def __init__(self, tk):
+        self.tk = tk
+        self.pc_path = tk.pipeline_configuration.get_path()
+        # path prefixes which belong to this project
+        self.prefixes = [self.pc_path]
+        self.prefixes.extend(tk.pipeline_configuration.get_data_roots().values())
+        self.prefixes = [os.path.normpath(x) for x in self.prefixes]
+        self.templates_file = os.path.join(tk.pipeline_configuration.get_config_location(),
+                                           "core", "templates.yml")
+        self.templates_mtime = self._get_templates_mtime()
+        self.last_check = time.time()
+        self.lock = threading.Lock()
+
+    def _get_templates_mtime(self):
+        try:
+            return os.path.getmtime(self.templates_file)
+        except OSError:
+            return None
+
+    def owns_path(self, path):
+        """
+        Returns True if the path is inside the configuration or one of the project roots
+        """
+        for prefix in self.prefixes:
+            if path == prefix or path.startswith(prefix + os.path.sep):
+                return True
+        return False
+
+    def check_templates(self):
+        """
+        Reloads the templates if the templates file has changed
+        """
+        now = time.time()
+        if now - self.last_check < TEMPLATES_CHECK_INTERVAL:
+            return
+        self.lock.acquire()
+        try:
+            self.last_check = now
+            mtime = self._get_templates_mtime()
+            if mtime != self.templates_mtime:
+                self.tk.reload_templates(incremental=True)
+                self.templates_mtime = mtime
+        finally:
+            self.lock.release()
+
+
+class Resolver(object):
+    """
+    Executes resolver requests against warm Sgtk API instances. One
+    instance is kept per pipeline configuration, created on first use.
+    """
+
+    # operation name -> method name
+    OPERATIONS = {"template_from_path": "template_from_path",
+                  "get_fields": "get_fields",
+                  "apply_fields": "apply_fields",
+                  "context_from_path": "context_from_path",
+                  "paths_from_entity": "paths_from_entity",
+                  "ping": "ping"}
+
+    def __init__(self):
+        self._projects = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _get_project(self, path):
+        """
+        Returns the project state for a path inside a project or configuration
+        """
+        path = os.path.normpath(path)
+        for project in self._projects:
+            if project.owns_path(path):
+                project.check_templates()
+                return project
+
+        # lazy load this to avoid cyclic dependencies
+        from ..api import tank_from_path
+
+        self._lock.acquire()
+        try:
+            # another thread may have loaded the project in the meantime
+            for project in self._projects:
+                if project.owns_path(path):
+                    return project
+            # the path may be to a file which hasn't been written yet
+            existing_path = path
+            while not os.path.exists(existing_path) and os.path.dirname(existing_path) != existing_path:
+                existing_path = os.path.dirname(existing_path)
+            project = _Project(tank_from_path(existing_path))
+            self._projects = self._projects + [project]
+            return project
+        finally:
+            self._lock.release()
+
+    def _get_path_cache(self, project):
+        """
+        Returns a path cache connection for the project. The connections
+        are kept open, one per thread since they can't be shared.
+        """
+        # lazy load this to avoid cyclic dependencies
+        from ..path_cache import PathCache
+
+        path_caches = getattr(self._local, "path_caches", None)
+        if path_caches is None:
+            path_caches = {}
+            self._local.path_caches = path_caches
+        path_cache = path_caches.get(project.pc_path)
+        if path_cache is None:
+            path_cache = PathCache(project.tk.pipeline_configuration)
+            path_caches[project.pc_path] = path_cache
+        return path_cache
+
+    def close(self):
+        """
+        Closes the path cache connections of the calling thread
+        """
+        path_caches = getattr(self._local, "path_caches", {})
+        for path_cache in path_caches.values():
+            path_cache.close()
+        self._local.path_caches = {}
+
+    def _get_template(self, project, template_name):
+        template = project.tk.templates.get(template_name)
+        if template is None:
+            raise TankError("Unknown template '%s' in configuration %s" % (template_name, project.pc_path))
+        return template
+
+    def execute(self, op, args):
+        """
+        Executes a request
+
+        :param op: Name of the operation
+        :param args: List of arguments for the operation
+        :returns: Result of the operation, which can be encoded as JSON
+        """
+        method_name = self.OPERATIONS.get(op)
+        if method_name is None:
+            raise TankError("Unknown resolver operation '%s'" % op)
+        return getattr(self, method_name)(*args)
+
+    def ping(self):
+        return "pong"
+
+    def template_from_path(self, path):
+        project = self._get_project(path)
+        template = project.tk.template_from_path(path)
+        if template is None:
+            return None
+        return template.name
+
+    def get_fields(self, path, template_name=None):
+        project = self._get_project(path)
+        if template_name is None:
+            template = project.tk.template_from_path(path)
+            if template is None:
+                raise TankError("No template matches the path '%s'" % path)
+        else:
+            template = self._get_template(project, template_name)
+        return template.get_fields(path)
+
+    def apply_fields(self, project_path, template_name, fields):
+        project = self._get_project(project_path)
+        template = self._get_template(project, template_name)
+        return template.apply_fields(fields)
+
+    def context_from_path(self, path):
+        project = self._get_project(path)
+        return _context_to_dict(project.tk.context_from_path(path))
+
+    def paths_from_entity(self, project_path, entity_type, entity_id):
+        project = self._get_project(project_path)
+        return self._get_path_cache(project).get_paths(entity_type, entity_id)
+
+
+class _ResolverRequestHandler(SocketServer.StreamRequestHandler):
+    """
+    Handles the requests of a single client connection
+    """
+
+    def handle(self):
+        resolver = self.server.resolver
+        try:
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    break
+                try:
+                    (op, args) = json.loads(line)
+                    response = [1, resolver.execute(op, args)]
+                except Exception, e:
+                    response = [0, "%s" % e]
+                self.wfile.write(_encode(response))
+                self.wfile.flush()
+        finally:
+            resolver.close()
+
+
+class ResolverServer(SocketServer.ThreadingMixIn, SocketServer.UnixStreamServer):
+    """
+    Resolver service listening on a Unix domain socket. Each client
+    connection is served by its own thread.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path=None):
+        """
+        :param socket_path: Path to the socket file. Defaults to a per user
+                            location in the temp folder.
+        """
+        if not hasattr(socket, "AF_UNIX"):
+            raise TankError("The resolver service is not supported on this platform.")
+
+        self.socket_path = socket_path or get_default_socket_path()
+        self.resolver = Resolver()
+
+        if os.path.exists(self.socket_path):
+            # remove the socket left over by a previous server,
+            # unless that server is still running.
+            try:
+                ResolverClient(self.socket_path).close()
+            except TankError:
+                os.remove(self.socket_path)
+            else:
+                raise TankError("A resolver service is already running on %s" % self.socket_path)
+
+        old_umask = os.umask(0077)
+        try:
+            SocketServer.UnixStreamServer.__init__(self, self.socket_path, _ResolverRequestHandler)
+        finally:
+            os.umask(old_umask)
+
+    def server_close(self):
+        SocketServer.UnixStreamServer.server_close(self)
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+
+class ResolverClient(object):
+    """
+    Client for the resolver service. Keeps a connection open
+    and reconnects if the connection is lost.
+    """
+
+    def __init__(self, socket_path=None):
+        """
+        :param socket_path: Path to the socket of the resolver service
+        """
+        self.socket_path = socket_path or get_default_socket_path()
+        self._socket = None
+        self._rfile = None
+        self._connect()
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.socket_path)
+        except socket.error, e:
+            sock.close()
+            raise TankError("Could not connect to the resolver service on %s: %s" % (self.socket_path, e))
+        self._socket = sock
+        self._rfile = sock.makefile("rb")
+
+    def close(self):
+        """
+        Closes the connection to the service
+        """
+        if self._socket is not None:
+            self._rfile.close()
+            self._socket.close()
+            self._socket = None
+            self._rfile = None
+
+    def _call(self, op, *args):
+        request = _encode([op, args])
+        for attempt in range(2):
+            if self._socket is None:
+                self._connect()
+            try:
+                self._socket.sendall(request)
+                line = self._rfile.readline()
+            except socket.error:
+                line = None
+            if line:
+                break
+            # the service went away, try again with a new connection
+            self.close()
+        else:
+            raise TankError("Lost connection to the resolver service on %s" % self.socket_path)
+
+        (status, result) = json.loads(line)
+        if not status:
+            raise TankError(result)
+        return result
+
+    def ping(self):
+        """
+        Checks that the service is responding
+        """
+        return self._call("ping")
+
+    def template_from_path(self, path):
+        """
+        Returns the name of the template matching a path, or None
+        """
+        return self._call("template_from_path", path)
+
+    def get_fields(self, path, template_name=None):
+        """
+        Returns the fields of a path, using the template matching the
+        path unless a template name is given.
+        """
+        return self._call("get_fields", path, template_name)
+
+    def apply_fields(self, project_path, template_name, fields):
+        """
+        Returns the path for a template and a dictionary of fields.
+
+        :param project_path: Path to the pipeline configuration or any path in the project
+        """
+        return self._call("apply_fields", project_path, template_name, fields)
+
+    def context_from_path(self, path):
+        """
+        Returns the entities of the context for a path as a dictionary with
+        keys project, entity, step, task, user and additional_entities.
+        """
+        return self._call("context_from_path", path)
+
+    def paths_from_entity(self, project_path, entity_type, entity_id):
+        """
+        Returns the paths associated with an entity.
+
+        :param project_path: Path to the pipeline configuration or any path in the project
+        """
+        return self._call("paths_from_entity", project_path, entity_type, entity_id)
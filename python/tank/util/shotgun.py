@@ -14,13 +14,17 @@ Shotgun utilities
 """
 
 import os
+import shutil
+import hashlib
+import datetime
 
-from tank_vendor.shotgun_api3 import Shotgun
+from tank_vendor.shotgun_api3 import Shotgun, Fault
 from tank_vendor import yaml
 
 from ..errors import TankError
 from ..platform import constants
 from . import login
+from . import publish_queue
 
 g_app_store_connection = None
 
@@ -86,6 +90,12 @@ def __create_sg_connection(shotgun_cfg_path, evaluate_script_user, user="default
     api_key: str
     http_proxy: str
 
+    with the following optional compression settings:
+
+    gzip_responses: bool (defaults to True)
+    gzip_requests: bool (defaults to False)
+    gzip_request_threshold: int, request size in bytes above which requests are compressed
+
     or may now look like:
 
     <User>:
@@ -140,6 +150,15 @@ def __create_sg_connection(shotgun_cfg_path, evaluate_script_user, user="default
                  config_data["api_key"],
                  http_proxy=config_data.get("http_proxy", None))
 
+    # configure compression of the json traffic
+    sg.config.gzip_responses = bool(config_data.get("gzip_responses", True))
+    sg.config.gzip_requests = bool(config_data.get("gzip_requests", False))
+    if config_data.get("gzip_request_threshold") is not None:
+        try:
+            sg.config.gzip_request_threshold = int(config_data["gzip_request_threshold"])
+        except ValueError:
+            raise TankError("Invalid value for 'gzip_request_threshold' in config '%s'" % shotgun_cfg_path)
+
     # bolt on our custom user agent manager
     sg.tk_user_agent_handler = ToolkitUserAgentHandler(sg)
 
@@ -255,6 +274,13 @@ def find_publish(tk, list_of_paths, filters=None, fields=None):
                    return. Defaults to id and type.
     :returns: dictionary keyed by path
     """
+    return _find_publish(tk, tk.shotgun, list_of_paths, filters, fields)
+
+def _find_publish(tk, sg, list_of_paths, filters=None, fields=None):
+    """
+    Implementation of find_publish using an explicit Shotgun API handle.
+    See find_publish for details.
+    """
     # Map path caches to full paths, grouped by storage
     # in case of sequences, there will be more than one file
     # per path cache
@@ -288,7 +314,7 @@ def find_publish(tk, list_of_paths, filters=None, fields=None):
     published_file_entity_type = get_published_file_entity_type(tk)
     for local_storage_name in local_storage_names:
 
-        local_storage = tk.shotgun.find_one("LocalStorage", [["code", "is", local_storage_name]])
+        local_storage = sg.find_one("LocalStorage", [["code", "is", local_storage_name]])
         if not local_storage:
             # fail gracefully here - it may be a storage which has been deleted
             published_files[local_storage_name] = []
@@ -314,7 +340,7 @@ def find_publish(tk, list_of_paths, filters=None, fields=None):
         sg_filters.append( ["path_cache_storage", "is", local_storage] )
 
         # organize the returned data by storage
-        published_files[local_storage_name] = tk.shotgun.find(published_file_entity_type, sg_filters, sg_fields)
+        published_files[local_storage_name] = sg.find(published_file_entity_type, sg_filters, sg_fields)
 
 
     # PASS 2
@@ -526,10 +552,17 @@ def register_publish(tk, context, path, name, version_number, **kwargs):
         created_at - override for the date the publish is created at.  This should be a python
                     datetime object
 
+        queue - if True, the publish is not sent to Shotgun straight away. Instead, it is
+                written to a local publish queue and registered in Shotgun by a background
+                thread, meaning that this call returns quickly even if Shotgun is slow or down.
+                The returned dictionary will have an id of None and a queue_id key holding the
+                id of the entry in the publish queue. Note that because Shotgun is not contacted,
+                the published file type will not yet be part of the data passed to the
+                before_register_publish hook.
+
     Future:
     - error handling
     - look at a project level config to see if publish should succeed if Shotgun is down?
-    - if Shotgun is down, log to sqlite and try again later?
     """
     # get the task from the optional args, fall back on context task if not set
     task = kwargs.get("task")
@@ -548,63 +581,108 @@ def register_publish(tk, context, path, name, version_number, **kwargs):
     update_task_thumbnail = kwargs.get("update_task_thumbnail", False)
     created_by_user = kwargs.get("created_by")
     created_at = kwargs.get("created_at")
+    use_queue = kwargs.get("queue", False)
 
     # convert the abstract fields to their defaults
     path = _translate_abstract_fields(tk, path)
 
     published_file_entity_type = get_published_file_entity_type(tk)
 
+    if published_file_type and not isinstance(published_file_type, basestring):
+        raise TankError("published_file_type must be a string")
+
+    if use_queue:
+        # write the publish to the local queue and let the
+        # background flusher push it to shotgun
+        return _queue_published_file(tk, context, path, name, version_number, task, comment,
+                                     published_file_type, created_by_user, created_at,
+                                     thumbnail_path, update_entity_thumbnail, update_task_thumbnail,
+                                     dependency_paths, dependency_ids)
+
     sg_published_file_type = None
     # query shotgun for the published_file_type
     if published_file_type:
-        if not isinstance(published_file_type, basestring):
-            raise TankError("published_file_type must be a string")
-
-        if published_file_entity_type == "PublishedFile":
-            filters = [["code", "is", published_file_type]]
-            sg_published_file_type = tk.shotgun.find_one('PublishedFileType', filters=filters)
-
-            if not sg_published_file_type:
-                # create a published file type on the fly
-                sg_published_file_type = tk.shotgun.create("PublishedFileType", {"code": published_file_type})
-        else:# == TankPublishedFile
-            filters = [ ["code", "is", published_file_type], ["project", "is", context.project] ]
-            sg_published_file_type = tk.shotgun.find_one('TankType', filters=filters)
-
-            if not sg_published_file_type:
-                # create a tank type on the fly
-                sg_published_file_type = tk.shotgun.create("TankType", {"code": published_file_type, "project": context.project})
+        sg_published_file_type = _get_published_file_type(tk.shotgun,
+                                                          published_file_entity_type,
+                                                          published_file_type,
+                                                          context.project)
 
     # create the publish
     entity = _create_published_file(tk, context, path, name, version_number, task, comment, sg_published_file_type, created_by_user, created_at)
 
     # upload thumbnails
+    _upload_thumbnails(tk.shotgun,
+                       published_file_entity_type,
+                       entity,
+                       thumbnail_path,
+                       context.entity if update_entity_thumbnail == True else None,
+                       task if update_task_thumbnail == True else None)
+
+    # register dependencies
+    _create_dependencies(tk, entity, dependency_paths, dependency_ids)
+
+    return entity
+
+def _get_published_file_type(sg, published_file_entity_type, published_file_type, project):
+    """
+    Returns the shotgun entity representing a published file type,
+    creating it on the fly if it does not exist.
+
+    :param sg: Shotgun API handle
+    :param published_file_entity_type: The publish entity type in use
+    :param published_file_type: published file type code, as a string
+    :param project: Project entity dictionary
+    :returns: PublishedFileType or TankType entity dictionary
+    """
+    if published_file_entity_type == "PublishedFile":
+        filters = [["code", "is", published_file_type]]
+        sg_published_file_type = sg.find_one('PublishedFileType', filters=filters)
+
+        if not sg_published_file_type:
+            # create a published file type on the fly
+            sg_published_file_type = sg.create("PublishedFileType", {"code": published_file_type})
+    else:# == TankPublishedFile
+        filters = [ ["code", "is", published_file_type], ["project", "is", project] ]
+        sg_published_file_type = sg.find_one('TankType', filters=filters)
+
+        if not sg_published_file_type:
+            # create a tank type on the fly
+            sg_published_file_type = sg.create("TankType", {"code": published_file_type, "project": project})
+
+    return sg_published_file_type
+
+def _upload_thumbnails(sg, published_file_entity_type, entity, thumbnail_path, linked_entity, task):
+    """
+    Uploads the thumbnail for a publish. If no thumbnail exists,
+    the default toolkit thumbnail is used.
+
+    :param sg: Shotgun API handle
+    :param published_file_entity_type: The publish entity type in use
+    :param entity: The publish entity dictionary
+    :param thumbnail_path: Path to a thumbnail, may be None
+    :param linked_entity: Entity dictionary which should also get the thumbnail, or None
+    :param task: Task dictionary which should also get the thumbnail, or None
+    """
     if thumbnail_path and os.path.exists(thumbnail_path):
 
         # publish
-        tk.shotgun.upload_thumbnail(published_file_entity_type, entity["id"], thumbnail_path)
+        sg.upload_thumbnail(published_file_entity_type, entity["id"], thumbnail_path)
 
         # entity
-        if update_entity_thumbnail == True and context.entity is not None:
-            tk.shotgun.upload_thumbnail(context.entity["type"],
-                                        context.entity["id"],
-                                        thumbnail_path)
+        if linked_entity is not None:
+            sg.upload_thumbnail(linked_entity["type"],
+                                linked_entity["id"],
+                                thumbnail_path)
 
         # task
-        if update_task_thumbnail == True and task is not None:
-            tk.shotgun.upload_thumbnail("Task", task["id"], thumbnail_path)
+        if task is not None:
+            sg.upload_thumbnail("Task", task["id"], thumbnail_path)
 
     else:
         # no thumbnail found - instead use the default one
         this_folder = os.path.abspath(os.path.dirname(__file__))
         no_thumb = os.path.join(this_folder, "no_preview.jpg")
-        tk.shotgun.upload_thumbnail(published_file_entity_type, entity.get("id"), no_thumb)
-
-
-    # register dependencies
-    _create_dependencies(tk, entity, dependency_paths, dependency_ids)
-
-    return entity
+        sg.upload_thumbnail(published_file_entity_type, entity.get("id"), no_thumb)
 
 def _translate_abstract_fields(tk, path):
     """
@@ -612,20 +690,19 @@ def _translate_abstract_fields(tk, path):
     For example, the path /foo/bar/xyz.0003.exr will be transformed into
     /foo/bar/xyz.%04d.exr
     """
-    template = tk.template_from_path(path)
+    (template, cur_fields) = tk._get_template_matcher().match(path)
     if template:
 
         abstract_key_names = [k.name for k in template.keys.values() if k.is_abstract]
 
         if len(abstract_key_names) > 0:
             # we want to use the default values for abstract keys
-            cur_fields = template.get_fields(path)
             for abstract_key_name in abstract_key_names:
                 del(cur_fields[abstract_key_name])
             path = template.apply_fields(cur_fields)
     return path
 
-def _create_dependencies(tk, publish_entity, dependency_paths, dependency_ids):
+def _create_dependencies(tk, publish_entity, dependency_paths, dependency_ids, sg=None):
     """
     Creates dependencies in shotgun from a given entity to
     a list of paths and ids. Paths not recognized are skipped.
@@ -635,11 +712,18 @@ def _create_dependencies(tk, publish_entity, dependency_paths, dependency_ids):
                            with keys type and id.
     :param dependency_paths: List of paths on disk. List of strings.
     :param dependency_ids: List of publish entity ids to associate. List of ints
+    :param sg: Optional Shotgun API handle to use instead of tk.shotgun
     
     """
+    if sg is None:
+        sg = tk.shotgun
+
     published_file_entity_type = get_published_file_entity_type(tk)
 
-    publishes = find_publish(tk, dependency_paths)
+    if len(dependency_paths) > 0:
+        publishes = _find_publish(tk, sg, dependency_paths)
+    else:
+        publishes = {}
 
     # create a single batch request for maximum speed
     sg_batch_data = []
@@ -698,7 +782,7 @@ def _create_dependencies(tk, publish_entity, dependency_paths, dependency_ids):
 
     # push to shotgun in a single xact
     if len(sg_batch_data) > 0:
-        tk.shotgun.batch(sg_batch_data)
+        sg.batch(sg_batch_data)
                 
 
 
@@ -707,6 +791,15 @@ def _create_published_file(tk, context, path, name, version_number, task, commen
     Creates a publish entity in shotgun given some standard fields.
     """
     published_file_entity_type = get_published_file_entity_type(tk)
+    data = _get_published_file_data(tk, context, path, name, version_number, task, comment, published_file_type, created_by_user, created_at)
+    return tk.shotgun.create(published_file_entity_type, data)
+
+def _get_published_file_data(tk, context, path, name, version_number, task, comment, published_file_type, created_by_user, created_at):
+    """
+    Computes the shotgun data for a publish entity given some standard fields
+    and runs it through the before_register_publish hook.
+    """
+    published_file_entity_type = get_published_file_entity_type(tk)
 
     # Make path platform agnostic.
     _, path_cache = _calc_path_cache(tk, path)
@@ -747,9 +840,7 @@ def _create_published_file(tk, context, path, name, version_number, task, commen
             data["tank_type"] = published_file_type
 
     # now call out to hook just before publishing
-    data = tk.execute_hook(constants.TANK_PUBLISH_HOOK_NAME, shotgun_data=data, context=context)
-
-    return tk.shotgun.create(published_file_entity_type, data)
+    return tk.execute_hook(constants.TANK_PUBLISH_HOOK_NAME, shotgun_data=data, context=context)
 
 def _calc_path_cache(tk, path):
     """
@@ -781,6 +872,291 @@ def _calc_path_cache(tk, path):
 
 
 
+#################################################################################################
+# publish queue
+
+def get_publish_queue(tk):
+    """
+    Returns the local queue holding publishes which have been registered
+    with register_publish(queue=True) but not yet pushed to Shotgun.
+    Make sure to close() the returned object when done.
+
+    :param tk: Sgtk API instance
+    :returns: PublishQueue instance
+    """
+    return publish_queue.PublishQueue(tk.pipeline_configuration.get_publish_queue_location())
+
+def flush_publish_queue(tk, sg=None, max_attempts=None, batch_size=None):
+    """
+    Pushes publishes waiting in the local publish queue to Shotgun.
+
+    Publish records are created in batches. If a batch is rejected by Shotgun,
+    the publishes in that batch are created one by one so that a single bad
+    publish does not block the rest of the queue. Publishes that fail stay in the
+    queue with their error message so that they can be inspected and retried.
+
+    Publishes currently being pushed by another flush, e.g. by the background
+    flusher thread, are skipped.
+
+    :param tk: Sgtk API instance
+    :param sg: Optional Shotgun API handle to use instead of tk.shotgun
+    :param max_attempts: If specified, publishes which have already failed this many
+                         times are skipped.
+    :param batch_size: Maximum number of publishes to create in a single batch call.
+    :returns: The number of publishes remaining in the queue
+    """
+    if sg is None:
+        sg = tk.shotgun
+
+    if batch_size is None:
+        batch_size = constants.PUBLISH_QUEUE_BATCH_SIZE
+
+    queue = get_publish_queue(tk)
+    try:
+        (claim, entries) = queue.claim_entries(max_attempts=max_attempts, 
+                                               claim_timeout=constants.PUBLISH_QUEUE_CLAIM_TIMEOUT)
+        try:
+            # cache of published file types resolved during this flush
+            published_file_types = {}
+            for idx in range(0, len(entries), batch_size):
+                _flush_publish_queue_entries(tk, sg, queue, entries[idx:idx+batch_size], published_file_types)
+        finally:
+            queue.release(claim)
+        return queue.count()
+    finally:
+        queue.close()
+
+def _queue_published_file(tk, context, path, name, version_number, task, comment, published_file_type,
+                          created_by_user, created_at, thumbnail_path, update_entity_thumbnail,
+                          update_task_thumbnail, dependency_paths, dependency_ids):
+    """
+    Writes a publish to the local publish queue rather than sending it to Shotgun.
+    The before_register_publish hook is executed straight away since it needs
+    the context.
+
+    :returns: dictionary representing the queued publish. The id is None
+              since the record does not yet exist in Shotgun.
+    """
+    published_file_entity_type = get_published_file_entity_type(tk)
+
+    # the publish will reach shotgun at a later point, so make sure
+    # it is stamped with the time when it was actually published
+    if created_at is None:
+        created_at = datetime.datetime.now()
+
+    data = _get_published_file_data(tk, context, path, name, version_number, task, comment,
+                                    None, created_by_user, created_at)
+
+    # the idempotency key identifies the publish both in the queue and in shotgun
+    project_id = (data.get("project") or {}).get("id")
+    key_str = "%s|%s|%s|%s|%s" % (published_file_entity_type, project_id, data.get("path_cache"),
+                                  data.get("name"), data.get("version_number"))
+    idempotency_key = hashlib.sha1(key_str).hexdigest()
+
+    # take a copy of the thumbnail - it is often written to a temp
+    # location which is cleaned up as soon as the publish returns
+    queued_thumbnail_path = None
+    if thumbnail_path and os.path.exists(thumbnail_path):
+        thumb_folder = os.path.join(tk.pipeline_configuration.get_cache_location(),
+                                    constants.PUBLISH_QUEUE_THUMBNAIL_FOLDER)
+        if not os.path.exists(thumb_folder):
+            os.makedirs(thumb_folder)
+        queued_thumbnail_path = os.path.join(thumb_folder,
+                                             "%s%s" % (idempotency_key, os.path.splitext(thumbnail_path)[1]))
+        shutil.copy(thumbnail_path, queued_thumbnail_path)
+
+    payload = {"data": data,
+               "published_file_type": published_file_type,
+               "thumbnail_path": queued_thumbnail_path,
+               "thumbnail_entity": context.entity if update_entity_thumbnail == True else None,
+               "thumbnail_task": task if update_task_thumbnail == True else None,
+               "dependency_paths": list(dependency_paths),
+               "dependency_ids": list(dependency_ids)}
+
+    queue = get_publish_queue(tk)
+    try:
+        queue_id = queue.enqueue(idempotency_key, published_file_entity_type, payload, 
+                                 claim_timeout=constants.PUBLISH_QUEUE_CLAIM_TIMEOUT)
+    finally:
+        queue.close()
+
+    _start_publish_queue_flusher(tk)
+
+    entity = data.copy()
+    entity["type"] = published_file_entity_type
+    entity["id"] = None
+    entity["queue_id"] = queue_id
+    return entity
+
+def _start_publish_queue_flusher(tk):
+    """
+    Makes sure that a background thread is flushing the publish
+    queue for the given API instance and asks it to flush now.
+    """
+    # the shotgun API is not thread safe so the flusher
+    # needs to use its own connection
+    connection = {}
+    def flush():
+        if "sg" not in connection:
+            connection["sg"] = create_sg_connection()
+        return flush_publish_queue(tk,
+                                   sg=connection["sg"],
+                                   max_attempts=constants.PUBLISH_QUEUE_MAX_ATTEMPTS)
+
+    flusher = publish_queue.get_flusher(tk.pipeline_configuration.get_publish_queue_location(),
+                                        flush,
+                                        constants.PUBLISH_QUEUE_FLUSH_INTERVAL)
+    flusher.wake()
+
+def _find_queued_publishes(sg, entries):
+    """
+    Looks for publish records which already exist in Shotgun for queued publishes. 
+    Records are matched on the fields making up the idempotency key of the 
+    publish: project, path, name and version number. A single query is made per 
+    publish entity type.
+
+    :param sg: Shotgun API handle
+    :param entries: List of PublishQueueEntry objects
+    :returns: Dictionary of shotgun ids keyed by queue id, for the entries which 
+              have a publish record in Shotgun.
+    """
+    def get_key(data):
+        project_id = (data.get("project") or {}).get("id")
+        return (project_id, data.get("path_cache"), data.get("name"), data.get("version_number"))
+
+    entries_by_type = {}
+    for entry in entries:
+        entries_by_type.setdefault(entry.entity_type, []).append(entry)
+
+    existing_ids = {}
+    for (entity_type, type_entries) in entries_by_type.items():
+        path_caches = list(set([entry.payload["data"].get("path_cache") for entry in type_entries]))
+        records = sg.find(entity_type, 
+                          [["path_cache", "in", path_caches]], 
+                          ["project", "path_cache", "name", "version_number"])
+        ids_by_key = {}
+        for record in records:
+            ids_by_key[get_key(record)] = record["id"]
+        for entry in type_entries:
+            sg_id = ids_by_key.get(get_key(entry.payload["data"]))
+            if sg_id is not None:
+                existing_ids[entry.queue_id] = sg_id
+    return existing_ids
+
+def _flush_publish_queue_entries(tk, sg, queue, entries, published_file_types):
+    """
+    Pushes a list of queued publishes to Shotgun.
+
+    :param tk: Sgtk API instance
+    :param sg: Shotgun API handle
+    :param queue: PublishQueue instance
+    :param entries: List of PublishQueueEntry objects to process. The entries
+                    must have been claimed by the caller.
+    :param published_file_types: Dictionary used to cache published file types,
+                                 keyed by published file type code
+    """
+    # PASS 1
+    # make sure that all entries have a publish record in shotgun. The record
+    # may exist even if the queue doesn't know about it, e.g. if a previous 
+    # flush died after shotgun created it, so always check first.
+    try:
+        existing_ids = _find_queued_publishes(sg, [entry for entry in entries if entry.sg_id is None])
+    except Fault, e:
+        for entry in entries:
+            queue.set_failed(entry.queue_id, e)
+        return
+    
+    to_create = []
+    for entry in entries:
+        if entry.sg_id is not None:
+            # record created in a previous flush
+            continue
+
+        sg_id = existing_ids.get(entry.queue_id)
+        if sg_id is not None:
+            queue.set_created(entry.queue_id, sg_id)
+            entry.sg_id = sg_id
+            continue
+
+        try:
+            data = entry.payload["data"].copy()
+
+            published_file_type = entry.payload["published_file_type"]
+            if published_file_type:
+                if published_file_type not in published_file_types:
+                    published_file_types[published_file_type] = _get_published_file_type(sg,
+                                                                                          entry.entity_type,
+                                                                                          published_file_type,
+                                                                                          data.get("project"))
+                if entry.entity_type == "PublishedFile":
+                    data["published_file_type"] = published_file_types[published_file_type]
+                else:# == TankPublishedFile
+                    data["tank_type"] = published_file_types[published_file_type]
+
+        except Fault, e:
+            queue.set_failed(entry.queue_id, e)
+            continue
+
+        to_create.append((entry, data))
+
+    if len(to_create) > 0:
+        sg_batch_data = []
+        for (entry, data) in to_create:
+            sg_batch_data.append({"request_type": "create",
+                                  "entity_type": entry.entity_type,
+                                  "data": data})
+        try:
+            results = sg.batch(sg_batch_data)
+        except Fault:
+            # shotgun rejected the transaction. Fall back on creating
+            # the records one by one to isolate the failing publishes.
+            results = []
+            for (entry, data) in to_create:
+                try:
+                    results.append(sg.create(entry.entity_type, data))
+                except Fault, e:
+                    queue.set_failed(entry.queue_id, e)
+                    results.append(None)
+        except Exception, e:
+            # shotgun is most likely unreachable - no point carrying on
+            for (entry, data) in to_create:
+                queue.set_failed(entry.queue_id, e)
+            raise
+
+        for ((entry, data), result) in zip(to_create, results):
+            if result:
+                queue.set_created(entry.queue_id, result["id"])
+                entry.sg_id = result["id"]
+
+    # PASS 2
+    # thumbnails and dependencies
+    for entry in entries:
+        if entry.sg_id is None:
+            continue
+
+        publish_entity = {"type": entry.entity_type, "id": entry.sg_id}
+        payload = entry.payload
+        try:
+            _upload_thumbnails(sg,
+                               entry.entity_type,
+                               publish_entity,
+                               payload["thumbnail_path"],
+                               payload["thumbnail_entity"],
+                               payload["thumbnail_task"])
+            _create_dependencies(tk, publish_entity, payload["dependency_paths"], payload["dependency_ids"], sg)
+        except Fault, e:
+            queue.set_failed(entry.queue_id, e)
+            continue
+
+        # all done!
+        queue.remove(entry.queue_id)
+        if payload["thumbnail_path"] and os.path.exists(payload["thumbnail_path"]):
+            try:
+                os.remove(payload["thumbnail_path"])
+            except OSError:
+                pass
+
+
 #################################################################################################
 # wrappers around the shotgun API's http header API methods
 
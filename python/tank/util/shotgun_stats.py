@@ -0,0 +1,393 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Instrumentation of Shotgun API handles.
+
+Records how many calls are made to Shotgun, how long they take and how much
+data is transferred, broken down by API method and entity type. Measurements
+are started and stopped explicitly:
+
+    measurement = ShotgunMeasurement(tk.shotgun)
+    stats = measurement.start()
+    try:
+        tk.context_from_entity("Shot", 123)
+    finally:
+        measurement.stop()
+    print stats.format_report()
+
+Any object exposing the standard Shotgun API methods can be instrumented,
+including the mockgun test implementation. Transfer sizes and retries are
+only available for real Shotgun connections.
+
+"""
+
+import time
+import threading
+
+# api methods which are instrumented. The first parameter of each of these
+# is the entity type, except for the methods listed in NO_ENTITY_TYPE_METHODS.
+INSTRUMENTED_METHODS = ["find", "find_one", "create", "update", "delete", "revive",
+                        "batch", "summarize", "upload", "upload_thumbnail",
+                        "upload_filmstrip_thumbnail", "download_attachment",
+                        "share_thumbnail", "schema_read", "schema_entity_read",
+                        "schema_field_read", "schema_field_create",
+                        "schema_field_update", "schema_field_delete",
+                        "info", "work_schedule_read", "work_schedule_update"]
+
+NO_ENTITY_TYPE_METHODS = ["batch", "download_attachment", "share_thumbnail",
+                          "schema_read", "schema_entity_read", "info",
+                          "work_schedule_read", "work_schedule_update"]
+
+# upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = [0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+
+class ShotgunCallStats(object):
+    """
+    Statistics for one api method and entity type combination.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.round_trips = 0
+        self.retries = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        # one bucket per entry in LATENCY_BUCKETS plus an overflow bucket
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def add_call(self, duration, error):
+        """
+        Records a single api call
+        """
+        self.calls += 1
+        if error:
+            self.errors += 1
+        self.total_time += duration
+        self.max_time = max(self.max_time, duration)
+        for (idx, bound) in enumerate(LATENCY_BUCKETS):
+            if duration <= bound:
+                self.histogram[idx] += 1
+                break
+        else:
+            self.histogram[-1] += 1
+
+    def to_dict(self):
+        """
+        Returns the statistics as a dictionary
+        """
+        return {"calls": self.calls,
+                "errors": self.errors,
+                "round_trips": self.round_trips,
+                "retries": self.retries,
+                "bytes_sent": self.bytes_sent,
+                "bytes_received": self.bytes_received,
+                "total_time": self.total_time,
+                "max_time": self.max_time,
+                "histogram": list(self.histogram)}
+
+
+class ShotgunStats(object):
+    """
+    Collection of statistics for all Shotgun calls made while a measurement
+    was active. Statistics are keyed by (method, entity_type), where
+    entity_type is None for methods which are not entity specific.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+        self.start_time = time.time()
+        self.end_time = None
+
+    def _get(self, method, entity_type):
+        key = (method, entity_type)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = ShotgunCallStats()
+            self._stats[key] = stats
+        return stats
+
+    def record_call(self, method, entity_type, duration, error=False):
+        """
+        Records a completed api call.
+
+        :param method: Name of the api method, e.g. 'find'
+        :param entity_type: Entity type the call was made for, or None
+        :param duration: Time in seconds the call took
+        :param error: True if the call raised an exception
+        """
+        self._lock.acquire()
+        try:
+            self._get(method, entity_type).add_call(duration, error)
+        finally:
+            self._lock.release()
+
+    def record_request(self, method, entity_type, bytes_sent, bytes_received, retry=False):
+        """
+        Records a single http round trip made as part of an api call.
+
+        :param method: Name of the api method the request was made for
+        :param entity_type: Entity type the call was made for, or None
+        :param bytes_sent: Size of the request body
+        :param bytes_received: Size of the response body
+        :param retry: True if the request was a resend of a previous request
+        """
+        self._lock.acquire()
+        try:
+            stats = self._get(method, entity_type)
+            stats.round_trips += 1
+            stats.bytes_sent += bytes_sent
+            stats.bytes_received += bytes_received
+            if retry:
+                stats.retries += 1
+        finally:
+            self._lock.release()
+
+    def get(self, method=None, entity_type=None):
+        """
+        Returns statistics summed across all entries matching the given
+        method and entity type. None matches anything.
+
+        :returns: ShotgunCallStats instance
+        """
+        total = ShotgunCallStats()
+        self._lock.acquire()
+        try:
+            for ((m, et), stats) in self._stats.iteritems():
+                if method is not None and m != method:
+                    continue
+                if entity_type is not None and et != entity_type:
+                    continue
+                total.calls += stats.calls
+                total.errors += stats.errors
+                total.round_trips += stats.round_trips
+                total.retries += stats.retries
+                total.bytes_sent += stats.bytes_sent
+                total.bytes_received += stats.bytes_received
+                total.total_time += stats.total_time
+                total.max_time = max(total.max_time, stats.max_time)
+                total.histogram = [a + b for (a, b) in zip(total.histogram, stats.histogram)]
+        finally:
+            self._lock.release()
+        return total
+
+    @property
+    def calls(self):
+        """
+        Total number of api calls recorded
+        """
+        return self.get().calls
+
+    def to_dict(self):
+        """
+        Returns all statistics as a dictionary keyed by (method, entity_type)
+        """
+        self._lock.acquire()
+        try:
+            return dict((key, stats.to_dict()) for (key, stats) in self._stats.iteritems())
+        finally:
+            self._lock.release()
+
+    def format_report(self):
+        """
+        Returns a human readable multi line report of the statistics
+        """
+        lines = []
+        header = "%-40s %6s %6s %6s %10s %10s %10s %10s" % ("Method", "Calls", "Trips", "Retry",
+                                                           "Sent", "Received", "Total ms", "Max ms")
+        lines.append(header)
+        lines.append("-" * len(header))
+
+        data = self.to_dict()
+        for key in sorted(data.keys()):
+            (method, entity_type) = key
+            stats = data[key]
+            name = method if entity_type is None else "%s(%s)" % (method, entity_type)
+            if stats["errors"]:
+                name += " [%d errors]" % stats["errors"]
+            lines.append("%-40s %6d %6d %6d %10d %10d %10.1f %10.1f" % (name,
+                                                                     stats["calls"],
+                                                                     stats["round_trips"],
+                                                                     stats["retries"],
+                                                                     stats["bytes_sent"],
+                                                                     stats["bytes_received"],
+                                                                     stats["total_time"] * 1000,
+                                                                     stats["max_time"] * 1000))
+
+        total = self.get()
+        lines.append("-" * len(header))
+        lines.append("%-40s %6d %6d %6d %10d %10d %10.1f %10.1f" % ("Total",
+                                                                 total.calls,
+                                                                 total.round_trips,
+                                                                 total.retries,
+                                                                 total.bytes_sent,
+                                                                 total.bytes_received,
+                                                                 total.total_time * 1000,
+                                                                 total.max_time * 1000))
+        lines.append("")
+        lines.append("Latency histogram (all calls):")
+        lower = 0
+        for (idx, bound) in enumerate(LATENCY_BUCKETS):
+            lines.append("  %6d - %6d ms: %d" % (lower * 1000, bound * 1000, total.histogram[idx]))
+            lower = bound
+        lines.append("  %6d+         ms: %d" % (lower * 1000, total.histogram[-1]))
+        return "\n".join(lines)
+
+
+class ShotgunInstrumentation(object):
+    """
+    Wraps the api methods of a Shotgun handle so that calls are recorded
+    into all currently active ShotgunStats collections. When no measurement
+    is active, the overhead is a single function call per api call.
+    """
+
+    def __init__(self, sg):
+        """
+        Constructor
+
+        :param sg: Shotgun API handle to instrument
+        """
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._last_call = None
+
+        for method in INSTRUMENTED_METHODS:
+            fn = getattr(sg, method, None)
+            if fn is not None:
+                setattr(sg, method, self._wrap_method(method, fn))
+
+        # the http request hook only exists on real shotgun connections
+        config = getattr(sg, "config", None)
+        if config is not None and hasattr(config, "request_observer"):
+            config.request_observer = self._on_request
+
+    def add_collector(self, stats):
+        """
+        Starts recording calls into the given ShotgunStats instance
+        """
+        self._lock.acquire()
+        try:
+            self._collectors = self._collectors + [stats]
+        finally:
+            self._lock.release()
+
+    def remove_collector(self, stats):
+        """
+        Stops recording calls into the given ShotgunStats instance
+        """
+        self._lock.acquire()
+        try:
+            self._collectors = [x for x in self._collectors if x is not stats]
+        finally:
+            self._lock.release()
+
+    def _wrap_method(self, method, fn):
+        """
+        Returns a wrapper for a public api method
+        """
+        def wrapper(*args, **kwargs):
+            collectors = self._collectors
+            if not collectors or getattr(self._local, "current", None) is not None:
+                # nothing to record, or this is an api method called
+                # by another api method (e.g. find_one calling find)
+                return fn(*args, **kwargs)
+
+            entity_type = None
+            if method not in NO_ENTITY_TYPE_METHODS:
+                entity_type = kwargs.get("entity_type", args[0] if args else None)
+
+            self._local.current = (method, entity_type)
+            self._last_call = self._local.current
+            error = True
+            start = time.time()
+            try:
+                result = fn(*args, **kwargs)
+                error = False
+                return result
+            finally:
+                duration = time.time() - start
+                self._local.current = None
+                for stats in collectors:
+                    stats.record_call(method, entity_type, duration, error)
+
+        wrapper.__name__ = method
+        wrapper.__doc__ = fn.__doc__
+        return wrapper
+
+    def _on_request(self, verb, path, bytes_sent, bytes_received, is_retry):
+        """
+        Callback from the shotgun connection after each http request
+        """
+        collectors = self._collectors
+        if not collectors:
+            return
+        # requests made from worker threads (e.g. a concurrent batch) are
+        # attributed to the most recent call made from any thread.
+        current = getattr(self._local, "current", None) or self._last_call
+        if current is None:
+            return
+        (method, entity_type) = current
+        for stats in collectors:
+            stats.record_request(method, entity_type, bytes_sent, bytes_received, is_retry)
+
+
+class ShotgunMeasurement(object):
+    """
+    Records all calls made to a Shotgun handle between start() and stop().
+    Make sure that stop() is always called, otherwise the calls keep being
+    recorded for as long as the Shotgun handle is used.
+
+    Measurements can be nested and may be used from several threads.
+    """
+
+    def __init__(self, sg):
+        """
+        :param sg: Shotgun API handle to record calls for
+        """
+        self._instrumentation = get_instrumentation(sg)
+        self.stats = ShotgunStats()
+
+    def start(self):
+        """
+        Starts recording calls.
+
+        :returns: ShotgunStats instance the calls are recorded into
+        """
+        self.stats.start_time = time.time()
+        self._instrumentation.add_collector(self.stats)
+        return self.stats
+
+    def stop(self):
+        """
+        Stops recording calls. Does nothing if the measurement is not running.
+        """
+        self._instrumentation.remove_collector(self.stats)
+        self.stats.end_time = time.time()
+
+
+def get_instrumentation(sg):
+    """
+    Returns the instrumentation for a Shotgun handle, instrumenting the
+    handle the first time it is called.
+
+    :param sg: Shotgun API handle
+    :returns: ShotgunInstrumentation instance
+    """
+    instrumentation = getattr(sg, "tk_instrumentation", None)
+    if instrumentation is None:
+        instrumentation = ShotgunInstrumentation(sg)
+        sg.tk_instrumentation = instrumentation
+    return instrumentation
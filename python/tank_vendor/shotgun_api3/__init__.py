@@ -1,4 +1,4 @@
 from shotgun import (Shotgun, ShotgunError, Fault, ProtocolError, ResponseError,
-                     Error, __version__)
+                     Error, BatchChunkError, __version__)
 from shotgun import SG_TIMEZONE as sg_timezone
 
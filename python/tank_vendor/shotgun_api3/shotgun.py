@@ -34,6 +34,7 @@ import base64
 import cookielib    # used for attachment upload
 import cStringIO    # used for attachment upload
 import datetime
+import gzip
 import logging
 import mimetools    # used for attachment upload
 import mimetypes    # used for attachment upload
@@ -42,6 +43,7 @@ import re
 import copy
 import stat         # used for attachment upload
 import sys
+import threading
 import time
 import types
 import urllib
@@ -82,6 +84,27 @@ class Fault(ShotgunError):
     """Exception when server side exception detected."""
     pass
 
+class BatchChunkError(ShotgunError):
+    """Exception raised when one or more chunks of a chunked batch() call
+    failed.
+
+    :ivar chunk_index: Index of the first chunk that failed.
+    :ivar start: Index in the request list of the first request in that chunk.
+    :ivar end: Index in the request list one past the last request in that chunk.
+    :ivar error: The exception raised for that chunk.
+    :ivar results: List with one entry per request. Requests in chunks
+        that failed, or were never sent, have None as their result.
+    :ivar failed_chunks: List of (chunk_index, start, end, error) tuples for
+        every chunk that failed.
+    """
+    def __init__(self, failed_chunks, results):
+        self.failed_chunks = failed_chunks
+        self.results = results
+        (self.chunk_index, self.start, self.end, self.error) = failed_chunks[0]
+        ShotgunError.__init__(self, "Batch chunk %d (requests %d to %d) failed: %s%s" % (
+            self.chunk_index, self.start, self.end - 1, self.error,
+            (len(failed_chunks) > 1 and " (and %d more chunks)" % (len(failed_chunks) - 1) or "")))
+
 # ----------------------------------------------------------------------------
 # API
 
@@ -193,6 +216,19 @@ class _Config(object):
         self.session_token = None
         self.authorization = None
         self.no_ssl_validation = False
+        # ask the server to gzip its responses
+        self.gzip_responses = True
+        # gzip request bodies larger than gzip_request_threshold bytes.
+        # This is automatically turned off if the server rejects a
+        # compressed request.
+        self.gzip_requests = False
+        self.gzip_request_threshold = 64 * 1024
+        # default maximum number of requests per batch() rpc call.
+        # None means no limit.
+        self.batch_chunk_size = None
+        # optional callable invoked after every http request with the
+        # arguments (verb, path, bytes_sent, bytes_received, is_retry).
+        self.request_observer = None
 
 class Shotgun(object):
     """Shotgun Client Connection"""
@@ -664,21 +700,36 @@ class Shotgun(object):
 
         return self._call_rpc("revive", params)
 
-    def batch(self, requests):
+    def batch(self, requests, chunk_size=None, max_concurrency=1):
         """Make a batch request  of several create, update and delete calls.
 
         All requests are performed within a transaction, so either all will
         complete or none will.
 
+        Large request lists can be split into chunks of at most chunk_size
+        requests, each of which is sent as a separate rpc call and therefore
+        runs in its own transaction. If a chunk fails, a BatchChunkError
+        describing the failed chunk(s) is raised once all chunks have been
+        processed; it holds the results of the chunks that succeeded.
+
         :param requests: A list of dict's of the form which have a
             request_type key and also specifies:
             - create: entity_type, data dict of fields to set
             - update: entity_type, entity_id, data dict of fields to set
             - delete: entity_type and entity_id
 
+        :param chunk_size: Optional, maximum number of requests to send in
+            a single rpc call. Defaults to config.batch_chunk_size, None
+            means no chunking.
+
+        :param max_concurrency: Optional, number of chunks to send in
+            parallel. Only use this if the chunks are independent of each
+            other. Defaults to 1.
+
         :returns: A list of values for each operation, create and update
         requests return a dict of the fields updated. Delete requests
-        return True if the entity was deleted.
+        return True if the entity was deleted. Results are always returned
+        in the same order as the requests.
         """
 
         if not isinstance(requests, list):
@@ -722,8 +773,77 @@ class Shotgun(object):
                 raise ShotgunError("Invalid request_type '%s' for batch" % (
                                    req["request_type"]))
             calls.append(request_params)
-        records = self._call_rpc("batch", calls)
-        return self._parse_records(records)
+
+        if chunk_size is None:
+            chunk_size = self.config.batch_chunk_size
+
+        if not chunk_size or len(calls) <= chunk_size:
+            records = self._call_rpc("batch", calls)
+            return self._parse_records(records)
+
+        return self._batch_chunks(calls, chunk_size, max_concurrency)
+
+    def _batch_chunks(self, calls, chunk_size, max_concurrency):
+        """Sends a list of batch calls in chunks, optionally in parallel.
+
+        :returns: list of results in the same order as the calls.
+        """
+        chunks = [(idx, start, min(start + chunk_size, len(calls)))
+                  for (idx, start) in enumerate(range(0, len(calls), chunk_size))]
+        results = [None] * len(calls)
+        failed_chunks = []
+        lock = threading.Lock()
+
+        def _run_chunk(sg, chunk):
+            (idx, start, end) = chunk
+            try:
+                records = sg._parse_records(sg._call_rpc("batch", calls[start:end]))
+            except Exception, e:
+                lock.acquire()
+                try:
+                    failed_chunks.append((idx, start, end, e))
+                finally:
+                    lock.release()
+                return
+            results[start:end] = records
+
+        if max_concurrency <= 1:
+            for chunk in chunks:
+                _run_chunk(self, chunk)
+        else:
+            pending = list(chunks)
+            pending.reverse()
+
+            def _worker():
+                # the http connection is not thread safe - give every
+                # worker its own client sharing this client's config.
+                sg = copy.copy(self)
+                sg._connection = None
+                try:
+                    while True:
+                        lock.acquire()
+                        try:
+                            if not pending:
+                                return
+                            chunk = pending.pop()
+                        finally:
+                            lock.release()
+                        _run_chunk(sg, chunk)
+                finally:
+                    sg._close_connection()
+
+            workers = [threading.Thread(target=_worker)
+                       for x in range(min(max_concurrency, len(chunks)))]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+
+        if failed_chunks:
+            failed_chunks.sort()
+            raise BatchChunkError(failed_chunks, results)
+
+        return results
 
     def work_schedule_read(self, start_date, end_date, project=None, user=None):
         """Get the work day rules for a given date range.
@@ -1247,8 +1367,29 @@ class Shotgun(object):
             "content-type" : "application/json; charset=utf-8",
             "connection" : "keep-alive"
         }
+
+        compressed = False
+        if self.config.gzip_requests and \
+           len(encoded_payload) >= self.config.gzip_request_threshold:
+            wire_payload = self._gzip_body(encoded_payload)
+            req_headers["content-encoding"] = "gzip"
+            compressed = True
+        else:
+            wire_payload = encoded_payload
+
         http_status, resp_headers, body = self._make_call("POST",
-            self.config.api_path, encoded_payload, req_headers)
+            self.config.api_path, wire_payload, req_headers)
+
+        if compressed and self._is_encoding_rejected(http_status, body):
+            # the server does not understand compressed requests. Turn
+            # compression off for this connection and send the request again.
+            LOG.debug("Server rejected gzipped request (%s %s), disabling "
+                "request compression" % http_status)
+            self.config.gzip_requests = False
+            del req_headers["content-encoding"]
+            http_status, resp_headers, body = self._make_call("POST",
+                self.config.api_path, encoded_payload, req_headers)
+
         LOG.debug("Completed rpc call to %s" % (method))
         try:
             self._parse_http_status(http_status)
@@ -1261,7 +1402,10 @@ class Shotgun(object):
 
         response = self._decode_response(resp_headers, body)
         self._response_errors(response)
-        response = self._transform_inbound(response)
+        # json responses are transformed as part of the decoding,
+        # see _inbound_object_hook
+        if not self._is_json_response(resp_headers):
+            response = self._transform_inbound(response)
 
         if not isinstance(response, dict) or "results" not in response:
             return response
@@ -1325,6 +1469,30 @@ class Shotgun(object):
             return wire.encode("utf-8")
         return wire
 
+    def _is_encoding_rejected(self, http_status, body):
+        """Returns True if the server rejected a request because it does not
+        support its content encoding. This is reported with a 415, or by some
+        servers with a 400 whose message mentions the encoding. Any other
+        error is a genuine failure of the request.
+        """
+        if http_status[0] == 415:
+            return True
+        if http_status[0] == 400:
+            message = ("%s %s" % (http_status[1], body or "")).lower()
+            return "encoding" in message or "gzip" in message
+        return False
+
+    def _gzip_body(self, body):
+        """Compresses a request body using gzip.
+        """
+        buf = cStringIO.StringIO()
+        gz = gzip.GzipFile(fileobj=buf, mode="wb", compresslevel=6)
+        try:
+            gz.write(body)
+        finally:
+            gz.close()
+        return buf.getvalue()
+
     def _make_call(self, verb, path, body, headers):
         """Makes a HTTP call to the server, handles retry and failure.
         """
@@ -1336,20 +1504,35 @@ class Shotgun(object):
         if self.config.authorization:
             req_headers["Authorization"] = self.config.authorization
 
+        # httplib2 asks for compressed responses unless told otherwise
+        if self.config.gzip_responses:
+            req_headers["accept-encoding"] = "gzip"
+        else:
+            req_headers["accept-encoding"] = "identity"
+
         req_headers.update(headers or {})
         body = body or None
 
         max_rpc_attempts = self.config.max_rpc_attempts
 
+        observer = self.config.request_observer
+        bytes_sent = len(body or "")
+
         while (attempt < max_rpc_attempts):
             attempt += 1
             try:
-                return self._http_request(verb, path, body, req_headers)
+                response = self._http_request(verb, path, body, req_headers)
             except Exception:
                 #TODO: LOG ?
+                if observer:
+                    observer(verb, path, bytes_sent, 0, attempt > 1)
                 self._close_connection()
                 if attempt == max_rpc_attempts:
                     raise
+            else:
+                if observer:
+                    observer(verb, path, bytes_sent, len(response[2] or ""), attempt > 1)
+                return response
 
     def _http_request(self, verb, path, body, headers):
         """Makes the actual HTTP request.
@@ -1413,39 +1596,121 @@ class Shotgun(object):
         if not body:
             return body
 
-        ct = (headers.get("content-type") or "application/json").lower()
-
-        if ct.startswith("application/json") or ct.startswith("text/javascript"):
+        if self._is_json_response(headers):
             return self._json_loads(body)
         return body
 
+    def _is_json_response(self, headers):
+        """Returns True if the response headers indicate a json body.
+        """
+        ct = (headers.get("content-type") or "application/json").lower()
+        return ct.startswith("application/json") or ct.startswith("text/javascript")
+
     def _json_loads(self, body):
-        return json.loads(body)
+        """Decodes a json response and applies the inbound transforms,
+        see _inbound_object_hook.
+        """
+        return self._inbound_json_loads(body, False)
 
     def _json_loads_ascii(self, body):
-        '''See http://stackoverflow.com/questions/956867'''
-        def _decode_list(lst):
-            newlist = []
-            for i in lst:
-                if isinstance(i, unicode):
-                    i = i.encode('utf-8')
-                elif isinstance(i, list):
-                    i = _decode_list(i)
-                newlist.append(i)
-            return newlist
-
-        def _decode_dict(dct):
-            newdict = {}
+        """Decodes a json response, applies the inbound transforms and
+        converts all unicode strings to utf-8 encoded str objects.
+
+        See http://stackoverflow.com/questions/956867
+        """
+        return self._inbound_json_loads(body, True)
+
+    def _inbound_json_loads(self, body, ensure_ascii):
+        """Decodes a json response in a single pass.
+        """
+        object_hook, transform_value = self._inbound_object_hook(ensure_ascii)
+        data = json.loads(body, object_hook=object_hook)
+        if not isinstance(data, dict):
+            # the object hook only sees dictionaries
+            data = transform_value(data)
+        return data
+
+    def _inbound_object_hook(self, ensure_ascii):
+        """Builds a json object hook which does all the processing of the
+        data received from the server while it is being decoded, rather than
+        walking the decoded data again afterwards:
+
+        - optionally converts unicode strings to utf-8 encoded str objects
+        - converts date time strings to datetime objects (see _transform_inbound)
+
+        The output is the same as decoding the json and then walking it with
+        _transform_inbound. Record specific processing is left to _parse_records.
+
+        :param ensure_ascii: If True, unicode strings are utf-8 encoded.
+
+        :returns: tuple with the object hook and a function which transforms
+        a single value that is not a dictionary.
+        """
+        if self.config.convert_datetimes_to_utc:
+            utc = SG_TIMEZONE.utc
+            local = SG_TIMEZONE.local
+            _change_tz = lambda x: x.replace(tzinfo=utc).astimezone(local)
+        else:
+            _change_tz = None
+
+        date_time_match = self._DATE_TIME_PATTERN.match
+        # time stamps tend to repeat a lot within a response and the
+        # time zone conversion is expensive, so cache the conversions.
+        datetime_cache = {}
+
+        def _to_datetime(value):
+            if value in datetime_cache:
+                return datetime_cache[value]
+            # fast path for the format the server always uses
+            if value[4] == "-" and value[7] == "-" and value[10] == "T" and \
+               value[13] == ":" and value[16] == ":" and value[19] == "Z":
+                try:
+                    converted = datetime.datetime(int(value[0:4]), int(value[5:7]),
+                        int(value[8:10]), int(value[11:13]), int(value[14:16]),
+                        int(value[17:19]))
+                except ValueError:
+                    return value
+            else:
+                try:
+                    # strptime was not on datetime in python2.4
+                    converted = datetime.datetime(
+                        *time.strptime(value, "%Y-%m-%dT%H:%M:%SZ")[:6])
+                except ValueError:
+                    return value
+            if _change_tz:
+                converted = _change_tz(converted)
+            datetime_cache[value] = converted
+            return converted
+
+        def _transform_value(value):
+            if isinstance(value, unicode):
+                if len(value) == 20 and date_time_match(value):
+                    converted = _to_datetime(value)
+                    if converted is not value:
+                        return converted
+                if ensure_ascii:
+                    return value.encode("utf-8")
+                return value
+            if isinstance(value, str):
+                if len(value) == 20 and date_time_match(value):
+                    return _to_datetime(value)
+                return value
+            if isinstance(value, list):
+                # dictionaries in the list have already been processed
+                return [_transform_value(i) for i in value]
+            return value
+
+        def _object_hook(dct):
+            new_dict = {}
             for k, v in dct.iteritems():
-                if isinstance(k, unicode):
-                    k = k.encode('utf-8')
-                if isinstance(v, unicode):
-                    v = v.encode('utf-8')
-                elif isinstance(v, list):
-                    v = _decode_list(v)
-                newdict[k] = v
-            return newdict
-        return json.loads(body, object_hook=_decode_dict)
+                if ensure_ascii and isinstance(k, unicode):
+                    k = k.encode("utf-8")
+                if isinstance(v, (basestring, list)):
+                    v = _transform_value(v)
+                new_dict[k] = v
+            return new_dict
+
+        return (_object_hook, _transform_value)
 
 
     def _response_errors(self, sg_response):
@@ -1612,6 +1877,11 @@ class Shotgun(object):
         if not isinstance(records, (list, tuple)):
             records = [records, ]
 
+        # only look up the server version if there are images to process
+        build_thumb_urls = None
+        string_types = types.StringTypes
+        local_path_field = self.client_caps.local_path_field
+
         for rec in records:
             # skip results that aren't entity dictionaries
             if not isinstance(rec, dict):
@@ -1623,20 +1893,22 @@ class Shotgun(object):
                     continue
 
                 # Check for html entities in strings
-                if isinstance(v, types.StringTypes):
-                    rec[k] = rec[k].replace('&lt;', '<')
+                if isinstance(v, string_types) and '&lt;' in v:
+                    rec[k] = v.replace('&lt;', '<')
 
                 # check for thumbnail for older version (<3.3.0) of shotgun
-                if k == 'image' and \
-                   self.server_caps.version and \
-                   self.server_caps.version < (3, 3, 0):
-                    rec['image'] = self._build_thumb_url(rec['type'],
-                        rec['id'])
-                    continue
+                if k == 'image':
+                    if build_thumb_urls is None:
+                        build_thumb_urls = bool(self.server_caps.version and
+                                                self.server_caps.version < (3, 3, 0))
+                    if build_thumb_urls:
+                        rec['image'] = self._build_thumb_url(rec['type'],
+                            rec['id'])
+                        continue
 
                 if isinstance(v, dict) and v.get('link_type') == 'local' \
-                    and self.client_caps.local_path_field in v:
-                    local_path = v[self.client_caps.local_path_field]
+                    and local_path_field in v:
+                    local_path = v[local_path_field]
                     v['local_path'] = local_path
                     v['url'] = "file://%s" % (local_path or "",)
 
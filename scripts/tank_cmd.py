@@ -24,6 +24,7 @@ from tank.deploy import core_api_admin
 from tank.deploy import env_admin
 from tank.deploy import tank_command
 from tank.deploy.tank_commands.action_base import Action
+from tank.deploy.tank_commands import shotgun_cache
 from tank import pipelineconfig
 from tank.util import shotgun
 from tank.platform import engine
@@ -249,75 +250,9 @@ def _write_shotgun_cache(tk, entity_type, cache_file_name):
     # start the shotgun engine, load the apps
     e = engine.start_shotgun_engine(tk, entity_type)
 
-    # get list of actions
-    engine_commands = e.commands
-
-    # insert special system commands
-    if entity_type == "Project":
-        engine_commands["__core_info"] = { "properties": {"title": "Check for Core Upgrades...",
-                                                          "deny_permissions": ["Artist"] } }
-
-        engine_commands["__upgrade_check"] = { "properties": {"title": "Check for App Upgrades...",
-                                                              "deny_permissions": ["Artist"] } }
-
-    # extract actions into cache file
-    res = []
-    for (cmd_name, cmd_params) in engine_commands.items():
-
-        # some apps provide a special deny_platforms entry
-        if "deny_platforms" in cmd_params["properties"]:
-            # setting can be Linux, Windows or Mac
-            curr_os = {"linux2": "Linux", "darwin": "Mac", "win32": "Windows"}[sys.platform]
-            if curr_os in cmd_params["properties"]["deny_platforms"]:
-                # deny this platform! :)
-                continue
-
-        if "title" in cmd_params["properties"]:
-            title = cmd_params["properties"]["title"]
-        else:
-            title = cmd_name
-
-        if "supports_multiple_selection" in cmd_params["properties"]:
-            supports_multiple_sel = cmd_params["properties"]["supports_multiple_selection"]
-        else:
-            supports_multiple_sel = False
-
-        if "deny_permissions" in cmd_params["properties"]:
-            deny = ",".join(cmd_params["properties"]["deny_permissions"])
-        else:
-            deny = ""
-
-        entry = [ cmd_name, title, deny, str(supports_multiple_sel) ]
-
-        res.append("$".join(entry))
-
-    data = "\n".join(res)
-
-    try:
-        # if file does not exist, make sure it is created with open permissions
-        cache_file_created = False
-        if not os.path.exists(cache_path):
-            cache_file_created = True
-
-        # Write to cache file
-        # Note that we are using binary form here to ensure that the line
-        # endings are written out consistently on all different OSes
-        # otherwise with wt mode, \n on windows will be turned into \n\r 
-        # which is not interpreted correctly by the jacascript code.
-        f = open(cache_path, "wb")
-        f.write(data)
-        f.close()
-
-        # make sure cache file has proper permissions
-        if cache_file_created:
-            old_umask = os.umask(0)
-            try:
-                os.chmod(cache_path, 0666)
-            finally:
-                os.umask(old_umask)
-
-    except Exception, e:
-        raise TankError("Could not write to cache file %s: %s" % (cache_path, e))
+    # extract actions into cache file. Unchanged files are not rewritten.
+    data = shotgun_cache.get_cache_data(e, entity_type)
+    shotgun_cache.write_cache_file(cache_path, data)
 
 
 def shotgun_cache_actions(log, install_root, pipeline_config_root, args):
@@ -0,0 +1,88 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Benchmark for creating paths for all the frames of a sequence, calling
+apply_fields() per frame compared to apply_fields_many() and
+apply_fields_for_values().
+
+Usage: python bench_apply_fields.py [num_frames]
+"""
+
+import os
+import sys
+import time
+
+tests_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(tests_root, "..", "python"))
+
+from tank.template import TemplatePath
+from tank.templatekey import StringKey, IntegerKey, SequenceKey
+
+
+def time_call(func):
+    start = time.time()
+    result = func()
+    return (time.time() - start, result)
+
+
+def main():
+    num_frames = 10000
+    if len(sys.argv) > 1:
+        num_frames = int(sys.argv[1])
+
+    keys = {"Sequence": StringKey("Sequence"),
+            "Shot": StringKey("Shot"),
+            "Step": StringKey("Step", choices=["comp", "light", "anim"]),
+            "eye": StringKey("eye", default="%V", choices=["left", "right", "%V"], abstract=True),
+            "name": StringKey("name", filter_by="alphanumeric"),
+            "version": IntegerKey("version", format_spec="03"),
+            "SEQ": SequenceKey("SEQ", format_spec="04")}
+    template = TemplatePath("sequences/{Sequence}/{Shot}/{Step}/publish/{eye}/{name}[.v{version}].{SEQ}.exr",
+                            keys, "/mnt/projects/bench")
+    fields = {"Sequence": "aa", "Shot": "aa_001", "Step": "comp", "eye": "left", "name": "beauty", "version": 12}
+    frames = range(1001, 1001 + num_frames)
+
+    def per_frame():
+        paths = []
+        for frame in frames:
+            cur_fields = dict(fields)
+            cur_fields["SEQ"] = frame
+            paths.append(template.apply_fields(cur_fields))
+        return paths
+
+    def many():
+        fields_list = []
+        for frame in frames:
+            cur_fields = dict(fields)
+            cur_fields["SEQ"] = frame
+            fields_list.append(cur_fields)
+        return template.apply_fields_many(fields_list)
+
+    def for_values():
+        return template.apply_fields_for_values(fields, "SEQ", frames)
+
+    print "%d frames" % num_frames
+    print ""
+    print "%-30s %10s" % ("Method", "Time (ms)")
+    expected = None
+    for (name, func) in [("apply_fields per frame", per_frame),
+                         ("apply_fields_many", many),
+                         ("apply_fields_for_values", for_values)]:
+        (duration, paths) = time_call(func)
+        if expected is None:
+            expected = paths
+        elif paths != expected:
+            raise Exception("%s returned different paths!" % name)
+        print "%-30s %10.1f" % (name, duration * 1000)
+
+
+if __name__ == "__main__":
+    main()
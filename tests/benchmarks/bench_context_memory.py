@@ -0,0 +1,132 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Benchmark for the memory used by many contexts, e.g. a task list or a farm
+job graph, comparing contexts holding their own entity dictionaries (the
+previous implementation, emulated below) with contexts sharing interned
+entity references.
+
+Each context is built from fresh dictionaries, as returned by Shotgun
+queries, for a pool of projects, shots, steps, tasks and users. Each mode
+runs in its own process so that the memory used can be measured.
+
+Usage: python bench_context_memory.py [num_contexts]
+"""
+
+import os
+import sys
+import copy
+import time
+import subprocess
+
+tests_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(tests_root, "..", "python"))
+
+from tank.context import Context
+
+
+class DictContext(object):
+    """
+    The previous layout of a context: an instance dictionary, and entity
+    dictionaries owned by the context.
+    """
+
+    def __init__(self, tk, project=None, entity=None, step=None, task=None, user=None, additional_entities=[]):
+        self.tk = tk
+        self.project = project
+        self.entity = entity
+        self.step = step
+        self.task = task
+        self.user = user
+        self.additional_entities = additional_entities
+        self._entity_fields_cache = {}
+
+    def __deepcopy__(self, memo):
+        ctx_copy = DictContext(self.tk)
+        ctx_copy.project = copy.deepcopy(self.project, memo)
+        ctx_copy.entity = copy.deepcopy(self.entity, memo)
+        ctx_copy.step = copy.deepcopy(self.step, memo)
+        ctx_copy.task = copy.deepcopy(self.task, memo)
+        ctx_copy.user = copy.deepcopy(self.user, memo)
+        ctx_copy.additional_entities = copy.deepcopy(self.additional_entities, memo)
+        return ctx_copy
+
+
+MODES = {"dict": DictContext, "entity_ref": Context}
+
+
+def get_rss():
+    """
+    Returns the resident memory of the process in bytes.
+    """
+    try:
+        fh = open("/proc/self/statm")
+        try:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        finally:
+            fh.close()
+    except (IOError, OSError):
+        # peak memory, in kilobytes on linux and bytes on osx
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == "darwin":
+            return rss
+        return rss * 1024
+
+
+def make_contexts(context_class, num_contexts):
+    contexts = []
+    for index in range(num_contexts):
+        shot_id = index % 2000
+        # fresh dictionaries for every context, as returned by shotgun
+        project = {"type": "Project", "id": 1 + index % 2, "name": "project_%d" % (1 + index % 2)}
+        entity = {"type": "Shot", "id": shot_id, "name": "shot_%04d" % shot_id}
+        step = {"type": "Step", "id": index % 10, "name": "step_%d" % (index % 10)}
+        task = {"type": "Task", "id": shot_id * 10 + index % 10, "name": "task"}
+        user = {"type": "HumanUser", "id": index % 50, "name": "user_%d" % (index % 50)}
+        sequence = {"type": "Sequence", "id": shot_id / 100, "name": "seq_%d" % (shot_id / 100)}
+        contexts.append(context_class(None, project, entity, step, task, user, [sequence]))
+    return contexts
+
+
+def run_mode(mode, num_contexts):
+    context_class = MODES[mode]
+    before = get_rss()
+    start = time.time()
+    contexts = make_contexts(context_class, num_contexts)
+    duration = time.time() - start
+    used = get_rss() - before
+
+    start = time.time()
+    copies = [copy.deepcopy(x) for x in contexts]
+    copy_duration = time.time() - start
+
+    print "%-12s %10.1f MB %10.3f s %10.3f s" % (mode, used / (1024.0 * 1024.0), duration, copy_duration)
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == "--mode":
+        run_mode(sys.argv[2], int(sys.argv[3]))
+        return
+
+    num_contexts = 100000
+    if len(sys.argv) > 1:
+        num_contexts = int(sys.argv[1])
+
+    print "%d contexts" % num_contexts
+    print ""
+    print "%-12s %13s %12s %12s" % ("mode", "memory", "create", "deepcopy")
+    for mode in ["dict", "entity_ref"]:
+        subprocess.check_call([sys.executable, __file__, "--mode", mode, str(num_contexts)])
+
+
+if __name__ == "__main__":
+    main()
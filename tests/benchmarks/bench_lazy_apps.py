@@ -0,0 +1,145 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Benchmark for engine startup with and without lazy app initialization.
+
+Builds a test project with an environment of 30 apps, each with a handful
+of settings to validate and an init_app() which does some work, and times
+engine startup in eager mode, in lazy mode with a cold and a warm command
+manifest, and in lazy mode followed by running the commands of a few apps.
+
+Usage: python bench_lazy_apps.py [num_apps] [num_apps_used]
+"""
+
+import os
+import sys
+import time
+
+tests_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(tests_root, "..", "python"))
+sys.path.insert(0, os.path.join(tests_root, "python"))
+
+import tank
+from tank_test import tank_test_base
+from tank_test.tank_test_base import TankTestBase
+
+# simulated cost of initializing an app, in seconds
+APP_INIT_TIME = 0.02
+
+APP_CODE = """
+import time
+from tank.platform import Application
+
+class BenchApp(Application):
+    def init_app(self):
+        time.sleep(%s)
+        self.engine.register_command(self.get_setting("command"),
+                                     lambda: self.instance_name,
+                                     {"type": "context_menu"})
+""" % APP_INIT_TIME
+
+APP_MANIFEST = """
+configuration:
+    command: {type: str}
+    hook_a: {type: hook, default_value: test_hook}
+    hook_b: {type: hook, default_value: test_hook}
+    template_a:
+        type: template
+        required_fields: [name, version]
+    names:
+        type: list
+        values: {type: str}
+"""
+
+
+class BenchFixture(TankTestBase):
+    def runTest(self):
+        pass
+
+
+def write_file(path, data):
+    if not os.path.exists(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    fh = open(path, "wt")
+    fh.write(data)
+    fh.close()
+
+
+def setup_project(fixture, num_apps, lazy):
+    """
+    Writes an environment with num_apps apps and returns a context
+    """
+    env = ["engines:",
+           "    test_engine:",
+           "        location: {'type': 'dev', 'path': '%s'}" % os.path.join(fixture.project_config, "test_engine"),
+           "        debug_logging: false",
+           "        lazy_app_init: %s" % (lazy and "true" or "false"),
+           "        apps:"]
+    for idx in range(num_apps):
+        app_dir = os.path.join(fixture.project_config, "bench_app_%02d" % idx)
+        write_file(os.path.join(app_dir, "app.py"), APP_CODE)
+        write_file(os.path.join(app_dir, "info.yml"), APP_MANIFEST)
+        env.extend(["            bench_app_%02d:" % idx,
+                    "                location: {'type': 'dev', 'path': '%s'}" % app_dir,
+                    "                command: command_%02d" % idx,
+                    "                hook_a: test_hook",
+                    "                hook_b: default",
+                    "                template_a: maya_publish_name",
+                    "                names: [a, b, c]"])
+    write_file(os.path.join(fixture.project_config, "env", "test.yml"), "\n".join(env) + "\n")
+
+
+def time_engine_start(fixture, ctx, num_commands):
+    tk = tank.Tank(fixture.project_root)
+    start = time.time()
+    engine = tank.platform.start_engine("test_engine", tk, ctx)
+    startup = time.time() - start
+    for name in sorted(engine.commands.keys())[:num_commands]:
+        engine.commands[name]["callback"]()
+    total = time.time() - start
+    engine.destroy()
+    return (startup, total)
+
+
+def main():
+    num_apps = 30
+    num_used = 2
+    if len(sys.argv) > 1:
+        num_apps = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        num_used = int(sys.argv[2])
+
+    tank_test_base.setUpModule()
+    fixture = BenchFixture()
+    fixture.setUp()
+    try:
+        fixture.setup_fixtures()
+        shot = {"type": "Shot", "name": "shot_name", "id": 2, "project": fixture.project}
+        shot_path = os.path.join(fixture.project_root, "shot_code")
+        fixture.add_production_path(shot_path, shot)
+        ctx = tank.Tank(fixture.project_root).context_from_path(shot_path)
+
+        print "Engine with %d apps, %d apps used, %.0f ms init per app" % (num_apps, num_used, APP_INIT_TIME * 1000)
+        print ""
+        print "%-30s %12s %20s" % ("Mode", "Startup (s)", "Startup + use (s)")
+
+        setup_project(fixture, num_apps, lazy=False)
+        print "%-30s %12.3f %20.3f" % (("eager",) + time_engine_start(fixture, ctx, num_used))
+
+        setup_project(fixture, num_apps, lazy=True)
+        print "%-30s %12.3f %20.3f" % (("lazy, no command manifest",) + time_engine_start(fixture, ctx, num_used))
+        print "%-30s %12.3f %20.3f" % (("lazy, cached command manifest",) + time_engine_start(fixture, ctx, num_used))
+    finally:
+        fixture.tearDown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Benchmark for template driven path searches.
+
+Builds a synthetic shot tree where only some of the step folders are valid
+for the template, and times a glob of the template followed by validation
+of every hit (the previous implementation of paths_from_template) against
+the level by level template search, with and without a thread pool.
+
+Usage: python bench_paths_from_template.py [num_shots] [files_per_step]
+"""
+
+import os
+import sys
+import glob
+import time
+import shutil
+import tempfile
+
+tests_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(tests_root, "..", "python"))
+
+from tank import template_search
+from tank.template import TemplatePath
+from tank.templatekey import StringKey, IntegerKey
+
+STEPS = ["comp", "light", "anim", "layout", "fx", "model"]
+VALID_STEPS = ["comp", "light"]
+
+
+def build_tree(root, num_shots, files_per_step):
+    for seq_idx in range(max(1, num_shots / 50)):
+        seq = "seq%02d" % seq_idx
+        for shot_idx in range(min(50, num_shots)):
+            for step in STEPS:
+                work = os.path.join(root, "sequences", seq, "%s_%03d" % (seq, shot_idx), step, "work")
+                os.makedirs(work)
+                for idx in range(files_per_step):
+                    open(os.path.join(work, "scene.v%03d.ma" % idx), "w").close()
+                    # files which don't match the template
+                    open(os.path.join(work, "scene.v%03d.ma.bak" % idx), "w").close()
+
+
+def time_call(func):
+    start = time.time()
+    result = func()
+    return (time.time() - start, result)
+
+
+def main():
+    num_shots = 200
+    files_per_step = 20
+    if len(sys.argv) > 1:
+        num_shots = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        files_per_step = int(sys.argv[2])
+
+    root = tempfile.mkdtemp(prefix="tank_bench_")
+    try:
+        build_tree(root, num_shots, files_per_step)
+
+        keys = {"Sequence": StringKey("Sequence"),
+                "Shot": StringKey("Shot"),
+                "Step": StringKey("Step", choices=VALID_STEPS),
+                "name": StringKey("name"),
+                "version": IntegerKey("version", format_spec="03")}
+        template = TemplatePath("sequences/{Sequence}/{Shot}/{Step}/work/{name}.v{version}.ma", keys, root)
+        fields = dict([(x, "*") for x in keys])
+
+        def glob_search():
+            glob_str = template._apply_fields(fields, ignore_types=fields.keys())
+            return [x for x in glob.iglob(glob_str) if template.validate(x)]
+
+        def template_walk(num_threads):
+            found = template_search.find_paths(template, fields, fields.keys(), num_threads)
+            return [x for x in found if template.validate(x)]
+
+        print "%d shots, %d steps per shot, %d files per step" % (num_shots, len(STEPS), files_per_step * 2)
+        print ""
+        print "%-30s %10s %10s" % ("Search", "Time (s)", "Paths")
+        (duration, result) = time_call(glob_search)
+        print "%-30s %10.3f %10d" % ("glob + validate", duration, len(result))
+        for num_threads in (0, 4, 16):
+            (duration, result) = time_call(lambda: template_walk(num_threads))
+            print "%-30s %10.3f %10d" % ("template search, %d threads" % num_threads, duration, len(result))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Benchmark for the resolver service.
+
+Compares requests per second for template_from_path + get_fields and
+context_from_path made through the resolver client against the same calls
+made with the in-process API, and the time a short lived process spends
+getting its first answer: constructing a Sgtk API instance versus
+connecting to a running resolver service.
+
+Usage: python bench_resolver.py [num_requests]
+"""
+
+import os
+import sys
+import time
+import shutil
+import select
+import tempfile
+import threading
+
+tests_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(tests_root, "..", "python"))
+sys.path.insert(0, os.path.join(tests_root, "python"))
+
+import tank
+from tank.util import resolver
+from tank_test import tank_test_base
+from tank_test.tank_test_base import TankTestBase
+
+
+class BenchFixture(TankTestBase):
+    def runTest(self):
+        pass
+
+
+def rate(num_requests, fn):
+    start = time.time()
+    for idx in range(num_requests):
+        fn(idx)
+    duration = time.time() - start
+    return num_requests / duration
+
+
+def main():
+    num_requests = 2000
+    if len(sys.argv) > 1:
+        num_requests = int(sys.argv[1])
+
+    tank_test_base.setUpModule()
+    fixture = BenchFixture()
+    fixture.setUp()
+    socket_dir = tempfile.mkdtemp()
+    try:
+        fixture.setup_fixtures()
+        seq_path = os.path.join(fixture.project_root, "sequences", "Seq")
+        fixture.add_production_path(seq_path, {"type": "Sequence", "name": "Seq", "id": 3})
+        shot_path = os.path.join(seq_path, "shot_code")
+        fixture.add_production_path(shot_path, {"type": "Shot", "name": "shot_code", "id": 2,
+                                                "project": fixture.project})
+        step_path = os.path.join(shot_path, "step_name")
+        fixture.add_production_path(step_path, {"type": "Step", "name": "step_name", "id": 4})
+        paths = [os.path.join(step_path, "work", "scene_%d.v%03d.ma" % (x % 10, x % 100)) for x in range(100)]
+
+        socket_path = os.path.join(socket_dir, "resolver.sock")
+        server = resolver.ResolverServer(socket_path)
+        serving = [True]
+        def serve():
+            # SocketServer.shutdown() doesn't exist in python 2.5, so poll
+            # for connections until the benchmark is done
+            while serving[0]:
+                (readable, _, _) = select.select([server], [], [], 0.05)
+                if readable:
+                    server.handle_request()
+        server_thread = threading.Thread(target=serve)
+        server_thread.setDaemon(True)
+        server_thread.start()
+
+        try:
+            # first answer for a fresh process
+            start = time.time()
+            tk = tank.tank_from_path(fixture.project_root)
+            tk.template_from_path(paths[0])
+            in_process_first = time.time() - start
+
+            client = resolver.ResolverClient(socket_path)
+            client.template_from_path(paths[0])
+            client.close()
+            start = time.time()
+            client = resolver.ResolverClient(socket_path)
+            client.template_from_path(paths[0])
+            service_first = time.time() - start
+
+            print "%d requests per test, %d templates" % (num_requests, len(tk.templates))
+            print ""
+            print "%-45s %15s %15s" % ("Operation", "In-process", "Resolver")
+            print "%-45s %12.1f ms %12.1f ms" % ("first answer (API startup / connect)",
+                                                 in_process_first * 1000, service_first * 1000)
+
+            def in_process_fields(idx):
+                path = paths[idx % len(paths)]
+                tk.template_from_path(path).get_fields(path)
+
+            def service_fields(idx):
+                client.get_fields(paths[idx % len(paths)])
+
+            print "%-45s %11.0f/s %11.0f/s" % ("template_from_path + get_fields",
+                                               rate(num_requests, in_process_fields),
+                                               rate(num_requests, service_fields))
+
+            num_ctx = max(1, num_requests / 10)
+            print "%-45s %11.0f/s %11.0f/s" % ("context_from_path",
+                                               rate(num_ctx, lambda idx: tk.context_from_path(step_path)),
+                                               rate(num_ctx, lambda idx: client.context_from_path(step_path)))
+            client.close()
+        finally:
+            serving[0] = False
+            server_thread.join()
+            server.server_close()
+    finally:
+        shutil.rmtree(socket_dir)
+        fixture.tearDown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+# 
+# CONFIDENTIAL AND PROPRIETARY
+# 
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit 
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your 
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights 
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Micro benchmark for decoding of large Shotgun read responses.
+
+Compares the single pass decoder in the Shotgun client with the previous
+three pass pipeline (ascii decoding, _transform_inbound, _parse_records) and
+checks that both produce the same output.
+
+Usage: python bench_shotgun_decode.py [num_records | path_to_recorded_response.json]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "python")))
+
+from tank_vendor.shotgun_api3 import Shotgun
+from tank_vendor.shotgun_api3.shotgun import json
+
+
+def make_response(num_records):
+    entities = []
+    for i in range(num_records):
+        entities.append({"type": "PublishedFile",
+                         "id": i,
+                         "code": u"scene_%05d.v%03d.ma" % (i, i % 100),
+                         "description": u"Publish with a longer description &lt;wip&gt; %d" % i,
+                         "created_at": "2013-10-12T12:%02d:00Z" % (i % 60),
+                         "updated_at": "2013-10-13T08:%02d:00Z" % (i % 60),
+                         "version_number": i % 100,
+                         "tags": [u"tag_a", u"tag_b"],
+                         "path": {"link_type": "local",
+                                  "local_path_linux": "/mnt/projects/bbb/seq/shot_%05d/scene.ma" % i,
+                                  "local_path_mac": "/Volumes/projects/bbb/seq/shot_%05d/scene.ma" % i,
+                                  "local_path_windows": "P:\\\\bbb\\\\seq\\\\shot_%05d\\\\scene.ma" % i,
+                                  "name": "scene.ma"},
+                         "project": {"type": "Project", "id": 65, "name": u"Big Buck Bunny"},
+                         "entity": {"type": "Shot", "id": i, "name": u"shot_%05d" % i},
+                         "task": {"type": "Task", "id": i * 3, "name": u"Animation"}})
+    return json.dumps({"results": {"entities": entities,
+                                   "paging_info": {"entity_count": num_records}}})
+
+
+def legacy_decode(sg, body):
+    """
+    The decoding pipeline as it was before the single pass decoder.
+    """
+    def _decode_list(lst):
+        newlist = []
+        for i in lst:
+            if isinstance(i, unicode):
+                i = i.encode('utf-8')
+            elif isinstance(i, list):
+                i = _decode_list(i)
+            newlist.append(i)
+        return newlist
+
+    def _decode_dict(dct):
+        newdict = {}
+        for k, v in dct.iteritems():
+            if isinstance(k, unicode):
+                k = k.encode('utf-8')
+            if isinstance(v, unicode):
+                v = v.encode('utf-8')
+            elif isinstance(v, list):
+                v = _decode_list(v)
+            newdict[k] = v
+        return newdict
+
+    response = json.loads(body, object_hook=_decode_dict)
+    response = sg._transform_inbound(response)
+    records = response["results"]["entities"]
+
+    local_path_field = sg.client_caps.local_path_field
+    for rec in records:
+        for k, v in rec.iteritems():
+            if not v:
+                continue
+            if isinstance(v, basestring):
+                rec[k] = rec[k].replace('&lt;', '<')
+            if isinstance(v, dict) and v.get('link_type') == 'local' and local_path_field in v:
+                local_path = v[local_path_field]
+                v['local_path'] = local_path
+                v['url'] = "file://%s" % (local_path or "",)
+    return records
+
+
+def fused_decode(sg, body):
+    response = sg._decode_response({"content-type": "application/json"}, body)
+    return sg._parse_records(response["results"]["entities"])
+
+
+def timed(label, func, repeat=3):
+    best = None
+    for x in range(repeat):
+        start = time.time()
+        result = func()
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    print "%-24s %8.3fs" % (label, best)
+    return result
+
+
+def main():
+    arg = "50000"
+    if len(sys.argv) > 1:
+        arg = sys.argv[1]
+
+    if os.path.exists(arg):
+        fh = open(arg, "rb")
+        body = fh.read()
+        fh.close()
+    else:
+        body = make_response(int(arg))
+
+    sg = Shotgun("http://localhost", "bench", "0123456789", connect=False)
+    # pretend we know the server so that _parse_records does not try to connect
+    sg._server_caps = type("Caps", (object,), {"version": (5, 0, 0), "host": sg.config.server})()
+
+    print "Response size: %d bytes" % len(body)
+    legacy = timed("legacy three pass", lambda: legacy_decode(sg, body))
+    fused = timed("single pass", lambda: fused_decode(sg, body))
+
+    if legacy != fused:
+        print "ERROR: the decoders returned different data!"
+        sys.exit(1)
+    print "Outputs are identical."
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+# 
+# CONFIDENTIAL AND PROPRIETARY
+# 
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit 
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your 
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights 
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Benchmark for gzip compression of the Shotgun json traffic.
+
+Starts a local stand-in for the Shotgun server which answers read and batch
+calls with canned data, then runs a large find() and a large batch() with
+and without compression, reporting bytes on the wire and client side time.
+
+Usage: python bench_shotgun_gzip.py [num_records]
+"""
+
+import os
+import sys
+import gzip
+import time
+import select
+import threading
+import cStringIO
+import BaseHTTPServer
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "python")))
+
+from tank_vendor.shotgun_api3 import Shotgun
+from tank_vendor.shotgun_api3.shotgun import json
+
+
+class StandInHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """
+    Minimal json rpc handler mimicking the Shotgun api3 end point.
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        raw = self.rfile.read(int(self.headers["content-length"]))
+        self.server.bytes_in += len(raw)
+        if self.headers.get("content-encoding") == "gzip":
+            raw = gzip.GzipFile(fileobj=cStringIO.StringIO(raw)).read()
+        payload = json.loads(raw)
+        method = payload["method_name"]
+
+        if method == "info":
+            response = {"version": [5, 0, 0]}
+        elif method == "read":
+            entities = self.server.records
+            response = {"results": {"entities": entities,
+                                    "paging_info": {"entity_count": len(entities)}}}
+        elif method == "batch":
+            response = {"results": [{"type": "Shot", "id": i} for i in range(len(payload["params"][1]))]}
+        else:
+            response = {"exception": True, "message": "Unknown method %s" % method}
+
+        body = json.dumps(response)
+        headers = {"content-type": "application/json; charset=utf-8"}
+        if "gzip" in (self.headers.get("accept-encoding") or ""):
+            buf = cStringIO.StringIO()
+            gz = gzip.GzipFile(fileobj=buf, mode="wb")
+            gz.write(body)
+            gz.close()
+            body = buf.getvalue()
+            headers["content-encoding"] = "gzip"
+
+        self.server.bytes_out += len(body)
+        self.send_response(200)
+        for (k, v) in headers.items():
+            self.send_header(k, v)
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def make_records(num_records):
+    records = []
+    for i in range(num_records):
+        records.append({"type": "Shot",
+                        "id": i,
+                        "code": "shot_%05d" % i,
+                        "description": "A fairly typical description of shot number %d" % i,
+                        "sg_status_list": "ip",
+                        "updated_at": "2013-10-12T12:01:00Z",
+                        "project": {"type": "Project", "id": 65, "name": "Big Buck Bunny"},
+                        "sg_sequence": {"type": "Sequence", "id": i % 40, "name": "seq_%02d" % (i % 40)}})
+    return records
+
+
+def run(server, sg, label, func):
+    server.bytes_in = 0
+    server.bytes_out = 0
+    start = time.time()
+    func()
+    elapsed = time.time() - start
+    print "%-32s sent %10d bytes  received %10d bytes  %8.3fs" % (label, server.bytes_in, server.bytes_out, elapsed)
+
+
+def main():
+    num_records = 20000
+    if len(sys.argv) > 1:
+        num_records = int(sys.argv[1])
+
+    server = BaseHTTPServer.HTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.records = make_records(num_records)
+    serving = [True]
+    def serve():
+        # SocketServer.shutdown() doesn't exist in python 2.5, so poll
+        # for connections until the benchmark is done
+        while serving[0]:
+            (readable, _, _) = select.select([server], [], [], 0.05)
+            if readable:
+                server.handle_request()
+    thread = threading.Thread(target=serve)
+    thread.setDaemon(True)
+    thread.start()
+
+    url = "http://127.0.0.1:%d" % server.server_address[1]
+    batch_data = [{"request_type": "create", "entity_type": "Shot", "data": r} for r in make_records(num_records / 10)]
+
+    for gzip_enabled in (False, True):
+        sg = Shotgun(url, "bench", "0123456789", connect=False)
+        sg.config.gzip_responses = gzip_enabled
+        sg.config.gzip_requests = gzip_enabled
+        suffix = "gzip" if gzip_enabled else "plain"
+        run(server, sg, "find %d records (%s)" % (num_records, suffix), lambda: sg.find("Shot", [], ["code"]))
+        run(server, sg, "batch %d creates (%s)" % (len(batch_data), suffix), lambda: sg.batch(batch_data))
+
+    serving[0] = False
+    thread.join()
+    server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Micro benchmarks for template key validation and conversion, which run for
+every key of every apply_fields() and get_fields() call.
+
+Usage: python bench_template_keys.py [num_calls]
+"""
+
+import os
+import sys
+import timeit
+
+tests_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(tests_root, "..", "python"))
+
+from tank.templatekey import StringKey, IntegerKey, SequenceKey
+
+
+def main():
+    num_calls = 100000
+    if len(sys.argv) > 1:
+        num_calls = int(sys.argv[1])
+
+    keys = {"string": StringKey("name"),
+            "string alphanumeric": StringKey("name", filter_by="alphanumeric"),
+            "string choices": StringKey("Step", choices=["comp", "light", "anim", "layout", "fx", "model"],
+                                        exclusions=["tmp", "old"]),
+            "integer": IntegerKey("version", format_spec="03"),
+            "sequence": SequenceKey("SEQ", format_spec="04")}
+
+    cases = [("string", "validate", "beauty"),
+             ("string alphanumeric", "validate", "beauty"),
+             ("string choices", "validate", "model"),
+             ("string choices", "validate (fails)", "blah"),
+             ("string choices", "str_from_value", "model"),
+             ("integer", "validate", 12),
+             ("integer", "str_from_value", 12),
+             ("integer", "value_from_str", "012"),
+             ("sequence", "validate", 1001),
+             ("sequence", "validate (fails)", "blah"),
+             ("sequence", "str_from_value", 1001),
+             ("sequence", "str_from_value", "FORMAT: #"),
+             ("sequence", "value_from_str", "%04d")]
+
+    print "%d calls per case" % num_calls
+    print ""
+    print "%-22s %-18s %-12s %12s" % ("Key", "Call", "Value", "Time (us)")
+    for (key_name, call, value) in cases:
+        key = keys[key_name]
+        func = getattr(key, call.split()[0])
+        duration = timeit.Timer(lambda: func(value)).timeit(num_calls)
+        print "%-22s %-18s %-12s %12.3f" % (key_name, call, repr(value), duration * 1000000 / num_calls)
+
+
+if __name__ == "__main__":
+    main()
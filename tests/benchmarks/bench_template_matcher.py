@@ -0,0 +1,127 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Benchmark for finding the template matching a path, looping over all the
+templates (the previous implementation of template_from_path) compared to
+the TemplateMatcher.
+
+Looping over all the templates is only timed for a sample of the paths,
+the time for all the paths is extrapolated from it.
+
+Usage: python bench_template_matcher.py [num_templates] [num_paths] [num_sample_paths]
+"""
+
+import os
+import sys
+import time
+import random
+
+tests_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.join(tests_root, "..", "python"))
+
+from tank.errors import TankError
+from tank.template import TemplatePath
+from tank.template_matcher import TemplateMatcher
+from tank.templatekey import StringKey, IntegerKey, SequenceKey
+
+ROOT = "/mnt/projects/bench"
+
+
+def make_templates(num_templates):
+    keys = {"Sequence": StringKey("Sequence"),
+            "Shot": StringKey("Shot"),
+            "sg_asset_type": StringKey("sg_asset_type"),
+            "Asset": StringKey("Asset"),
+            "Step": StringKey("Step"),
+            "name": StringKey("name", filter_by="alphanumeric"),
+            "version": IntegerKey("version", format_spec="03"),
+            "SEQ": SequenceKey("SEQ", format_spec="04")}
+    areas = ["sequences/{Sequence}/{Shot}/{Step}", "assets/{sg_asset_type}/{Asset}/{Step}"]
+    templates = {}
+    for index in range(num_templates):
+        area = areas[index % 2]
+        kind = ["work", "publish"][(index / 2) % 2]
+        app = "app%03d" % (index / 4)
+        ext = "e%02d" % (index / 4 % 40)
+        if index % 8 < 4:
+            definition = "%s/%s/%s/{name}.v{version}.%s" % (area, kind, app, ext)
+        else:
+            definition = "%s/%s/%s/{name}/v{version}/{name}.{SEQ}.%s" % (area, kind, app, ext)
+        name = "template_%04d" % index
+        templates[name] = TemplatePath(definition, keys, ROOT, name)
+    return templates
+
+
+def make_paths(templates, num_paths):
+    random.seed(0)
+    template_list = sorted(templates.values(), key=lambda x: x.name)
+    fields = {"Sequence": "aa", "Shot": "aa_001", "sg_asset_type": "Character", "Asset": "hero",
+              "Step": "comp", "name": "scene"}
+    paths = []
+    for index in range(num_paths):
+        template = random.choice(template_list)
+        fields["version"] = random.randint(1, 100)
+        fields["SEQ"] = random.randint(1, 1000)
+        path = template.apply_fields(fields)
+        if index % 10 == 0:
+            # some paths which don't match any template
+            path += ".bak"
+        paths.append(path)
+    return paths
+
+
+def loop_match(templates, path):
+    matched = []
+    for template in templates.values():
+        if template.validate(path):
+            matched.append(template)
+    return matched
+
+
+def main():
+    num_templates = 1000
+    num_paths = 100000
+    num_sample_paths = 1000
+    if len(sys.argv) > 1:
+        num_templates = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        num_paths = int(sys.argv[2])
+    if len(sys.argv) > 3:
+        num_sample_paths = int(sys.argv[3])
+
+    templates = make_templates(num_templates)
+    paths = make_paths(templates, num_paths)
+    sample_paths = paths[:num_sample_paths]
+
+    print "%d templates, %d paths" % (num_templates, num_paths)
+    print ""
+
+    start = time.time()
+    matcher = TemplateMatcher(templates)
+    print "%-40s %10.3f s" % ("building the matcher", time.time() - start)
+
+    start = time.time()
+    expected = [loop_match(templates, x) for x in sample_paths]
+    duration = (time.time() - start) * num_paths / len(sample_paths)
+    print "%-40s %10.3f s" % ("loop over templates (extrapolated)", duration)
+
+    start = time.time()
+    found = []
+    for path in paths:
+        found.append([x for (x, _) in matcher.match_all(path)])
+    print "%-40s %10.3f s" % ("template matcher", time.time() - start)
+
+    if found[:len(sample_paths)] != expected:
+        raise TankError("The template matcher found different templates!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+# 
+# CONFIDENTIAL AND PROPRIETARY
+# 
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit 
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your 
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights 
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+import logging
+from StringIO import StringIO
+from mock import patch
+
+import tank
+from tank import TankError
+from tank_test.tank_test_base import *
+from tank.deploy.tank_commands import resolve
+
+try:
+    import json
+except ImportError:
+    # python 2.5 - use the simplejson fallback of the shotgun API
+    from tank_vendor.shotgun_api3.sg_25 import json
+
+
+class TestResolve(TankTestBase):
+    
+    def setUp(self):
+        super(TestResolve, self).setUp()
+        self.setup_fixtures()
+
+        seq = {"type":"Sequence", "name":"seq_name", "id":3}
+        seq_path = os.path.join(self.project_root, "sequences/Seq")
+        self.add_production_path(seq_path, seq)
+        shot = {"type":"Shot",
+                "name": "shot_name",
+                "id":2,
+                "project": self.project}
+        shot_path = os.path.join(seq_path, "shot_code")
+        self.add_production_path(shot_path, shot)
+        step = {"type":"Step", "name":"step_name", "id":4}
+        self.step_path = os.path.join(shot_path, "step_name")
+        self.add_production_path(self.step_path, step)
+        self.work_path = os.path.join(self.step_path, "work", "foo.v003.ma")
+
+        self.tk = tank.Tank(self.project_root)
+        self.action = resolve.ResolveAction()
+        self.action.tk = self.tk
+
+    def _resolve(self, paths, **kwargs):
+        output = StringIO()
+        self.action.resolve(paths, output, **kwargs)
+        return [json.loads(x) for x in output.getvalue().splitlines()]
+
+    def test_resolve(self):
+        results = self._resolve([self.work_path, os.path.join(self.project_root, "foo")])
+        self.assertEqual(len(results), 2)
+
+        self.assertEqual(results[0]["path"], self.work_path)
+        self.assertEqual(results[0]["template"], "maya_shot_work")
+        self.assertEqual(results[0]["fields"], {"Sequence": "Seq", "Shot": "shot_code", "Step": "step_name",
+                                                "name": "foo", "version": 3})
+        self.assertEqual(results[0]["context"]["entity"]["id"], 2)
+        self.assertEqual(results[0]["context"]["step"]["id"], 4)
+        self.assertEqual(results[0]["context"]["task"], None)
+
+        self.assertEqual(results[1]["template"], None)
+        self.assertEqual(results[1]["context"]["entity"], None)
+
+    def test_matches_api(self):
+        paths = [self.work_path, self.step_path, os.path.join(self.step_path, "publish", "foo.v001.ma")]
+        for result in self._resolve(paths):
+            template = self.tk.template_from_path(result["path"])
+            self.assertEqual(result["template"], template.name if template else None)
+            ctx = self.tk.context_from_path(result["path"])
+            self.assertEqual(result["context"]["entity"], ctx.entity)
+            self.assertEqual(result["context"]["step"], ctx.step)
+
+    def test_worker_processes(self):
+        paths = [self.work_path, self.step_path] * 10
+        self.assertEqual(self._resolve(paths, num_processes=2), self._resolve(paths))
+
+    def test_no_multiprocessing(self):
+        paths = [self.work_path, self.step_path] * 10
+        expected = self._resolve(paths)
+        patcher = patch.object(resolve, "multiprocessing", None)
+        patcher.start()
+        try:
+            self.assertEqual(self._resolve(paths, num_processes=2), expected)
+        finally:
+            patcher.stop()
+
+    def test_no_context(self):
+        results = self._resolve([self.work_path], with_context=False)
+        self.assertFalse("context" in results[0])
+
+    def test_walk(self):
+        os.makedirs(os.path.dirname(self.work_path))
+        open(self.work_path, "w").close()
+        paths = list(self.action._get_paths([self.step_path]))
+        self.assertEqual(paths, [self.step_path, os.path.dirname(self.work_path), self.work_path])
+
+    def test_bad_args(self):
+        log = logging.getLogger("test_resolve")
+        self.assertRaises(TankError, self.action.run, log, ["--foo"])
+        self.assertRaises(TankError, self.action.run, log, ["--processes=x"])
+        self.assertRaises(TankError, self.action.run, log, [os.path.join(self.project_root, "no_such_dir")])
@@ -0,0 +1,130 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+# 
+# CONFIDENTIAL AND PROPRIETARY
+# 
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit 
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your 
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights 
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+import sys
+import logging
+
+from mock import Mock, patch
+
+import tank
+from tank import TankError
+from tank_test.tank_test_base import *
+from tank.deploy.tank_commands import shotgun_cache
+
+
+class TestShotgunCache(TankTestBase):
+    
+    def setUp(self):
+        super(TestShotgunCache, self).setUp()
+        self.setup_fixtures()
+
+        app_code = "\n".join(["from tank.platform import Application",
+                              "class CacheTestApp(Application):",
+                              "    def init_app(self):",
+                              "        self.engine.register_command('launch', lambda: None, ",
+                              "                                     {'title': 'Launch', 'deny_permissions': ['Artist']})"])
+        self._write_file("cache_app/app.py", app_code)
+        self._write_file("cache_app/info.yml", "configuration: {}\n")
+
+        env = "\n".join(["engines:",
+                         "    tk-shotgun:",
+                         "        location: {'type': 'dev', 'path': '%s'}" % os.path.join(self.project_config, "test_engine"),
+                         "        debug_logging: false",
+                         "        apps:",
+                         "            cache_app:",
+                         "                location: {'type': 'dev', 'path': '%s'}" % os.path.join(self.project_config, "cache_app"),
+                         ""])
+        self._write_file("env/shotgun_shot.yml", env)
+        self._write_file("env/shotgun_asset.yml", env)
+
+        self.tk = tank.Tank(self.project_root)
+        self.cache_folder = self.tk.pipeline_configuration.get_cache_location()
+        self.log = logging.getLogger("test_shotgun_cache")
+
+    def tearDown(self):
+        for name in ["shotgun_shot.yml", "shotgun_asset.yml", "shotgun_project.yml"]:
+            path = os.path.join(self.project_config, "env", name)
+            if os.path.lexists(path):
+                os.remove(path)
+        for name in os.listdir(self.cache_folder):
+            if name.startswith("shotgun") and name.endswith(".txt"):
+                os.remove(os.path.join(self.cache_folder, name))
+
+    def _write_file(self, path, data):
+        path = os.path.join(self.project_config, path)
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        fh = open(path, "wt")
+        fh.write(data)
+        fh.close()
+
+    def _read_cache_file(self, entity_type):
+        fh = open(os.path.join(self.cache_folder, shotgun_cache.get_cache_file_name(entity_type)), "rb")
+        data = fh.read()
+        fh.close()
+        return data
+
+    def _run(self, *args):
+        action = shotgun_cache.CacheShotgunActionsAction()
+        action.tk = self.tk
+        action.run(self.log, list(args))
+
+    def test_environments(self):
+        self.assertEqual(shotgun_cache.get_shotgun_environments(self.tk), [["asset"], ["shot"]])
+
+    def test_cache_all(self):
+        self._run("--processes=1")
+        self.assertEqual(self._read_cache_file("Shot"), "launch$Launch$Artist$False")
+        self.assertEqual(self._read_cache_file("Asset"), "launch$Launch$Artist$False")
+
+    def test_parallel(self):
+        self._run("--processes=2")
+        self.assertEqual(self._read_cache_file("Shot"), "launch$Launch$Artist$False")
+        self.assertEqual(self._read_cache_file("Asset"), "launch$Launch$Artist$False")
+
+    def test_no_multiprocessing(self):
+        patcher = patch.object(shotgun_cache, "multiprocessing", None)
+        patcher.start()
+        try:
+            self._run("--processes=2")
+        finally:
+            patcher.stop()
+        self.assertEqual(self._read_cache_file("Shot"), "launch$Launch$Artist$False")
+        self.assertEqual(self._read_cache_file("Asset"), "launch$Launch$Artist$False")
+
+    def test_unchanged_files_not_written(self):
+        (written, unchanged) = shotgun_cache.cache_environment(self.tk, ["shot"])
+        self.assertEqual(written, [shotgun_cache.get_cache_file_name("shot")])
+        (written, unchanged) = shotgun_cache.cache_environment(self.tk, ["shot"])
+        self.assertEqual(written, [])
+        self.assertEqual(unchanged, [shotgun_cache.get_cache_file_name("shot")])
+
+    def test_shared_environment(self):
+        if sys.platform == "win32":
+            return
+        os.symlink(os.path.join(self.project_config, "env", "shotgun_shot.yml"),
+                   os.path.join(self.project_config, "env", "shotgun_project.yml"))
+        self.assertEqual(shotgun_cache.get_shotgun_environments(self.tk), [["asset"], ["project", "shot"]])
+
+        patcher = patch("tank.platform.engine.start_shotgun_engine", wraps=tank.platform.engine.start_shotgun_engine)
+        start_mock = patcher.start()
+        try:
+            self._run("--processes=1")
+        finally:
+            patcher.stop()
+        self.assertEqual(start_mock.call_count, 2)
+        # special commands are added for projects
+        self.assertTrue("__core_info" in self._read_cache_file("Project"))
+        self.assertEqual(self._read_cache_file("Shot"), "launch$Launch$Artist$False")
+
+    def test_bad_args(self):
+        self.assertRaises(TankError, self._run, "foo")
+        self.assertRaises(TankError, self._run, "--processes=x")
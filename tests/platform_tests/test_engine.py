@@ -10,14 +10,24 @@
 
 import os
 import unittest2 as unittest
+from mock import Mock, patch
 
 from tank_test.tank_test_base import *
 
 import tank
 from tank.context import Context
 from tank.platform import engine
+from tank.platform import framework
+from tank.platform import application
+from tank.platform import profiler
 from tank.errors import TankError
 
+try:
+    import json
+except ImportError:
+    # python 2.5 - use the simplejson fallback of the shotgun API
+    from tank_vendor.shotgun_api3.sg_25 import json
+
 
 class TestStartEngine(TankTestBase):
     def setUp(self):
@@ -89,4 +99,315 @@ class TestStartEngine(TankTestBase):
         self.assertEqual(engine.context, self.context)
         
         
-         
\ No newline at end of file
+         
+
+class TestSharedFrameworks(TankTestBase):
+    """
+    Tests that framework instances are shared by all items in an engine
+    """
+    def setUp(self):
+        super(TestSharedFrameworks, self).setUp()
+        self.setup_fixtures()
+
+        shot = {"type":"Shot",
+                "name": "shot_name",
+                "id":2,
+                "project": self.project}
+        shot_path = os.path.join(self.project_root, "shot_code")
+        self.add_production_path(shot_path, shot)
+
+        self.test_resource = os.path.join(self.project_root, "tank", "config", "foo", "bar.png")
+        os.makedirs(os.path.dirname(self.test_resource))
+        fh = open(self.test_resource, "wt")
+        fh.write("test")
+        fh.close()
+
+        self.tk = tank.Tank(self.project_root)
+        context = self.tk.context_from_path(shot_path)
+        self.engine = tank.platform.start_engine("test_engine", self.tk, context)
+        self.destroyed = []
+        self.loaded = []
+
+        fw_descriptor = Mock()
+        fw_descriptor.get_version.return_value = "v1.2.3"
+        self.env = Mock()
+        self.env.get_framework_descriptor.return_value = fw_descriptor
+
+        def load_framework(engine_obj, env, fw_instance_name):
+            fw = framework.Framework(engine_obj, fw_descriptor, {})
+            fw.destroy_framework = lambda: self.destroyed.append(fw)
+            self.loaded.append(fw)
+            return fw
+
+        patchers = [patch("tank.platform.framework.load_framework", new=load_framework),
+                    patch("tank.platform.validation.validate_and_return_frameworks",
+                          return_value=["tk-framework-test_v1.x.x"])]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        cur_engine = tank.platform.current_engine()
+        if cur_engine:
+            cur_engine.destroy()
+        os.remove(self.test_resource)
+
+    def _make_parent(self):
+        parent = Mock()
+        parent.frameworks = {}
+        return parent
+
+    def test_shared_instance(self):
+        parents = [self._make_parent() for x in range(3)]
+        for parent in parents:
+            framework.setup_frameworks(self.engine, parent, self.env, None)
+        self.assertEqual(len(self.loaded), 1)
+        fw = self.loaded[0]
+        for parent in parents:
+            self.assertEqual(parent.frameworks.values(), [fw])
+
+    def test_ref_counted_destroy(self):
+        parents = [self._make_parent() for x in range(2)]
+        for parent in parents:
+            framework.setup_frameworks(self.engine, parent, self.env, None)
+        fw = self.loaded[0]
+
+        parents[0].frameworks.values()[0]._destroy_framework()
+        self.assertEqual(self.destroyed, [])
+        parents[1].frameworks.values()[0]._destroy_framework()
+        self.assertEqual(self.destroyed, [fw])
+
+        # once destroyed, a new instance is loaded
+        framework.setup_frameworks(self.engine, self._make_parent(), self.env, None)
+        self.assertEqual(len(self.loaded), 2)
+
+
+class TestLazyAppInit(TankTestBase):
+    """
+    Tests the lazy app initialization mode of the engine
+    """
+    def setUp(self):
+        super(TestLazyAppInit, self).setUp()
+        self.setup_fixtures()
+
+        shot = {"type":"Shot",
+                "name": "shot_name",
+                "id":2,
+                "project": self.project}
+        shot_path = os.path.join(self.project_root, "shot_code")
+        self.add_production_path(shot_path, shot)
+
+        app_code = "\n".join(["from tank.platform import Application",
+                              "class LazyTestApp(Application):",
+                              "    def init_app(self):",
+                              "        self.engine.register_command(self.get_setting('command'), ",
+                              "                                     lambda: self.instance_name, ",
+                              "                                     {'type': 'test', 'app_object': self})"])
+        app_manifest = "configuration:\n    command: {type: str}\n"
+
+        self._write_file("declared_app/app.py", app_code)
+        self._write_file("declared_app/info.yml", app_manifest + "commands:\n    - name: declared_cmd\n")
+        self._write_file("undeclared_app/app.py", app_code)
+        self._write_file("undeclared_app/info.yml", app_manifest)
+
+        env = "\n".join(["engines:",
+                         "    test_engine:",
+                         "        location: {'type': 'dev', 'path': '%s'}" % os.path.join(self.project_config, "test_engine"),
+                         "        debug_logging: false",
+                         "        lazy_app_init: true",
+                         "        apps:",
+                         "            declared:",
+                         "                location: {'type': 'dev', 'path': '%s'}" % os.path.join(self.project_config, "declared_app"),
+                         "                command: declared_cmd",
+                         "            undeclared:",
+                         "                location: {'type': 'dev', 'path': '%s'}" % os.path.join(self.project_config, "undeclared_app"),
+                         "                command: undeclared_cmd",
+                         ""])
+        self._write_file("env/test.yml", env)
+
+        self.tk = tank.Tank(self.project_root)
+        self.context = self.tk.context_from_path(shot_path)
+
+    def _write_file(self, path, data):
+        path = os.path.join(self.project_config, path)
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        fh = open(path, "wt")
+        fh.write(data)
+        fh.close()
+
+    def tearDown(self):
+        cur_engine = tank.platform.current_engine()
+        if cur_engine:
+            cur_engine.destroy()
+
+    def test_lazy_init(self):
+        engine = tank.platform.start_engine("test_engine", self.tk, self.context)
+
+        # the app which declares its commands is not initialized
+        self.assertIsInstance(engine.apps["declared"], application.LazyApplication)
+        self.assertEqual(engine.apps["declared"].name, "declared_app")
+        self.assertIsInstance(engine.apps["undeclared"], application.Application)
+        self.assertEqual(sorted(engine.commands.keys()), ["declared_cmd", "undeclared_cmd"])
+
+        # running the command initializes the app
+        self.assertEqual(engine.commands["declared_cmd"]["callback"](), "declared")
+        self.assertIsInstance(engine.apps["declared"], application.Application)
+        self.assertEqual(engine.commands["declared_cmd"]["properties"]["type"], "test")
+        self.assertIs(engine.commands["declared_cmd"]["properties"]["app"], engine.apps["declared"])
+
+    def test_cached_commands(self):
+        engine = tank.platform.start_engine("test_engine", self.tk, self.context)
+        engine.destroy()
+
+        # the second time round, the commands for both apps are known
+        engine = tank.platform.start_engine("test_engine", self.tk, self.context)
+        self.assertIsInstance(engine.apps["undeclared"], application.LazyApplication)
+        command = engine.commands["undeclared_cmd"]
+        self.assertEqual(command["properties"]["type"], "test")
+        self.assertFalse("app_object" in command["properties"])
+        self.assertEqual(command["callback"](), "undeclared")
+        self.assertIsInstance(engine.apps["undeclared"], application.Application)
+
+    def test_cached_commands_per_context(self):
+        engine = tank.platform.start_engine("test_engine", self.tk, self.context)
+        engine.destroy()
+
+        # the commands were recorded for a shot context, so the app
+        # has to be initialized to find its commands in a project context
+        project_context = self.tk.context_from_path(self.project_root)
+        engine = tank.platform.start_engine("test_engine", self.tk, project_context)
+        self.assertIsInstance(engine.apps["undeclared"], application.Application)
+        engine.destroy()
+
+        engine = tank.platform.start_engine("test_engine", self.tk, project_context)
+        self.assertIsInstance(engine.apps["undeclared"], application.LazyApplication)
+        engine.destroy()
+
+        engine = tank.platform.start_engine("test_engine", self.tk, self.context)
+        self.assertIsInstance(engine.apps["undeclared"], application.LazyApplication)
+
+    def test_accessing_app_initializes_it(self):
+        engine = tank.platform.start_engine("test_engine", self.tk, self.context)
+        self.assertEqual(engine.apps["declared"].get_setting("command"), "declared_cmd")
+        self.assertIsInstance(engine.apps["declared"], application.Application)
+
+
+class TestStartupProfiler(TankTestBase):
+    """
+    Tests profiling of engine startup
+    """
+    def setUp(self):
+        super(TestStartupProfiler, self).setUp()
+        self.setup_fixtures()
+
+        # the test app needs a shot step context
+        seq = {"type":"Sequence", "name":"seq_name", "id":3}
+        seq_path = os.path.join(self.project_root, "sequences/Seq")
+        self.add_production_path(seq_path, seq)
+        shot = {"type":"Shot",
+                "name": "shot_name",
+                "id":2,
+                "project": self.project}
+        shot_path = os.path.join(seq_path, "shot_code")
+        self.add_production_path(shot_path, shot)
+        step = {"type":"Step", "name":"step_name", "id":4}
+        step_path = os.path.join(shot_path, "step_name")
+        self.add_production_path(step_path, step)
+
+        # icon used by the test app
+        self.test_resource = os.path.join(self.project_config, "foo", "bar.png")
+        os.makedirs(os.path.dirname(self.test_resource))
+        fh = open(self.test_resource, "wt")
+        fh.write("test")
+        fh.close()
+
+        self.tk = tank.Tank(self.project_root)
+        self.context = self.tk.context_from_path(step_path)
+        self.trace_path = os.path.join(self.tank_temp, "startup_trace.json")
+
+    def tearDown(self):
+        cur_engine = tank.platform.current_engine()
+        if cur_engine:
+            cur_engine.destroy()
+        if "TANK_PROFILE_STARTUP" in os.environ:
+            del os.environ["TANK_PROFILE_STARTUP"]
+        os.remove(self.test_resource)
+        if os.path.exists(self.trace_path):
+            os.remove(self.trace_path)
+
+    def test_disabled(self):
+        tank.platform.start_engine("test_engine", self.tk, self.context)
+        self.assertFalse(os.path.exists(self.trace_path))
+        self.assertEqual(profiler.g_current_profiler, None)
+        # phases are no-ops when not profiling
+        profiler.begin_phase("foo")
+        profiler.end_phase()
+
+    def test_chrome_trace(self):
+        os.environ["TANK_PROFILE_STARTUP"] = self.trace_path
+        tank.platform.start_engine("test_engine", self.tk, self.context)
+        self.assertTrue(os.path.exists(self.trace_path))
+
+        fh = open(self.trace_path, "rt")
+        trace = json.load(fh)
+        fh.close()
+
+        events = [x for x in trace["traceEvents"] if x["ph"] == "X"]
+        names = [x["name"] for x in events]
+        for name in ["validate_settings", "setup_frameworks", "init_engine", "load_apps",
+                     "test_app", "init_app", "post_app_init", "engine_init_hook"]:
+            self.assertIn(name, names)
+
+        app_event = [x for x in events if x["name"] == "test_app"][0]
+        self.assertEqual(app_event["cat"], "app")
+        self.assertIn("sg_calls", app_event["args"])
+
+        # the app init is nested within the app phase
+        init_app = [x for x in events if x["name"] == "init_app"][0]
+        self.assertTrue(init_app["ts"] >= app_event["ts"])
+        self.assertTrue(init_app["ts"] + init_app["dur"] <= app_event["ts"] + app_event["dur"])
+
+        # profiling ends with the engine startup
+        self.assertEqual(profiler.g_current_profiler, None)
+
+    def test_failed_startup(self):
+        os.environ["TANK_PROFILE_STARTUP"] = self.trace_path
+        profilers = []
+        start = profiler.start
+        def start_profiler(name, tk):
+            profilers.append(start(name, tk))
+            return profilers[-1]
+        start_patcher = patch("tank.platform.profiler.start", start_profiler)
+        validate_patcher = patch("tank.platform.validation.validate_settings",
+                                 Mock(side_effect=TankError("failed")))
+        start_patcher.start()
+        validate_patcher.start()
+        try:
+            self.assertRaises(TankError, tank.platform.start_engine, "test_engine", self.tk, self.context)
+        finally:
+            validate_patcher.stop()
+            start_patcher.stop()
+
+        # the profiler stops recording shotgun calls
+        self.assertEqual(profiler.g_current_profiler, None)
+        self.assertEqual(len(profilers), 1)
+        self.assertEqual(profilers[0]._measurement, None)
+        self.assertFalse(os.path.exists(self.trace_path))
+
+    def test_summary(self):
+        prof = profiler.StartupProfiler("test")
+        prof.begin_phase("outer")
+        prof.begin_phase("inner", "app")
+        prof.end_phase()
+        prof.end_phase()
+        prof.begin_phase("broken")
+        prof.end_phase(failed=True)
+        # unbalanced calls are ignored
+        prof.end_phase()
+        prof.stop()
+        lines = prof.format_summary().split("\n")
+        self.assertTrue(lines[0].startswith("test:"))
+        self.assertTrue(lines[2].startswith("outer "))
+        self.assertTrue(lines[3].startswith("  inner (app) "))
+        self.assertTrue(lines[4].startswith("broken [failed] "))
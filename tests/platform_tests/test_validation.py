@@ -1,9 +1,11 @@
 import tank
 import tank.platform.constants
+from mock import patch
 from tank.errors import TankError
 from tank.templatekey import StringKey
 from tank_test.tank_test_base import *
 from tank.platform.validation import *
+from tank.platform.validation import g_validated_settings
 from tank.platform.environment import Environment
 
 class TestValidateSchema(TankTestBase):
@@ -341,6 +343,117 @@ class TestValidateSettings(TankTestBase):
         self.check_error_message(TankError, expected_msg, validate_settings, self.app_name, self.tk, self.context, schema, settings)
 
 
+class TestValidationCache(TankTestBase):
+    """
+    Tests the caching of settings validation results
+    """
+    def setUp(self):
+        super(TestValidationCache, self).setUp()
+        shot = {"type":"Shot",
+                "name": "shot_name",
+                "id":2,
+                "project": self.project}
+        shot_path = os.path.join(self.project_root, "shot_code")
+        self.add_production_path(shot_path, shot)
+
+        self.tk = tank.Tank(self.project_root)
+        self.context = self.tk.context_from_path(shot_path)
+        self.app_name = "test_app"
+        clear_validation_cache(self.tk)
+
+        keys = {"Shot": StringKey("Shot")}
+        template = tank.template.TemplatePath("name-{Shot}-{name}", dict(keys, name=StringKey("name")), self.project_root)
+        self.tk.templates = {"template_name": template}
+        self.schema = {"this_template": {"type": "template", "required_fields": []}}
+        self.settings = {"this_template": "template_name"}
+
+        patcher = patch("tank.platform.validation._SettingsValidator.validate")
+        self.validate_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        os.environ.pop(tank.platform.constants.FORCE_FULL_VALIDATION_ENV_VAR, None)
+        super(TestValidationCache, self).tearDown()
+
+    def test_cached(self):
+        validate_settings(self.app_name, self.tk, self.context, self.schema, self.settings)
+        validate_settings(self.app_name, self.tk, self.context, self.schema, self.settings)
+        self.assertEqual(self.validate_mock.call_count, 1)
+
+        # the cache is persisted on disk
+        g_validated_settings.clear()
+        validate_settings(self.app_name, self.tk, self.context, self.schema, self.settings)
+        self.assertEqual(self.validate_mock.call_count, 1)
+
+    def test_failures_not_cached(self):
+        self.validate_mock.side_effect = TankError("invalid")
+        self.assertRaises(TankError, validate_settings, self.app_name, self.tk, self.context, self.schema, self.settings)
+        self.assertRaises(TankError, validate_settings, self.app_name, self.tk, self.context, self.schema, self.settings)
+        self.assertEqual(self.validate_mock.call_count, 2)
+
+    def test_invalidation(self):
+        keys = {"Shot": StringKey("Shot")}
+        validate_settings(self.app_name, self.tk, self.context, self.schema, self.settings)
+
+        # different settings
+        validate_settings(self.app_name, self.tk, self.context, self.schema, {"this_template": "other_name"})
+        self.assertEqual(self.validate_mock.call_count, 2)
+
+        # different templates
+        template = tank.template.TemplatePath("name-{Shot}", keys, self.project_root)
+        self.tk.templates = {"template_name": template}
+        validate_settings(self.app_name, self.tk, self.context, self.schema, self.settings)
+        self.assertEqual(self.validate_mock.call_count, 3)
+
+        # different context shape
+        validate_settings(self.app_name, self.tk, self.tk.context_from_path(self.project_root), self.schema, self.settings)
+        self.assertEqual(self.validate_mock.call_count, 4)
+
+    def test_templates_changed_in_place(self):
+        validate_settings(self.app_name, self.tk, self.context, self.schema, self.settings)
+        keys = {"Shot": StringKey("Shot")}
+        self.tk.templates["template_name"] = tank.template.TemplatePath("name-{Shot}", keys, self.project_root)
+        validate_settings(self.app_name, self.tk, self.context, self.schema, self.settings)
+        self.assertEqual(self.validate_mock.call_count, 2)
+
+    def test_nested_config_resources(self):
+        resource = os.path.join(self.project_config, "foo", "bar.png")
+        os.makedirs(os.path.dirname(resource))
+        open(resource, "w").close()
+        schema = {"icons": {"type": "list", "values": {"type": "config_path"}}}
+        settings = {"icons": ["foo/bar.png"]}
+        validate_settings(self.app_name, self.tk, self.context, schema, settings)
+        validate_settings(self.app_name, self.tk, self.context, schema, settings)
+        self.assertEqual(self.validate_mock.call_count, 1)
+
+        # the resource goes away, the folders are left untouched
+        os.remove(resource)
+        validate_settings(self.app_name, self.tk, self.context, schema, settings)
+        self.assertEqual(self.validate_mock.call_count, 2)
+
+    def test_hooks(self):
+        schema = {"hook": {"type": "hook"}}
+        settings = {"hook": "validation_test_hook"}
+        validate_settings(self.app_name, self.tk, self.context, schema, settings)
+        
+        hooks_folder = self.tk.pipeline_configuration.get_hooks_location()
+        if not os.path.exists(hooks_folder):
+            os.makedirs(hooks_folder)
+        hook_path = os.path.join(hooks_folder, "validation_test_hook.py")
+        open(hook_path, "w").close()
+        try:
+            validate_settings(self.app_name, self.tk, self.context, schema, settings)
+        finally:
+            os.remove(hook_path)
+        self.assertEqual(self.validate_mock.call_count, 2)
+
+    def test_force_full_validation(self):
+        os.environ[tank.platform.constants.FORCE_FULL_VALIDATION_ENV_VAR] = "1"
+        validate_settings(self.app_name, self.tk, self.context, self.schema, self.settings)
+        validate_settings(self.app_name, self.tk, self.context, self.schema, self.settings)
+        self.assertEqual(self.validate_mock.call_count, 2)
+
+
 class TestValidateContext(TankTestBase):
     """Tests related to validating context through the config.validate_and_populate_config function. 
 
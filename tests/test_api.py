@@ -305,8 +305,42 @@ class TestAbstractPathsFromTemplate(TankTestBase):
         self.assertEquals(set(expected), set(result))
 
 
+    def test_one_parse_per_sequence(self):
+        patcher = patch.object(self.template, "get_fields", wraps=self.template.get_fields)
+        get_fields = patcher.start()
+        try:
+            result = self.tk.abstract_paths_from_template(self.template, {"Shot": "AAA"})
+        finally:
+            patcher.stop()
+        self.assertEquals(2, len(result))
+        # one of the 8 files for each name is parsed
+        self.assertEquals(2, get_fields.call_count)
+
+    def test_frame_ranges(self):
+        self.create_file(os.path.join(self.shot_a_path, "left", "filename.0006.exr"))
+        expected = {os.path.join(self.shot_a_path, "%V", "filename.%04d.exr"): (1, 6, [5]),
+                    os.path.join(self.shot_a_path, "%V", "anothername.%04d.exr"): (1, 4, [])}
+        result = self.tk.frame_ranges_from_template(self.template, {"Shot": "AAA"})
+        self.assertEquals(expected, result)
+
+    def test_frame_ranges_specify_eye(self):
+        self.create_file(os.path.join(self.shot_a_path, "right", "filename.0006.exr"))
+        expected = {os.path.join(self.shot_a_path, "left", "filename.%04d.exr"): (1, 4, [])}
+        result = self.tk.frame_ranges_from_template(self.template, {"Shot": "AAA", 
+                                                                    "eye": "left", 
+                                                                    "name": "filename"})
+        self.assertEquals(expected, result)
+
+    def test_frame_ranges_without_frames(self):
+        keys = {"Shot": StringKey("Shot"), "name": StringKey("name")}
+        template = TemplatePath("sequences/SEQ_001/{Shot}/left/{name}.0001.exr", keys, self.project_root)
+        expected = {os.path.join(self.shot_a_path, "left", "filename.0001.exr"): None}
+        result = self.tk.frame_ranges_from_template(template, {"Shot": "AAA", "name": "filename"})
+        self.assertEquals(expected, result)
+
+
 class TestPathsFromTemplateGlob(TankTestBase):
-    """Tests for Tank.paths_from_template method which check the string sent to glob.glob."""
+    """Tests for Tank.paths_from_template method which check the glob string searched for."""
     def setUp(self):
         super(TestPathsFromTemplateGlob, self).setUp()
         self.tk = Tank(self.project_root)
@@ -316,16 +350,17 @@ class TestPathsFromTemplateGlob(TankTestBase):
 
         self.template = TemplatePath("{Shot}/{version}/filename.{seq_num}", keys, root_path=self.project_root)
 
-    @patch("tank.api.glob.iglob")
-    def assert_glob(self, fields, expected_glob, skip_keys, mock_glob):
-        # want to ensure that value returned from glob is returned
+    @patch("tank.template_search.find_paths")
+    def assert_glob(self, fields, expected_glob, skip_keys, mock_find_paths):
+        # want to ensure that value returned from the search is returned
         expected = [os.path.join(self.project_root, "shot_1","001","filename.00001")]
-        mock_glob.return_value = expected
+        mock_find_paths.return_value = expected
         retval = self.tk.paths_from_template(self.template, fields, skip_keys=skip_keys)
         self.assertEquals(expected, retval)
-        # Check glob string
+        # Check the glob string the search is equivalent to
         expected_glob = os.path.join(self.project_root, expected_glob)
-        glob_actual = [x[0][0] for x in mock_glob.call_args_list][0]
+        (template, search_fields, ignore_types) = mock_find_paths.call_args_list[0][0]
+        glob_actual = template._apply_fields(search_fields, ignore_types=ignore_types)
         self.assertEquals(expected_glob, glob_actual)
 
     def test_fully_qualified(self):
@@ -9,6 +9,8 @@
 # not expressly granted therein are reserved by Shotgun Software Inc.
 
 import os
+import copy
+import sqlite3
 
 from tank_test.tank_test_base import *
 
@@ -118,6 +120,53 @@ class TestEq(TestContext):
         self.assertTrue(context_1 == context_2)
         self.assertFalse(context_1 != context_2)
 
+
+class TestEntityRefs(TestContext):
+    def setUp(self):
+        super(TestEntityRefs, self).setUp()
+        self.kws = {}
+        self.kws["tk"] = self.tk
+        self.kws["project"] = self.project
+        self.kws["entity"] = self.shot
+        self.kws["step"] = self.step
+        self.kws["task"] = {"id": 45, "type": "Task"}
+        self.kws["user"] = self.other_user
+
+    def test_shared(self):
+        context_1 = context.Context(**self.kws)
+        context_2 = context.Context(**self.kws)
+        self.assertTrue(context_1.step is context_2.step)
+        self.assertTrue(context_1.task is context_2.task)
+        self.assertTrue(context_1.user is context_2.user)
+        self.assertEquals(self.step, context_1.step)
+
+    def test_immutable(self):
+        ctx = context.Context(**self.kws)
+        def set_item():
+            ctx.step["name"] = "other"
+        self.assertRaises(TypeError, set_item)
+        self.assertRaises(AttributeError, setattr, ctx, "foo", "bar")
+
+    def test_hashable(self):
+        ctx = context.Context(**self.kws)
+        contexts_by_task = {ctx.task: ctx}
+        self.assertTrue(contexts_by_task[context.Context(**self.kws).task] is ctx)
+
+    def test_deepcopy(self):
+        ctx = context.Context(additional_entities=[self.seq], **self.kws)
+        ctx_copy = copy.deepcopy(ctx)
+        self.assertEquals(ctx, ctx_copy)
+        self.assertTrue(ctx.step is ctx_copy.step)
+        self.assertTrue(ctx.additional_entities[0] is ctx_copy.additional_entities[0])
+
+    def test_copy_for_user(self):
+        ctx = context.Context(**self.kws)
+        ctx_copy = ctx.create_copy_for_user(dict(self.current_user))
+        self.assertEquals(self.current_user, ctx_copy.user)
+        self.assertEquals(self.other_user, ctx.user)
+        self.assertTrue(ctx.task is ctx_copy.task)
+
+
 class TestUser(TestContext):
     def setUp(self):
         super(TestUser, self).setUp()
@@ -229,6 +278,109 @@ class TestFromPath(TestContext):
 
 
 
+class TestFromPathCache(TestContext):
+    """
+    Tests the caching of path cache lookups by context_from_path
+    """
+
+    def setUp(self):
+        super(TestFromPathCache, self).setUp()
+        self.file_paths = [os.path.join(self.step_path, "file_%d.ma" % x) for x in range(5)]
+        self.other_path = os.path.join(self.project_root, "misc", "file.ma")
+
+    def _assert_no_lookups(self, path):
+        """
+        Resolves a path and checks that the path cache wasn't opened
+        """
+        patcher = patch("tank.context.PathCache")
+        path_cache_class = patcher.start()
+        try:
+            result = self.tk.context_from_path(path)
+        finally:
+            patcher.stop()
+        self.assertFalse(path_cache_class.called)
+        return result
+
+    def test_sibling_files(self):
+        result = self.tk.context_from_path(self.file_paths[0])
+        self.assertEquals(self.shot["id"], result.entity["id"])
+        self.assertEquals(self.step["id"], result.step["id"])
+        for path in self.file_paths[1:]:
+            self.assertEquals(result, self._assert_no_lookups(path))
+
+    def test_negative_results(self):
+        result = self.tk.context_from_path(self.other_path)
+        self.assertIsNone(result.entity)
+        self.assertEquals(self.project["id"], result.project["id"])
+        result = self._assert_no_lookups(self.other_path)
+        self.assertIsNone(result.entity)
+
+    def test_one_query_per_folder(self):
+        tk = tank.Tank(self.project_root)
+        patcher = patch("tank.path_cache.PathCache.get_child_entities", 
+                        side_effect=context.PathCache.get_child_entities, 
+                        autospec=True)
+        get_child_entities = patcher.start()
+        try:
+            for path in self.file_paths:
+                tk.context_from_path(path)
+        finally:
+            patcher.stop()
+        # one query for the step folder and one for each of its parents
+        # up to the project root, which is looked up on its own.
+        self.assertEquals(5, get_child_entities.call_count)
+
+    def test_additional_entities_hook(self):
+        # the hook is consulted for every context, even when the
+        # folder lookups come from the cache
+        self.tk.context_from_path(self.file_paths[0])
+        hook_data = {"entity_types_in_path": ["Shot"], "entity_fields_on_task": []}
+        patcher = patch.object(self.tk, "execute_hook", return_value=hook_data)
+        execute_hook = patcher.start()
+        try:
+            result = self.tk.context_from_path(self.file_paths[1])
+        finally:
+            patcher.stop()
+        self.assertEquals(1, execute_hook.call_count)
+        self.assertEquals([self.shot["id"]], [x["id"] for x in result.additional_entities])
+
+    def test_invalidated_by_new_folders(self):
+        shot_path = os.path.join(self.seq_path, "shot_new")
+        file_path = os.path.join(shot_path, "file.ma")
+        result = self.tk.context_from_path(file_path)
+        self.assertEquals(self.seq, result.entity)
+
+        shot = {"type": "Shot", "name": "shot_new", "id": 5, "project": self.project}
+        self.add_production_path(shot_path, shot)
+        result = self.tk.context_from_path(file_path)
+        self.assertEquals(shot["id"], result.entity["id"])
+
+    def test_invalidated_by_other_processes(self):
+        result = self.tk.context_from_path(self.other_path)
+        self.assertIsNone(result.entity)
+
+        # simulate another process writing to the path cache
+        db = sqlite3.connect(self.tk.pipeline_configuration.get_path_cache_location())
+        db.execute("INSERT INTO path_cache VALUES(?, ?, ?, ?, ?, ?)", 
+                   ("Asset", 6, "misc", "primary", "/misc", True))
+        db.commit()
+        db.close()
+        result = self.tk.context_from_path(self.other_path)
+        self.assertEquals({"type": "Asset", "id": 6, "name": "misc"}, result.entity)
+
+    def test_same_as_uncached(self):
+        paths = self.file_paths + [self.other_path, 
+                                   self.step_path, 
+                                   self.other_user_path,
+                                   self.alt_1_step_path,
+                                   self.project_root,
+                                   os.path.dirname(self.project_root)]
+        uncached_tk = tank.Tank(self.project_root)
+        uncached_tk._folder_entity_cache = context.FolderEntityCache(uncached_tk.pipeline_configuration, 0)
+        for path in paths + paths:
+            self.assertEquals(uncached_tk.context_from_path(path), self.tk.context_from_path(path))
+
+
 class TestFromPathWithPrevious(TestContext):
 
     def get_task_context(self):
@@ -445,6 +597,87 @@ class TestFromEntity(TestContext):
         self.assertEquals(first_entity["name"], second_entity["name"])
 
 
+class TestFromEntities(TestContext):
+
+    def setUp(self):
+        super(TestFromEntities, self).setUp()
+
+        self.task = {"id": 1,
+                     "type": "Task",
+                     "content": "task_content",
+                     "project": self.project,
+                     "entity": self.shot,
+                     "step": self.step}
+        self.add_to_sg_mock_db(self.task)
+        self.task_2 = {"id": 5,
+                       "type": "Task",
+                       "content": "other_content",
+                       "project": self.project,
+                       "entity": self.shot,
+                       "step": self.step}
+        self.add_to_sg_mock_db(self.task_2)
+
+        self.shot_2 = {"type":"Shot",
+                       "name": "shot_name_2",
+                       "id":6,
+                       "project": self.project}
+        self.shot_2_path = os.path.join(self.seq_path, "shot_code_2")
+        self.add_production_path(self.shot_2_path, self.shot_2)
+        step_path = os.path.join(self.shot_2_path, "step_short_name")
+        self.add_production_path(step_path, self.step)
+
+    @patch("tank.util.login.get_current_user")
+    def test_entities_from_cache(self, get_current_user):
+        get_current_user.return_value = self.current_user
+        
+        results = self.tk.contexts_from_entities("Shot", [self.shot["id"], self.shot_2["id"], 13])
+        self.assertEqual(set(results.keys()), set([self.shot["id"], self.shot_2["id"], 13]))
+        for (entity_id, result) in results.items():
+            self.assertEqual(result, context.from_entity(self.tk, "Shot", entity_id))
+        self.assertEqual(results[self.shot_2["id"]].entity["name"], "shot_name_2")
+
+    @patch("tank.util.login.get_current_user")
+    def test_tasks_from_sg(self, get_current_user):
+        get_current_user.return_value = self.current_user
+        
+        self.sg_mock.find.reset_mock()
+        self.sg_mock.find_one.reset_mock()
+
+        results = self.tk.contexts_from_entities("Task", [self.task["id"], self.task_2["id"], self.task["id"]])
+        self.assertEqual(len(results), 2)
+        
+        # a single query for all tasks
+        self.assertEqual(self.sg_mock.find.call_count, 1)
+        self.assertFalse(self.sg_mock.find_one.called)
+
+        for (task_id, result) in results.items():
+            self.assertEqual(result, context.from_entity(self.tk, "Task", task_id))
+        self.assertEqual(results[self.task_2["id"]].task["name"], "other_content")
+
+    def test_missing_task(self):
+        self.assertRaises(TankError, self.tk.contexts_from_entities, "Task", [self.task["id"], 13])
+
+    @patch("tank.util.login.get_current_user")
+    def test_published_files(self, get_current_user):
+        get_current_user.return_value = self.current_user
+
+        self.add_to_sg_mock_db({"type": "PublishedFile", "id": 20, "task": self.task, "entity": self.shot})
+        self.add_to_sg_mock_db({"type": "PublishedFile", "id": 21, "task": None, "entity": self.shot_2})
+        self.add_to_sg_mock_db({"type": "PublishedFile", "id": 22, "project": self.project})
+        self.add_to_sg_mock_db({"type": "PublishedFile", "id": 23})
+
+        results = self.tk.contexts_from_entities("PublishedFile", [20, 21, 22, 23])
+        self.assertEqual(results[20].task["id"], self.task["id"])
+        self.assertEqual(results[21].entity["id"], self.shot_2["id"])
+        self.assertEqual(results[22].project["id"], self.project["id"])
+        self.assertEqual(results[22].entity, None)
+        self.assertEqual(results[23].project, None)
+
+    def test_empty(self):
+        self.assertEqual(self.tk.contexts_from_entities("Shot", []), {})
+        self.assertRaises(TankError, self.tk.contexts_from_entities, "Shot", [1, None])
+
+
 class TestAsTemplateFields(TestContext):
     def setUp(self):
         super(TestAsTemplateFields, self).setUp()
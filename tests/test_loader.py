@@ -0,0 +1,114 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+# 
+# CONFIDENTIAL AND PROPRIETARY
+# 
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit 
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your 
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights 
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+import time
+
+from mock import patch
+from tank_test.tank_test_base import *
+
+from tank import loader
+from tank import Hook
+from tank import TankError
+
+class TestLoadPlugin(TankTestBase):
+    def setUp(self):
+        super(TestLoadPlugin, self).setUp()
+        self.plugin_dir = os.path.join(self.tank_temp, "loader_plugins")
+        self.cache_dir = os.path.join(self.tank_temp, "loader_cache")
+        if not os.path.exists(self.plugin_dir):
+            os.makedirs(self.plugin_dir)
+        loader.clear_plugin_cache()
+
+    def tearDown(self):
+        if loader.BYTECODE_CACHE_ENV_VAR in os.environ:
+            del os.environ[loader.BYTECODE_CACHE_ENV_VAR]
+        loader.clear_plugin_cache()
+
+    def _write_plugin(self, name, code, mtime=None):
+        path = os.path.join(self.plugin_dir, name)
+        fh = open(path, "wt")
+        fh.write(code)
+        fh.close()
+        if mtime:
+            os.utime(path, (mtime, mtime))
+        return path
+
+    def test_load(self):
+        path = self._write_plugin("plugin.py", "from tank import Hook\nclass MyHook(Hook):\n    value = 1\n")
+        cls = loader.load_plugin(path, Hook)
+        self.assertEqual(cls.__name__, "MyHook")
+        self.assertEqual(cls.value, 1)
+
+        # each load gives a new module
+        self.assertNotEqual(loader.load_plugin(path, Hook), cls)
+
+    def test_code_cached(self):
+        path = self._write_plugin("cached.py", "from tank import Hook\nclass MyHook(Hook):\n    value = 1\n")
+        loader.load_plugin(path, Hook)
+        patcher = patch("__builtin__.compile")
+        compile_mock = patcher.start()
+        try:
+            cls = loader.load_plugin(path, Hook)
+        finally:
+            patcher.stop()
+        self.assertFalse(compile_mock.called)
+        self.assertEqual(cls.value, 1)
+
+    def test_modified_file_reloaded(self):
+        mtime = time.time() - 100
+        path = self._write_plugin("modified.py", "from tank import Hook\nclass MyHook(Hook):\n    value = 1\n", mtime)
+        self.assertEqual(loader.load_plugin(path, Hook).value, 1)
+        path = self._write_plugin("modified.py", "from tank import Hook\nclass MyHook(Hook):\n    value = 2\n", mtime + 10)
+        self.assertEqual(loader.load_plugin(path, Hook).value, 2)
+
+    def test_disk_cache(self):
+        os.environ[loader.BYTECODE_CACHE_ENV_VAR] = self.cache_dir
+        path = self._write_plugin("disk.py", "from tank import Hook\nclass MyHook(Hook):\n    value = 1\n")
+        loader.load_plugin(path, Hook)
+        self.assertTrue(os.path.exists(loader._get_disk_cache_path(path)))
+
+        # a new session picks up the compiled code from disk
+        loader.clear_plugin_cache()
+        patcher = patch("__builtin__.compile")
+        compile_mock = patcher.start()
+        try:
+            cls = loader.load_plugin(path, Hook)
+        finally:
+            patcher.stop()
+        self.assertFalse(compile_mock.called)
+        self.assertEqual(cls.value, 1)
+
+    def test_disk_cache_write_failure(self):
+        # the cache location is a file, so the cache can't be written
+        cache_file = os.path.join(self.tank_temp, "loader_cache_file")
+        fh = open(cache_file, "wt")
+        fh.close()
+        try:
+            os.environ[loader.BYTECODE_CACHE_ENV_VAR] = cache_file
+            path = self._write_plugin("unwritable.py", "from tank import Hook\nclass MyHook(Hook):\n    value = 1\n")
+            self.assertEqual(loader.load_plugin(path, Hook).value, 1)
+            self.assertFalse(os.path.exists(loader._get_disk_cache_path(path)))
+        finally:
+            os.remove(cache_file)
+
+    def test_class_not_defined_in_file(self):
+        # classes which aren't defined by a class statement in the file are still found
+        path = self._write_plugin("dynamic.py", "from tank import Hook\nMyHook = type('MyHook', (Hook,), {'value': 3})\n")
+        self.assertEqual(loader.load_plugin(path, Hook).value, 3)
+
+    def test_errors(self):
+        path = self._write_plugin("syntax.py", "class MyHook(Hook:\n")
+        self.assertRaises(TankError, loader.load_plugin, path, Hook)
+        path = self._write_plugin("no_class.py", "x = 1\n")
+        self.assertRaises(TankError, loader.load_plugin, path, Hook)
+        path = self._write_plugin("two_classes.py", "from tank import Hook\nclass A(Hook): pass\nclass B(Hook): pass\n")
+        self.assertRaises(TankError, loader.load_plugin, path, Hook)
+        self.assertRaises(TankError, loader.load_plugin, os.path.join(self.plugin_dir, "missing.py"), Hook)
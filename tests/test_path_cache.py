@@ -11,6 +11,8 @@
 import os
 import sqlite3
 
+from mock import patch
+
 from tank_test.tank_test_base import *
 
 from tank import path_cache
@@ -259,6 +261,42 @@ class TestGetPaths(TestPathCache):
         self.assertIn(self.project_root, result)
         self.assertIn(self.alt_root_1, result)
 
+class TestBulkQueries(TestPathCache):
+    def setUp(self):
+        super(TestBulkQueries, self).setUp()
+        self.path_cache.add_mapping("Project", self.project["id"], self.project["name"], self.project_root)
+        self.shot_paths = {}
+        for shot_id in range(1, 8):
+            shot_path = os.path.join(self.project_root, "seq", "shot_%d" % shot_id)
+            self.path_cache.add_mapping("Shot", shot_id, "shot_%d" % shot_id, shot_path)
+            self.shot_paths[shot_id] = shot_path
+
+    def test_get_paths_for_entities(self):
+        patcher = patch("tank.path_cache.MAX_QUERY_PARAMETERS", 3)
+        patcher.start()
+        try:
+            result = self.path_cache.get_paths_for_entities("Shot", [1, 2, 3, 4, 5, 999])
+        finally:
+            patcher.stop()
+        self.assertEqual(sorted(result.keys()), [1, 2, 3, 4, 5])
+        for (shot_id, paths) in result.items():
+            self.assertEqual(paths, self.path_cache.get_paths("Shot", shot_id))
+
+    def test_get_entities(self):
+        paths = self.shot_paths.values() + [self.project_root, 
+                                            os.path.join(self.project_root, "seq"),
+                                            os.path.join("path", "not", "in", "project")]
+        patcher = patch("tank.path_cache.MAX_QUERY_PARAMETERS", 3)
+        patcher.start()
+        try:
+            result = self.path_cache.get_entities(paths)
+        finally:
+            patcher.stop()
+        self.assertEqual(len(result), len(paths))
+        for path in paths:
+            self.assertEqual(result[path], self.path_cache.get_entity(path))
+
+
 class Test_SeperateRoots(TestPathCache):
     def test_different_case(self):
         """
@@ -10,12 +10,15 @@
 
 import sys
 import os
+import copy
+
+from mock import patch
 
 import tank
 from tank import TankError
 from tank_test.tank_test_base import *
 from tank.template import Template, TemplatePath, TemplateString
-from tank.template import make_template_paths, make_template_strings, read_templates
+from tank.template import make_template_paths, make_template_strings, read_templates, load_templates
 from tank.templatekey import (TemplateKey, StringKey, IntegerKey, SequenceKey)
 
 class TestTemplate(TankTestBase):
@@ -367,3 +370,88 @@ class TestReadTemplates(TankTestBase):
         self.assertEquals(["Seq", "Shot"], key.exclusions)
 
 
+class TestLoadTemplates(TankTestBase):
+    """Test reloading only the templates which have changed."""
+    def setUp(self):
+        super(TestLoadTemplates, self).setUp()
+        self.setup_fixtures()
+        self.data = {"keys": {"Shot": {"type": "str"},
+                              "name": {"type": "str"},
+                              "version": {"type": "int", "format_spec": "03"}},
+                     "paths": {"shot_root": "shots/{Shot}",
+                               "shot_work": "shots/{Shot}/work/{name}.v{version}.ma",
+                               "shot_publish": {"definition": "shots/{Shot}/publish/{name}.v{version}.ma"}},
+                     "strings": {"publish_name": {"definition": "{name}, v{version}",
+                                                  "validate_with": "shot_publish"},
+                                 "shot_name": "{Shot}"}}
+        (self.templates, self.state) = self.load()
+
+    def load(self, previous_state=None):
+        # the configuration is read from disk each time
+        data = copy.deepcopy(self.data)
+        patcher = patch.object(self.pipeline_configuration, "get_templates_config", return_value=data)
+        patcher.start()
+        try:
+            return load_templates(self.pipeline_configuration, previous_state)
+        finally:
+            patcher.stop()
+
+    def assert_reused(self, templates, names):
+        reused = set([x for x in templates if templates[x] is self.templates.get(x)])
+        self.assertEquals(set(names), reused)
+
+    def test_unchanged(self):
+        (templates, _) = self.load(self.state)
+        self.assert_reused(templates, self.templates.keys())
+
+    def test_no_previous_state(self):
+        (templates, _) = self.load()
+        self.assert_reused(templates, [])
+
+    def test_changed_path(self):
+        self.data["paths"]["shot_work"] = "shots/{Shot}/work/maya/{name}.v{version}.ma"
+        (templates, _) = self.load(self.state)
+        self.assert_reused(templates, ["shot_root", "shot_publish", "publish_name", "shot_name"])
+        self.assertEquals(os.path.join("shots", "{Shot}", "work", "maya", "{name}.v{version}.ma"),
+                          templates["shot_work"].definition)
+
+    def test_changed_validator(self):
+        self.data["paths"]["shot_publish"] = {"definition": "shots/{Shot}/pub/{name}.v{version}.ma"}
+        (templates, _) = self.load(self.state)
+        self.assert_reused(templates, ["shot_root", "shot_work", "shot_name"])
+        self.assertTrue(templates["publish_name"].validate_with is templates["shot_publish"])
+
+    def test_changed_key(self):
+        self.data["keys"]["version"] = {"type": "int", "format_spec": "04"}
+        (templates, _) = self.load(self.state)
+        self.assert_reused(templates, ["shot_root", "shot_name"])
+        self.assertEquals("04", templates["shot_work"].keys["version"].format_spec)
+
+    def test_added_and_removed(self):
+        del(self.data["paths"]["shot_root"])
+        self.data["strings"]["version_name"] = "v{version}"
+        (templates, _) = self.load(self.state)
+        self.assertFalse("shot_root" in templates)
+        self.assertTrue(isinstance(templates["version_name"], TemplateString))
+        self.assert_reused(templates, ["shot_work", "shot_publish", "publish_name", "shot_name"])
+
+    def test_same_as_full_load(self):
+        self.data["keys"]["name"] = {"type": "str", "filter_by": "alphanumeric"}
+        self.data["paths"]["shot_root"] = "shots/{Shot}/"
+        (templates, _) = self.load(self.state)
+        (expected, _) = self.load()
+        self.assertEquals(sorted(expected), sorted(templates))
+        for name in expected:
+            self.assertEquals(expected[name].definition, templates[name].definition)
+            self.assertEquals(sorted(expected[name].keys), sorted(templates[name].keys))
+
+    def test_tank_reload(self):
+        tk = tank.Tank(self.project_root)
+        templates = tk.templates.copy()
+        path = os.path.join(self.project_root, "sequences", "Seq", "shot_010", "Anm", "work", "foo.v003.ma")
+        self.assertEquals("maya_shot_work", tk.template_from_path(path).name)
+        tk.reload_templates(incremental=True)
+        self.assertTrue(all(tk.templates[x] is templates[x] for x in templates))
+        tk.reload_templates()
+        self.assertFalse(any(tk.templates[x] is templates[x] for x in templates))
+        self.assertEquals("maya_shot_work", tk.template_from_path(path).name)
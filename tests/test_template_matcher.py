@@ -0,0 +1,116 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+
+import tank
+from tank import TankError
+from tank.template import TemplatePath
+from tank.template_matcher import TemplateMatcher
+from tank.templatekey import StringKey, IntegerKey
+
+from tank_test.tank_test_base import *
+
+
+class TestTemplateMatcher(TankTestBase):
+
+    def setUp(self):
+        super(TestTemplateMatcher, self).setUp()
+        self.setup_fixtures()
+        self.tk = tank.Tank(self.project_root)
+        self.matcher = TemplateMatcher(self.tk.templates)
+
+    def assert_same_as_templates(self, path):
+        expected = []
+        for template in self.tk.templates.values():
+            try:
+                expected.append((template, template.get_fields(path)))
+            except TankError:
+                pass
+        matched = self.matcher.match_all(path)
+        self.assertEquals(expected, matched)
+        return matched
+
+    def test_same_as_templates(self):
+        paths = ["sequences/Seq/shot_010/Anm/work/foo.v003.ma",
+                 "sequences/Seq/shot_010/Anm/publish/shot_010.jfk.v001.ma",
+                 "sequences/Seq/shot_010/Anm/publish/shot_010.jfk.v001.MA",
+                 "sequences/Seq/shot_010/Anm/publish/shot_010.jfk.v001.ma.bak",
+                 "sequences/Seq/shot_010/Anm/work",
+                 "sequences/Seq/shot_010",
+                 "sequences/Seq",
+                 "assets/Character/hero/mod/work/hero.v001.ma",
+                 "foo"]
+        for path in paths:
+            self.assert_same_as_templates(os.path.join(self.project_root, path))
+        # resolved TemplateStrings
+        self.assertTrue(len(self.assert_same_as_templates("Nuke Script Name, v02")) > 0)
+
+    def test_match(self):
+        path = os.path.join(self.project_root, "sequences/Seq/shot_010/Anm/work/foo.v003.ma")
+        (template, fields) = self.matcher.match(path)
+        self.assertEquals("maya_shot_work", template.name)
+        self.assertEquals(3, fields["version"])
+        self.assertEquals((None, None), self.matcher.match(os.path.join(self.project_root, "foo")))
+
+    def test_candidates(self):
+        path = os.path.join(self.project_root, "sequences/Seq/shot_010/Anm/work/foo.v003.ma")
+        candidates = self.matcher.candidates(path)
+        # only a few templates have to be parsed
+        self.assertTrue(self.tk.templates["maya_shot_work"] in candidates)
+        self.assertTrue(len(candidates) < len(self.tk.templates) / 2)
+
+    def test_ambiguous(self):
+        keys = {"name": StringKey("name"), "version": IntegerKey("version")}
+        templates = {"a": TemplatePath("{name}.v{version}.ma", keys, self.project_root, "a"),
+                     "b": TemplatePath("{name}.ma", keys, self.project_root, "b")}
+        matcher = TemplateMatcher(templates)
+        self.assertRaises(TankError, matcher.match, os.path.join(self.project_root, "foo.v001.ma"))
+
+    def test_adjacent_keys(self):
+        """A template whose keys aren't separated by static tokens is always parsed."""
+        keys = {"name": StringKey("name"), "layer": StringKey("layer")}
+        template = TemplatePath("{name}.ma{layer}", keys, self.project_root, "adjacent")
+        matcher = TemplateMatcher({"adjacent": template})
+        path = os.path.join(self.project_root, "foo.mabar")
+        self.assertEquals([(template, template.get_fields(path))], matcher.match_all(path))
+
+    def test_template_from_path_rebuilds(self):
+        path = os.path.join(self.project_root, "foo.v001.ma")
+        self.assertIsNone(self.tk.template_from_path(path))
+        keys = {"name": StringKey("name"), "version": IntegerKey("version")}
+        template = TemplatePath("{name}.v{version}.ma", keys, self.project_root, "new")
+        # the matcher is updated when the templates are replaced, e.g. by reload_templates
+        self.tk.templates = dict(self.tk.templates, new=template)
+        self.assertTrue(template is self.tk.template_from_path(path))
+
+    def test_update(self):
+        templates = self.tk.templates.copy()
+        path = os.path.join(self.project_root, "sequences/Seq/shot_010/Anm/work/foo.v003.ma")
+        work_template = templates.pop("maya_shot_work")
+        keys = {"name": StringKey("name"), "version": IntegerKey("version")}
+        templates["new"] = TemplatePath("{name}.v{version}.ma", keys, self.project_root, "new")
+        self.matcher.update(templates)
+        self.assertEquals((None, None), self.matcher.match(path))
+        self.assert_same_as_templates_in(templates, os.path.join(self.project_root, "foo.v001.ma"))
+        self.assertTrue(work_template not in self.matcher.candidates(path))
+        templates["maya_shot_work"] = work_template
+        self.matcher.update(templates)
+        self.assertEquals(work_template, self.matcher.match(path)[0])
+
+    def assert_same_as_templates_in(self, templates, path):
+        expected = []
+        for template in templates.values():
+            try:
+                expected.append((template, template.get_fields(path)))
+            except TankError:
+                pass
+        self.assertEquals(sorted(expected), sorted(self.matcher.match_all(path)))
+        self.assertTrue(len(expected) > 0)
@@ -0,0 +1,125 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+from mock import Mock
+
+import tank
+from tank.template import TemplatePath, TemplateString
+from tank.template_overlap import find_overlapping_templates
+from tank.templatekey import StringKey, IntegerKey, SequenceKey
+from tank.deploy.tank_commands.template_overlaps import TemplateOverlapsAction
+
+from tank_test.tank_test_base import *
+
+
+class TestFindOverlappingTemplates(TankTestBase):
+
+    def setUp(self):
+        super(TestFindOverlappingTemplates, self).setUp()
+        self.keys = {"Sequence": StringKey("Sequence"),
+                     "Shot": StringKey("Shot"),
+                     "Step": StringKey("Step", choices=["comp", "light"]),
+                     "name": StringKey("name"),
+                     "alpha": StringKey("alpha", filter_by="alphanumeric"),
+                     "code": StringKey("code", length=3),
+                     "version": IntegerKey("version", format_spec="03"),
+                     "SEQ": SequenceKey("SEQ", format_spec="04"),
+                     "layer": StringKey("layer")}
+
+    def assert_overlaps(self, definition_a, definition_b, expected=True):
+        templates = {"a": TemplatePath(definition_a, self.keys, self.project_root, "a"),
+                     "b": TemplatePath(definition_b, self.keys, self.project_root, "b")}
+        overlaps = find_overlapping_templates(templates)
+        if expected:
+            self.assertEquals([("a", "b")], overlaps)
+        else:
+            self.assertEquals([], overlaps)
+
+    def test_different_folders(self):
+        self.assert_overlaps("sequences/{Sequence}/{Shot}/work/{name}.ma",
+                             "sequences/{Sequence}/{Shot}/publish/{name}.ma", False)
+        self.assert_overlaps("sequences/{Sequence}/{name}.ma",
+                             "sequences/{Sequence}/{Shot}/{name}.ma", False)
+
+    def test_wider_key(self):
+        # the name could be scene.v001
+        self.assert_overlaps("work/{name}.ma", "work/{name}.v{version}.ma")
+
+    def test_same_definition(self):
+        self.assert_overlaps("{Sequence}/{Shot}", "{Shot}/{Sequence}")
+
+    def test_choices(self):
+        self.assert_overlaps("{Step}/{name}.ma", "work/{name}.ma", False)
+        self.assert_overlaps("{Step}/{name}.ma", "comp/{name}.ma")
+
+    def test_integers(self):
+        self.assert_overlaps("work/{version}", "work/latest", False)
+        self.assert_overlaps("work/{version}", "work/v{version}", False)
+        self.assert_overlaps("work/{version}", "work/{name}")
+
+    def test_sequences(self):
+        self.assert_overlaps("{name}.{SEQ}.exr", "{name}.####.exr")
+        self.assert_overlaps("{name}.{SEQ}.exr", "{name}.#.exr", False)
+
+    def test_alphanumeric(self):
+        self.assert_overlaps("{alpha}.ma", "foo_bar.ma", False)
+        self.assert_overlaps("{alpha}.ma", "foo.ma")
+
+    def test_length(self):
+        self.assert_overlaps("{code}.ma", "abcd.ma", False)
+        self.assert_overlaps("{code}.ma", "abc.ma")
+
+    def test_optional_keys(self):
+        self.assert_overlaps("work/{name}[_{layer}].v{version}.nk", "work/{name}.v{version}.nk")
+
+    def test_case_insensitive(self):
+        self.assert_overlaps("work/{name}.MA", "work/{name}.ma")
+
+    def test_ignores_strings(self):
+        templates = {"a": TemplatePath("{name}.ma", self.keys, self.project_root, "a"),
+                     "b": TemplateString("{name}.ma", self.keys, "b")}
+        self.assertEquals([], find_overlapping_templates(templates))
+
+    def test_many_templates(self):
+        templates = {}
+        for index in range(200):
+            name = "template_%03d" % index
+            definition = "sequences/{Sequence}/{Shot}/app%03d/{name}.v{version}.ma" % index
+            templates[name] = TemplatePath(definition, self.keys, self.project_root, name)
+        templates["catch_all"] = TemplatePath("sequences/{Sequence}/{Shot}/{layer}/{name}.ma",
+                                              self.keys, self.project_root, "catch_all")
+        overlaps = find_overlapping_templates(templates)
+        self.assertEquals(200, len(overlaps))
+        self.assertTrue(all("catch_all" in x for x in overlaps))
+
+
+class TestTemplateOverlapsAction(TankTestBase):
+
+    def setUp(self):
+        super(TestTemplateOverlapsAction, self).setUp()
+        self.setup_fixtures()
+        self.action = TemplateOverlapsAction()
+        self.action.tk = tank.Tank(self.project_root)
+
+    def test_no_overlaps(self):
+        log = Mock()
+        self.action.run(log, [])
+        self.assertFalse(log.warning.called)
+
+    def test_overlaps(self):
+        template = self.action.tk.templates["maya_shot_work"]
+        definition = template.definition.replace("{name}", "{Shot}")
+        self.action.tk.templates["overlapping"] = TemplatePath(definition, template.keys,
+                                                               template.root_path, "overlapping")
+        log = Mock()
+        self.action.run(log, [])
+        self.assertTrue(log.warning.called)
+        messages = [x[0][0] for x in log.info.call_args_list]
+        self.assertTrue(any(x.startswith("overlapping:") for x in messages))
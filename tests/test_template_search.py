@@ -0,0 +1,182 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+import glob
+import time
+
+from mock import patch
+
+from tank import template_search
+from tank.template import TemplatePath
+from tank.templatekey import StringKey, IntegerKey
+
+from tank_test.tank_test_base import *
+
+
+class TestTemplateSearch(TankTestBase):
+    """
+    Sets up a shot tree with valid and invalid paths for a template
+    """
+
+    def setUp(self):
+        super(TestTemplateSearch, self).setUp()
+        self.keys = {"Sequence": StringKey("Sequence", filter_by="alphanumeric"),
+                     "Shot": StringKey("Shot"),
+                     "Step": StringKey("Step", choices=["comp", "light"]),
+                     "name": StringKey("name"),
+                     "version": IntegerKey("version", format_spec="03"),
+                     "layer": StringKey("layer")}
+        self.template = TemplatePath("sequences/{Sequence}/{Shot}/{Step}/work/{name}.v{version}[.{layer}].ma",
+                                     self.keys,
+                                     root_path=self.project_root)
+
+        files = ["sequences/aa/aa_001/comp/work/scene.v001.ma",
+                 "sequences/aa/aa_001/comp/work/scene.v002.ma",
+                 "sequences/aa/aa_001/comp/work/scene.v002.beauty.ma",
+                 "sequences/aa/aa_001/comp/work/scene.vxyz.ma",
+                 "sequences/aa/aa_001/comp/work/.scene.v003.ma",
+                 "sequences/aa/aa_001/light/work/other.v010.ma",
+                 "sequences/aa/aa_001/anim/work/scene.v001.ma",
+                 "sequences/aa/aa_002/comp/work/scene.v001.ma",
+                 "sequences/aa/aa_002/Comp/work/scene.v001.ma",
+                 "sequences/a_b/b_001/comp/work/scene.v001.ma",
+                 "sequences/bb/bb_001/comp/scene.v001.ma",
+                 "sequences/bb/.hidden/comp/work/scene.v001.ma"]
+        for path in files:
+            path = os.path.join(self.project_root, path)
+            if not os.path.exists(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            open(path, "w").close()
+
+    def assert_same_as_glob(self, fields, skip_keys, num_threads=None):
+        expected = glob.glob(self.template._apply_fields(fields, ignore_types=skip_keys))
+        expected = [x for x in expected if self.template.validate(x)]
+        found = template_search.find_paths(self.template, fields, skip_keys, num_threads)
+        found = [x for x in found if self.template.validate(x)]
+        self.assertEquals(sorted(expected), sorted(found))
+        return found
+
+
+class TestFindPaths(TestTemplateSearch):
+    """
+    Checks that template searches find the same paths as a glob
+    """
+
+    def test_all_wildcards(self):
+        fields = {"Sequence": "*", "Shot": "*", "Step": "*", "name": "*", "version": "*"}
+        found = self.assert_same_as_glob(fields, fields.keys())
+        self.assertEquals(6, len(found))
+
+    def test_pruned(self):
+        fields = {"Sequence": "*", "Shot": "*", "Step": "*", "name": "*", "version": "*"}
+        patcher = patch("tank.template_search._list_dir", side_effect=template_search._list_dir)
+        list_dir = patcher.start()
+        try:
+            self.assert_same_as_glob(fields, fields.keys())
+        finally:
+            patcher.stop()
+        listed = [x[0][0][len(self.project_root) + 1:] for x in list_dir.call_args_list]
+        # sequence a_b isn't alphanumeric, step anim isn't in the choices
+        self.assertFalse(os.path.join("sequences", "a_b") in listed)
+        self.assertFalse(os.path.join("sequences", "aa", "aa_001", "anim", "work") in listed)
+
+    def test_some_values(self):
+        fields = {"Sequence": "aa", "Shot": "*", "Step": "comp", "name": "scene", "version": "*"}
+        self.assert_same_as_glob(fields, ["Shot", "version"])
+
+    def test_optional_keys(self):
+        fields = {"Sequence": "aa", "Shot": "*", "Step": "*", "name": "*", "version": "*", "layer": "*"}
+        found = self.assert_same_as_glob(fields, fields.keys())
+        self.assertEquals(1, len(found))
+
+    def test_no_wildcards(self):
+        fields = {"Sequence": "aa", "Shot": "aa_001", "Step": "comp", "name": "scene", "version": 2}
+        found = self.assert_same_as_glob(fields, [])
+        self.assertEquals(1, len(found))
+        fields["version"] = 5
+        self.assertEquals([], self.assert_same_as_glob(fields, []))
+
+    def test_missing_root(self):
+        fields = {"Sequence": "zz", "Shot": "*", "Step": "*", "name": "*", "version": "*"}
+        self.assertEquals([], self.assert_same_as_glob(fields, ["Shot", "Step", "name", "version"]))
+
+    def test_threads(self):
+        fields = {"Sequence": "*", "Shot": "*", "Step": "*", "name": "*", "version": "*"}
+        found = self.assert_same_as_glob(fields, fields.keys(), num_threads=4)
+        self.assertEquals(6, len(found))
+
+    def test_no_thread_pool(self):
+        # python 2.5 has no multiprocessing module
+        fields = {"Sequence": "*", "Shot": "*", "Step": "*", "name": "*", "version": "*"}
+        patcher = patch.dict("sys.modules", {"multiprocessing.pool": None})
+        patcher.start()
+        try:
+            found = self.assert_same_as_glob(fields, fields.keys(), num_threads=4)
+        finally:
+            patcher.stop()
+        self.assertEquals(6, len(found))
+
+
+class TestListingCache(TestTemplateSearch):
+    """
+    Checks that cached directory listings are used until a directory changes
+    """
+
+    def setUp(self):
+        super(TestListingCache, self).setUp()
+        self.cache = template_search.enable_listing_cache()
+        self.fields = {"Sequence": "*", "Shot": "*", "Step": "*", "name": "*", "version": "*"}
+        # make the directories old enough for their listings to be cached
+        self.mtime = time.time() - 60
+        for (dir_path, dir_names, file_names) in os.walk(self.project_root):
+            os.utime(dir_path, (self.mtime, self.mtime))
+
+    def tearDown(self):
+        template_search.disable_listing_cache()
+        super(TestListingCache, self).tearDown()
+
+    def test_cached(self):
+        self.assert_same_as_glob(self.fields, self.fields.keys())
+        self.assertEquals(0, self.cache.hits)
+        misses = self.cache.misses
+        patcher = patch("tank.template_search._list_dir")
+        list_dir = patcher.start()
+        try:
+            found = self.assert_same_as_glob(self.fields, self.fields.keys())
+        finally:
+            patcher.stop()
+        self.assertFalse(list_dir.called)
+        self.assertEquals(misses, self.cache.hits)
+        self.assertEquals(6, len(found))
+
+    def test_modified_directory(self):
+        self.assert_same_as_glob(self.fields, self.fields.keys())
+        work = os.path.join(self.project_root, "sequences", "aa", "aa_001", "comp", "work")
+        open(os.path.join(work, "scene.v003.ma"), "w").close()
+        os.utime(work, (self.mtime + 1, self.mtime + 1))
+        found = self.assert_same_as_glob(self.fields, self.fields.keys())
+        self.assertEquals(7, len(found))
+
+    def test_recent_directory(self):
+        work = os.path.join(self.project_root, "sequences", "aa", "aa_001", "comp", "work")
+        os.utime(work, None)
+        self.assert_same_as_glob(self.fields, self.fields.keys())
+        # the recently modified directory is listed again
+        misses = self.cache.misses
+        self.assert_same_as_glob(self.fields, self.fields.keys())
+        self.assertEquals(misses + 1, self.cache.misses)
+
+    def test_size_limit(self):
+        template_search.disable_listing_cache()
+        self.cache = template_search.enable_listing_cache(10)
+        self.assert_same_as_glob(self.fields, self.fields.keys())
+        self.assertTrue(self.cache.size <= 10)
+        self.assertTrue(len(self.cache) > 0)
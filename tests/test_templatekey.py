@@ -14,6 +14,7 @@ Tests for templatefield module.
 
 from tank import TankError
 import copy
+from mock import patch
 from tank_test.tank_test_base import *
 from tank.templatekey import TemplateKey, StringKey, IntegerKey, SequenceKey, make_keys
 
@@ -46,6 +47,27 @@ class TestStringKey(TankTestBase):
         self.assertFalse(template_field.validate("a"))
         self.assertFalse(template_field.validate("b"))
 
+    def test_choices_exclusions_case_insensitive(self):
+        template_field = StringKey("field_name", choices=["Comp", "LIGHT"])
+        self.assertTrue(template_field.validate("comp"))
+        self.assertTrue(template_field.validate("Light"))
+        self.assertFalse(template_field.validate("anim"))
+        template_field = StringKey("field_name", exclusions=["Anim"])
+        self.assertFalse(template_field.validate("ANIM"))
+        self.assertTrue(template_field.validate("comp"))
+
+    def test_error_message_on_failure_only(self):
+        """Error messages aren't built for values that validate."""
+        patcher = patch.object(StringKey, "__repr__", return_value="<key>")
+        mock_repr = patcher.start()
+        try:
+            self.assertTrue(self.choice_field.validate("a"))
+            self.assertFalse(self.choice_field.validate("c"))
+            self.assertFalse(mock_repr.called)
+            self.assertEquals("<key> Illegal value: 'c' not in choices: ['a', 'b']", self.choice_field._last_error)
+        finally:
+            patcher.stop()
+
     def test_illegal_choice_alphanumic(self):
         choices_value = ["@", "b"]
         self.assertRaises(TankError,
@@ -307,6 +329,19 @@ class TestSequenceKey(TankTestBase):
 
         self.check_error_message(TankError, expected, self.seq_field.str_from_value, value)
 
+    def test_validate_bad_error_on_failure_only(self):
+        """Error messages aren't built for values that validate."""
+        patcher = patch.object(SequenceKey, "__repr__", return_value="<key>")
+        mock_repr = patcher.start()
+        try:
+            for value in [3, "3", "%d", "FORMAT: #"]:
+                self.assertTrue(self.seq_field.validate(value))
+            self.assertFalse(self.seq_field.validate("a"))
+            self.assertFalse(mock_repr.called)
+            self.assertTrue(self.seq_field._last_error.startswith("<key> Illegal value 'a'"))
+        finally:
+            patcher.stop()
+
     def test_str_from_value_formatted(self):
         formatted_field = SequenceKey("field_name", format_spec="03")
         value = 3
@@ -505,6 +505,60 @@ class TestApplyFields(TestTemplatePath):
         self.assertEquals(expected, template.apply_fields(fields))
 
 
+class TestApplyFieldsMany(TestTemplatePath):
+    """Tests for TemplatePath.apply_fields_many and apply_fields_for_values"""
+    def setUp(self):
+        super(TestApplyFieldsMany, self).setUp()
+        definition = "shots/{Shot}[.{branch}][.v{version}][.{snapshot}].{frame}.exr"
+        self.template = TemplatePath(definition, self.keys, self.project_root)
+        self.fields = {"Shot": "s1", "branch": "mmm", "version": 3}
+
+    def test_many(self):
+        fields_list = [{"Shot": "s1", "branch": "mmm", "version": 3, "frame": 1},
+                       {"Shot": "s1", "branch": "mmm", "version": 3, "frame": 2},
+                       {"Shot": "s2", "version": 3, "frame": 2},
+                       {"Shot": "s2", "branch": None, "version": 4, "frame": "FORMAT:#"},
+                       {"Shot": "s2", "branch": "mmm", "snapshot": 4}]
+        expected = [self.template.apply_fields(x) for x in fields_list]
+        self.assertEquals(expected, self.template.apply_fields_many(fields_list))
+
+    def test_many_bad_value(self):
+        fields_list = [{"Shot": "s1", "frame": 1}, {"Shot": "s3", "frame": 1}]
+        self.assertRaises(TankError, self.template.apply_fields_many, fields_list)
+
+    def test_many_missing_value(self):
+        fields_list = [{"Shot": "s1", "frame": 1}, {"frame": 1}]
+        self.assertRaises(TankError, self.template_path.apply_fields_many, fields_list)
+
+    def test_for_values(self):
+        frames = range(1001, 1011) + ["FORMAT:%d"]
+        expected = []
+        for frame in frames:
+            fields = dict(self.fields)
+            fields["frame"] = frame
+            expected.append(self.template.apply_fields(fields))
+        self.assertEquals(expected, self.template.apply_fields_for_values(self.fields, "frame", frames))
+
+    def test_for_values_optional_key(self):
+        versions = [1, None, 3]
+        expected = []
+        for version in versions:
+            fields = dict(self.fields)
+            fields["version"] = version
+            expected.append(self.template.apply_fields(fields))
+        self.assertEquals(expected, self.template.apply_fields_for_values(self.fields, "version", versions))
+
+    def test_for_values_unused_key(self):
+        expected = [self.template.apply_fields(self.fields)] * 2
+        self.assertEquals(expected, self.template.apply_fields_for_values(self.fields, "Step", ["a", "b"]))
+
+    def test_for_values_bad_value(self):
+        self.assertRaises(TankError, self.template.apply_fields_for_values, self.fields, "frame", [1, "a"])
+
+    def test_for_values_empty(self):
+        self.assertEquals([], self.template.apply_fields_for_values(self.fields, "frame", []))
+
+
 class Test_ApplyFields(TestTemplatePath):
     """Tests for private TemplatePath._apply_fields"""
     def test_skip_enum(self):
@@ -990,5 +1044,33 @@ class TestParent(TestTemplatePath):
         result = template.parent
         self.assertEquals("{new_name}", result.definition)
 
+    def test_parent_reused(self):
+        parent = self.template_path.parent
+        self.assertTrue(parent is self.template_path.parent)
+        self.assertTrue(parent.parent is self.template_path.parent.parent)
+
+    def test_ancestors(self):
+        definition = "shots/{Sequence}/{Shot}/work/{Shot}.{branch}.v{version}.ma"
+        template = TemplatePath(definition, self.keys, root_path=self.project_root)
+        expected = [os.path.join("shots", "{Sequence}"),
+                    os.path.join("shots", "{Sequence}", "{Shot}"),
+                    os.path.join("shots", "{Sequence}", "{Shot}", "work"),
+                    template.definition]
+        ancestors = template.ancestors
+        self.assertEquals(expected, [x.definition for x in ancestors])
+        self.assertTrue(ancestors[-1] is template)
+        self.assertTrue(ancestors[-2] is template.parent)
+
+    def test_ancestors_no_keys(self):
+        template = TemplatePath("shots/work", self.keys, root_path=self.project_root)
+        self.assertEquals([template], template.ancestors)
+
+    def test_level_key_names(self):
+        definition = "shots/{Sequence}/{Shot}/work/{Shot}.{branch}.v{version}.ma"
+        template = TemplatePath(definition, self.keys, root_path=self.project_root)
+        self.assertEquals(set(["branch", "version"]), template._get_level_key_names())
+        self.assertEquals(set(), template.parent._get_level_key_names())
+        self.assertEquals(set(["Shot"]), template.parent.parent._get_level_key_names())
+
 
 
@@ -0,0 +1,85 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import copy
+import pickle
+
+import unittest2 as unittest
+
+from tank_vendor import yaml
+from tank.util.entity_ref import EntityRef, get_entity_ref
+
+
+class TestEntityRef(unittest.TestCase):
+
+    def setUp(self):
+        self.shot = {"type": "Shot", "id": 12, "name": "aa_001"}
+
+    def test_interned(self):
+        entity_ref = get_entity_ref(self.shot)
+        self.assertTrue(isinstance(entity_ref, EntityRef))
+        self.assertTrue(entity_ref is get_entity_ref(dict(self.shot)))
+        self.assertTrue(entity_ref is get_entity_ref(entity_ref))
+        self.assertFalse(entity_ref is get_entity_ref({"type": "Shot", "id": 12, "name": "aa_002"}))
+        self.assertIsNone(get_entity_ref(None))
+
+    def test_unhashable_values(self):
+        self.shot["sg_sequence"] = {"type": "Sequence", "id": 1}
+        entity_ref = get_entity_ref(self.shot)
+        self.assertEquals(self.shot, entity_ref)
+        self.assertFalse(entity_ref is get_entity_ref(self.shot))
+
+    def test_dict_access(self):
+        entity_ref = get_entity_ref(self.shot)
+        self.assertEquals(self.shot, entity_ref)
+        self.assertEquals("Shot", entity_ref["type"])
+        self.assertEquals(12, entity_ref.get("id"))
+        self.assertIsNone(entity_ref.get("code"))
+        self.assertEquals(sorted(self.shot.keys()), sorted(entity_ref.keys()))
+
+    def test_immutable(self):
+        entity_ref = get_entity_ref(self.shot)
+        def set_item():
+            entity_ref["id"] = 13
+        def del_item():
+            del entity_ref["id"]
+        self.assertRaises(TypeError, set_item)
+        self.assertRaises(TypeError, del_item)
+        self.assertRaises(TypeError, entity_ref.update, {"id": 13})
+        self.assertRaises(TypeError, entity_ref.pop, "id")
+        self.assertRaises(TypeError, entity_ref.setdefault, "code", "aa_001")
+        self.assertRaises(TypeError, entity_ref.clear)
+        self.assertEquals(self.shot, entity_ref)
+
+    def test_hashable(self):
+        entity_ref = get_entity_ref(self.shot)
+        values = {entity_ref: "shot"}
+        self.assertEquals("shot", values[get_entity_ref(dict(self.shot))])
+
+    def test_copies_are_dicts(self):
+        entity_ref = get_entity_ref(self.shot)
+        for entity_copy in [copy.copy(entity_ref), copy.deepcopy(entity_ref), dict(entity_ref)]:
+            self.assertTrue(type(entity_copy) is dict)
+            self.assertEquals(self.shot, entity_copy)
+            entity_copy["id"] = 13
+
+    def test_pickle(self):
+        entity_ref = get_entity_ref(self.shot)
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            loaded = pickle.loads(pickle.dumps(entity_ref, protocol))
+            self.assertTrue(type(loaded) is dict)
+            self.assertEquals(self.shot, loaded)
+
+    def test_yaml(self):
+        entity_ref = get_entity_ref(self.shot)
+        for dumper in [yaml.Dumper, yaml.SafeDumper]:
+            loaded = yaml.load(yaml.dump(entity_ref, Dumper=dumper))
+            self.assertTrue(type(loaded) is dict)
+            self.assertEquals(self.shot, loaded)
@@ -0,0 +1,65 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import unittest2 as unittest
+
+from tank.util.lru_cache import LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_get_set(self):
+        cache = LRUCache(10)
+        self.assertIsNone(cache.get("a"))
+        self.assertEquals(0, cache.get("a", 0))
+        cache.set("a", 1)
+        cache.set("a", 2)
+        self.assertEquals(2, cache.get("a"))
+        self.assertEquals(1, len(cache))
+        self.assertEquals(1, cache.hits)
+        self.assertEquals(2, cache.misses)
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(3)
+        for key in "abc":
+            cache.set(key, key)
+        cache.get("a")
+        cache.set("d", "d")
+        self.assertEquals(3, len(cache))
+        self.assertFalse("b" in cache)
+        for key in "acd":
+            self.assertEquals(key, cache.get(key))
+
+    def test_clear(self):
+        cache = LRUCache(3)
+        cache.set("a", 1)
+        cache.clear()
+        self.assertEquals(0, len(cache))
+        cache.set("b", 2)
+        self.assertEquals(2, cache.get("b"))
+
+    def test_disabled(self):
+        cache = LRUCache(0)
+        cache.set("a", 1)
+        self.assertEquals(0, len(cache))
+        self.assertIsNone(cache.get("a"))
+
+    def test_size_func(self):
+        cache = LRUCache(10, size_func=len)
+        cache.set("a", "xxxx")
+        cache.set("b", "xxxx")
+        self.assertEquals(8, cache.size)
+        cache.set("c", "xxxx")
+        self.assertEquals(8, cache.size)
+        self.assertFalse("a" in cache)
+        # too large to ever fit
+        cache.set("d", "x" * 11)
+        self.assertFalse("d" in cache)
+        self.assertEquals(8, cache.size)
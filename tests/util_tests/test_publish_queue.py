@@ -0,0 +1,162 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import threading
+import unittest2 as unittest
+
+from tank.util import publish_queue
+
+# maximum number of seconds to wait for the flusher thread
+TIMEOUT = 5
+
+
+class FlushRecorder(object):
+    """
+    Flush callback which records its calls and can be told to fail
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.error = None
+        self.called = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.called.set()
+        if self.error:
+            raise self.error
+        return 0
+
+    def wait(self):
+        """
+        Waits for the next call, returns True if there was one
+        """
+        self.called.wait(TIMEOUT)
+        called = self.called.isSet()
+        self.called.clear()
+        return called
+
+
+class TestPublishQueueFlusher(unittest.TestCase):
+
+    def setUp(self):
+        self.flushers = []
+
+    def tearDown(self):
+        for flusher in self.flushers:
+            flusher.stop()
+            flusher.join(TIMEOUT)
+
+    def _start(self, flush_callback, interval):
+        flusher = publish_queue.PublishQueueFlusher(flush_callback, interval)
+        self.flushers.append(flusher)
+        flusher.start()
+        return flusher
+
+    def test_wake(self):
+        recorder = FlushRecorder()
+        flusher = self._start(recorder, 3600)
+        self.assertEqual(recorder.calls, 0)
+        flusher.wake()
+        self.assertTrue(recorder.wait())
+        self.assertEqual(recorder.calls, 1)
+
+    def test_interval(self):
+        recorder = FlushRecorder()
+        self._start(recorder, 0.01)
+        # flushes keep happening without being woken up
+        self.assertTrue(recorder.wait())
+        self.assertTrue(recorder.wait())
+
+    def test_stop(self):
+        recorder = FlushRecorder()
+        flusher = self._start(recorder, 3600)
+        flusher.stop()
+        flusher.join(TIMEOUT)
+        self.assertFalse(flusher.isAlive())
+        # the queue isn't flushed on the way out
+        self.assertEqual(recorder.calls, 0)
+
+    def test_last_error(self):
+        recorder = FlushRecorder()
+        recorder.error = IOError("shotgun is down")
+        flusher = self._start(recorder, 3600)
+        flusher.wake()
+        self.assertTrue(recorder.wait())
+        # the thread keeps going after a failed flush
+        flusher.wake()
+        self.assertTrue(recorder.wait())
+        self.assertTrue(flusher.isAlive())
+        flusher.stop()
+        flusher.join(TIMEOUT)
+        self.assertEqual(flusher.last_error, recorder.error)
+
+    def test_last_error_cleared(self):
+        recorder = FlushRecorder()
+        recorder.error = IOError("shotgun is down")
+        flusher = self._start(recorder, 3600)
+        flusher.wake()
+        self.assertTrue(recorder.wait())
+        # the error is cleared by the next successful flush
+        recorder.error = None
+        flusher.wake()
+        self.assertTrue(recorder.wait())
+        flusher.stop()
+        flusher.join(TIMEOUT)
+        self.assertEqual(recorder.calls, 2)
+        self.assertEqual(flusher.last_error, None)
+
+    def test_set_flush_callback(self):
+        first = FlushRecorder()
+        second = FlushRecorder()
+        flusher = self._start(first, 3600)
+        flusher.set_flush_callback(second)
+        flusher.wake()
+        self.assertTrue(second.wait())
+        self.assertEqual(first.calls, 0)
+
+
+class TestGetFlusher(unittest.TestCase):
+
+    def setUp(self):
+        self.db_paths = ["/test/queue_a.db", "/test/queue_b.db"]
+
+    def tearDown(self):
+        for db_path in self.db_paths:
+            flusher = publish_queue.g_flushers.pop(db_path, None)
+            if flusher:
+                flusher.stop()
+                flusher.join(TIMEOUT)
+
+    def test_one_flusher_per_queue(self):
+        flusher = publish_queue.get_flusher(self.db_paths[0], FlushRecorder(), 3600)
+        self.assertTrue(flusher.isAlive())
+        self.assertTrue(publish_queue.get_flusher(self.db_paths[0], FlushRecorder(), 3600) is flusher)
+        self.assertFalse(publish_queue.get_flusher(self.db_paths[1], FlushRecorder(), 3600) is flusher)
+
+    def test_latest_callback_used(self):
+        first = FlushRecorder()
+        second = FlushRecorder()
+        publish_queue.get_flusher(self.db_paths[0], first, 3600)
+        flusher = publish_queue.get_flusher(self.db_paths[0], second, 3600)
+        flusher.wake()
+        self.assertTrue(second.wait())
+        self.assertEqual(first.calls, 0)
+
+    def test_restarted(self):
+        flusher = publish_queue.get_flusher(self.db_paths[0], FlushRecorder(), 3600)
+        flusher.stop()
+        flusher.join(TIMEOUT)
+        recorder = FlushRecorder()
+        new_flusher = publish_queue.get_flusher(self.db_paths[0], recorder, 3600)
+        self.assertFalse(new_flusher is flusher)
+        self.assertTrue(new_flusher.isAlive())
+        new_flusher.wake()
+        self.assertTrue(recorder.wait())
@@ -0,0 +1,114 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+# 
+# CONFIDENTIAL AND PROPRIETARY
+# 
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit 
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your 
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights 
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+import sys
+import shutil
+import select
+import tempfile
+import threading
+
+from tank_test.tank_test_base import *
+
+import tank
+from tank import TankError
+from tank.util import resolver
+
+
+class TestResolver(TankTestBase):
+
+    def setUp(self):
+        super(TestResolver, self).setUp()
+        self.setup_fixtures()
+
+        seq = {"type":"Sequence", "name":"seq_name", "id":3}
+        seq_path = os.path.join(self.project_root, "sequences/Seq")
+        self.add_production_path(seq_path, seq)
+        shot = {"type":"Shot",
+                "name": "shot_name",
+                "id":2,
+                "project": self.project}
+        self.shot_path = os.path.join(seq_path, "shot_code")
+        self.add_production_path(self.shot_path, shot)
+        step = {"type":"Step", "name":"step_name", "id":4}
+        self.step_path = os.path.join(self.shot_path, "step_name")
+        self.add_production_path(self.step_path, step)
+        self.work_path = os.path.join(self.step_path, "work", "foo.v003.ma")
+
+        # socket paths are limited in length so keep this short
+        self.socket_dir = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.socket_dir, "resolver.sock")
+        self.server = resolver.ResolverServer(self.socket_path)
+        self.serving = True
+        self.server_thread = threading.Thread(target=self._serve)
+        self.server_thread.setDaemon(True)
+        self.server_thread.start()
+        self.client = resolver.ResolverClient(self.socket_path)
+
+    def tearDown(self):
+        self.client.close()
+        self.serving = False
+        self.server_thread.join()
+        self.server.server_close()
+        shutil.rmtree(self.socket_dir)
+
+    def _serve(self):
+        # SocketServer.shutdown() doesn't exist in python 2.5, so poll
+        # for connections until the test is done
+        while self.serving:
+            (readable, _, _) = select.select([self.server], [], [], 0.05)
+            if readable:
+                self.server.handle_request()
+
+    def test_template_from_path(self):
+        self.assertEqual(self.client.template_from_path(self.work_path), "maya_shot_work")
+        self.assertEqual(self.client.template_from_path(os.path.join(self.project_root, "foo")), None)
+
+    def test_get_fields(self):
+        expected = {"Sequence": "Seq", "Shot": "shot_code", "Step": "step_name", "name": "foo", "version": 3}
+        self.assertEqual(self.client.get_fields(self.work_path), expected)
+        self.assertEqual(self.client.get_fields(self.work_path, "maya_shot_work"), expected)
+        self.assertRaises(TankError, self.client.get_fields, self.work_path, "no_such_template")
+
+    def test_apply_fields(self):
+        fields = {"Sequence": "Seq", "Shot": "shot_code", "Step": "step_name", "name": "foo", "version": 3}
+        self.assertEqual(self.client.apply_fields(self.project_root, "maya_shot_work", fields), self.work_path)
+
+    def test_context_from_path(self):
+        ctx = self.client.context_from_path(self.step_path)
+        self.assertEqual(ctx["entity"]["type"], "Shot")
+        self.assertEqual(ctx["entity"]["id"], 2)
+        self.assertEqual(ctx["step"]["id"], 4)
+        self.assertEqual(ctx["project"]["id"], self.project["id"])
+
+    def test_paths_from_entity(self):
+        self.assertEqual(self.client.paths_from_entity(self.project_root, "Shot", 2), [self.shot_path])
+
+    def test_warm_instance(self):
+        self.client.template_from_path(self.work_path)
+        self.assertEqual(len(self.server.resolver._projects), 1)
+        # the pipeline configuration path maps to the same project
+        self.client.apply_fields(os.path.dirname(self.project_config), "maya_shot_work",
+                                 {"Sequence": "Seq", "Shot": "shot_code", "Step": "step_name",
+                                  "name": "foo", "version": 3})
+        self.assertEqual(len(self.server.resolver._projects), 1)
+
+    def test_errors(self):
+        self.assertRaises(TankError, self.client._call, "no_such_op")
+        # the connection survives errors
+        self.assertEqual(self.client.ping(), "pong")
+
+    def test_reconnect(self):
+        # simulate a dropped connection
+        self.client._socket.close()
+        self.assertEqual(self.client.ping(), "pong")
+
+    def test_already_running(self):
+        self.assertRaises(TankError, resolver.ResolverServer, self.socket_path)
@@ -9,9 +9,12 @@
 # not expressly granted therein are reserved by Shotgun Software Inc.
 
 import os
+import gzip
 import datetime
+import StringIO
 
 from mock import Mock, patch
+import unittest2 as unittest
 
 import tank
 from tank import context
@@ -441,3 +444,483 @@ class TestCalcPathCache(TankTestBase):
         self.assertEqual(expected, path_cache)
 
 
+
+
+class TestShotgunPublishQueue(TankTestBase):
+    def setUp(self):
+        super(TestShotgunPublishQueue, self).setUp()
+        self.setup_fixtures()
+
+        self.storage = {"type": "LocalStorage", "id": 1, "code": "Tank"}
+        self.add_to_sg_mock_db([self.storage])
+
+        self.tk = tank.Tank(self.project_root)
+        self.tk._tank__sg = self.sg_mock
+
+        self.shot = {"type": "Shot", "name": "shot_name", "id": 2, "project": self.project}
+        self.context = context.Context(self.tk, project=self.project, entity=self.shot)
+        self.path = os.path.join(self.project_root, "foo", "bar")
+
+        # don't let a background thread interfere with the tests
+        patcher = patch("tank.util.shotgun._start_publish_queue_flusher")
+        self.start_flusher = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _queue_count(self):
+        queue = tank.util.get_publish_queue(self.tk)
+        try:
+            return queue.count()
+        finally:
+            queue.close()
+
+    def test_queued_publish(self):
+        """
+        Queued publishes return straight away without talking to shotgun
+        """
+        result = tank.util.register_publish(self.tk, self.context, self.path, "Test Publish", 1, queue=True)
+        self.assertEqual(result["id"], None)
+        self.assertEqual(result["type"], "TankPublishedFile")
+        self.assertTrue(result["queue_id"] is not None)
+        self.assertFalse(self.sg_mock.create.called)
+        self.assertFalse(self.sg_mock.batch.called)
+        self.assertEqual(self._queue_count(), 1)
+        self.assertTrue(self.start_flusher.called)
+
+    def test_queue_deduplicates(self):
+        """
+        Publishing the same thing twice only queues it once
+        """
+        r1 = tank.util.register_publish(self.tk, self.context, self.path, "Test Publish", 1, queue=True)
+        r2 = tank.util.register_publish(self.tk, self.context, self.path, "Test Publish", 1, queue=True)
+        self.assertEqual(r1["queue_id"], r2["queue_id"])
+        self.assertEqual(self._queue_count(), 1)
+
+    def test_flush(self):
+        """
+        Flushing creates the publishes in a single batch and empties the queue
+        """
+        tank.util.register_publish(self.tk, self.context, self.path, "Test Publish", 1, queue=True)
+        tank.util.register_publish(self.tk, self.context, self.path, "Test Publish", 2, queue=True)
+
+        self.sg_mock.batch.side_effect = lambda reqs: [{"type": r["entity_type"], "id": 100 + i} for (i, r) in enumerate(reqs)]
+        remaining = tank.util.flush_publish_queue(self.tk)
+
+        self.assertEqual(remaining, 0)
+        self.assertEqual(self.sg_mock.batch.call_count, 1)
+        requests = self.sg_mock.batch.call_args[0][0]
+        self.assertEqual([r["data"]["version_number"] for r in requests], [1, 2])
+        project_name = os.path.basename(self.project_root)
+        self.assertEqual(requests[0]["data"]["path_cache"], "%s/foo/bar" % project_name)
+
+    def test_retry_is_idempotent(self):
+        """
+        A publish which was created in shotgun by a failed attempt is not created twice
+        """
+        tank.util.register_publish(self.tk, self.context, self.path, "Test Publish", 1, queue=True)
+
+        # shotgun goes away mid flight
+        self.sg_mock.batch.side_effect = Exception("Shotgun is down")
+        self.assertRaises(Exception, tank.util.flush_publish_queue, self.tk)
+        self.assertEqual(self._queue_count(), 1)
+
+        queue = tank.util.get_publish_queue(self.tk)
+        entry = queue.get_entries()[0]
+        queue.close()
+        self.assertEqual(entry.attempts, 1)
+        self.assertEqual(entry.last_error, "Shotgun is down")
+
+        # pretend the record made it to shotgun anyway
+        data = entry.payload["data"]
+        self.add_to_sg_mock_db({"type": "TankPublishedFile",
+                                "id": 55,
+                                "project": data["project"],
+                                "path_cache": data["path_cache"],
+                                "name": data["name"],
+                                "version_number": data["version_number"]})
+
+        self.sg_mock.batch.reset_mock()
+        remaining = tank.util.flush_publish_queue(self.tk)
+        self.assertEqual(remaining, 0)
+        self.assertFalse(self.sg_mock.batch.called)
+
+    def test_existing_record(self):
+        """
+        A publish which already exists in shotgun is never created, even on the first attempt
+        """
+        result = tank.util.register_publish(self.tk, self.context, self.path, "Test Publish", 1, queue=True)
+        self.add_to_sg_mock_db({"type": "TankPublishedFile",
+                                "id": 56,
+                                "project": self.project,
+                                "path_cache": result["path_cache"],
+                                "name": result["name"],
+                                "version_number": result["version_number"]})
+        self.assertEqual(tank.util.flush_publish_queue(self.tk), 0)
+        self.assertFalse(self.sg_mock.batch.called)
+        self.assertFalse(self.sg_mock.create.called)
+
+    def test_claimed_entries_skipped(self):
+        """
+        Publishes being pushed by another flusher are not pushed twice
+        """
+        tank.util.register_publish(self.tk, self.context, self.path, "Test Publish", 1, queue=True)
+        queue = tank.util.get_publish_queue(self.tk)
+        try:
+            (claim, entries) = queue.claim_entries()
+            self.assertEqual(len(entries), 1)
+            self.assertEqual(entries[0].attempts, 1)
+            # a second flusher gets nothing
+            self.assertEqual(tank.util.flush_publish_queue(self.tk), 1)
+            self.assertFalse(self.sg_mock.batch.called)
+            self.assertEqual(queue.claim_entries()[1], [])
+            # unless the claim has expired
+            (claim, entries) = queue.claim_entries(claim_timeout=-1)
+            self.assertEqual(len(entries), 1)
+            queue.release(claim)
+        finally:
+            queue.close()
+        
+        self.sg_mock.batch.side_effect = lambda reqs: [{"type": r["entity_type"], "id": 100 + i} for (i, r) in enumerate(reqs)]
+        self.assertEqual(tank.util.flush_publish_queue(self.tk), 0)
+        self.assertEqual(self.sg_mock.batch.call_count, 1)
+
+    def test_enqueue_different_payload(self):
+        """
+        Queuing different data for an existing publish replaces the queued data,
+        unless the publish is being pushed to shotgun.
+        """
+        queue = tank.util.get_publish_queue(self.tk)
+        try:
+            queue_id = queue.enqueue("key", "TankPublishedFile", {"data": 1})
+            self.assertEqual(queue_id, queue.enqueue("key", "TankPublishedFile", {"data": 1}))
+            self.assertEqual(queue_id, queue.enqueue("key", "TankPublishedFile", {"data": 2}))
+            self.assertEqual([{"data": 2}], [x.payload for x in queue.get_entries()])
+            
+            (claim, entries) = queue.claim_entries()
+            self.assertRaises(TankError, queue.enqueue, "key", "TankPublishedFile", {"data": 3})
+            self.assertEqual(queue_id, queue.enqueue("key", "TankPublishedFile", {"data": 2}))
+            queue.release(claim)
+            self.assertEqual(queue_id, queue.enqueue("key", "TankPublishedFile", {"data": 3}))
+            
+            queue.set_created(queue_id, 12)
+            self.assertRaises(TankError, queue.enqueue, "key", "TankPublishedFile", {"data": 4})
+        finally:
+            queue.close()
+
+    def test_max_attempts(self):
+        """
+        Publishes that have failed too many times are skipped by the flusher
+        """
+        tank.util.register_publish(self.tk, self.context, self.path, "Test Publish", 1, queue=True)
+        self.sg_mock.batch.side_effect = Exception("Shotgun is down")
+        self.assertRaises(Exception, tank.util.flush_publish_queue, self.tk)
+
+        self.sg_mock.batch.reset_mock()
+        self.assertEqual(tank.util.flush_publish_queue(self.tk, max_attempts=1), 1)
+        self.assertFalse(self.sg_mock.batch.called)
+
+
+class TestShotgunCompression(unittest.TestCase):
+    """
+    Tests the gzip support in the shotgun api connection
+    """
+    def setUp(self):
+        from tank_vendor.shotgun_api3 import Shotgun
+        self.sg = Shotgun("http://unit_test_mock_sg", "script", "key", connect=False)
+        self.sg.config.gzip_requests = True
+        self.sg.config.gzip_request_threshold = 10
+        self.requests = []
+        self.sg._http_request = self._http_request
+        self.gzip_response = None
+
+    def _http_request(self, verb, path, body, headers):
+        self.requests.append((body, headers))
+        if self.gzip_response and headers.get("content-encoding") == "gzip":
+            return self.gzip_response
+        if headers.get("content-encoding") == "gzip":
+            body = gzip.GzipFile(fileobj=StringIO.StringIO(body)).read()
+        if '"bad"' in body:
+            return ((400, "Bad Request"), {}, "")
+        return ((200, "OK"), {"content-type": "application/json"}, '{"results": [1, 2]}')
+
+    def test_accept_encoding(self):
+        self.sg._call_rpc("batch", {})
+        self.assertEqual(self.requests[0][1]["accept-encoding"], "gzip")
+        self.sg.config.gzip_responses = False
+        self.sg._call_rpc("batch", {})
+        self.assertEqual(self.requests[1][1]["accept-encoding"], "identity")
+
+    def test_compressed_request(self):
+        self.assertEqual(self.sg._call_rpc("batch", {"foo": "x" * 100}), [1, 2])
+        body, headers = self.requests[0]
+        self.assertEqual(headers["content-encoding"], "gzip")
+        self.assertTrue('"foo"' in gzip.GzipFile(fileobj=StringIO.StringIO(body)).read())
+
+    def test_small_request_not_compressed(self):
+        self.sg.config.gzip_request_threshold = 10000
+        self.sg._call_rpc("batch", {"foo": "x" * 100})
+        self.assertFalse("content-encoding" in self.requests[0][1])
+
+    def test_fallback(self):
+        responses = [((415, "Unsupported Media Type"), {}, ""),
+                     ((400, "Bad Request"), {}, "Unsupported content encoding: gzip")]
+        for response in responses:
+            self.requests = []
+            self.sg.config.gzip_requests = True
+            self.gzip_response = response
+            self.assertEqual(self.sg._call_rpc("batch", {"foo": "x" * 100}), [1, 2])
+            self.assertEqual(len(self.requests), 2)
+            self.assertFalse("content-encoding" in self.requests[1][1])
+            self.assertFalse(self.sg.config.gzip_requests)
+
+    def test_bad_request_not_resent(self):
+        from tank_vendor.shotgun_api3 import ProtocolError
+        self.assertRaises(ProtocolError, self.sg._call_rpc, "batch", {"bad": "x" * 100})
+        self.assertEqual(len(self.requests), 1)
+        self.assertTrue(self.sg.config.gzip_requests)
+
+
+class TestShotgunResponseDecoding(unittest.TestCase):
+    """
+    Tests the single pass decoding of shotgun responses
+    """
+    def setUp(self):
+        from tank_vendor.shotgun_api3 import Shotgun
+        self.sg = Shotgun("http://unit_test_mock_sg", "script", "key", connect=False)
+        self.sg.config.convert_datetimes_to_utc = False
+        self.headers = {"content-type": "application/json"}
+
+    def test_strings_and_dates(self):
+        body = '{"results": {"code": "abc", "created_at": "2013-10-12T12:01:00Z", ' \
+               '"tags": ["x", ["2013-10-12T12:01:00Z"]], "bad_date": "2013-02-30T12:01:00Z"}}'
+        data = self.sg._decode_response(self.headers, body)
+        record = data["results"]
+        self.assertEqual(record.keys()[0].__class__, str)
+        self.assertEqual(record["code"].__class__, str)
+        self.assertEqual(record["created_at"], datetime.datetime(2013, 10, 12, 12, 1))
+        self.assertEqual(record["tags"], ["x", [datetime.datetime(2013, 10, 12, 12, 1)]])
+        self.assertEqual(record["bad_date"], "2013-02-30T12:01:00Z")
+
+    def test_unicode(self):
+        self.sg._json_loads = self.sg._json_loads_ascii
+        data = self.sg._decode_response(self.headers, '{"name": "caf\\u00e9"}')
+        self.assertEqual(data["name"], "caf\xc3\xa9")
+
+    def test_local_path(self):
+        field = self.sg.client_caps.local_path_field
+        body = '{"results": [{"path": {"link_type": "local", "%s": "/foo/bar"}, ' \
+               '"entity": {"type": "Shot", "id": 1, "path": {"link_type": "local", "%s": "/foo"}}}]}' % (field, field)
+        data = self.sg._decode_response(self.headers, body)
+        # local paths are only added to the fields of records
+        path = data["results"][0]["path"]
+        self.assertFalse("local_path" in path)
+        records = self.sg._parse_records(data["results"])
+        self.assertEqual(path["local_path"], "/foo/bar")
+        self.assertEqual(path["url"], "file:///foo/bar")
+        self.assertFalse("local_path" in records[0]["entity"]["path"])
+
+    def _legacy_decode(self, body, ensure_ascii):
+        """
+        Decodes a response the way the client did before the single pass decoder
+        """
+        def _decode_list(lst):
+            newlist = []
+            for i in lst:
+                if isinstance(i, unicode):
+                    i = i.encode('utf-8')
+                elif isinstance(i, list):
+                    i = _decode_list(i)
+                newlist.append(i)
+            return newlist
+
+        def _decode_dict(dct):
+            newdict = {}
+            for k, v in dct.iteritems():
+                if isinstance(k, unicode):
+                    k = k.encode('utf-8')
+                if isinstance(v, unicode):
+                    v = v.encode('utf-8')
+                elif isinstance(v, list):
+                    v = _decode_list(v)
+                newdict[k] = v
+            return newdict
+
+        from tank_vendor.shotgun_api3.shotgun import json
+        if ensure_ascii:
+            data = json.loads(body, object_hook=_decode_dict)
+        else:
+            data = json.loads(body)
+        return self.sg._transform_inbound(data)
+
+    def test_same_as_legacy_decoder(self):
+        from tank_vendor.shotgun_api3 import Shotgun
+        field = self.sg.client_caps.local_path_field
+        local_link = '{"link_type": "local", "%s": "/foo/bar", "name": "b&lt;r"}' % field
+        bodies = [
+            # nested entities
+            '{"results": {"entities": [{"type": "Shot", "id": 1, "code": "a&lt;b", "path": %s, '
+            '"sg_sequence": {"type": "Sequence", "id": 2, "updated_at": "2013-10-12T12:01:00Z", "path": %s}, '
+            '"tags": [{"type": "Tag", "id": 3, "name": "caf\\u00e9"}, "2013-10-12T12:01:00Z"]}], '
+            '"paging_info": {"entity_count": 1}}}' % (local_link, local_link),
+            # schema_read
+            '{"results": {"Shot": {"path": {"properties": {"default_value": {"value": %s}}, '
+            '"data_type": {"value": "url"}}}}}' % local_link,
+            # info
+            '{"version": [5, 0, 0], "s3_uploads_enabled": false, "totango_site_id": "1"}',
+            # other json values
+            '["2013-10-12T12:01:00Z", "2013-02-30T12:01:00Z", {"a": [[]]}, 1, null]',
+            '"2013-10-12T12:01:00Z"',
+            '{}',
+        ]
+        for convert_datetimes_to_utc in (False, True):
+            self.sg.config.convert_datetimes_to_utc = convert_datetimes_to_utc
+            for ensure_ascii in (False, True):
+                if ensure_ascii:
+                    self.sg._json_loads = self.sg._json_loads_ascii
+                else:
+                    self.sg._json_loads = lambda body: Shotgun._json_loads(self.sg, body)
+                for body in bodies:
+                    self.assertEqual(self._legacy_decode(body, ensure_ascii),
+                                     self.sg._decode_response(self.headers, body))
+
+
+class TestShotgunChunkedBatch(unittest.TestCase):
+    """
+    Tests splitting of shotgun batch calls into chunks
+    """
+    def setUp(self):
+        from tank_vendor.shotgun_api3 import Shotgun
+        self.sg = Shotgun("http://unit_test_mock_sg", "script", "key", connect=False)
+        self.calls = []
+        self.fail_ids = []
+        # patch on the class so that the per-thread copies used
+        # for concurrent chunks are patched too.
+        patcher = patch("tank_vendor.shotgun_api3.Shotgun._call_rpc", new=self._call_rpc)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _call_rpc(self, method, params, *args, **kwargs):
+        self.calls.append(params)
+        for call in params:
+            if call["id"] in self.fail_ids:
+                raise Exception("Failed %s" % call["id"])
+        return [{"type": c["type"], "id": c["id"]} for c in params]
+
+    def _requests(self, count):
+        return [{"request_type": "update", "entity_type": "Shot", "entity_id": x, "data": {}}
+                for x in range(count)]
+
+    def test_no_chunking(self):
+        results = self.sg.batch(self._requests(10))
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual([r["id"] for r in results], range(10))
+
+    def test_chunks(self):
+        results = self.sg.batch(self._requests(10), chunk_size=3)
+        self.assertEqual([len(c) for c in self.calls], [3, 3, 3, 1])
+        self.assertEqual([r["id"] for r in results], range(10))
+
+    def test_config_default(self):
+        self.sg.config.batch_chunk_size = 4
+        self.sg.batch(self._requests(10))
+        self.assertEqual(len(self.calls), 3)
+
+    def test_concurrent_chunks(self):
+        results = self.sg.batch(self._requests(100), chunk_size=7, max_concurrency=4)
+        self.assertEqual(len(self.calls), 15)
+        self.assertEqual([r["id"] for r in results], range(100))
+
+    def test_failed_chunk(self):
+        from tank_vendor.shotgun_api3 import BatchChunkError
+        self.fail_ids = [4, 9]
+        try:
+            self.sg.batch(self._requests(10), chunk_size=3, max_concurrency=2)
+        except BatchChunkError, e:
+            self.assertEqual((e.chunk_index, e.start, e.end), (1, 3, 6))
+            self.assertEqual([c[0] for c in e.failed_chunks], [1, 3])
+            self.assertEqual(e.results[3:6], [None, None, None])
+            self.assertEqual([r["id"] for r in e.results[:3] + e.results[6:9]], [0, 1, 2, 6, 7, 8])
+        else:
+            self.fail("BatchChunkError not raised")
+
+
+class TestShotgunStats(unittest.TestCase):
+    """
+    Tests the instrumentation of shotgun handles
+    """
+    class FakeShotgun(object):
+        def find(self, entity_type, filters, fields=None):
+            if entity_type not in ("Project", "Shot"):
+                raise Exception("Unknown entity type %s" % entity_type)
+            return [{"type": entity_type, "id": 1}]
+        def find_one(self, entity_type, filters, fields=None):
+            return self.find(entity_type, filters, fields)[0]
+        def update(self, entity_type, entity_id, data):
+            return {"type": entity_type, "id": entity_id}
+
+    def setUp(self):
+        self.sg = self.FakeShotgun()
+
+    def test_counts(self):
+        from tank.util import shotgun_stats
+        self.sg.find("Shot", [])
+        measurement = shotgun_stats.ShotgunMeasurement(self.sg)
+        stats = measurement.start()
+        try:
+            self.sg.find("Shot", [])
+            self.sg.find_one("Shot", [["code", "is", "shot_name"]])
+            self.sg.find_one("Project", [])
+            self.sg.update("Shot", 1, {"code": "foo"})
+        finally:
+            measurement.stop()
+        self.sg.find("Shot", [])
+
+        self.assertEqual(stats.calls, 4)
+        # find_one calls find internally - this should not be counted
+        self.assertEqual(stats.get("find").calls, 1)
+        self.assertEqual(stats.get("find_one").calls, 2)
+        self.assertEqual(stats.get("find_one", "Shot").calls, 1)
+        self.assertEqual(stats.get(entity_type="Shot").calls, 3)
+        self.assertEqual(sum(stats.get().histogram), 4)
+        self.assertTrue("update(Shot)" in stats.format_report())
+
+    def test_errors_and_nesting(self):
+        from tank.util import shotgun_stats
+        outer_measurement = shotgun_stats.ShotgunMeasurement(self.sg)
+        inner_measurement = shotgun_stats.ShotgunMeasurement(self.sg)
+        outer = outer_measurement.start()
+        try:
+            inner = inner_measurement.start()
+            try:
+                self.assertRaises(Exception, self.sg.find, "NotAnEntity", [])
+            finally:
+                inner_measurement.stop()
+            self.sg.find("Shot", [])
+        finally:
+            outer_measurement.stop()
+        self.assertEqual(inner.calls, 1)
+        self.assertEqual(inner.get().errors, 1)
+        self.assertEqual(outer.calls, 2)
+
+    def test_round_trips(self):
+        from tank.util import shotgun_stats
+        from tank_vendor.shotgun_api3 import Shotgun
+        sg = Shotgun("http://unit_test_mock_sg", "script", "key", connect=False)
+        attempts = []
+        def http_request(verb, path, body, headers):
+            attempts.append(body)
+            if len(attempts) == 1:
+                raise IOError("connection reset")
+            return ((200, "OK"), {"content-type": "application/json"}, '{"results": {"id": 1, "type": "Shot"}}')
+        sg._http_request = http_request
+        measurement = shotgun_stats.ShotgunMeasurement(sg)
+        stats = measurement.start()
+        try:
+            sg.update("Shot", 1, {"code": "foo"})
+        finally:
+            measurement.stop()
+        shot_stats = stats.get("update", "Shot")
+        self.assertEqual(shot_stats.calls, 1)
+        self.assertEqual(shot_stats.round_trips, 2)
+        self.assertEqual(shot_stats.retries, 1)
+        self.assertEqual(shot_stats.bytes_sent, 2 * len(attempts[-1]))
+        self.assertEqual(shot_stats.bytes_received, 38)